@@ -18,6 +18,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 
+from keyword_matcher import get_keyword_matcher, register_keywords
+
 
 class EnrichmentStage(str, Enum):
     """Stage of transaction enrichment"""
@@ -77,6 +79,7 @@ AMBIGUOUS_LABELS = [
     'retail', 'services', 'general', 'other', 'miscellaneous',
     'purchase', 'payment', 'transfer', 'unknown', 'uncategorized'
 ]
+register_keywords("ambiguous_label", lambda: AMBIGUOUS_LABELS)
 
 # Confidence threshold for 4-layer cascade
 # Lowered to 0.80 to respect Ntropy as primary enrichment layer
@@ -112,9 +115,10 @@ def needs_agentic_enrichment(
     
     labels = ntropy_result.get("labels", [])
     labels_lower = [l.lower() for l in labels]
+    keywords = get_keyword_matcher()
     
     has_only_ambiguous_labels = all(
-        any(amb in label for amb in AMBIGUOUS_LABELS)
+        keywords.contains_any(label, "ambiguous_label")
         for label in labels_lower
     ) if labels_lower else True
     
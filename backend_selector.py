@@ -0,0 +1,69 @@
+# backend_selector.py - Automatic solver backend selection
+# Picks CP-SAT or MIP for a portfolio from its features, preferring
+# measured solve history (solve_ledger) for similar portfolios when there is enough of it.
+
+from statistics import median
+from typing import Any, Dict, List
+
+from solver_engine import (
+    DebtPortfolio,
+    OptimizationStrategy,
+    PaymentShape,
+    SolverBackend,
+)
+from solve_ledger import portfolio_features, similar_solves
+
+# Minimum samples per backend before history overrides the heuristic
+MIN_SAMPLES_PER_BACKEND = 3
+
+# Largest portfolio the heuristic sends to MIP: up to here MIP proved
+# optimality where CP-SAT often had no plan yet; beyond it neither backend
+# was measured to win (benchmarks/evidence/README.md)
+MIP_HEURISTIC_MAX_ACCOUNTS = 3
+
+
+def _select_from_history(features: Dict[str, Any]) -> SolverBackend | None:
+    """Return the backend with the lower median solve time for similar portfolios, if known."""
+    timings: Dict[str, List[float]] = {SolverBackend.CP_SAT.value: [], SolverBackend.MIP.value: []}
+
+    for row in similar_solves(features):
+        # Early-stopped solves did not run to completion, so their times are not comparable
+        if row["status"] == "OPTIMAL" and not row["stopped_early"] and row["backend"] in timings:
+            timings[row["backend"]].append(row["wall_time_seconds"])
+
+    if any(len(samples) < MIN_SAMPLES_PER_BACKEND for samples in timings.values()):
+        return None
+
+    fastest = min(timings, key=lambda name: median(timings[name]))
+    return SolverBackend(fastest)
+
+
+def select_backend(portfolio: DebtPortfolio) -> SolverBackend:
+    """
+    Choose a concrete backend for AUTO requests.
+
+    History wins when both backends have been measured on similar portfolios.
+    Otherwise the heuristic sends small portfolios with pure linear
+    objectives and without the linear payment shape (whose OnlyEnforceIf
+    links suit CP-SAT) to the MIP solver. Solves that need alternatives or
+    live progress never get here: solve_payment_plan keeps those on CP-SAT.
+    """
+    features = portfolio_features(portfolio)
+
+    from_history = _select_from_history(features)
+    if from_history is not None:
+        return from_history
+
+    linear_shape = (
+        portfolio.preferences.payment_shape == PaymentShape.LINEAR_PER_ACCOUNT
+        or portfolio.preferences.strategy == OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS
+    )
+    linear_objective = portfolio.preferences.strategy in (
+        OptimizationStrategy.MINIMIZE_MONTHLY_SPEND,
+        OptimizationStrategy.PAY_OFF_IN_PROMO,
+        OptimizationStrategy.MINIMIZE_TOTAL_INTEREST,
+        OptimizationStrategy.TARGET_MAX_BUDGET,
+    )
+    if linear_objective and not linear_shape and len(portfolio.accounts) <= MIP_HEURISTIC_MAX_ACCOUNTS:
+        return SolverBackend.MIP
+    return SolverBackend.CP_SAT
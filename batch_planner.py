@@ -0,0 +1,195 @@
+"""
+Batch Planner
+
+Re-plans many portfolios in one go (e.g. the nightly refresh after balance
+sync): NDJSON portfolios in, NDJSON plan records out, as each plan finishes.
+
+Key features:
+- Fans portfolios out across the solver runner's lanes, so fast-path
+  portfolios skip the queue behind long searches
+- Keeps a bounded number of solves in flight and backs off when the runner
+  reports it is overloaded, instead of flooding it
+- Identical portfolios within a batch are solved once (recent distinct
+  portfolios are kept, up to BATCH_CACHE_SIZE)
+- Ends with a summary record reporting throughput in plans/sec
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Tuple
+
+import schemas
+from solver_engine import (
+    DebtPortfolio,
+    PlanSolveResult,
+    build_columnar_plan,
+    portfolio_from_schema,
+)
+from solver_runner import SolverOverloaded, SolverRunner, get_solver_runner
+
+# Solves in flight at once; the runner's lanes queue the rest
+BATCH_MAX_IN_FLIGHT = 8
+
+# Recent distinct portfolios whose solves are reused for identical lines
+BATCH_CACHE_SIZE = 256
+
+
+@dataclass
+class BatchStats:
+    """Counters for one batch run."""
+    started_at: float = field(default_factory=time.perf_counter)
+    plans: int = 0
+    solves: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    statuses: Counter = field(default_factory=Counter)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "plans": self.plans,
+            "solves": self.solves,
+            "cache_hits": self.cache_hits,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "elapsed_seconds": round(elapsed, 3),
+            "plans_per_second": round(self.plans / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+
+
+def parse_batch_line(line: str, line_number: int) -> Tuple[str, schemas.DebtPortfolio]:
+    """
+    Parse one NDJSON line: either {"id": ..., "portfolio": {...}} or a bare
+    portfolio in the /generate-plan request format (id = line number).
+    """
+    data = json.loads(line)
+    if isinstance(data, dict) and "portfolio" in data:
+        return str(data.get("id", line_number)), schemas.DebtPortfolio.model_validate(data["portfolio"])
+    return str(line_number), schemas.DebtPortfolio.model_validate(data)
+
+
+def plan_record(
+    item_id: str,
+    portfolio: DebtPortfolio,
+    result: PlanSolveResult,
+    format: schemas.PlanFormat
+) -> Dict[str, Any]:
+    """One NDJSON output record for a solved portfolio."""
+    record: Dict[str, Any] = {
+        "id": item_id,
+        "status": result.status,
+        "engine": f"fast-path:{result.fast_path}" if result.fast_path else result.backend.value,
+        "objective_value": result.objective_value,
+        "wall_time_seconds": result.wall_time_seconds,
+    }
+    if result.results is not None:
+        record["total_interest_cents"] = sum(r.interest_charged_cents for r in result.results)
+        record["payoff_month"] = max((r.month for r in result.results), default=0)
+        record["approximation_error_cents"] = result.approximation_error_cents
+        if format == schemas.PlanFormat.COLUMNAR:
+            record["plan_columnar"] = build_columnar_plan(portfolio, result.results)
+        else:
+            record["plan"] = [r.__dict__ for r in result.results]
+    return record
+
+
+async def _solve(runner: SolverRunner, portfolio: DebtPortfolio, solve_id: str) -> PlanSolveResult:
+    """Submit a solve, waiting out overload rejections, and await its result."""
+    while True:
+        try:
+            ticket = runner.submit(portfolio, solve_id=solve_id)
+            break
+        except SolverOverloaded as e:
+            await asyncio.sleep(e.retry_after_seconds)
+    return await asyncio.wrap_future(ticket.future)
+
+
+async def iterate_lines(lines: Iterable[str]) -> AsyncIterator[str]:
+    """Adapt a file, list of lines or request body lines for replan_batch."""
+    for line in lines:
+        yield line
+
+
+async def replan_batch(
+    lines: AsyncIterable[str],
+    format: schemas.PlanFormat = schemas.PlanFormat.COLUMNAR,
+    runner: Optional[SolverRunner] = None,
+    max_in_flight: int = BATCH_MAX_IN_FLIGHT
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Solve every NDJSON portfolio line and yield a record per line as soon as
+    its plan is ready (not in input order), then {"summary": {...}}.
+    Lines that fail to parse or solve yield {"id", "status": "ERROR", "error"}.
+    If the consumer stops early (e.g. the client disconnects), outstanding solves are cancelled.
+    """
+    runner = runner or get_solver_runner()
+    batch_id = uuid.uuid4().hex
+    stats = BatchStats()
+    solves: "OrderedDict[str, asyncio.Task]" = OrderedDict()  # portfolio JSON -> shared solve, oldest first
+    pending: set = set()
+
+    async def plan_one(item_id: str, portfolio: DebtPortfolio, solve: asyncio.Task, cached: bool) -> Dict[str, Any]:
+        try:
+            result = await solve
+        except Exception as e:
+            return {"id": item_id, "status": "ERROR", "error": str(e)}
+        record = plan_record(item_id, portfolio, result, format)
+        record["cached"] = cached
+        return record
+
+    def count(record: Dict[str, Any]) -> Dict[str, Any]:
+        stats.plans += 1
+        stats.statuses[record["status"]] += 1
+        if record["status"] == "ERROR":
+            stats.errors += 1
+        return record
+
+    try:
+        line_number = 0
+        async for line in lines:
+            if not line.strip():
+                continue
+            line_number += 1
+            try:
+                item_id, portfolio_schema = parse_batch_line(line, line_number)
+                portfolio = portfolio_from_schema(portfolio_schema)
+            except Exception as e:
+                yield count({"id": str(line_number), "status": "ERROR", "error": str(e)})
+                continue
+
+            key = portfolio_schema.model_dump_json()
+            cached = key in solves
+            if cached:
+                stats.cache_hits += 1
+            else:
+                stats.solves += 1
+                solves[key] = asyncio.ensure_future(_solve(runner, portfolio, f"batch-{batch_id}-{stats.solves}"))
+                if len(solves) > BATCH_CACHE_SIZE:
+                    solves.popitem(last=False)
+            pending.add(asyncio.ensure_future(plan_one(item_id, portfolio, solves[key], cached)))
+
+            while len(pending) >= max_in_flight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield count(task.result())
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield count(task.result())
+    finally:
+        if pending:
+            print(f"[BatchPlanner] Batch stopped early; cancelling {len(pending)} outstanding plans")
+            for number in range(1, stats.solves + 1):
+                runner.cancel(f"batch-{batch_id}-{number}")
+            for task in pending:
+                task.cancel()
+
+    summary = stats.summary()
+    print(f"[BatchPlanner] {summary['plans']} plans in {summary['elapsed_seconds']}s "
+          f"({summary['plans_per_second']} plans/sec, {summary['cache_hits']} cache hits)")
+    yield {"summary": summary}
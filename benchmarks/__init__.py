@@ -0,0 +1,22 @@
+# Solver benchmark suite
+# Seeded synthetic portfolios, a runner that records build/solve times,
+# status, gap and peak memory per case, and a comparison that flags
+# regressions between two runs (e.g. two commits).
+# Entry point: python -m benchmarks run | compare
+
+from benchmarks.compare import Regression, Tolerances, compare_results
+from benchmarks.generator import BenchmarkCase, generate_portfolio, generate_suite
+from benchmarks.runner import BenchmarkResult, load_results, run_benchmarks, write_results
+
+__all__ = [
+    "BenchmarkCase",
+    "BenchmarkResult",
+    "Regression",
+    "Tolerances",
+    "compare_results",
+    "generate_portfolio",
+    "generate_suite",
+    "load_results",
+    "run_benchmarks",
+    "write_results",
+]
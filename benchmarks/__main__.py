@@ -0,0 +1,97 @@
+# python -m benchmarks run [options]              - solve the suite, write a results file
+# python -m benchmarks compare BASELINE CANDIDATE - flag regressions (exit code 1 if any)
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+from benchmarks.compare import Tolerances, compare_results, summarize_times
+from benchmarks.generator import DEFAULT_SIZES, generate_suite
+from benchmarks.runner import (
+    DEFAULT_TIME_LIMIT_SECONDS,
+    BenchmarkResult,
+    git_commit,
+    load_results,
+    results_metadata,
+    run_benchmarks,
+    write_results,
+)
+from solver_engine import OptimizationStrategy, PaymentShape, SolverBackend
+
+
+def _names(value: str) -> List[str]:
+    return [name.strip().upper() for name in value.split(",") if name.strip()]
+
+
+def run(args: argparse.Namespace) -> None:
+    cases = generate_suite(
+        seed=args.seed,
+        sizes=[int(size) for size in args.sizes.split(",")],
+        strategies=[OptimizationStrategy[name] for name in _names(args.strategies)] if args.strategies else OptimizationStrategy,
+        shapes=[PaymentShape[name] for name in _names(args.shapes)] if args.shapes else PaymentShape,
+    )
+    backends = [SolverBackend[name] for name in _names(args.backends)]
+    output = args.output or os.path.join("benchmarks", "results", f"{git_commit() or 'results'}.json")
+    print(f"[Benchmarks] {len(cases)} cases x {len(backends)} backends, {args.time_limit:.0f}s limit each")
+
+    def report(result: BenchmarkResult) -> None:
+        gap = f"{result.relative_gap:.4f}" if result.relative_gap is not None else "-"
+        timing = f"build {result.build_seconds or 0:.2f}s solve {result.solve_seconds or 0:.2f}s"
+        print(f"  {result.case_id:<55} {result.backend:<6} {result.status:<10} {timing} "
+              f"gap {gap} rss {result.peak_rss_mb or 0:.0f}MB" + (f" ({result.error})" if result.error else ""))
+
+    results = run_benchmarks(cases, backends, args.time_limit, isolate=not args.in_process, on_result=report)
+    write_results(output, results, results_metadata(args.seed, args.time_limit))
+    print(f"[Benchmarks] Results written to {output}")
+
+
+def compare(args: argparse.Namespace) -> int:
+    baseline, candidate = load_results(args.baseline), load_results(args.candidate)
+    tolerances = Tolerances(time_ratio=args.time_ratio, min_seconds=args.min_seconds, gap=args.gap, rss_ratio=args.rss_ratio)
+    regressions, notes = compare_results(baseline, candidate, tolerances)
+
+    print(f"Baseline:  {baseline['metadata'].get('commit')} {summarize_times(baseline)}")
+    print(f"Candidate: {candidate['metadata'].get('commit')} {summarize_times(candidate)}")
+    for note in notes:
+        print(f"  note: {note}")
+    if not regressions:
+        print("No regressions.")
+        return 0
+    print(f"{len(regressions)} regression(s):")
+    for regression in regressions:
+        print(f"  {regression.describe()}")
+    return 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Solver benchmark suite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Solve the synthetic suite and write a results file")
+    run_parser.add_argument("-o", "--output", help="Results path (default benchmarks/results/<commit>.json)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated account counts (1-30)")
+    run_parser.add_argument("--strategies", help="Comma-separated OptimizationStrategy names (default: all)")
+    run_parser.add_argument("--shapes", help="Comma-separated PaymentShape names (default: both)")
+    run_parser.add_argument("--backends", default="cp_sat,mip", help="Comma-separated SolverBackend names")
+    run_parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT_SECONDS, help="Seconds per solve")
+    run_parser.add_argument("--in-process", action="store_true", help="Skip per-case processes (peak RSS becomes cumulative)")
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions between two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--time-ratio", type=float, default=Tolerances.time_ratio)
+    compare_parser.add_argument("--min-seconds", type=float, default=Tolerances.min_seconds)
+    compare_parser.add_argument("--gap", type=float, default=Tolerances.gap)
+    compare_parser.add_argument("--rss-ratio", type=float, default=Tolerances.rss_ratio)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# benchmarks/compare.py - Flags solver regressions between two results files
+# Cases are matched on (case_id, backend). A case regresses when its status
+# gets worse, its solve or build time grows beyond a tolerance, its gap
+# widens, its optimal objective changes, or its peak memory grows.
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Status ranks: lower is better. INFEASIBLE is a proven answer, like OPTIMAL.
+_STATUS_RANK = {"OPTIMAL": 0, "INFEASIBLE": 0, "FEASIBLE": 1}
+_WORST_STATUS_RANK = 2
+
+
+@dataclass
+class Tolerances:
+    """
+    How much worse a candidate may be before a case counts as regressed.
+    Time and memory must grow by both the ratio and the absolute floor, so
+    noise on sub-second cases is not reported.
+    """
+    time_ratio: float = 1.25
+    min_seconds: float = 0.25
+    gap: float = 0.001
+    rss_ratio: float = 1.2
+    min_rss_mb: float = 20.0
+    objective_rel: float = 1e-6
+
+
+@dataclass
+class Regression:
+    case_id: str
+    backend: str
+    metric: str
+    baseline: Any
+    candidate: Any
+
+    def describe(self) -> str:
+        def fmt(value: Any) -> str:
+            return f"{value:.3f}" if isinstance(value, float) else str(value)
+        return f"{self.case_id} [{self.backend}] {self.metric}: {fmt(self.baseline)} -> {fmt(self.candidate)}"
+
+
+def _grew(baseline: Optional[float], candidate: Optional[float], ratio: float, floor: float) -> bool:
+    if baseline is None or candidate is None:
+        return False
+    return candidate > baseline * ratio and candidate - baseline > floor
+
+
+def compare_case(base: Dict[str, Any], cand: Dict[str, Any], tolerances: Tolerances) -> List[Regression]:
+    """Regressions of one case from the baseline to the candidate run."""
+    key = (cand["case_id"], cand["backend"])
+
+    def regression(metric: str) -> Regression:
+        return Regression(*key, metric=metric, baseline=base[metric], candidate=cand[metric])
+
+    found: List[Regression] = []
+    base_rank = _STATUS_RANK.get(base["status"], _WORST_STATUS_RANK)
+    cand_rank = _STATUS_RANK.get(cand["status"], _WORST_STATUS_RANK)
+    if cand_rank > base_rank or ("INFEASIBLE" in (base["status"], cand["status"]) and base["status"] != cand["status"]):
+        found.append(regression("status"))
+
+    for metric in ("solve_seconds", "build_seconds"):
+        if _grew(base[metric], cand[metric], tolerances.time_ratio, tolerances.min_seconds):
+            found.append(regression(metric))
+
+    if base["relative_gap"] is not None and cand["relative_gap"] is not None \
+            and cand["relative_gap"] - base["relative_gap"] > tolerances.gap:
+        found.append(regression("relative_gap"))
+
+    # Both proven optimal: a different objective means the model itself changed
+    if base["status"] == cand["status"] == "OPTIMAL" \
+            and base["objective_value"] is not None and cand["objective_value"] is not None:
+        scale = max(1.0, abs(base["objective_value"]))
+        if abs(cand["objective_value"] - base["objective_value"]) / scale > tolerances.objective_rel:
+            found.append(regression("objective_value"))
+
+    if _grew(base["peak_rss_mb"], cand["peak_rss_mb"], tolerances.rss_ratio, tolerances.min_rss_mb):
+        found.append(regression("peak_rss_mb"))
+    return found
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    candidate: Dict[str, Any],
+    tolerances: Optional[Tolerances] = None
+) -> Tuple[List[Regression], List[str]]:
+    """
+    Compare two results files (as loaded by load_results). Returns the
+    regressions and notes about cases present in only one of the files.
+    """
+    tolerances = tolerances or Tolerances()
+    base_by_key = {(r["case_id"], r["backend"]): r for r in baseline["results"]}
+    cand_by_key = {(r["case_id"], r["backend"]): r for r in candidate["results"]}
+
+    regressions: List[Regression] = []
+    for key, cand in cand_by_key.items():
+        if key in base_by_key:
+            regressions.extend(compare_case(base_by_key[key], cand, tolerances))
+
+    notes = [f"{case_id} [{backend}] only in baseline" for case_id, backend in base_by_key.keys() - cand_by_key.keys()]
+    notes += [f"{case_id} [{backend}] only in candidate" for case_id, backend in cand_by_key.keys() - base_by_key.keys()]
+    return regressions, sorted(notes)
+
+
+def summarize_times(results: Dict[str, Any]) -> Dict[str, float]:
+    """Total solve time and share of proven-optimal cases, per backend."""
+    summary: Dict[str, float] = {}
+    for backend in sorted({r["backend"] for r in results["results"]}):
+        rows = [r for r in results["results"] if r["backend"] == backend]
+        summary[f"{backend}_total_solve_seconds"] = round(sum(r["solve_seconds"] or 0.0 for r in rows), 3)
+        summary[f"{backend}_optimal_share"] = round(sum(r["status"] == "OPTIMAL" for r in rows) / len(rows), 3)
+    return summary
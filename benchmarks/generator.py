@@ -0,0 +1,188 @@
+# benchmarks/generator.py - Seeded synthetic portfolios for solver benchmarks
+# Every case is rebuilt identically from (seed, size, strategy, shape), so
+# results from different commits can be compared case by case.
+
+import random
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, List, Sequence
+
+from dateutil.relativedelta import relativedelta
+
+from solver_engine import (
+    Account,
+    AccountType,
+    BucketType,
+    Budget,
+    DebtBucket,
+    DebtPortfolio,
+    MinPaymentRule,
+    OptimizationStrategy,
+    PaymentShape,
+    UserPreferences,
+)
+
+# Portfolio sizes in the default suite, from a single card to the 30-account ceiling
+DEFAULT_SIZES = (1, 3, 8, 15, 30)
+
+# Fixed start date, so promo and budget dates do not drift between runs
+PLAN_START = date(2026, 1, 1)
+
+# Relative frequency of each kind of account
+_ACCOUNT_KINDS = ("card", "bucket_card", "bnpl", "loan")
+_ACCOUNT_WEIGHTS = (3, 2, 1, 2)
+
+
+@dataclass
+class BenchmarkCase:
+    """One synthetic portfolio and the parameters it was generated from."""
+    case_id: str
+    seed: int
+    num_accounts: int
+    strategy: OptimizationStrategy
+    payment_shape: PaymentShape
+    portfolio: DebtPortfolio
+
+
+def case_id(seed: int, num_accounts: int, strategy: OptimizationStrategy, payment_shape: PaymentShape) -> str:
+    """Stable identifier used to match a case across result files."""
+    return f"n{num_accounts:02d}-{strategy.name.lower()}-{payment_shape.name.lower()}-s{seed}"
+
+
+def _pounds(rng: random.Random, low: int, high: int) -> int:
+    """A whole-pound amount in [low, high] pounds, in cents."""
+    return rng.randint(low, high) * 100
+
+
+def _promo_expiry(rng: random.Random, min_months: int, max_months: int) -> date:
+    return PLAN_START + relativedelta(months=rng.randint(min_months, max_months), day=rng.randint(1, 28))
+
+
+def _generate_account(rng: random.Random, index: int, needs_promo: bool) -> Account:
+    kind = rng.choices(_ACCOUNT_KINDS, weights=_ACCOUNT_WEIGHTS)[0]
+    name = f"{kind.replace('_', ' ').title()} {index + 1}"
+    due_day = rng.randint(1, 28)
+
+    if kind == "bucket_card":
+        apr = rng.randint(2290, 2990)
+        buckets = [
+            DebtBucket(BucketType.BALANCE_TRANSFER, _pounds(rng, 500, 6000), 0, is_promo=True,
+                       promo_expiry_date=_promo_expiry(rng, 3, 21)),
+            DebtBucket(BucketType.PURCHASES, _pounds(rng, 100, 3000), rng.choice((apr, apr - 200))),
+        ]
+        if rng.random() < 0.3:
+            buckets.append(DebtBucket(BucketType.CASH_ADVANCE, _pounds(rng, 50, 800), 3990))
+        return Account(
+            lender_name=name,
+            account_type=AccountType.CREDIT_CARD,
+            current_balance_cents=sum(b.balance_cents for b in buckets),
+            apr_standard_bps=apr,
+            payment_due_day=due_day,
+            min_payment_rule=MinPaymentRule(fixed_cents=2500, percentage_bps=100, includes_interest=True),
+            buckets=buckets,
+        )
+
+    if kind == "card":
+        has_promo = needs_promo or rng.random() < 0.4
+        return Account(
+            lender_name=name,
+            account_type=AccountType.CREDIT_CARD,
+            current_balance_cents=_pounds(rng, 300, 8000),
+            apr_standard_bps=rng.randint(1990, 3490),
+            payment_due_day=due_day,
+            min_payment_rule=MinPaymentRule(
+                fixed_cents=2500, percentage_bps=rng.choice((100, 200, 300)), includes_interest=rng.random() < 0.5
+            ),
+            promo_duration_months=rng.randint(3, 18) if has_promo else None,
+        )
+
+    if kind == "bnpl":
+        balance = _pounds(rng, 100, 1500)
+        return Account(
+            lender_name=name,
+            account_type=AccountType.BNPL,
+            current_balance_cents=balance,
+            apr_standard_bps=2990,
+            payment_due_day=due_day,
+            min_payment_rule=MinPaymentRule(fixed_cents=max(balance // 12, 1000)),
+            promo_end_date=_promo_expiry(rng, 3, 12),
+        )
+
+    balance = _pounds(rng, 2000, 15000)
+    return Account(
+        lender_name=name,
+        account_type=AccountType.LOAN,
+        current_balance_cents=balance,
+        apr_standard_bps=rng.randint(500, 1990),
+        payment_due_day=due_day,
+        min_payment_rule=MinPaymentRule(fixed_cents=balance // rng.randint(36, 60)),
+        promo_duration_months=rng.randint(6, 12) if needs_promo else None,
+    )
+
+
+def _minimum_payment(account: Account) -> int:
+    rule = account.min_payment_rule
+    return max(rule.fixed_cents, account.current_balance_cents * rule.percentage_bps // 10000)
+
+
+def generate_portfolio(
+    seed: int,
+    num_accounts: int,
+    strategy: OptimizationStrategy,
+    payment_shape: PaymentShape
+) -> DebtPortfolio:
+    """
+    A random but reproducible portfolio of num_accounts accounts: plain and
+    promo credit cards, multi-bucket cards (balance transfer, purchases and
+    sometimes a cash advance), BNPL plans and loans. The budget covers the
+    minimum payments with room to clear the debt within a few years, and
+    sometimes changes or receives a lump sum.
+    """
+    rng = random.Random(case_id(seed, num_accounts, strategy, payment_shape))
+    # Clearing promos needs every account to have one
+    needs_promo = strategy == OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS
+    accounts = [_generate_account(rng, index, needs_promo) for index in range(num_accounts)]
+
+    total_balance = sum(acc.current_balance_cents for acc in accounts)
+    monthly_interest = sum(acc.current_balance_cents * acc.get_highest_apr_bps() // 120000 for acc in accounts)
+    budget_cents = max(
+        sum(_minimum_payment(acc) for acc in accounts) * 13 // 10,
+        total_balance // rng.randint(18, 48) + monthly_interest * 3 // 2,
+    )
+    budget = Budget(monthly_budget_cents=-(-budget_cents // 1000) * 1000)  # round up to £10
+    if rng.random() < 0.3:
+        budget.future_changes.append(
+            (PLAN_START + relativedelta(months=rng.randint(6, 24)), int(budget.monthly_budget_cents * rng.uniform(0.95, 1.25)))
+        )
+    if rng.random() < 0.3:
+        budget.lump_sum_payments.append((PLAN_START + relativedelta(months=rng.randint(2, 12)), _pounds(rng, 200, 2000)))
+
+    return DebtPortfolio(
+        accounts=accounts,
+        budget=budget,
+        preferences=UserPreferences(strategy=strategy, payment_shape=payment_shape),
+        plan_start_date=PLAN_START,
+    )
+
+
+def generate_suite(
+    seed: int = 0,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    strategies: Iterable[OptimizationStrategy] = tuple(OptimizationStrategy),
+    shapes: Iterable[PaymentShape] = tuple(PaymentShape)
+) -> List[BenchmarkCase]:
+    """Every combination of size, strategy and payment shape, smallest portfolios first."""
+    strategies, shapes = list(strategies), list(shapes)
+    return [
+        BenchmarkCase(
+            case_id=case_id(seed, size, strategy, shape),
+            seed=seed,
+            num_accounts=size,
+            strategy=strategy,
+            payment_shape=shape,
+            portfolio=generate_portfolio(seed, size, strategy, shape),
+        )
+        for size in sizes
+        for strategy in strategies
+        for shape in shapes
+    ]
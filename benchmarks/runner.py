@@ -0,0 +1,175 @@
+# benchmarks/runner.py - Runs benchmark cases and writes a JSON results file
+# Each case is solved in a fresh process (so peak RSS is that solve's own
+# peak and a crash only fails one case), one case at a time so timings are
+# not skewed by solves competing for cores.
+
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.generator import BenchmarkCase
+from solver_engine import SolverBackend, solve_payment_plan
+
+# Results format version, bumped when fields change meaning
+RESULTS_VERSION = 1
+
+# Per-case time limit unless overridden; long enough for small cases to prove optimality
+DEFAULT_TIME_LIMIT_SECONDS = 10.0
+
+
+@dataclass
+class BenchmarkResult:
+    """Outcome of solving one case with one backend."""
+    case_id: str
+    backend: str
+    num_accounts: int
+    strategy: str
+    payment_shape: str
+    status: str
+    build_seconds: Optional[float] = None
+    solve_seconds: Optional[float] = None
+    wall_seconds: Optional[float] = None
+    objective_value: Optional[float] = None
+    best_bound: Optional[float] = None
+    relative_gap: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+    num_variables: Optional[int] = None
+    num_constraints: Optional[int] = None
+    error: Optional[str] = None
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(case: BenchmarkCase, backend: SolverBackend, time_limit_seconds: float) -> BenchmarkResult:
+    """
+    Solve one case and measure it. Solver output is discarded, and solves are
+    recorded in a throwaway in-memory ledger instead of the real one.
+    """
+    import solve_ledger
+    solve_ledger.LEDGER_PATH = ":memory:"
+
+    result = BenchmarkResult(
+        case_id=case.case_id,
+        backend=backend.name.lower(),
+        num_accounts=case.num_accounts,
+        strategy=case.strategy.name.lower(),
+        payment_shape=case.payment_shape.name.lower(),
+        status="ERROR",
+    )
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            solved = solve_payment_plan(case.portfolio, backend, time_limit_seconds=time_limit_seconds)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+        result.wall_seconds = time.perf_counter() - start
+        result.peak_rss_mb = peak_rss_mb()
+        return result
+
+    result.wall_seconds = time.perf_counter() - start
+    result.status = solved.status
+    result.build_seconds = solved.build_seconds
+    # Everything outside model construction: the search itself plus plan extraction
+    result.solve_seconds = result.wall_seconds - (solved.build_seconds or 0.0)
+    result.objective_value = solved.objective_value
+    result.best_bound = solved.best_bound
+    result.relative_gap = solved.relative_gap
+    result.num_variables = solved.num_variables
+    result.num_constraints = solved.num_constraints
+    result.peak_rss_mb = peak_rss_mb()
+    return result
+
+
+def run_benchmarks(
+    cases: Sequence[BenchmarkCase],
+    backends: Sequence[SolverBackend] = (SolverBackend.CP_SAT, SolverBackend.MIP),
+    time_limit_seconds: float = DEFAULT_TIME_LIMIT_SECONDS,
+    isolate: bool = True,
+    on_result: Optional[Callable[[BenchmarkResult], None]] = None
+) -> List[BenchmarkResult]:
+    """
+    Run every case with every backend, in order. With isolate=False cases run
+    in this process, which is faster to start but makes peak RSS cumulative.
+    """
+    results: List[BenchmarkResult] = []
+    for case in cases:
+        for backend in backends:
+            if isolate:
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    try:
+                        result = pool.submit(run_case, case, backend, time_limit_seconds).result()
+                    except Exception as e:  # the worker died (e.g. out of memory)
+                        result = BenchmarkResult(
+                            case_id=case.case_id,
+                            backend=backend.name.lower(),
+                            num_accounts=case.num_accounts,
+                            strategy=case.strategy.name.lower(),
+                            payment_shape=case.payment_shape.name.lower(),
+                            status="ERROR",
+                            error=f"{type(e).__name__}: {e}",
+                        )
+            else:
+                result = run_case(case, backend, time_limit_seconds)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    """The checked-out commit (with a -dirty suffix for uncommitted changes), if in a git repo."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def results_metadata(seed: int, time_limit_seconds: float) -> Dict[str, Any]:
+    """Where and how a results file was produced."""
+    from ortools import __version__ as ortools_version
+    return {
+        "version": RESULTS_VERSION,
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "seed": seed,
+        "time_limit_seconds": time_limit_seconds,
+        "python": platform.python_version(),
+        "ortools": ortools_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(path: str, results: List[BenchmarkResult], metadata: Dict[str, Any]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"metadata": metadata, "results": [asdict(r) for r in results]}, f, indent=2)
+        f.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
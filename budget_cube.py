@@ -0,0 +1,279 @@
+# budget_cube.py - Monthly aggregate cube for budget analysis
+# Budget figures are sums of transaction cents by month, budget category and
+# entry type. The cube adds every classified transaction of a frame into those
+# cells in one pass (plus a per-merchant rollup), after which any horizon,
+# rolling average or trend is answered from the monthly cells in O(months)
+# without touching transactions again. Cubes are kept per account holder, so
+# the budget analysis endpoint can re-slice the last enrichment of a bank
+# connection (another horizon or reference date) without re-enriching it.
+
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from transaction_frame import (
+    BUDGET_CATEGORIES,
+    ENTRY_TYPES,
+    INCOMING,
+    NO_DAY,
+    OUTGOING,
+    UNCLASSIFIED,
+    TransactionFrame,
+    category_code,
+)
+
+# Cubes kept for the budget analysis endpoint (least recently used are evicted first)
+MAX_RETAINED_CUBES = int(os.environ.get("MAX_RETAINED_BUDGET_CUBES", "1000"))
+# Cubes older than this are dropped; the next enrichment rebuilds them
+BUDGET_CUBE_TTL_SECONDS = float(os.environ.get("BUDGET_CUBE_TTL_SECONDS", str(24 * 3600)))
+
+DEFAULT_HORIZON_MONTHS = 3
+
+# Budget measures: income is every incoming transaction, the rest are
+# outgoing transactions of that category
+MEASURES = ("income", "fixed", "discretionary", "debt")
+_MEASURE_KEYS = {
+    "income": "averageMonthlyIncomeCents",
+    "fixed": "fixedCostsCents",
+    "discretionary": "discretionaryCents",
+    "debt": "debtPaymentsCents",
+}
+
+_CELLS_PER_MONTH = len(ENTRY_TYPES) * len(BUDGET_CATEGORIES)
+
+
+def month_index(day: date) -> int:
+    """Months since year 0, so consecutive months are consecutive integers."""
+    return day.year * 12 + day.month - 1
+
+
+def month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+class BudgetCube:
+    """
+    Cents and transaction counts per (month, entry type, budget category),
+    stored densely from the first to the last month with transactions, and
+    cents, counts and active months per merchant.
+    """
+
+    def __init__(self):
+        self.first_month: Optional[int] = None
+        self.month_count = 0
+        self.cents = array("q")
+        self.counts = array("l")
+        self.merchants: Dict[str, Dict[str, Any]] = {}
+        self.transaction_count = 0
+        self.built_at = time.time()
+
+    @classmethod
+    def from_frame(cls, frame: TransactionFrame, merchants: Optional[Sequence[Optional[str]]] = None) -> "BudgetCube":
+        """
+        Aggregate the classified rows of frame; undated and unclassified rows
+        are left out. merchants[i] (optional) names row i's merchant.
+        """
+        cube = cls()
+        month_by_day: Dict[int, int] = {}
+        rows: List[Tuple[int, int]] = []
+        for index, (day, category) in enumerate(zip(frame.days, frame.categories)):
+            if day == NO_DAY or category == UNCLASSIFIED:
+                continue
+            month = month_by_day.get(day)
+            if month is None:
+                month = month_by_day[day] = month_index(date.fromordinal(day))
+            rows.append((index, month))
+        if not rows:
+            return cube
+
+        cube.first_month = min(month for _, month in rows)
+        cube.month_count = max(month for _, month in rows) - cube.first_month + 1
+        cube.cents = array("q", [0]) * (cube.month_count * _CELLS_PER_MONTH)
+        cube.counts = array("l", [0]) * (cube.month_count * _CELLS_PER_MONTH)
+        for index, month in rows:
+            cents = frame.amount_cents[index]
+            entry_type = frame.entry_types[index]
+            cell = cube._cell(month, entry_type, frame.categories[index])
+            cube.cents[cell] += cents
+            cube.counts[cell] += 1
+            if merchants is not None and merchants[index]:
+                rollup = cube.merchants.setdefault(merchants[index], {
+                    "outgoingCents": 0, "incomingCents": 0, "transactionCount": 0,
+                    "months": set(), "categories": {},
+                })
+                rollup["incomingCents" if entry_type == INCOMING else "outgoingCents"] += cents
+                rollup["transactionCount"] += 1
+                rollup["months"].add(month)
+                category = BUDGET_CATEGORIES[frame.categories[index]]
+                rollup["categories"][category] = rollup["categories"].get(category, 0) + 1
+        cube.transaction_count = len(rows)
+        return cube
+
+    def _cell(self, month: int, entry_type: int, category: int) -> int:
+        return ((month - self.first_month) * len(ENTRY_TYPES) + entry_type) * len(BUDGET_CATEGORIES) + category
+
+    def month_totals(self, month: int) -> Dict[str, int]:
+        """Cents per measure in one month (zero outside the cube)."""
+        totals = dict.fromkeys(MEASURES, 0)
+        if self.first_month is None or not 0 <= month - self.first_month < self.month_count:
+            return totals
+        incoming = self._cell(month, INCOMING, 0)
+        totals["income"] = sum(self.cents[incoming:incoming + len(BUDGET_CATEGORIES)])
+        for measure in ("fixed", "discretionary", "debt"):
+            totals[measure] = self.cents[self._cell(month, OUTGOING, category_code(measure))]
+        return totals
+
+    def monthly(self, start_month: int, end_month: int) -> List[Dict[str, int]]:
+        """Totals per measure for each month in [start_month, end_month)."""
+        return [self.month_totals(month) for month in range(start_month, end_month)]
+
+    @staticmethod
+    def _complete_months(horizon_months: int, as_of: Optional[date]) -> Tuple[int, int]:
+        """[start, end) of the horizon's complete months before as_of's (partial) month."""
+        end = month_index(as_of or date.today())
+        return end - max(horizon_months, 0), end
+
+    def budget_breakdown(self, horizon_months: int = DEFAULT_HORIZON_MONTHS, as_of: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Monthly averages over the complete months of the horizon: the current
+        (partial) month of as_of (default today) is excluded, and at least one
+        month is divided by.
+        """
+        start, end = self._complete_months(horizon_months, as_of)
+        totals = dict.fromkeys(MEASURES, 0)
+        for month_totals in self.monthly(start, end):
+            for measure, cents in month_totals.items():
+                totals[measure] += cents
+        months = max(1, horizon_months)
+        averages = {measure: cents // months for measure, cents in totals.items()}
+        breakdown: Dict[str, Any] = {_MEASURE_KEYS[measure]: averages[measure] for measure in MEASURES}
+        breakdown["safeToSpendCents"] = max(0, averages["income"] - averages["fixed"] - averages["debt"])
+        breakdown["analysisMonths"] = months
+        return breakdown
+
+    def rolling_averages(
+        self,
+        window_months: int = DEFAULT_HORIZON_MONTHS,
+        horizon_months: int = 12,
+        as_of: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        For each complete month of the horizon, the average of each measure
+        over the window_months ending with it (running sums, O(months)).
+        """
+        window_months = max(1, window_months)
+        start, end = self._complete_months(horizon_months, as_of)
+        series = self.monthly(start - window_months + 1, end)
+        running = dict.fromkeys(MEASURES, 0)
+        averages = []
+        for position, month_totals in enumerate(series):
+            for measure in MEASURES:
+                running[measure] += month_totals[measure]
+                if position >= window_months:
+                    running[measure] -= series[position - window_months][measure]
+            if position >= window_months - 1:
+                month = start + position - (window_months - 1)
+                averages.append({"month": month_label(month),
+                                 **{f"{measure}Cents": running[measure] // window_months for measure in MEASURES}})
+        return averages
+
+    def trend(self, horizon_months: int = 6, as_of: Optional[date] = None) -> Dict[str, int]:
+        """Least-squares change per month of each measure over the horizon's complete months, in cents."""
+        start, end = self._complete_months(horizon_months, as_of)
+        series = self.monthly(start, end)
+        count = len(series)
+        if count < 2:
+            return {f"{measure}CentsPerMonth": 0 for measure in MEASURES}
+        mean_x = (count - 1) / 2
+        variance = sum((x - mean_x) ** 2 for x in range(count))
+        slopes = {}
+        for measure in MEASURES:
+            mean_y = sum(totals[measure] for totals in series) / count
+            covariance = sum((x - mean_x) * (totals[measure] - mean_y) for x, totals in enumerate(series))
+            slopes[f"{measure}CentsPerMonth"] = round(covariance / variance)
+        return slopes
+
+    def top_merchants(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Merchants by outgoing cents over the whole history, with their monthly average."""
+        ranked = sorted(self.merchants.items(), key=lambda item: (-item[1]["outgoingCents"], item[0]))[:max(limit, 0)]
+        return [
+            {
+                "merchant": name,
+                "outgoingCents": rollup["outgoingCents"],
+                "incomingCents": rollup["incomingCents"],
+                "transactionCount": rollup["transactionCount"],
+                "activeMonths": len(rollup["months"]),
+                "averageMonthlyOutgoingCents": rollup["outgoingCents"] // len(rollup["months"]),
+                "budgetCategory": max(rollup["categories"].items(), key=lambda item: (item[1], item[0]))[0],
+            }
+            for name, rollup in ranked
+        ]
+
+    def analysis(
+        self,
+        horizon_months: int = DEFAULT_HORIZON_MONTHS,
+        as_of: Optional[date] = None,
+        rolling_window_months: int = DEFAULT_HORIZON_MONTHS,
+        merchant_limit: int = 10
+    ) -> Dict[str, Any]:
+        """Budget breakdown plus monthly totals, rolling averages, trend and top merchants for one horizon."""
+        start, end = self._complete_months(horizon_months, as_of)
+        return {
+            "budget_analysis": self.budget_breakdown(horizon_months, as_of),
+            "monthly_totals": [
+                {"month": month_label(month), **{f"{measure}Cents": cents for measure, cents in totals.items()}}
+                for month, totals in zip(range(start, end), self.monthly(start, end))
+            ],
+            "rolling_averages": self.rolling_averages(rolling_window_months, horizon_months, as_of),
+            "trend": self.trend(horizon_months, as_of),
+            "top_merchants": self.top_merchants(merchant_limit),
+            "first_month": month_label(self.first_month) if self.first_month is not None else None,
+            "last_month": month_label(self.first_month + self.month_count - 1) if self.first_month is not None else None,
+            "transaction_count": self.transaction_count,
+            "built_at": self.built_at,
+        }
+
+
+class BudgetCubeStore:
+    """The latest cube of each account holder, in memory with TTL expiry and bounded retention."""
+
+    def __init__(self, ttl_seconds: float = BUDGET_CUBE_TTL_SECONDS, max_cubes: int = MAX_RETAINED_CUBES):
+        self._ttl_seconds = ttl_seconds
+        self._max_cubes = max_cubes
+        self._cubes: "OrderedDict[str, BudgetCube]" = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+    def put(self, account_holder_id: str, cube: BudgetCube) -> None:
+        with self._lock:
+            self._cubes[account_holder_id] = cube
+            self._cubes.move_to_end(account_holder_id)
+            while len(self._cubes) > self._max_cubes:
+                self._cubes.popitem(last=False)
+
+    def get(self, account_holder_id: str) -> Optional[BudgetCube]:
+        with self._lock:
+            cube = self._cubes.get(account_holder_id)
+            if cube is None:
+                return None
+            if time.time() - cube.built_at > self._ttl_seconds:
+                del self._cubes[account_holder_id]
+                return None
+            self._cubes.move_to_end(account_holder_id)
+            return cube
+
+
+_budget_cube_store: Optional[BudgetCubeStore] = None
+_budget_cube_store_lock = threading.Lock()
+
+
+def get_budget_cube_store() -> BudgetCubeStore:
+    """The process-wide store of budget cubes by account holder."""
+    global _budget_cube_store
+    with _budget_cube_store_lock:
+        if _budget_cube_store is None:
+            _budget_cube_store = BudgetCubeStore()
+        return _budget_cube_store
@@ -0,0 +1,41 @@
+# conftest.py - Shared pytest fixtures
+# Solves are recorded in the solve ledger, which feeds the time limit and
+# backend of later solves. Each test gets its own empty ledger, so results
+# never depend on solves made by earlier tests or earlier runs.
+
+import copy
+
+import pytest
+
+import solve_ledger
+
+
+@pytest.fixture(autouse=True)
+def isolated_solve_ledger(tmp_path, monkeypatch):
+    monkeypatch.setattr(solve_ledger, "LEDGER_PATH", str(tmp_path / "solve_ledger.sqlite3"))
+    yield
+
+
+# A one-card portfolio in the /generate-plan JSON format
+PORTFOLIO_JSON = {
+    "accounts": [{
+        "lender_name": "Card",
+        "account_type": "Credit Card",
+        "current_balance_cents": 150000,
+        "apr_standard_bps": 2499,
+        "payment_due_day": 15,
+        "min_payment_rule": {"fixed_cents": 2500, "percentage_bps": 200},
+        "promo_duration_months": 3,
+    }],
+    "budget": {"monthly_budget_cents": 30000},
+    "preferences": {
+        "strategy": "Minimize Total Interest",
+        "payment_shape": "Optimized (Variable Amounts)",
+    },
+    "plan_start_date": "2026-01-01",
+}
+
+
+@pytest.fixture
+def portfolio_json():
+    return copy.deepcopy(PORTFOLIO_JSON)
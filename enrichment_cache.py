@@ -0,0 +1,335 @@
+# enrichment_cache.py - Shared description-level cache of Ntropy enrichments
+# Transaction histories are dominated by repeats ("TESCO STORES 2345",
+# "NETFLIX.COM") month after month and across users. Descriptions are reduced
+# to a canonical form (no card suffixes, dates, references or store numbers)
+# and the merchant-level enrichment (merchant, logo, website, category,
+# labels) is cached on (canonical description, entry type, currency):
+# a bounded in-memory LRU in front of a local SQLite file, both with a TTL.
+# Recurrence is specific to an account holder's history and is not cached;
+# for a hit it is detected from the holder's own history (detect_recurrence).
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Where the shared tier lives (a local SQLite file)
+CACHE_PATH = os.environ.get("ENRICHMENT_CACHE_PATH", ".enrichment_cache.sqlite3")
+
+# Merchants rebrand and Ntropy improves; re-enrich after this long
+CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+# Entries kept in the in-memory tier (least recently used are evicted first)
+MEMORY_CACHE_SIZE = 20000
+
+# Keep the SQLite tier bounded; expired rows are purged once it grows past this
+MAX_CACHE_ROWS = 500000
+
+# Canonical descriptions per SQLite lookup (under the default variable limit)
+_LOOKUP_CHUNK = 500
+
+# Cadences a cache hit's merchant can recur at: (periodicity, min days, max days)
+# between consecutive charges, named like Ntropy's recurrence groups
+RECURRENCE_PERIODS = (
+    ("weekly", 6, 8),
+    ("bi-weekly", 13, 16),
+    ("monthly", 26, 35),
+    ("quarterly", 84, 98),
+    ("yearly", 355, 376),
+)
+
+# Charges on distinct days needed before a cadence counts as recurrence
+MIN_RECURRENCES = 3
+
+CacheKey = Tuple[str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS enrichments (
+    canonical_description TEXT NOT NULL,
+    entry_type TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    merchant_name TEXT,
+    logo_url TEXT,
+    website_url TEXT,
+    category TEXT,
+    labels TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (canonical_description, entry_type, currency)
+)
+"""
+
+_MONTHS = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)"
+
+# Applied in order to the lowercased description
+_CANONICAL_PATTERNS = [
+    # Dates: 2025-01-31, 31/01/25, 31.01, 31 jan 2025, 31jan, on 31 jan
+    re.compile(r"\b\d{4}-\d{2}-\d{2}\b"),
+    re.compile(r"\b\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?\b"),
+    re.compile(rf"\b(?:on\s+)?\d{{1,2}}\s?{_MONTHS}[a-z]*(?:\s?\d{{2,4}})?\b"),
+    # Times: 14:05, 14:05:59
+    re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b"),
+    # Card suffixes: card 1234, card ending 1234, xxxx1234, ****1234
+    re.compile(r"\b(?:card|crd)\s*(?:no\.?|ending|end)?\s*[x*]*\d{4}\b"),
+    re.compile(r"[x*]{2,}\d{2,4}\b"),
+    # References: ref abc123, reference: 123, txn 99, auth 0042
+    re.compile(r"\b(?:ref|reference|txn|trans|auth|id|inv|invoice)\b[:.#\s]*[a-z0-9-]*\d[a-z0-9-]*"),
+    # Store numbers: #1234, store 1234, no. 12
+    re.compile(r"#\s*\d+"),
+    re.compile(r"\b(?:store|branch|no\.?)\s*\d+\b"),
+    # Processor suffixes after '*': amzn mktp uk*2k4ll0xy5, paypal *ebay 8841
+    re.compile(r"\*\s*(?=[a-z]*\d)[a-z0-9]+"),
+]
+
+
+def canonicalize_description(description: Optional[str]) -> str:
+    """
+    Reduce a bank description to the part that identifies the merchant.
+    "TESCO STORES 2345", "Tesco Stores 6611 31/01" and "TESCO STORES
+    CARD 4421" all become "tesco stores". Returns "" when nothing is left.
+    """
+    text = (description or "").lower()
+    for pattern in _CANONICAL_PATTERNS:
+        text = pattern.sub(" ", text)
+
+    tokens = []
+    for token in re.split(r"[^a-z0-9&+']+", text):
+        if not token:
+            continue
+        digits = sum(ch.isdigit() for ch in token)
+        # Standalone numbers (store, terminal and reference numbers) and long
+        # letter/digit codes carry no merchant information; keep short brand
+        # tokens such as "o2", "3" or "24hr"
+        if (digits == len(token) and len(token) >= 2) or (digits and len(token) >= 6) or digits >= 4:
+            continue
+        tokens.append(token)
+    return " ".join(tokens)
+
+
+def detect_recurrence(days: Iterable[int]) -> Optional[str]:
+    """
+    Periodicity of a merchant's charges from their ordinal days, or None.
+    Needs MIN_RECURRENCES distinct days with the gaps between them inside one
+    RECURRENCE_PERIODS band; up to a quarter of the gaps may fall outside it
+    (a skipped or moved charge).
+    """
+    ordered = sorted(set(days))
+    if len(ordered) < MIN_RECURRENCES:
+        return None
+    gaps = [later - earlier for earlier, later in zip(ordered, ordered[1:])]
+    for periodicity, low, high in RECURRENCE_PERIODS:
+        regular = sum(low <= gap <= high for gap in gaps)
+        if regular >= MIN_RECURRENCES - 1 and len(gaps) - regular <= len(gaps) // 4:
+            return periodicity
+    return None
+
+
+class EnrichmentCache:
+    """
+    Two-tier cache of merchant-level enrichments. Values are the
+    '_normalized' dicts the enrichment service builds from Ntropy results
+    (merchant_name, logo_url, website_url, category, labels).
+    Thread-safe; lookups and writes are best effort and never raise.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_size: int = MEMORY_CACHE_SIZE,
+        ttl_seconds: float = CACHE_TTL_SECONDS
+    ):
+        self.path = path or CACHE_PATH
+        self.memory_size = memory_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[CacheKey, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def key(description: Optional[str], entry_type: str, currency: str) -> Optional[CacheKey]:
+        """Cache key for a transaction, or None if its description has nothing cacheable."""
+        canonical = canonicalize_description(description)
+        if not canonical:
+            return None
+        return (canonical, entry_type, (currency or "").upper())
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection for the cache's lifetime: lookups are on the enrichment hot path
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            self._conn.execute(_SCHEMA)
+        return self._conn
+
+    def _remember(self, key: CacheKey, value: Dict[str, Any], expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, description: Optional[str], entry_type: str, currency: str) -> Optional[Dict[str, Any]]:
+        """The cached enrichment for a transaction, or None (counted as a miss)."""
+        return self.get_many([(description, entry_type, currency)])[0]
+
+    def get_many(self, items: Sequence[Tuple[Optional[str], str, str]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Cached enrichments for (description, entry_type, currency) items, in
+        item order (None for a miss). Keys missing from memory are read from
+        SQLite in one query per chunk of canonical descriptions, so a history
+        costs a handful of queries rather than one per transaction.
+        """
+        keys = [self.key(*item) for item in items]
+        now = time.time()
+        with self._lock:
+            found: Dict[CacheKey, Dict[str, Any]] = {}
+            unresolved = set()
+            for key in keys:
+                if key is None or key in found or key in unresolved:
+                    continue
+                value = self._memory_lookup(key, now)
+                if value is None:
+                    unresolved.add(key)
+                else:
+                    found[key] = value
+            if unresolved:
+                found.update(self._load(unresolved, now))
+
+            results: List[Optional[Dict[str, Any]]] = []
+            for key in keys:
+                value = found.get(key) if key is not None else None
+                if value is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(dict(value, labels=list(value["labels"])))
+            return results
+
+    def _memory_lookup(self, key: CacheKey, now: float) -> Optional[Dict[str, Any]]:
+        cached = self._memory.get(key)
+        if cached is None:
+            return None
+        value, expires_at = cached
+        if expires_at > now:
+            self._memory.move_to_end(key)
+            return value
+        del self._memory[key]
+        return None
+
+    def _load(self, keys: Iterable[CacheKey], now: float) -> Dict[CacheKey, Dict[str, Any]]:
+        """Unexpired SQLite rows for keys, remembered in the memory tier."""
+        wanted = set(keys)
+        canonicals = sorted({key[0] for key in wanted})
+        found: Dict[CacheKey, Dict[str, Any]] = {}
+        try:
+            conn = self._connection()
+            for start in range(0, len(canonicals), _LOOKUP_CHUNK):
+                chunk = canonicals[start:start + _LOOKUP_CHUNK]
+                rows = conn.execute(
+                    f"SELECT canonical_description, entry_type, currency, merchant_name, logo_url, website_url, "
+                    f"category, labels, updated_at FROM enrichments WHERE updated_at > ? "
+                    f"AND canonical_description IN ({', '.join('?' * len(chunk))})",
+                    (now - self.ttl_seconds, *chunk),
+                ).fetchall()
+                for canonical, entry_type, currency, merchant_name, logo_url, website_url, category, labels, updated_at in rows:
+                    key = (canonical, entry_type, currency)
+                    if key not in wanted:
+                        continue
+                    found[key] = {
+                        "merchant_name": merchant_name,
+                        "logo_url": logo_url,
+                        "website_url": website_url,
+                        "category": category,
+                        "labels": json.loads(labels),
+                    }
+                    self._remember(key, found[key], updated_at + self.ttl_seconds)
+        except sqlite3.Error as e:
+            print(f"[EnrichmentCache] Could not read cache: {e}", file=sys.stderr)
+        return found
+
+    def put(self, description: Optional[str], entry_type: str, currency: str, normalized: Dict[str, Any]) -> None:
+        """Cache a transaction's normalized enrichment in both tiers."""
+        self.put_many([(description, entry_type, currency, normalized)])
+
+    def put_many(self, entries: Iterable[Tuple[Optional[str], str, str, Dict[str, Any]]]) -> None:
+        """Cache (description, entry_type, currency, normalized) entries in both tiers, in one transaction."""
+        now = time.time()
+        values: Dict[CacheKey, Dict[str, Any]] = {}
+        for description, entry_type, currency, normalized in entries:
+            key = self.key(description, entry_type, currency)
+            if key is None:
+                continue
+            values[key] = {
+                "merchant_name": normalized.get("merchant_name"),
+                "logo_url": normalized.get("logo_url"),
+                "website_url": normalized.get("website_url"),
+                "category": normalized.get("category"),
+                "labels": list(normalized.get("labels") or []),
+            }
+        if not values:
+            return
+
+        with self._lock:
+            for key, value in values.items():
+                self._remember(key, value, now + self.ttl_seconds)
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO enrichments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (*key, value["merchant_name"], value["logo_url"], value["website_url"],
+                             value["category"], json.dumps(value["labels"]), now)
+                            for key, value in values.items()
+                        ],
+                    )
+            except sqlite3.Error as e:
+                print(f"[EnrichmentCache] Could not write cache: {e}", file=sys.stderr)
+
+    def purge_expired(self) -> int:
+        """Drop expired rows from the SQLite tier if it has grown past MAX_CACHE_ROWS; returns rows removed."""
+        with self._lock:
+            try:
+                conn = self._connection()
+                (count,) = conn.execute("SELECT COUNT(*) FROM enrichments").fetchone()
+                if count <= MAX_CACHE_ROWS:
+                    return 0
+                with conn:
+                    cursor = conn.execute(
+                        "DELETE FROM enrichments WHERE updated_at <= ?", (time.time() - self.ttl_seconds,)
+                    )
+                return cursor.rowcount
+            except sqlite3.Error as e:
+                print(f"[EnrichmentCache] Could not purge cache: {e}", file=sys.stderr)
+                return 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "memory_entries": len(self._memory),
+        }
+
+
+_shared_cache: Optional[EnrichmentCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_enrichment_cache() -> EnrichmentCache:
+    """The process-wide cache shared by every enrichment run."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EnrichmentCache()
+        return _shared_cache
@@ -1,14 +1,24 @@
 # enrichment_service.py - Ntropy Transaction Enrichment Service
 # Handles TrueLayer → Ntropy → Budget Classification pipeline
-# Version: 1.3 - With parallel agentic enrichment and streaming support
+# Version: 1.4 - With parallel agentic enrichment, streaming support and a description cache
 
 import os
 import hashlib
 import asyncio
-from typing import List, Dict, Any, Optional, AsyncGenerator, Callable
+from typing import List, Dict, Any, Optional, AsyncGenerator, Callable, Sequence, Tuple
 from pydantic import BaseModel, Field
 from concurrent.futures import ThreadPoolExecutor
 import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+from budget_cube import DEFAULT_HORIZON_MONTHS, BudgetCube, get_budget_cube_store
+from enrichment_cache import CacheKey, EnrichmentCache, detect_recurrence, get_enrichment_cache
+from enrichment_store import EnrichmentResultStore, content_hash, get_result_store
+from keyword_matcher import get_keyword_matcher, register_keywords
+from ntropy_client import get_ntropy_client
+from ntropy_limiter import CREDITS_PER_CALL, NTROPY_MAX_CONCURRENCY, get_ntropy_limiter, ntropy_request_scope
+from transaction_frame import NO_DAY, TransactionFrame
 
 # Import parallel agentic enrichment components
 try:
@@ -37,11 +47,37 @@ try:
 except ImportError as e:
     print(f"[EnrichmentService] Warning: ntropy-sdk not available ({e}), running in fallback mode")
 
-# Thread pool for concurrent Ntropy API calls
-# Ntropy rate limit: max 10 concurrent enrichment operations, 500 credits/sec refill
-# Source: https://docs.ntropy.com/api/rate-limits
+# Thread pool for blocking Ntropy SDK calls; the process-wide limiter in
+# ntropy_limiter decides how many run at once and how many credits they spend
 _executor = ThreadPoolExecutor(max_workers=10)
 
+# How Ntropy is called: "httpx" (async client on the event loop, the default)
+# or "sdk" (the blocking SDK in the thread pool above)
+NTROPY_TRANSPORT = os.environ.get("NTROPY_TRANSPORT", "httpx")
+# Per-transaction enrichment timeout on the async client
+NTROPY_ENRICH_TIMEOUT_SECONDS = 15.0
+
+# Account holders created (or found to exist) by this process; creating one
+# is idempotent, so each is only sent to Ntropy once
+_known_account_holders: set = set()
+
+# Ntropy batch enrichment: histories are submitted as batches of up to this many
+# transactions (the API accepts 24,960; smaller chunks are processed in parallel)
+# and polled until done. Source: https://docs.ntropy.com/api/batches
+NTROPY_BATCH_SIZE = 1000
+# Below this many transactions, per-transaction calls beat a batch round trip
+NTROPY_BATCH_MIN_TRANSACTIONS = 20
+NTROPY_BATCH_POLL_SECONDS = 1.0
+# Transactions in batches still unfinished after this are enriched one by one
+NTROPY_BATCH_TIMEOUT_SECONDS = 180
+
+# Per-transaction calls a request keeps in flight; a new one starts as each
+# finishes (the shared rate limiter still caps the whole process)
+NTROPY_WINDOW_SIZE = NTROPY_MAX_CONCURRENCY
+
+# How often the streaming pipeline reports progress while enriching
+STREAM_PROGRESS_INTERVAL_SECONDS = 0.5
+
 
 # ============== Pydantic Models for Type Safety ==============
 
@@ -136,6 +172,55 @@ AMBIGUITY_PENALTIES = {
     "transfer": 0.6,
 }
 
+# Labels too generic to count as a specific Ntropy label
+GENERIC_LABELS = {
+    'retail', 'services', 'general', 'other', 'miscellaneous',
+    'purchase', 'payment', 'transfer', 'unknown', 'uncategorized'
+}
+
+# Payment processors in the raw bank description hide the actual merchant
+PAYMENT_PROCESSOR_PENALTIES = {
+    'paypal': 0.5,    # PayPal hides actual merchant
+    'amazon': 0.5,   # Amazon marketplace has many sellers
+    'ebay': 0.5,     # eBay marketplace
+    'klarna': 0.6,   # Buy-now-pay-later
+    'clearpay': 0.6, # Buy-now-pay-later
+    'afterpay': 0.6, # Buy-now-pay-later
+}
+
+# Description keywords of returned/bounced payments (always incoming credits)
+# Note: "returned dd" matches "RETURNED DD" (the most common format)
+BOUNCE_KEYWORDS = [
+    'returned dd',          # Most common format from banks
+    'direct debit returned',
+    'dd returned',
+    'unpaid direct debit',
+    'returned payment',
+    'payment returned',
+    'reversal',
+    'refund returned',
+    'chargeback',
+    'bounced',
+    'dishonoured',
+    'insufficient funds',
+    'reversed dd',
+]
+
+# Description keywords of recurring payments, for classification without Ntropy
+RECURRING_KEYWORDS = [
+    'dd ', 'direct debit', 'standing order', 's/o',
+    'subscription', 'monthly', 'recurring'
+]
+
+# Every keyword list above is matched through the shared compiled matcher;
+# call keyword_matcher.reload_keywords() after editing one at runtime
+register_keywords("debt", lambda: DEBT_LABELS)
+register_keywords("fixed", lambda: FIXED_COST_LABELS)
+register_keywords("ambiguity", lambda: AMBIGUITY_PENALTIES)
+register_keywords("payment_processor", lambda: PAYMENT_PROCESSOR_PENALTIES)
+register_keywords("bounce", lambda: BOUNCE_KEYWORDS)
+register_keywords("recurring", lambda: RECURRING_KEYWORDS)
+
 # Confidence threshold for stopping the cascade
 # Lowered to 0.80 to respect Ntropy as primary enrichment layer
 # Claude should only enhance transactions where Ntropy is uncertain
@@ -144,16 +229,36 @@ CONFIDENCE_THRESHOLD = 0.80
 
 # ============== Enrichment Service ==============
 
+def hash_account_holder_id(user_id: str, truelayer_item_id: str) -> str:
+    """Ntropy account holder id (and budget cube key) of one user's bank connection"""
+    return hashlib.sha256(f"{user_id}:{truelayer_item_id}".encode()).hexdigest()[:32]
+
+
 class EnrichmentService:
     """
     Handles the full transaction enrichment lifecycle:
     ingest → convert → enrich → classify
     """
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the Ntropy SDK with the provided API key"""
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[EnrichmentCache] = None,
+        result_store: Optional[EnrichmentResultStore] = None
+    ):
+        """
+        Initialize the Ntropy SDK with the provided API key.
+        Repeated descriptions are served from the shared description cache,
+        and transactions enriched by an earlier request from the shared
+        result store, unless others are given.
+        """
         self.api_key = api_key or os.environ.get("NTROPY_API_KEY")
         self.sdk = None
+        self.use_http_client = NTROPY_TRANSPORT == "httpx" and bool(self.api_key)
+        self.cache = cache or get_enrichment_cache()
+        self.result_store = result_store or get_result_store()
+        # Monthly aggregates of the last enrichment run (also kept per account holder)
+        self.budget_cube: Optional[BudgetCube] = None
         
         # Detailed initialization logging
         print(f"[EnrichmentService] Initializing...")
@@ -161,7 +266,9 @@ class EnrichmentService:
         print(f"[EnrichmentService] API key present: {bool(self.api_key)}")
         print(f"[EnrichmentService] API key length: {len(self.api_key) if self.api_key else 0}")
         
-        if NTROPY_AVAILABLE and self.api_key and NtropySDK:
+        if self.use_http_client:
+            print("[EnrichmentService] ✓ Async Ntropy client enabled - LIVE enrichment enabled")
+        elif NTROPY_AVAILABLE and self.api_key and NtropySDK:
             try:
                 self.sdk = NtropySDK(self.api_key)
                 print("[EnrichmentService] ✓ Ntropy SDK initialized successfully - LIVE enrichment enabled")
@@ -178,6 +285,10 @@ class EnrichmentService:
                 reasons.append("SDK class not loaded")
             print(f"[EnrichmentService] ⚠ Running in FALLBACK mode - reasons: {', '.join(reasons)}")
     
+    def _ntropy_enabled(self) -> bool:
+        """Whether live Ntropy enrichment is available (async client or SDK)"""
+        return self.use_http_client or bool(self.sdk and NTROPY_AVAILABLE)
+    
     def normalize_truelayer_transaction(self, raw_tx: Dict[str, Any]) -> TrueLayerIngestModel:
         """
         Phase 1: Normalize raw TrueLayer transaction data
@@ -231,9 +342,14 @@ class EnrichmentService:
             timestamp=date_str
         )
     
+    def _build_frame(self, normalized: List[TrueLayerIngestModel]) -> TransactionFrame:
+        """Columnar view of the normalized transactions, shared by every later stage"""
+        return TransactionFrame.from_transactions(normalized, self._determine_entry_type)
+    
     def _detect_ghost_pairs(
         self,
-        normalized_transactions: List[TrueLayerIngestModel]
+        normalized_transactions: List[TrueLayerIngestModel],
+        frame: Optional[TransactionFrame] = None
     ) -> Dict[str, Dict[str, Any]]:
         """
         Layer 0: Ghost Pair Detection (Math Brain)
@@ -247,180 +363,146 @@ class EnrichmentService:
         - Incoming "DIRECT DEBIT RETURNED" credits match outgoing direct debits
         - Same amount, within 7 days (bank processing can be slow)
         
+        Dates, entry types and amounts come from the transaction frame (built
+        here if the caller has none), and each amount group is sorted by day
+        so a match only scans the candidates inside its date window.
+        Transactions are still matched in input order, each to the
+        earliest-listed eligible candidate in its window, so the pairs are the
+        same as a full scan of the group.
+        
         Returns:
             Dict mapping transaction_id -> ghost pair match info
         """
-        from datetime import datetime, timedelta
+        from bisect import bisect_left, bisect_right
         
         ghost_pairs: Dict[str, Dict[str, Any]] = {}
         processed_ids = set()
         
-        # Keywords for returned/bounced payments
-        # Note: "returned dd" matches "RETURNED DD" (the most common format)
-        BOUNCE_KEYWORDS = [
-            'returned dd',          # Most common format from banks
-            'direct debit returned',
-            'dd returned',
-            'unpaid direct debit',
-            'returned payment',
-            'payment returned',
-            'reversal',
-            'refund returned',
-            'chargeback',
-            'bounced',
-            'dishonoured',
-            'insufficient funds',
-            'reversed dd',
-        ]
+        if frame is None:
+            frame = self._build_frame(normalized_transactions)
+        days = frame.days
+        amounts = frame.amount_cents
+        entry_types = [frame.entry_type(index) for index in range(len(frame))]
+        
+        # Bounce keywords are checked once per distinct description
+        keywords = get_keyword_matcher()
+        is_bounce = frame.description_flags(lambda description: keywords.contains_any(description.lower(), "bounce"))
+        
+        # Group dated transactions by (amount, entry type), sorted by (day, input
+        # position). Paired transactions are removed, so a window only ever holds
+        # candidates that are still available.
+        candidate_groups: Dict[tuple, List[int]] = {}
+        for index, day in enumerate(days):
+            if day != NO_DAY:
+                candidate_groups.setdefault((amounts[index], entry_types[index]), []).append(index)
+        group_days: Dict[tuple, List[int]] = {}
+        for key, indices in candidate_groups.items():
+            indices.sort(key=lambda i: (days[i], i))
+            group_days[key] = [days[i] for i in indices]
+        indices_by_id: Dict[str, List[int]] = {}
+        for index, tx in enumerate(normalized_transactions):
+            indices_by_id.setdefault(tx.transaction_id, []).append(index)
+        
+        def find_match(index: int, earliest_day: int, latest_day: int, entry_type: str) -> Optional[int]:
+            """Earliest-listed available candidate of the same amount and given entry type dated within [earliest_day, latest_day]"""
+            key = (amounts[index], entry_type)
+            if key not in candidate_groups:
+                return None
+            window_days = group_days[key]
+            window = candidate_groups[key][bisect_left(window_days, earliest_day):bisect_right(window_days, latest_day)]
+            tx_id = normalized_transactions[index].transaction_id
+            # A transaction never pairs with another sharing its id
+            for candidate_index in sorted(window):
+                if normalized_transactions[candidate_index].transaction_id != tx_id:
+                    return candidate_index
+            return None
         
-        # Group transactions by amount for faster matching
-        amount_groups: Dict[int, List[TrueLayerIngestModel]] = {}
-        for tx in normalized_transactions:
-            amount_cents = int(tx.amount * 100)
-            if amount_cents not in amount_groups:
-                amount_groups[amount_cents] = []
-            amount_groups[amount_cents].append(tx)
+        def mark_processed(transaction_id: str) -> None:
+            """Mark an id paired and drop every transaction carrying it from the candidate windows"""
+            processed_ids.add(transaction_id)
+            for index in indices_by_id[transaction_id]:
+                if days[index] == NO_DAY:
+                    continue
+                key = (amounts[index], entry_types[index])
+                indices, window_days = candidate_groups[key], group_days[key]
+                lo, hi = bisect_left(window_days, days[index]), bisect_right(window_days, days[index])
+                window = indices[lo:hi]
+                if index in window:
+                    position = lo + window.index(index)
+                    del indices[position]
+                    del window_days[position]
+        
+        def record_pair(index: int, candidate_index: int, days_apart: int, pair_type: str) -> None:
+            tx = normalized_transactions[index]
+            candidate = normalized_transactions[candidate_index]
+            ghost_pairs[tx.transaction_id] = {
+                "linked_id": candidate.transaction_id,
+                "amount_cents": amounts[index],
+                "days_apart": days_apart,
+                "entry_type": entry_types[index],
+                "linked_entry_type": entry_types[candidate_index],
+                "pair_type": pair_type
+            }
+            ghost_pairs[candidate.transaction_id] = {
+                "linked_id": tx.transaction_id,
+                "amount_cents": amounts[index],
+                "days_apart": days_apart,
+                "entry_type": entry_types[candidate_index],
+                "linked_entry_type": entry_types[index],
+                "pair_type": pair_type
+            }
+            mark_processed(tx.transaction_id)
+            mark_processed(candidate.transaction_id)
         
         # PHASE 1: Detect bounced/returned direct debits FIRST
         # These have special handling because the description changes
-        for tx in normalized_transactions:
+        for index, tx in enumerate(normalized_transactions):
             if tx.transaction_id in processed_ids:
                 continue
             
-            tx_entry_type = self._determine_entry_type(tx)
-            
             # Only process incoming transactions for bounce detection
-            if tx_entry_type != "incoming":
+            if entry_types[index] != "incoming" or days[index] == NO_DAY:
                 continue
             
             # Check if description matches bounce keywords
-            desc_lower = (tx.description or "").lower()
-            is_bounce = any(kw in desc_lower for kw in BOUNCE_KEYWORDS)
-            
-            if not is_bounce:
+            if not is_bounce[frame.description_ids[index]]:
                 continue
             
-            # Found a potential bounce credit - look for matching outgoing payment
-            amount_cents = int(tx.amount * 100)
-            candidates = amount_groups.get(amount_cents, [])
-            
-            try:
-                tx_date = datetime.strptime(tx.timestamp, "%Y-%m-%d")
-            except ValueError:
+            # Bounced payments can take up to 7 days to appear
+            # The returned credit usually comes AFTER the original debit (which must be outgoing)
+            tx_day = days[index]
+            candidate_index = find_match(index, tx_day - 7, tx_day, "outgoing")
+            if candidate_index is None:
                 continue
             
-            for candidate in candidates:
-                if candidate.transaction_id == tx.transaction_id:
-                    continue
-                if candidate.transaction_id in processed_ids:
-                    continue
-                
-                candidate_entry_type = self._determine_entry_type(candidate)
-                
-                # Must be outgoing (the original payment that bounced)
-                if candidate_entry_type != "outgoing":
-                    continue
-                
-                try:
-                    candidate_date = datetime.strptime(candidate.timestamp, "%Y-%m-%d")
-                except ValueError:
-                    continue
-                
-                # Bounced payments can take up to 7 days to appear
-                # The returned credit usually comes AFTER the original debit
-                days_diff = (tx_date - candidate_date).days
-                if days_diff < 0 or days_diff > 7:
-                    continue
-                
-                # Found a bounce pair!
-                ghost_pairs[tx.transaction_id] = {
-                    "linked_id": candidate.transaction_id,
-                    "amount_cents": amount_cents,
-                    "days_apart": abs(days_diff),
-                    "entry_type": tx_entry_type,
-                    "linked_entry_type": candidate_entry_type,
-                    "pair_type": "bounced_payment"
-                }
-                ghost_pairs[candidate.transaction_id] = {
-                    "linked_id": tx.transaction_id,
-                    "amount_cents": amount_cents,
-                    "days_apart": abs(days_diff),
-                    "entry_type": candidate_entry_type,
-                    "linked_entry_type": tx_entry_type,
-                    "pair_type": "bounced_payment"
-                }
-                
-                processed_ids.add(tx.transaction_id)
-                processed_ids.add(candidate.transaction_id)
-                
-                tx_id_short = str(tx.transaction_id)[:16] if tx.transaction_id else "unknown"
-                cand_id_short = str(candidate.transaction_id)[:16] if candidate.transaction_id else "unknown"
-                print(f"[EnrichmentService] Layer 0: Bounced Payment detected - {tx_id_short}... (returned) <-> {cand_id_short}... (original) ({amount_cents/100:.2f})")
-                break
+            # Found a bounce pair!
+            record_pair(index, candidate_index, tx_day - days[candidate_index], "bounced_payment")
+            
+            candidate = normalized_transactions[candidate_index]
+            tx_id_short = str(tx.transaction_id)[:16] if tx.transaction_id else "unknown"
+            cand_id_short = str(candidate.transaction_id)[:16] if candidate.transaction_id else "unknown"
+            print(f"[EnrichmentService] Layer 0: Bounced Payment detected - {tx_id_short}... (returned) <-> {cand_id_short}... (original) ({amounts[index]/100:.2f})")
         
         # PHASE 2: Standard ghost pair detection (internal transfers)
-        for tx in normalized_transactions:
-            if tx.transaction_id in processed_ids:
+        for index, tx in enumerate(normalized_transactions):
+            if tx.transaction_id in processed_ids or days[index] == NO_DAY:
                 continue
-                
-            amount_cents = int(tx.amount * 100)
-            candidates = amount_groups.get(amount_cents, [])
-            
-            tx_entry_type = self._determine_entry_type(tx)
             
-            try:
-                tx_date = datetime.strptime(tx.timestamp, "%Y-%m-%d")
-            except ValueError:
+            # Opposite entry types, within 2 days either way
+            tx_day = days[index]
+            opposite_type = "outgoing" if entry_types[index] == "incoming" else "incoming"
+            candidate_index = find_match(index, tx_day - 2, tx_day + 2, opposite_type)
+            if candidate_index is None:
                 continue
             
-            for candidate in candidates:
-                if candidate.transaction_id == tx.transaction_id:
-                    continue
-                if candidate.transaction_id in processed_ids:
-                    continue
-                    
-                candidate_entry_type = self._determine_entry_type(candidate)
-                
-                # Check opposite entry types
-                if tx_entry_type == candidate_entry_type:
-                    continue
-                    
-                try:
-                    candidate_date = datetime.strptime(candidate.timestamp, "%Y-%m-%d")
-                except ValueError:
-                    continue
-                
-                # Check within 2 days
-                days_diff = abs((tx_date - candidate_date).days)
-                if days_diff > 2:
-                    continue
-                
-                # Found a ghost pair!
-                ghost_pairs[tx.transaction_id] = {
-                    "linked_id": candidate.transaction_id,
-                    "amount_cents": amount_cents,
-                    "days_apart": days_diff,
-                    "entry_type": tx_entry_type,
-                    "linked_entry_type": candidate_entry_type,
-                    "pair_type": "transfer"
-                }
-                ghost_pairs[candidate.transaction_id] = {
-                    "linked_id": tx.transaction_id,
-                    "amount_cents": amount_cents,
-                    "days_apart": days_diff,
-                    "entry_type": candidate_entry_type,
-                    "linked_entry_type": tx_entry_type,
-                    "pair_type": "transfer"
-                }
-                
-                processed_ids.add(tx.transaction_id)
-                processed_ids.add(candidate.transaction_id)
-                
-                # Safe string slicing for logging
-                tx_id_short = str(tx.transaction_id)[:16] if tx.transaction_id else "unknown"
-                cand_id_short = str(candidate.transaction_id)[:16] if candidate.transaction_id else "unknown"
-                print(f"[EnrichmentService] Layer 0: Ghost Pair detected - {tx_id_short}... <-> {cand_id_short}... ({amount_cents/100:.2f})")
-                break
+            # Found a ghost pair!
+            record_pair(index, candidate_index, abs(tx_day - days[candidate_index]), "transfer")
+            
+            # Safe string slicing for logging
+            candidate = normalized_transactions[candidate_index]
+            tx_id_short = str(tx.transaction_id)[:16] if tx.transaction_id else "unknown"
+            cand_id_short = str(candidate.transaction_id)[:16] if candidate.transaction_id else "unknown"
+            print(f"[EnrichmentService] Layer 0: Ghost Pair detected - {tx_id_short}... <-> {cand_id_short}... ({amounts[index]/100:.2f})")
         
         return ghost_pairs
     
@@ -456,10 +538,8 @@ class EnrichmentService:
             base_confidence += 0.1
         
         # Add confidence for having specific labels (not just generic ones)
-        generic_labels = {'retail', 'services', 'general', 'other', 'miscellaneous', 
-                         'purchase', 'payment', 'transfer', 'unknown', 'uncategorized'}
         if labels:
-            specific_labels = [l for l in labels if l.lower() not in generic_labels]
+            specific_labels = [l for l in labels if l.lower() not in GENERIC_LABELS]
             if specific_labels:
                 base_confidence += 0.1
         
@@ -470,47 +550,37 @@ class EnrichmentService:
         # Cap base at 1.0
         base_confidence = min(base_confidence, 1.0)
         
-        # Find lowest applicable penalty
+        # Find lowest applicable penalty; on ties the earlier check and the
+        # earlier keyword in its list win
         lowest_penalty = 1.0
         penalty_reason = None
+        keywords = get_keyword_matcher()
         
         # Check merchant name for ambiguity
         if merchant_name:
-            merchant_lower = merchant_name.lower()
-            for ambiguous_name, penalty in AMBIGUITY_PENALTIES.items():
-                if ambiguous_name in merchant_lower:
-                    if penalty < lowest_penalty:
-                        lowest_penalty = penalty
-                        penalty_reason = f"ambiguous merchant: {ambiguous_name}"
+            for ambiguous_name in keywords.matches(keywords.scan(merchant_name.lower()), "ambiguity"):
+                penalty = AMBIGUITY_PENALTIES[ambiguous_name]
+                if penalty < lowest_penalty:
+                    lowest_penalty = penalty
+                    penalty_reason = f"ambiguous merchant: {ambiguous_name}"
         
         # Check labels for ambiguity
         for label in labels:
-            label_lower = label.lower()
-            for ambiguous_label, penalty in AMBIGUITY_PENALTIES.items():
-                if ambiguous_label in label_lower:
-                    if penalty < lowest_penalty:
-                        lowest_penalty = penalty
-                        penalty_reason = f"ambiguous label: {ambiguous_label}"
+            for ambiguous_label in keywords.matches(keywords.scan(label.lower()), "ambiguity"):
+                penalty = AMBIGUITY_PENALTIES[ambiguous_label]
+                if penalty < lowest_penalty:
+                    lowest_penalty = penalty
+                    penalty_reason = f"ambiguous label: {ambiguous_label}"
         
         # CRITICAL: Check original bank description for payment processor keywords
         # Even if Ntropy extracted a clean merchant name (e.g., "Uber" from "PAYPAL *UBERTRIP"),
         # the presence of payment processors in the raw description signals uncertainty
         if original_description:
-            desc_lower = original_description.lower()
-            # Payment processors that hide actual merchants
-            payment_processors = {
-                'paypal': 0.5,    # PayPal hides actual merchant
-                'amazon': 0.5,   # Amazon marketplace has many sellers
-                'ebay': 0.5,     # eBay marketplace
-                'klarna': 0.6,   # Buy-now-pay-later
-                'clearpay': 0.6, # Buy-now-pay-later
-                'afterpay': 0.6, # Buy-now-pay-later
-            }
-            for processor, penalty in payment_processors.items():
-                if processor in desc_lower:
-                    if penalty < lowest_penalty:
-                        lowest_penalty = penalty
-                        penalty_reason = f"payment processor in description: {processor}"
+            for processor in keywords.matches(keywords.scan(original_description.lower()), "payment_processor"):
+                penalty = PAYMENT_PROCESSOR_PENALTIES[processor]
+                if penalty < lowest_penalty:
+                    lowest_penalty = penalty
+                    penalty_reason = f"payment processor in description: {processor}"
         
         final_confidence = base_confidence * lowest_penalty
         return (final_confidence, penalty_reason)
@@ -523,8 +593,7 @@ class EnrichmentService:
         when bank accounts are removed and re-added. Each bank connection gets a 
         unique Ntropy account holder, preventing data carryover.
         """
-        combined = f"{user_id}:{truelayer_item_id}"
-        hashed_id = hashlib.sha256(combined.encode()).hexdigest()[:32]
+        hashed_id = hash_account_holder_id(user_id, truelayer_item_id)
         print(f"[EnrichmentService] Generated unique account_holder_id: {hashed_id[:16]}... (user: {user_id[:8]}..., item: {truelayer_item_id[:8]}...)")
         return hashed_id
     
@@ -546,6 +615,8 @@ class EnrichmentService:
         if not self.sdk or not NTROPY_AVAILABLE:
             print(f"[EnrichmentService] SDK not available, skipping account holder creation")
             return False
+        if hashed_user_id in _known_account_holders:
+            return True
             
         try:
             print(f"[EnrichmentService] Creating/verifying account holder {hashed_user_id[:16]}...")
@@ -555,15 +626,48 @@ class EnrichmentService:
                 name=account_holder_name or "Account Holder"
             )
             print(f"[EnrichmentService] ✓ Account holder {hashed_user_id[:16]}... created with name: {account_holder_name}")
+            _known_account_holders.add(hashed_user_id)
             return True
         except Exception as e:
             error_str = str(e).lower()
             if "already exists" in error_str or "conflict" in error_str or "409" in error_str:
                 print(f"[EnrichmentService] ✓ Account holder {hashed_user_id[:16]}... already exists")
+                _known_account_holders.add(hashed_user_id)
                 return True
             print(f"[EnrichmentService] ✗ Failed to create account holder: {e}")
             return False
     
+    async def _ensure_account_holder(
+        self,
+        hashed_user_id: str,
+        account_holder_name: Optional[str] = None,
+        country: str = "GB"
+    ) -> bool:
+        """
+        Async counterpart of _create_or_get_account_holder. Holders already
+        known to this process are not sent to Ntropy again.
+        """
+        if hashed_user_id in _known_account_holders:
+            print(f"[EnrichmentService] ✓ Account holder {hashed_user_id[:16]}... already known")
+            return True
+        with ntropy_request_scope(hashed_user_id):
+            if not self.use_http_client:
+                return await self._run_sdk(
+                    asyncio.get_event_loop(), self._create_or_get_account_holder,
+                    hashed_user_id, account_holder_name, country
+                )
+            try:
+                created = await get_ntropy_client(self.api_key).create_account_holder(
+                    hashed_user_id, name=account_holder_name or "Account Holder"
+                )
+            except Exception as e:
+                print(f"[EnrichmentService] ✗ Failed to create account holder: {e}")
+                return False
+        state = "created" if created else "already exists"
+        print(f"[EnrichmentService] ✓ Account holder {hashed_user_id[:16]}... {state}")
+        _known_account_holders.add(hashed_user_id)
+        return True
+    
     def _determine_entry_type(self, norm_tx: TrueLayerIngestModel) -> str:
         """
         Determine if a transaction is incoming (income) or outgoing (expense).
@@ -582,23 +686,7 @@ class EnrichmentService:
         """
         # PRIORITY 1: Check for bounced/returned payment keywords
         # These are ALWAYS incoming credits, regardless of what transaction_type says
-        desc_lower = (norm_tx.description or "").lower()
-        INCOMING_KEYWORDS = [
-            'returned dd',          # Most common format from banks
-            'direct debit returned',
-            'dd returned',
-            'unpaid direct debit',
-            'returned payment',
-            'payment returned',
-            'reversal',
-            'refund returned',
-            'chargeback',
-            'bounced',
-            'dishonoured',
-            'insufficient funds',
-            'reversed dd',
-        ]
-        if any(kw in desc_lower for kw in INCOMING_KEYWORDS):
+        if get_keyword_matcher().contains_any((norm_tx.description or "").lower(), "bounce"):
             return "incoming"
         
         # PRIORITY 2: Check transaction_type (if provided by TrueLayer or background-sync)
@@ -617,21 +705,60 @@ class EnrichmentService:
         else:
             return "outgoing"
     
+    def _ntropy_transaction_input(self, tx_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Ntropy transaction payload, shared by single calls and batches"""
+        # Note: account_holder_name is set on the account holder, NOT on transactions
+        return {
+            "id": tx_data["id"],
+            "description": tx_data["description"],
+            "amount": tx_data["amount"],
+            "entry_type": tx_data["entry_type"],
+            "currency": tx_data["currency"],
+            "date": tx_data["date"],
+            "account_holder_id": tx_data["account_holder_id"],
+            "location": {"country": tx_data.get("country", "GB")},
+        }
+    
+    def _normalize_ntropy_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add the '_normalized' view of a dumped Ntropy enrichment, for both the
+        single-call and batch paths.
+        
+        Ntropy SDK v5.x response structure (ACTUAL, confirmed via debug):
+        - 'entities': dict with 'counterparty' (dict) and 'intermediaries' (list) keys
+          - counterparty: {id, name, website, logo, mccs, type}
+        - 'categories': dict with 'general' (string) and 'accounting' (string or None) keys
+        - 'merchant' at top level is ALWAYS None - use entities.counterparty.name instead
+        - 'logo'/'website' at top level are ALWAYS None - use entities.counterparty instead
+        """
+        entities = result.get('entities') or {}
+        counterparty = entities.get('counterparty') or {}
+        categories = result.get('categories') or {}
+        
+        # Extract merchant info from counterparty entity
+        merchant_name = counterparty.get('name') if isinstance(counterparty, dict) else None
+        logo_url = counterparty.get('logo') if isinstance(counterparty, dict) else None
+        website_url = counterparty.get('website') if isinstance(counterparty, dict) else None
+        
+        # Extract category - it's a dict with 'general' key, not a list
+        general_category = categories.get('general') if isinstance(categories, dict) else None
+        
+        # Normalize the result to a consistent format for downstream processing
+        # This makes it compatible with the rest of the codebase
+        result['_normalized'] = {
+            'merchant_name': merchant_name,
+            'logo_url': logo_url,
+            'website_url': website_url,
+            'category': general_category,
+            'labels': [general_category] if general_category else [],
+        }
+        return result
+    
     def _enrich_single_sync(self, tx_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Synchronous single transaction enrichment for thread pool"""
         try:
             # Build the transaction create call
-            # Note: account_holder_name is set on the account holder, NOT on transactions
-            create_kwargs = {
-                "id": tx_data["id"],
-                "description": tx_data["description"],
-                "amount": tx_data["amount"],
-                "entry_type": tx_data["entry_type"],
-                "currency": tx_data["currency"],
-                "date": tx_data["date"],
-                "account_holder_id": tx_data["account_holder_id"],
-                "location": {"country": tx_data.get("country", "GB")},
-            }
+            create_kwargs = self._ntropy_transaction_input(tx_data)
             
             # Log the API call for debugging
             print(f"[EnrichmentService] >>> Calling Ntropy SDK transactions.create() with:")
@@ -643,36 +770,8 @@ class EnrichmentService:
             enriched = self.sdk.transactions.create(**create_kwargs)
             result = enriched.model_dump() if hasattr(enriched, 'model_dump') else None
             if result:
-                # Ntropy SDK v5.x response structure (ACTUAL, confirmed via debug):
-                # - 'entities': dict with 'counterparty' (dict) and 'intermediaries' (list) keys
-                #   - counterparty: {id, name, website, logo, mccs, type}
-                # - 'categories': dict with 'general' (string) and 'accounting' (string or None) keys
-                # - 'merchant' at top level is ALWAYS None - use entities.counterparty.name instead
-                # - 'logo'/'website' at top level are ALWAYS None - use entities.counterparty instead
-                
-                entities = result.get('entities') or {}
-                counterparty = entities.get('counterparty') or {}
-                categories = result.get('categories') or {}
-                
-                # Extract merchant info from counterparty entity
-                merchant_name = counterparty.get('name') if isinstance(counterparty, dict) else None
-                logo_url = counterparty.get('logo') if isinstance(counterparty, dict) else None
-                website_url = counterparty.get('website') if isinstance(counterparty, dict) else None
-                
-                # Extract category - it's a dict with 'general' key, not a list
-                general_category = categories.get('general') if isinstance(categories, dict) else None
-                
-                print(f"[EnrichmentService] ✓ Enriched: {tx_data['description'][:30]}... → {merchant_name} [{general_category or 'no category'}]")
-                
-                # Normalize the result to a consistent format for downstream processing
-                # This makes it compatible with the rest of the codebase
-                result['_normalized'] = {
-                    'merchant_name': merchant_name,
-                    'logo_url': logo_url,
-                    'website_url': website_url,
-                    'category': general_category,
-                    'labels': [general_category] if general_category else [],
-                }
+                normalized = self._normalize_ntropy_result(result)['_normalized']
+                print(f"[EnrichmentService] ✓ Enriched: {tx_data['description'][:30]}... → {normalized['merchant_name']} [{normalized['category'] or 'no category'}]")
             else:
                 print(f"[EnrichmentService] ⚠ No result from Ntropy for {tx_data['id'][:20]}...")
             return result
@@ -682,20 +781,408 @@ class EnrichmentService:
             traceback.print_exc()
             return None
     
+    async def _enrich_single_async(self, tx_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Single transaction enrichment through the async client"""
+        try:
+            result = await get_ntropy_client(self.api_key).enrich_transaction(
+                self._ntropy_transaction_input(tx_data), timeout=NTROPY_ENRICH_TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            print(f"[EnrichmentService] ✗ Error enriching {tx_data['id']}: {e}")
+            return None
+        normalized = self._normalize_ntropy_result(result)['_normalized']
+        print(f"[EnrichmentService] ✓ Enriched: {tx_data['description'][:30]}... → {normalized['merchant_name']} [{normalized['category'] or 'no category'}]")
+        return result
+    
+    def _submit_ntropy_batch_sync(self, tx_data_list: List[Dict[str, Any]]) -> Optional[str]:
+        """Submit one chunk as an Ntropy batch; returns the batch id, or None if submission failed"""
+        try:
+            batch = self.sdk.batches.create(
+                operation="POST /v3/transactions",
+                data=[self._ntropy_transaction_input(tx_data) for tx_data in tx_data_list],
+            )
+            print(f"[EnrichmentService] >>> Submitted Ntropy batch {batch.id} ({len(tx_data_list)} transactions)")
+            return batch.id
+        except Exception as e:
+            print(f"[EnrichmentService] ✗ Failed to submit Ntropy batch of {len(tx_data_list)}: {e}")
+            return None
+    
+    def _get_ntropy_batch_sync(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Current status of a batch, or None if the poll failed (retried on the next poll)"""
+        try:
+            batch = self.sdk.batches.get(id=batch_id)
+        except Exception as e:
+            print(f"[EnrichmentService] ⚠ Failed to poll Ntropy batch {batch_id}: {e}")
+            return None
+        status = "completed" if batch.is_completed() else "error" if batch.is_error() else "processing"
+        return {"status": status, "progress": batch.progress, "total": batch.total}
+    
+    def _ntropy_batch_results_sync(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        """Normalized results of a completed batch, by transaction id"""
+        try:
+            batch_result = self.sdk.batches.results(id=batch_id)
+        except Exception as e:
+            print(f"[EnrichmentService] ✗ Failed to fetch Ntropy batch {batch_id} results: {e}")
+            return {}
+        return {
+            enriched.id: self._normalize_ntropy_result(enriched.model_dump())
+            for enriched in batch_result.results
+        }
+    
+    async def _run_sdk(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        func: Callable[..., Any],
+        *args: Any,
+        credits: float = CREDITS_PER_CALL
+    ) -> Any:
+        """Run a blocking SDK call in the thread pool once the rate limiter admits it"""
+        async with get_ntropy_limiter().slot(credits):
+            return await loop.run_in_executor(_executor, func, *args)
+    
+    async def _submit_ntropy_batch(self, tx_data_list: List[Dict[str, Any]], loop: asyncio.AbstractEventLoop) -> Optional[str]:
+        """_submit_ntropy_batch_sync through whichever transport is in use"""
+        if not self.use_http_client:
+            return await self._run_sdk(
+                loop, self._submit_ntropy_batch_sync, tx_data_list, credits=CREDITS_PER_CALL * len(tx_data_list)
+            )
+        try:
+            batch = await get_ntropy_client(self.api_key).create_batch(
+                [self._ntropy_transaction_input(tx_data) for tx_data in tx_data_list]
+            )
+        except Exception as e:
+            print(f"[EnrichmentService] ✗ Failed to submit Ntropy batch of {len(tx_data_list)}: {e}")
+            return None
+        print(f"[EnrichmentService] >>> Submitted Ntropy batch {batch['id']} ({len(tx_data_list)} transactions)")
+        return batch["id"]
+    
+    async def _get_ntropy_batch(self, batch_id: str, loop: asyncio.AbstractEventLoop) -> Optional[Dict[str, Any]]:
+        """_get_ntropy_batch_sync through whichever transport is in use"""
+        if not self.use_http_client:
+            return await self._run_sdk(loop, self._get_ntropy_batch_sync, batch_id)
+        try:
+            batch = await get_ntropy_client(self.api_key).get_batch(batch_id)
+        except Exception as e:
+            print(f"[EnrichmentService] ⚠ Failed to poll Ntropy batch {batch_id}: {e}")
+            return None
+        return {"status": batch["status"], "progress": batch.get("progress", 0), "total": batch.get("total", 0)}
+    
+    async def _ntropy_batch_results(self, batch_id: str, loop: asyncio.AbstractEventLoop) -> Dict[str, Dict[str, Any]]:
+        """_ntropy_batch_results_sync through whichever transport is in use"""
+        if not self.use_http_client:
+            return await self._run_sdk(loop, self._ntropy_batch_results_sync, batch_id)
+        try:
+            batch_results = await get_ntropy_client(self.api_key).batch_results(batch_id)
+        except Exception as e:
+            print(f"[EnrichmentService] ✗ Failed to fetch Ntropy batch {batch_id} results: {e}")
+            return {}
+        return {enriched["id"]: self._normalize_ntropy_result(enriched) for enriched in batch_results}
+    
     async def _enrich_concurrent(
         self, 
         tx_data_list: List[Dict[str, Any]], 
-        loop: asyncio.AbstractEventLoop
+        loop: asyncio.AbstractEventLoop,
+        on_result: Optional[Callable[[int, Optional[Dict[str, Any]]], None]] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Enrich transactions concurrently, on the async client or in the
+        thread pool, over a sliding window: NTROPY_WINDOW_SIZE calls stay in
+        flight and the next starts as soon as any finishes, so one slow call
+        never holds back the others. on_result(index, result), if given, is
+        called as each finishes.
+        """
+        async def enrich(index: int):
+            tx_data = tx_data_list[index]
+            if self.use_http_client:
+                return index, await self._enrich_single_async(tx_data)
+            return index, await self._run_sdk(loop, self._enrich_single_sync, tx_data)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tx_data_list)
+        queued = iter(range(len(tx_data_list)))
+        in_flight = {asyncio.ensure_future(enrich(index)) for _, index in zip(range(NTROPY_WINDOW_SIZE), queued)}
+        while in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, result = task.result()
+                results[index] = result
+                if on_result is not None:
+                    on_result(index, result)
+                next_index = next(queued, None)
+                if next_index is not None:
+                    in_flight.add(asyncio.ensure_future(enrich(next_index)))
+        return results
+    
+    async def _enrich_batched(
+        self,
+        tx_data_list: List[Dict[str, Any]],
+        loop: asyncio.AbstractEventLoop,
+        batch_progress: Optional[Dict[str, int]] = None,
+        on_result: Optional[Callable[[int, Optional[Dict[str, Any]]], None]] = None
     ) -> List[Optional[Dict[str, Any]]]:
         """
-        Enrich transactions concurrently using thread pool.
-        Significantly faster than sequential processing.
+        Enrich transactions through Ntropy's batch API.
+        
+        The history is split into chunks of NTROPY_BATCH_SIZE, all submitted
+        up front and polled together until they finish, so a full history
+        costs a handful of requests instead of one round trip per transaction.
+        Transactions whose batch failed, timed out or omitted them (stragglers)
+        are enriched one by one through _enrich_concurrent. Small histories
+        skip batching entirely.
+        
+        Results are in input order, in the same format as _enrich_single_sync.
+        batch_progress, if given, is updated with 'processed' and 'total'
+        counts while polling. on_result(index, result), if given, is called
+        for each transaction once its result is final: when its batch
+        completes, or when it finishes as a straggler.
+        """
+        if len(tx_data_list) < NTROPY_BATCH_MIN_TRANSACTIONS:
+            return await self._enrich_concurrent(tx_data_list, loop, on_result)
+        
+        chunks = [
+            tx_data_list[start:start + NTROPY_BATCH_SIZE]
+            for start in range(0, len(tx_data_list), NTROPY_BATCH_SIZE)
+        ]
+        batch_ids = await asyncio.gather(*[self._submit_ntropy_batch(chunk, loop) for chunk in chunks])
+        pending = [batch_id for batch_id in batch_ids if batch_id]
+        chunk_starts = {batch_id: k * NTROPY_BATCH_SIZE for k, batch_id in enumerate(batch_ids) if batch_id}
+        processed: Dict[str, int] = {batch_id: 0 for batch_id in pending}
+        if batch_progress is not None:
+            batch_progress.update(processed=0, total=len(tx_data_list))
+        
+        enriched_by_id: Dict[str, Dict[str, Any]] = {}
+        deadline = time.monotonic() + NTROPY_BATCH_TIMEOUT_SECONDS
+        while pending and time.monotonic() < deadline:
+            await asyncio.sleep(NTROPY_BATCH_POLL_SECONDS)
+            batches = await asyncio.gather(*[self._get_ntropy_batch(batch_id, loop) for batch_id in pending])
+            still_pending = []
+            for batch_id, batch in zip(pending, batches):
+                if batch is None:
+                    still_pending.append(batch_id)
+                elif batch["status"] == "completed":
+                    processed[batch_id] = batch["total"]
+                    batch_results = await self._ntropy_batch_results(batch_id, loop)
+                    enriched_by_id.update(batch_results)
+                    if on_result is not None:
+                        start = chunk_starts[batch_id]
+                        for index in range(start, min(start + NTROPY_BATCH_SIZE, len(tx_data_list))):
+                            if tx_data_list[index]["id"] in batch_results:
+                                on_result(index, batch_results[tx_data_list[index]["id"]])
+                elif batch["status"] == "error":
+                    print(f"[EnrichmentService] ✗ Ntropy batch {batch_id} terminated with an error")
+                else:
+                    processed[batch_id] = batch["progress"]
+                    still_pending.append(batch_id)
+            pending = still_pending
+            if batch_progress is not None:
+                batch_progress["processed"] = sum(processed.values())
+        if pending:
+            print(f"[EnrichmentService] ⚠ {len(pending)} Ntropy batch(es) unfinished after {NTROPY_BATCH_TIMEOUT_SECONDS}s")
+        
+        results = [enriched_by_id.get(tx_data["id"]) for tx_data in tx_data_list]
+        stragglers = [i for i, result in enumerate(results) if result is None]
+        if stragglers:
+            print(f"[EnrichmentService] Enriching {len(stragglers)} straggler(s) individually")
+            retried = await self._enrich_concurrent(
+                [tx_data_list[i] for i in stragglers], loop,
+                (lambda position, result: on_result(stragglers[position], result)) if on_result is not None else None
+            )
+            for i, result in zip(stragglers, retried):
+                results[i] = result
+        
+        print(f"[EnrichmentService] Batch enrichment: {len(tx_data_list) - len(stragglers)} batched, {len(stragglers)} individually")
+        return results
+    
+    async def _enrich_cached(
+        self,
+        tx_data_list: List[Dict[str, Any]],
+        loop: asyncio.AbstractEventLoop,
+        batch_progress: Optional[Dict[str, int]] = None,
+        on_result: Optional[Callable[[int, Optional[Dict[str, Any]]], None]] = None,
+        history: Optional[Sequence[Tuple[str, str, str, int]]] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Serve repeated descriptions from the description cache without an API
+        call, enrich the rest through _enrich_batched and cache what comes back.
+        
+        Cache hits carry the merchant-level '_normalized' fields, are flagged
+        with '_cache_hit', and get their recurrence from the account holder's
+        history (_recurrence_of_hits): history is the whole window as
+        (description, entry_type, currency, ordinal day) tuples, including
+        transactions not being enriched (default: tx_data_list itself).
+        batch_progress, if given, also receives the 'cache_hits' count.
+        on_result(index, result), if given, is called for each transaction as
+        its result becomes final.
+        Cache reads and writes are batched per history and run in the
+        default executor.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tx_data_list)
+        misses = []
+        # One batched lookup (and one write below) per history, off the event loop
+        found = await loop.run_in_executor(None, self.cache.get_many, [
+            (tx_data["description"], tx_data["entry_type"], tx_data["currency"]) for tx_data in tx_data_list
+        ])
+        periodicities = self._recurrence_of_hits(
+            tx_data_list, [i for i, cached in enumerate(found) if cached is not None], history
+        )
+        for i, (tx_data, cached) in enumerate(zip(tx_data_list, found)):
+            if cached is None:
+                misses.append(i)
+            else:
+                results[i] = {"id": tx_data["id"], "_normalized": cached, "_cache_hit": True}
+                if i in periodicities:
+                    results[i]["recurrence"] = "recurring"
+                    results[i]["recurrence_group"] = {"periodicity": periodicities[i]}
+                if on_result is not None:
+                    on_result(i, results[i])
+        
+        cache_hits = len(tx_data_list) - len(misses)
+        if batch_progress is not None:
+            batch_progress["cache_hits"] = cache_hits
+        print(f"[EnrichmentService] Description cache: {cache_hits}/{len(tx_data_list)} hits")
+        
+        to_cache = []
+        
+        def deliver(position: int, enriched_dict: Optional[Dict[str, Any]]) -> None:
+            i = misses[position]
+            results[i] = enriched_dict
+            if enriched_dict is not None:
+                tx_data = tx_data_list[i]
+                to_cache.append((tx_data["description"], tx_data["entry_type"], tx_data["currency"], enriched_dict["_normalized"]))
+            if on_result is not None:
+                on_result(i, enriched_dict)
+        
+        if misses:
+            try:
+                # Queue this history's Ntropy calls under its account holder, so
+                # the rate limiter shares capacity fairly between requests
+                with ntropy_request_scope(tx_data_list[misses[0]]["account_holder_id"]):
+                    await self._enrich_batched([tx_data_list[i] for i in misses], loop, batch_progress, on_result=deliver)
+            finally:
+                await loop.run_in_executor(None, self.cache.put_many, to_cache)
+        return results
+    
+    def _recurrence_of_hits(
+        self,
+        tx_data_list: List[Dict[str, Any]],
+        hits: List[int],
+        history: Optional[Sequence[Tuple[str, str, str, int]]] = None
+    ) -> Dict[int, str]:
+        """
+        Periodicity of each cache hit (by index) whose merchant recurs in the
+        history: the same cache key charged at a regular cadence, as detected
+        by detect_recurrence. Hits of merchants that don't recur are left out.
+        """
+        if not hits:
+            return {}
+        keys: Dict[Tuple[str, str, str], Optional[CacheKey]] = {}
+        
+        def key_of(description: str, entry_type: str, currency: str) -> Optional[CacheKey]:
+            item = (description, entry_type, currency)
+            if item not in keys:
+                keys[item] = self.cache.key(description, entry_type, currency)
+            return keys[item]
+        
+        if history is None:
+            history = [
+                (tx["description"], tx["entry_type"], tx["currency"], self._ordinal_day(tx["date"]))
+                for tx in tx_data_list
+            ]
+        hit_keys = {key_of(tx_data_list[i]["description"], tx_data_list[i]["entry_type"], tx_data_list[i]["currency"])
+                    for i in hits}
+        days_by_key: Dict[CacheKey, List[int]] = defaultdict(list)
+        for description, entry_type, currency, day in history:
+            key = key_of(description, entry_type, currency)
+            if key in hit_keys and day != NO_DAY:
+                days_by_key[key].append(day)
+        
+        periodicity_by_key = {key: detect_recurrence(days) for key, days in days_by_key.items()}
+        periodicities = {}
+        for i in hits:
+            tx_data = tx_data_list[i]
+            periodicity = periodicity_by_key.get(key_of(tx_data["description"], tx_data["entry_type"], tx_data["currency"]))
+            if periodicity:
+                periodicities[i] = periodicity
+        return periodicities
+    
+    @staticmethod
+    def _ordinal_day(timestamp: Optional[str]) -> int:
+        """Ordinal of a YYYY-MM-DD date, NO_DAY if it doesn't parse"""
+        try:
+            return datetime.strptime(timestamp, "%Y-%m-%d").toordinal()
+        except (TypeError, ValueError):
+            return NO_DAY
+    
+    def _recurrence_history(self, normalized: List[TrueLayerIngestModel], frame: TransactionFrame) -> List[Tuple[str, str, str, int]]:
+        """The window as _enrich_cached's history: (description, entry_type, currency, ordinal day) per transaction"""
+        return [
+            (tx.description, frame.entry_type(i), tx.currency, frame.days[i])
+            for i, tx in enumerate(normalized)
+        ]
+    
+    def _update_cache_stats(self, progress_stats: Dict[str, Any], cache_hits: int, lookups: int) -> None:
+        """Copy the cache hit count and rate into the streamed progress stats"""
+        progress_stats["cache_hits"] = cache_hits
+        progress_stats["cache_hit_rate"] = round(cache_hits / lookups, 4) if lookups else 0.0
+    
+    def _load_stored_results(
+        self,
+        account_holder_id: str,
+        normalized: List[TrueLayerIngestModel],
+        exclude_ids: Optional[Dict[str, Any]] = None
+    ) -> tuple[Dict[str, str], Dict[str, NtropyOutputModel]]:
+        """
+        Content hashes of the normalized transactions, and the final results
+        stored for those unchanged since an earlier request (by transaction id).
+        Transactions in exclude_ids (e.g. this window's ghost pairs) are not looked up.
+        Ids shared by several transactions of the window (e.g. id-less ones,
+        which get a description hash) can't tell their rows apart, so they are
+        left out of both: never reused, and never saved (see _save_results).
+        """
+        id_counts: Dict[str, int] = {}
+        for tx in normalized:
+            id_counts[tx.transaction_id] = id_counts.get(tx.transaction_id, 0) + 1
+        hashes = {
+            tx.transaction_id: content_hash(tx.model_dump())
+            for tx in normalized if id_counts[tx.transaction_id] == 1
+        }
+        exclude_ids = exclude_ids or {}
+        found = self.result_store.get_many(
+            account_holder_id,
+            [(tx_id, digest) for tx_id, digest in hashes.items() if tx_id not in exclude_ids]
+        )
+        stored = {tx_id: NtropyOutputModel(**result) for tx_id, result in found.items()}
+        if stored:
+            print(f"[EnrichmentService] Reusing {len(stored)} stored results from earlier requests")
+        return hashes, stored
+    
+    def _save_results(
+        self,
+        account_holder_id: str,
+        results: List[NtropyOutputModel],
+        hashes: Dict[str, str],
+        final_ids: set
+    ) -> None:
+        """
+        Store the final results of transactions in final_ids for later requests
+        to reuse; ids without a content hash (duplicated in the window) are skipped.
         """
-        tasks = [
-            loop.run_in_executor(_executor, self._enrich_single_sync, tx_data)
-            for tx_data in tx_data_list
+        self.result_store.put_many(account_holder_id, [
+            (result.transaction_id, hashes[result.transaction_id], result.model_dump())
+            for result in results if result.transaction_id in final_ids and result.transaction_id in hashes
+        ])
+    
+    def _merge_stored_results(
+        self,
+        normalized: List[TrueLayerIngestModel],
+        stored: Dict[str, NtropyOutputModel],
+        fresh: List[NtropyOutputModel]
+    ) -> List[NtropyOutputModel]:
+        """Results in input order: stored ones where available, fresh ones (for the rest, in order) otherwise"""
+        fresh_iter = iter(fresh)
+        return [
+            stored[tx.transaction_id].model_copy(deep=True) if tx.transaction_id in stored else next(fresh_iter)
+            for tx in normalized
         ]
-        return await asyncio.gather(*tasks)
     
     async def enrich_transactions_streaming(
         self,
@@ -706,7 +1193,8 @@ class EnrichmentService:
         country: str = "GB",
         progress_callback: Optional[Callable[[int, int, str], None]] = None,
         enable_agentic_enrichment: bool = True,
-        nylas_grant_id: Optional[str] = None
+        nylas_grant_id: Optional[str] = None,
+        analysis_horizon_months: int = DEFAULT_HORIZON_MONTHS
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Stream enrichment progress with real-time updates.
@@ -724,6 +1212,7 @@ class EnrichmentService:
             progress_callback: Optional callback(current, total, status)
             enable_agentic_enrichment: Whether to run parallel agentic enrichment
             nylas_grant_id: Optional Nylas grant ID for email receipt search
+            analysis_horizon_months: Complete months averaged in the budget analysis
             
         Yields:
             Progress events: {"type": "progress", "current": N, "total": M, "status": "enriching", ...}
@@ -738,6 +1227,9 @@ class EnrichmentService:
             "ntropy_completed": 0,
             "agentic_queued": 0,
             "agentic_completed": 0,
+            "cache_hits": 0,
+            "cache_hit_rate": 0.0,
+            "stored_reused": 0,
             "start_time": start_time
         }
         
@@ -759,10 +1251,12 @@ class EnrichmentService:
         }
         
         normalized = [self.normalize_truelayer_transaction(tx) for tx in raw_transactions]
+        # Entry types, cents and days are derived once here for every later stage
+        frame = self._build_frame(normalized)
         
         # ============== LAYER 0: Ghost Pair Detection (Math Brain) ==============
         # Run BEFORE Ntropy to catch internal transfers first
-        ghost_pairs = self._detect_ghost_pairs(normalized)
+        ghost_pairs = self._detect_ghost_pairs(normalized, frame)
         ghost_pair_count = len(ghost_pairs) // 2  # Each pair has 2 entries
         print(f"[EnrichmentService] Layer 0: Detected {ghost_pair_count} ghost pairs (transfers)")
         
@@ -781,13 +1275,23 @@ class EnrichmentService:
         # Hash user ID + truelayer_item_id for unique Ntropy account holder isolation
         hashed_account_holder_id = self._hash_account_holder_id(user_id, truelayer_item_id)
         
+        # Transactions unchanged since an earlier (overlapping) sync window reuse
+        # their stored final result. Ghost pairs were evaluated across the whole
+        # window above, so they are always rebuilt by Layer 0 and never reused.
+        content_hashes, stored = self._load_stored_results(hashed_account_holder_id, normalized, ghost_pairs)
+        progress_stats["stored_reused"] = sum(tx.transaction_id in stored for tx in normalized)
+        # Transactions whose result is final (Ntropy succeeded, agentic done or not needed)
+        final_ids: set = set()
+        awaiting_agentic: set = set()
+        
         print(f"[EnrichmentService] Account holder context:")
         print(f"  - Hashed ID: {hashed_account_holder_id[:16]}...")
         print(f"  - Name: {account_holder_name or '(not provided)'}")
         print(f"  - Country: {country}")
         
         # Create account holder explicitly (required in Ntropy SDK v5.x)
-        self._create_or_get_account_holder(hashed_account_holder_id, account_holder_name, country)
+        if self._ntropy_enabled():
+            await self._ensure_account_holder(hashed_account_holder_id, account_holder_name, country)
         
         # Start agentic worker in parallel (runs concurrently with Ntropy enrichment)
         if agentic_queue:
@@ -800,7 +1304,7 @@ class EnrichmentService:
         # Track high-confidence transactions that don't need agentic enrichment
         high_confidence_count = 0
         
-        if self.sdk and NTROPY_AVAILABLE:
+        if self._ntropy_enabled():
             yield {
                 "type": "progress", 
                 "current": 0, 
@@ -812,211 +1316,225 @@ class EnrichmentService:
             
             loop = asyncio.get_event_loop()
             
-            # Process in batches of 10 for better progress visibility
-            batch_size = 10
-            for batch_start in range(0, total, batch_size):
-                batch_end = min(batch_start + batch_size, total)
-                batch = normalized[batch_start:batch_end]
-                raw_batch = raw_transactions[batch_start:batch_end]
+            # Enrich everything except Layer 0 ghost pairs (which skip Ntropy) and
+            # stored results through the batch API
+            to_enrich = [
+                i for i, norm_tx in enumerate(normalized)
+                if norm_tx.transaction_id not in ghost_pairs and norm_tx.transaction_id not in stored
+            ]
+            tx_data_list = []
+            for i in to_enrich:
+                norm_tx = normalized[i]
+                tx_data_list.append({
+                    "id": norm_tx.transaction_id,
+                    "description": norm_tx.description,
+                    "amount": norm_tx.amount,
+                    "entry_type": frame.entry_type(i),
+                    "currency": norm_tx.currency,
+                    "date": norm_tx.timestamp,
+                    "account_holder_id": hashed_account_holder_id,
+                    "country": country,
+                })
+            
+            # Each transaction is classified (and queued for agentic enrichment)
+            # as soon as its enrichment is final, rather than after the slowest
+            # call of its group; progress is reported on a fixed cadence
+            results_by_index: List[Optional[NtropyOutputModel]] = [None] * total
+            batch_progress: Dict[str, int] = {"processed": 0, "total": len(tx_data_list), "cache_hits": 0}
+            
+            def process(index: int, enriched_dict: Optional[Dict[str, Any]]) -> None:
+                nonlocal high_confidence_count
+                norm_tx = normalized[index]
+                raw_tx = raw_transactions[index]
+                entry_type = frame.entry_type(index)
+                amount_cents = frame.amount_cents[index]
                 
-                # Prepare batch data with all enrichment context
-                tx_data_list = []
-                for norm_tx in batch:
-                    entry_type = self._determine_entry_type(norm_tx)
-                    tx_data_list.append({
-                        "id": norm_tx.transaction_id,
-                        "description": norm_tx.description,
-                        "amount": norm_tx.amount,
-                        "entry_type": entry_type,
-                        "currency": norm_tx.currency,
-                        "date": norm_tx.timestamp,
-                        "account_holder_id": hashed_account_holder_id,
-                        "country": country,
-                    })
+                # ============== LAYER 0 CHECK: Ghost Pair / Bounced Payment ==============
+                # If this is a ghost pair or bounced payment, skip Ntropy processing entirely
+                if norm_tx.transaction_id in ghost_pairs:
+                    ghost_info = ghost_pairs[norm_tx.transaction_id]
+                    pair_type = ghost_info.get("pair_type", "transfer")
+                    
+                    # Determine appropriate labels based on pair type
+                    if pair_type == "bounced_payment":
+                        ghost_labels = ["bounced_payment", "excluded"]
+                        tx_type = "bounced_payment"
+                        reason_text = f"Layer 0: Bounced Payment detected - matched with TX {str(ghost_info['linked_id'])[:16]}..."
+                    else:
+                        ghost_labels = ["transfer", "internal"]
+                        tx_type = "transfer"
+                        reason_text = f"Layer 0: Ghost Pair detected - matched with TX {str(ghost_info['linked_id'])[:16]}..."
+                    
+                    result = NtropyOutputModel(
+                        transaction_id=norm_tx.transaction_id,
+                        original_description=norm_tx.description,
+                        merchant_clean_name=None,
+                        merchant_logo_url=None,
+                        merchant_website_url=None,
+                        labels=ghost_labels,
+                        is_recurring=False,
+                        recurrence_frequency=None,
+                        recurrence_day=None,
+                        amount_cents=amount_cents,
+                        entry_type=entry_type,
+                        budget_category="transfer",  # Always exclude from budget
+                        transaction_date=norm_tx.timestamp,
+                        # Layer 0 cascade fields
+                        ntropy_confidence=1.0,
+                        enrichment_source="math_brain",
+                        reasoning_trace=[reason_text],
+                        exclude_from_analysis=True,
+                        transaction_type=tx_type,
+                        linked_transaction_id=ghost_info["linked_id"]
+                    )
+                    results_by_index[index] = result
+                    progress_stats["ntropy_completed"] += 1
+                    high_confidence_count += 1
+                    # Safe string slicing for logging
+                    tx_id_short = str(norm_tx.transaction_id)[:16] if norm_tx.transaction_id else "unknown"
+                    print(f"[EnrichmentService] Layer 0: Skipping Ntropy for {pair_type} {tx_id_short}... (confidence=1.0)")
+                    return
                 
-                # Enrich batch concurrently with Ntropy
-                enriched_batch = await self._enrich_concurrent(tx_data_list, loop)
+                # ============== Stored result from an earlier request ==============
+                if norm_tx.transaction_id in stored:
+                    results_by_index[index] = stored[norm_tx.transaction_id].model_copy(deep=True)
+                    progress_stats["ntropy_completed"] += 1
+                    return
                 
-                # Process results and check for agentic enrichment needs
-                for i, enriched_dict in enumerate(enriched_batch):
-                    norm_tx = batch[i]
-                    raw_tx = raw_batch[i]
-                    entry_type = self._determine_entry_type(norm_tx)
+                # ============== LAYER 1: Ntropy Processing ==============
+                if enriched_dict is None:
+                    result = self._create_fallback_output(norm_tx, entry_type, amount_cents)
+                    result.reasoning_trace = ["Layer 1: Ntropy enrichment failed - using fallback"]
+                    result.ntropy_confidence = 0.3
+                    results_by_index[index] = result
                     
-                    # ============== LAYER 0 CHECK: Ghost Pair / Bounced Payment ==============
-                    # If this is a ghost pair or bounced payment, skip Ntropy processing entirely
-                    if norm_tx.transaction_id in ghost_pairs:
-                        ghost_info = ghost_pairs[norm_tx.transaction_id]
-                        pair_type = ghost_info.get("pair_type", "transfer")
-                        
-                        # Determine appropriate labels based on pair type
-                        if pair_type == "bounced_payment":
-                            ghost_labels = ["bounced_payment", "excluded"]
-                            tx_type = "bounced_payment"
-                            reason_text = f"Layer 0: Bounced Payment detected - matched with TX {str(ghost_info['linked_id'])[:16]}..."
-                        else:
-                            ghost_labels = ["transfer", "internal"]
-                            tx_type = "transfer"
-                            reason_text = f"Layer 0: Ghost Pair detected - matched with TX {str(ghost_info['linked_id'])[:16]}..."
-                        
-                        result = NtropyOutputModel(
-                            transaction_id=norm_tx.transaction_id,
-                            original_description=norm_tx.description,
-                            merchant_clean_name=None,
-                            merchant_logo_url=None,
-                            merchant_website_url=None,
-                            labels=ghost_labels,
-                            is_recurring=False,
-                            recurrence_frequency=None,
-                            recurrence_day=None,
-                            amount_cents=int(norm_tx.amount * 100),
-                            entry_type=entry_type,
-                            budget_category="transfer",  # Always exclude from budget
-                            transaction_date=norm_tx.timestamp,
-                            # Layer 0 cascade fields
-                            ntropy_confidence=1.0,
-                            enrichment_source="math_brain",
-                            reasoning_trace=[reason_text],
-                            exclude_from_analysis=True,
-                            transaction_type=tx_type,
-                            linked_transaction_id=ghost_info["linked_id"]
+                    # Mark as ntropy_done and check for agentic enrichment
+                    progress_stats["ntropy_completed"] += 1
+                    if agentic_queue:
+                        agentic_queue.mark_ntropy_complete(norm_tx.transaction_id)
+                        # Fallback always needs agentic enrichment
+                        tx_data = self._prepare_transaction_for_agentic(
+                            norm_tx, result, raw_tx, user_id, nylas_grant_id
                         )
-                        results.append(result)
-                        progress_stats["ntropy_completed"] += 1
-                        high_confidence_count += 1
-                        # Safe string slicing for logging
-                        tx_id_short = str(norm_tx.transaction_id)[:16] if norm_tx.transaction_id else "unknown"
-                        print(f"[EnrichmentService] Layer 0: Skipping Ntropy for {pair_type} {tx_id_short}... (confidence=1.0)")
-                        continue
+                        if agentic_queue.add_transaction(
+                            norm_tx.transaction_id,
+                            tx_data,
+                            result.model_dump()
+                        ):
+                            progress_stats["agentic_queued"] += 1
+                else:
+                    # ============== Ntropy SDK v5.x Response Parsing ==============
+                    # The SDK response has entities (counterparty) and categories (general/accounting)
+                    # We normalize this in _enrich_single_sync and store in _normalized
+                    # NOTE: Use a different variable name to avoid shadowing the outer 'normalized' list
+                    ntropy_normalized = enriched_dict.get('_normalized', {})
                     
-                    # ============== LAYER 1: Ntropy Processing ==============
-                    if enriched_dict is None:
-                        result = self._create_fallback_output(norm_tx)
-                        result.reasoning_trace = ["Layer 1: Ntropy enrichment failed - using fallback"]
-                        result.ntropy_confidence = 0.3
-                        results.append(result)
-                        
-                        # Mark as ntropy_done and check for agentic enrichment
-                        progress_stats["ntropy_completed"] += 1
-                        if agentic_queue:
-                            agentic_queue.mark_ntropy_complete(norm_tx.transaction_id)
-                            # Fallback always needs agentic enrichment
-                            tx_data = self._prepare_transaction_for_agentic(
-                                norm_tx, result, raw_tx, user_id, nylas_grant_id
-                            )
-                            if agentic_queue.add_transaction(
-                                norm_tx.transaction_id,
-                                tx_data,
-                                result.model_dump()
-                            ):
-                                progress_stats["agentic_queued"] += 1
+                    # Get merchant info from normalized structure
+                    merchant_name = ntropy_normalized.get('merchant_name')
+                    logo_url = ntropy_normalized.get('logo_url')
+                    website_url = ntropy_normalized.get('website_url')
+                    general_category = ntropy_normalized.get('category')
+                    labels = ntropy_normalized.get('labels', [])
+                    
+                    # Recurrence is still at top level
+                    recurrence_value = enriched_dict.get('recurrence')
+                    is_recurring = recurrence_value in ('recurring', 'subscription') if recurrence_value else False
+                    
+                    # recurrence_group contains periodicity info if recurring
+                    recurrence_group = enriched_dict.get('recurrence_group') or {}
+                    
+                    budget_category = self.classify_transaction(
+                        labels=labels,
+                        is_recurring=is_recurring,
+                        entry_type=entry_type
+                    )
+                    
+                    # Calculate confidence based on Ntropy response quality
+                    # (Ntropy SDK v5.x doesn't provide explicit confidence score)
+                    ntropy_confidence, penalty_reason = self._calculate_ntropy_confidence(
+                        merchant_name,
+                        labels,
+                        recurrence_confidence=None,  # No longer used
+                        is_recurring=is_recurring,
+                        original_description=norm_tx.description  # Check for payment processors in original description
+                    )
+                    
+                    # Build reasoning trace
+                    reasoning_trace = []
+                    if enriched_dict.get('_cache_hit'):
+                        reasoning_trace.append("Layer 1: Ntropy enrichment served from description cache")
+                    if penalty_reason:
+                        reasoning_trace.append(f"Layer 1: Ntropy confidence={ntropy_confidence:.2f} (penalty applied for {penalty_reason})")
                     else:
-                        # ============== Ntropy SDK v5.x Response Parsing ==============
-                        # The SDK response has entities (counterparty) and categories (general/accounting)
-                        # We normalize this in _enrich_single_sync and store in _normalized
-                        # NOTE: Use a different variable name to avoid shadowing the outer 'normalized' list
-                        ntropy_normalized = enriched_dict.get('_normalized', {})
-                        
-                        # Get merchant info from normalized structure
-                        merchant_name = ntropy_normalized.get('merchant_name')
-                        logo_url = ntropy_normalized.get('logo_url')
-                        website_url = ntropy_normalized.get('website_url')
-                        general_category = ntropy_normalized.get('category')
-                        labels = ntropy_normalized.get('labels', [])
-                        
-                        # Recurrence is still at top level
-                        recurrence_value = enriched_dict.get('recurrence')
-                        is_recurring = recurrence_value in ('recurring', 'subscription') if recurrence_value else False
-                        
-                        # recurrence_group contains periodicity info if recurring
-                        recurrence_group = enriched_dict.get('recurrence_group') or {}
-                        
-                        budget_category = self.classify_transaction(
-                            labels=labels,
-                            is_recurring=is_recurring,
-                            entry_type=entry_type
-                        )
-                        
-                        # Calculate confidence based on Ntropy response quality
-                        # (Ntropy SDK v5.x doesn't provide explicit confidence score)
-                        ntropy_confidence, penalty_reason = self._calculate_ntropy_confidence(
-                            merchant_name,
-                            labels,
-                            recurrence_confidence=None,  # No longer used
-                            is_recurring=is_recurring,
-                            original_description=norm_tx.description  # Check for payment processors in original description
-                        )
-                        
-                        # Build reasoning trace
-                        reasoning_trace = []
-                        if penalty_reason:
-                            reasoning_trace.append(f"Layer 1: Ntropy confidence={ntropy_confidence:.2f} (penalty applied for {penalty_reason})")
-                        else:
-                            reasoning_trace.append(f"Layer 1: Ntropy confidence={ntropy_confidence:.2f}")
-                        
-                        # Determine if we should skip agentic enrichment (confidence gate)
-                        skip_agentic = ntropy_confidence >= CONFIDENCE_THRESHOLD
-                        enrichment_source = "ntropy" if skip_agentic else None
-                        
-                        if skip_agentic:
-                            reasoning_trace.append(f"Layer 1: Confidence >= {CONFIDENCE_THRESHOLD} - cascade STOP")
-                            high_confidence_count += 1
-                        
-                        # Extract recurrence details from recurrence_group
-                        recurrence_frequency = recurrence_group.get('periodicity') if recurrence_group else None
-                        recurrence_day = None  # SDK v5.x doesn't provide day_of_month directly
-                        
-                        result = NtropyOutputModel(
-                            transaction_id=norm_tx.transaction_id,
-                            original_description=norm_tx.description,
-                            merchant_clean_name=merchant_name,
-                            merchant_logo_url=logo_url,
-                            merchant_website_url=website_url,
-                            labels=labels,
-                            is_recurring=is_recurring,
-                            recurrence_frequency=recurrence_frequency,
-                            recurrence_day=recurrence_day,
-                            amount_cents=int(norm_tx.amount * 100),
-                            entry_type=entry_type,
-                            budget_category=budget_category,
-                            transaction_date=norm_tx.timestamp,
-                            # Layer 1 cascade fields
-                            ntropy_confidence=ntropy_confidence,
-                            enrichment_source=enrichment_source,
-                            reasoning_trace=reasoning_trace
-                        )
-                        results.append(result)
+                        reasoning_trace.append(f"Layer 1: Ntropy confidence={ntropy_confidence:.2f}")
+                    
+                    # Determine if we should skip agentic enrichment (confidence gate)
+                    skip_agentic = ntropy_confidence >= CONFIDENCE_THRESHOLD
+                    enrichment_source = "ntropy" if skip_agentic else None
+                    
+                    if skip_agentic:
+                        reasoning_trace.append(f"Layer 1: Confidence >= {CONFIDENCE_THRESHOLD} - cascade STOP")
+                        high_confidence_count += 1
+                    
+                    # Extract recurrence details from recurrence_group
+                    recurrence_frequency = recurrence_group.get('periodicity') if recurrence_group else None
+                    recurrence_day = None  # SDK v5.x doesn't provide day_of_month directly
+                    
+                    result = NtropyOutputModel(
+                        transaction_id=norm_tx.transaction_id,
+                        original_description=norm_tx.description,
+                        merchant_clean_name=merchant_name,
+                        merchant_logo_url=logo_url,
+                        merchant_website_url=website_url,
+                        labels=labels,
+                        is_recurring=is_recurring,
+                        recurrence_frequency=recurrence_frequency,
+                        recurrence_day=recurrence_day,
+                        amount_cents=amount_cents,
+                        entry_type=entry_type,
+                        budget_category=budget_category,
+                        transaction_date=norm_tx.timestamp,
+                        # Layer 1 cascade fields
+                        ntropy_confidence=ntropy_confidence,
+                        enrichment_source=enrichment_source,
+                        reasoning_trace=reasoning_trace
+                    )
+                    results_by_index[index] = result
+                    final_ids.add(norm_tx.transaction_id)
+                    
+                    # Mark as ntropy_done
+                    progress_stats["ntropy_completed"] += 1
+                    if agentic_queue:
+                        agentic_queue.mark_ntropy_complete(norm_tx.transaction_id)
                         
-                        # Mark as ntropy_done
-                        progress_stats["ntropy_completed"] += 1
-                        if agentic_queue:
-                            agentic_queue.mark_ntropy_complete(norm_tx.transaction_id)
+                        # Only queue for agentic if confidence < threshold
+                        if not skip_agentic:
+                            ntropy_result_dict = {
+                                "labels": labels,
+                                "merchant_clean_name": merchant_name,
+                                "merchant": {"name": merchant_name, "logo": logo_url, "website": website_url},
+                                "is_recurring": is_recurring,
+                                "ntropy_confidence": ntropy_confidence
+                            }
                             
-                            # Only queue for agentic if confidence < threshold
-                            if not skip_agentic:
-                                ntropy_result_dict = {
-                                    "labels": labels,
-                                    "merchant_clean_name": merchant_name,
-                                    "merchant": {"name": merchant_name, "logo": logo_url, "website": website_url},
-                                    "is_recurring": is_recurring,
-                                    "ntropy_confidence": ntropy_confidence
-                                }
-                                
-                                if needs_agentic_enrichment(ntropy_result_dict, subscription_catalog_match=False, ntropy_confidence=ntropy_confidence):
-                                    tx_data = self._prepare_transaction_for_agentic(
-                                        norm_tx, result, raw_tx, user_id, nylas_grant_id
-                                    )
-                                    if agentic_queue.add_transaction(
-                                        norm_tx.transaction_id,
-                                        tx_data,
-                                        result.model_dump()
-                                    ):
-                                        progress_stats["agentic_queued"] += 1
-                
+                            if needs_agentic_enrichment(ntropy_result_dict, subscription_catalog_match=False, ntropy_confidence=ntropy_confidence):
+                                tx_data = self._prepare_transaction_for_agentic(
+                                    norm_tx, result, raw_tx, user_id, nylas_grant_id
+                                )
+                                if agentic_queue.add_transaction(
+                                    norm_tx.transaction_id,
+                                    tx_data,
+                                    result.model_dump()
+                                ):
+                                    progress_stats["agentic_queued"] += 1
+                                    awaiting_agentic.add(norm_tx.transaction_id)
+            
+            def progress_event() -> Dict[str, Any]:
                 # Update agentic_completed from queue
                 if agentic_queue:
                     queue_progress = agentic_queue.get_progress()
                     progress_stats["agentic_completed"] = queue_progress.get("agentic_completed", 0)
+                self._update_cache_stats(progress_stats, batch_progress["cache_hits"], len(tx_data_list))
                 
                 # Calculate processing rate
                 elapsed = time.time() - start_time
@@ -1025,9 +1543,8 @@ class EnrichmentService:
                 else:
                     rate = 0
                 
-                # Emit progress update with extended stats
-                current = len(results)
-                yield {
+                current = progress_stats["ntropy_completed"]
+                return {
                     "type": "progress", 
                     "current": current, 
                     "total": total, 
@@ -1036,9 +1553,48 @@ class EnrichmentService:
                     "ntropy_completed": progress_stats["ntropy_completed"],
                     "agentic_queued": progress_stats["agentic_queued"],
                     "agentic_completed": progress_stats["agentic_completed"],
+                    "cache_hits": progress_stats["cache_hits"],
+                    "cache_hit_rate": progress_stats["cache_hit_rate"],
+                    "ntropy_batch_processed": batch_progress["processed"],
+                    "ntropy_batch_total": batch_progress["total"],
                     "transactions_per_minute": round(rate, 2),
                     "estimated_time_remaining": round((total - current) / rate * 60, 1) if rate > 0 else 0
                 }
+            
+            # Layer 0 ghost pairs and stored results need no Ntropy call
+            for i, norm_tx in enumerate(normalized):
+                if norm_tx.transaction_id in ghost_pairs or norm_tx.transaction_id in stored:
+                    process(i, None)
+            
+            completed: deque = deque()
+            arrived = asyncio.Event()
+            
+            def on_result(position: int, enriched_dict: Optional[Dict[str, Any]]) -> None:
+                completed.append((to_enrich[position], enriched_dict))
+                arrived.set()
+            
+            enrich_task = asyncio.ensure_future(
+                self._enrich_cached(tx_data_list, loop, batch_progress, on_result=on_result,
+                                    history=self._recurrence_history(normalized, frame))
+            )
+            enrich_task.add_done_callback(lambda _: arrived.set())
+            next_progress = time.monotonic() + STREAM_PROGRESS_INTERVAL_SECONDS
+            while True:
+                arrived.clear()
+                while completed:
+                    process(*completed.popleft())
+                if enrich_task.done():
+                    break
+                if time.monotonic() >= next_progress:
+                    yield progress_event()
+                    next_progress = time.monotonic() + STREAM_PROGRESS_INTERVAL_SECONDS
+                try:
+                    await asyncio.wait_for(arrived.wait(), timeout=max(0.0, next_progress - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+            enrich_task.result()
+            results = [result for result in results_by_index if result is not None]
+            yield progress_event()
         else:
             # Fallback mode
             yield {
@@ -1049,7 +1605,9 @@ class EnrichmentService:
                 "startTime": int(start_time * 1000),
                 **progress_stats
             }
-            results = self._fallback_classification(normalized)
+            rows = [i for i, tx in enumerate(normalized) if tx.transaction_id not in stored]
+            fresh = self._fallback_classification([normalized[i] for i in rows], frame, rows)
+            results = results_by_index = self._merge_stored_results(normalized, stored, fresh)
             progress_stats["ntropy_completed"] = total
         
         # Phase 3: Wait for agentic enrichment to complete (in parallel)
@@ -1106,6 +1664,13 @@ class EnrichmentService:
         elif agentic_queue:
             await agentic_queue.stop()
         
+        # Store final results; ones still waiting on agentic enrichment (timed out) are not final
+        self._save_results(hashed_account_holder_id, results, content_hashes, {
+            result.transaction_id for result in results
+            if result.transaction_id in final_ids
+            and (result.transaction_id not in awaiting_agentic or result.enrichment_stage == "agentic_done")
+        })
+        
         # Phase 4: Compute budget analysis
         yield {
             "type": "progress", 
@@ -1116,7 +1681,9 @@ class EnrichmentService:
             **progress_stats
         }
         
-        budget_analysis = self._compute_budget_breakdown(results)
+        # Final categories (after any agentic update) are aggregated into the budget cube
+        cube = self._build_budget_cube(hashed_account_holder_id, frame, results_by_index)
+        budget_analysis = cube.budget_breakdown(analysis_horizon_months)
         detected_debts = self._extract_detected_debts(results)
         
         # Final result with extended stats
@@ -1133,6 +1700,9 @@ class EnrichmentService:
                 "ntropy_completed": progress_stats["ntropy_completed"],
                 "agentic_queued": progress_stats["agentic_queued"],
                 "agentic_completed": progress_stats["agentic_completed"],
+                "cache_hits": progress_stats["cache_hits"],
+                "cache_hit_rate": progress_stats["cache_hit_rate"],
+                "stored_reused": progress_stats["stored_reused"],
                 "elapsed_seconds": round(elapsed, 2),
                 "transactions_per_minute": round((total / elapsed) * 60, 2) if elapsed > 0 else 0
             }
@@ -1164,87 +1734,26 @@ class EnrichmentService:
             "enrichmentStage": "ntropy_done"
         }
     
-    def _compute_budget_breakdown(self, enriched: List[NtropyOutputModel], analysis_horizon_months: int = 3) -> Dict[str, Any]:
+    def _build_budget_cube(
+        self,
+        account_holder_id: str,
+        frame: TransactionFrame,
+        results: List[Optional[NtropyOutputModel]]
+    ) -> BudgetCube:
         """
-        Compute budget breakdown from enriched transactions.
-        
-        Calculates monthly averages using only COMPLETE months from the data,
-        capped at the analysis horizon (default: 3 months).
-        Current (partial) month is excluded from the average calculation.
+        Aggregate the final results (results[i] is frame row i's, None if it has
+        none) into a budget cube, and keep it for the budget analysis endpoint.
+        Transactions excluded from analysis are left out of the merchant rollup.
         """
-        from datetime import datetime
-        
-        today = datetime.now()
-        first_of_current_month = datetime(today.year, today.month, 1)
-        
-        # Calculate the analysis window: 1st of (current - analysis_horizon_months) to end of last complete month
-        # Example: If today is Dec 13 and horizon is 3, window is Sept 1 - Nov 30
-        analysis_start_year = today.year
-        analysis_start_month = today.month - analysis_horizon_months
-        while analysis_start_month <= 0:
-            analysis_start_month += 12
-            analysis_start_year -= 1
-        analysis_start = datetime(analysis_start_year, analysis_start_month, 1)
-        
-        income_total = 0
-        fixed_total = 0
-        discretionary_total = 0
-        debt_total = 0
-        
-        # Only count transactions within the analysis window (complete months only)
-        for tx in enriched:
-            if not tx.transaction_date:
-                continue
-            
-            try:
-                tx_date = datetime.strptime(tx.transaction_date, "%Y-%m-%d")
-            except ValueError:
-                continue
-            
-            # Include only transactions from complete months within the analysis window
-            # Exclude current month (partial) and transactions before the analysis start
-            if tx_date < analysis_start or tx_date >= first_of_current_month:
-                continue
-            
-            if tx.entry_type == "incoming":
-                income_total += tx.amount_cents
-            elif tx.budget_category == "fixed":
-                fixed_total += tx.amount_cents
-            elif tx.budget_category == "discretionary":
-                discretionary_total += tx.amount_cents
-            elif tx.budget_category == "debt":
-                debt_total += tx.amount_cents
-        
-        # Calculate actual complete months in the analysis window
-        # Count months from analysis_start to first_of_current_month
-        complete_months = 0
-        check_year, check_month = analysis_start_year, analysis_start_month
-        while datetime(check_year, check_month, 1) < first_of_current_month:
-            complete_months += 1
-            check_month += 1
-            if check_month > 12:
-                check_month = 1
-                check_year += 1
-        
-        # Cap at analysis horizon and ensure minimum of 1
-        months = min(complete_months, analysis_horizon_months)
-        months = max(1, months)
-        
-        monthly_income = income_total // months
-        monthly_fixed = fixed_total // months
-        monthly_discretionary = discretionary_total // months
-        monthly_debt = debt_total // months
-        
-        safe_to_spend = max(0, monthly_income - monthly_fixed - monthly_debt)
-        
-        return {
-            "averageMonthlyIncomeCents": monthly_income,
-            "fixedCostsCents": monthly_fixed,
-            "discretionaryCents": monthly_discretionary,
-            "debtPaymentsCents": monthly_debt,
-            "safeToSpendCents": safe_to_spend,
-            "analysisMonths": months
-        }
+        frame.set_categories(results)
+        merchants = [
+            None if result is None or result.exclude_from_analysis
+            else result.merchant_clean_name or result.original_description
+            for result in results
+        ]
+        self.budget_cube = BudgetCube.from_frame(frame, merchants)
+        get_budget_cube_store().put(account_holder_id, self.budget_cube)
+        return self.budget_cube
     
     def _extract_detected_debts(self, enriched: List[NtropyOutputModel]) -> List[Dict[str, Any]]:
         """Extract detected debt payments from enriched transactions"""
@@ -1282,16 +1791,16 @@ class EnrichmentService:
         """
         labels_lower = [l.lower() for l in labels]
         labels_text = " ".join(labels_lower)
+        keywords = get_keyword_matcher()
+        hits = keywords.scan(labels_text)
         
         # Bucket A: Check for debt indicators
-        for debt_keyword in DEBT_LABELS:
-            if debt_keyword in labels_text:
-                return "debt"
+        if keywords.has_any(hits, "debt"):
+            return "debt"
         
         # Bucket B: Check for fixed costs OR recurring non-debt
-        for fixed_keyword in FIXED_COST_LABELS:
-            if fixed_keyword in labels_text:
-                return "fixed"
+        if keywords.has_any(hits, "fixed"):
+            return "fixed"
         
         # If it's recurring but not matched above, assume fixed cost
         if is_recurring and entry_type == "outgoing":
@@ -1332,45 +1841,56 @@ class EnrichmentService:
             self.normalize_truelayer_transaction(tx)
             for tx in raw_transactions
         ]
+        frame = self._build_frame(normalized)
         
         # Hash user ID + truelayer_item_id for unique Ntropy account holder isolation
         hashed_account_holder_id = self._hash_account_holder_id(user_id, truelayer_item_id)
         
+        # Only new or changed transactions go through the pipeline; the rest
+        # reuse their stored result from an earlier request
+        content_hashes, stored = self._load_stored_results(hashed_account_holder_id, normalized)
+        rows = [i for i, tx in enumerate(normalized) if tx.transaction_id not in stored]
+        pending = [normalized[i] for i in rows]
+        final_ids: set = set()
+        
         # Phase 2: Enrich with Ntropy (if available)
-        if self.sdk and NTROPY_AVAILABLE:
+        if self._ntropy_enabled():
             try:
                 # Create account holder explicitly (required in Ntropy SDK v5.x)
-                self._create_or_get_account_holder(hashed_account_holder_id, account_holder_name, country)
+                await self._ensure_account_holder(hashed_account_holder_id, account_holder_name, country)
                 
                 # Prepare transaction data for concurrent processing
                 # Note: account_holder_name is set on the account holder, not transactions
                 tx_data_list = []
-                for norm_tx in normalized:
-                    entry_type = self._determine_entry_type(norm_tx)
+                for row, norm_tx in zip(rows, pending):
                     tx_data_list.append({
                         "id": norm_tx.transaction_id,
                         "description": norm_tx.description,
                         "amount": norm_tx.amount,
-                        "entry_type": entry_type,
+                        "entry_type": frame.entry_type(row),
                         "currency": norm_tx.currency,
                         "date": norm_tx.timestamp,
                         "account_holder_id": hashed_account_holder_id,
                         "country": country,
                     })
                 
-                print(f"[EnrichmentService] Enriching {len(tx_data_list)} transactions with Ntropy (concurrent)...")
+                print(f"[EnrichmentService] Enriching {len(tx_data_list)} transactions with Ntropy (batched)...")
                 
-                # Use concurrent processing for speed
+                # Batch API for speed, per-transaction calls for stragglers
                 loop = asyncio.get_event_loop()
-                enriched_batch = await self._enrich_concurrent(tx_data_list, loop)
+                enriched_batch = await self._enrich_cached(
+                    tx_data_list, loop, history=self._recurrence_history(normalized, frame)
+                )
                 
                 # Process enriched results
                 for i, enriched_dict in enumerate(enriched_batch):
-                    norm_tx = normalized[i]
+                    norm_tx = pending[i]
+                    row = rows[i]
+                    entry_type = frame.entry_type(row)
                     
                     # Skip if enrichment failed for this transaction
                     if enriched_dict is None:
-                        results.append(self._create_fallback_output(norm_tx))
+                        results.append(self._create_fallback_output(norm_tx, entry_type, frame.amount_cents[row]))
                         continue
                     
                     # ============== Ntropy SDK v5.x Response Parsing ==============
@@ -1392,8 +1912,6 @@ class EnrichmentService:
                     recurrence_freq = recurrence_group.get('periodicity') if recurrence_group else None
                     recurrence_day = None  # SDK v5.x doesn't provide day_of_month
                     
-                    entry_type = self._determine_entry_type(norm_tx)
-                    
                     # Phase 3: Classify
                     budget_category = self.classify_transaction(
                         labels=labels,
@@ -1411,47 +1929,68 @@ class EnrichmentService:
                         is_recurring=is_recurring,
                         recurrence_frequency=recurrence_freq,
                         recurrence_day=recurrence_day,
-                        amount_cents=int(norm_tx.amount * 100),
+                        amount_cents=frame.amount_cents[row],
                         entry_type=entry_type,
                         budget_category=budget_category,
                         transaction_date=norm_tx.timestamp
                     ))
+                    final_ids.add(norm_tx.transaction_id)
                 
                 print(f"[EnrichmentService] Successfully enriched {len(results)} transactions")
                 
             except Exception as e:
                 print(f"[EnrichmentService] Ntropy enrichment failed: {e}")
                 print("[EnrichmentService] Falling back to basic classification")
-                results = self._fallback_classification(normalized)
+                results = self._fallback_classification(pending, frame, rows)
+                final_ids.clear()
         else:
             # Fallback mode - use TrueLayer classifications and basic rules
             print("[EnrichmentService] Using fallback classification (no Ntropy)")
-            results = self._fallback_classification(normalized)
+            results = self._fallback_classification(pending, frame, rows)
         
-        return results
+        self._save_results(hashed_account_holder_id, results, content_hashes, final_ids)
+        merged = self._merge_stored_results(normalized, stored, results)
+        self._build_budget_cube(hashed_account_holder_id, frame, merged)
+        return merged
     
-    def _create_fallback_output(self, norm_tx: TrueLayerIngestModel) -> NtropyOutputModel:
-        """Create a fallback output for a single transaction when Ntropy enrichment fails"""
+    def _create_fallback_output(
+        self,
+        norm_tx: TrueLayerIngestModel,
+        entry_type: Optional[str] = None,
+        amount_cents: Optional[int] = None
+    ) -> NtropyOutputModel:
+        """
+        Create a fallback output for a single transaction when Ntropy enrichment fails.
+        Entry type and cents are taken from the caller's transaction frame when given.
+        """
+        # Use TrueLayer classification as labels
         labels = norm_tx.transaction_classification or []
+        
+        # Basic keyword matching on description
         desc_lower = norm_tx.description.lower()
-        is_recurring = any(kw in desc_lower for kw in [
-            'dd ', 'direct debit', 'standing order', 's/o',
-            'subscription', 'monthly', 'recurring'
-        ])
-        entry_type = self._determine_entry_type(norm_tx)
+        
+        # Detect recurring based on common patterns
+        is_recurring = get_keyword_matcher().contains_any(desc_lower, "recurring")
+        
+        if entry_type is None:
+            entry_type = self._determine_entry_type(norm_tx)
+        if amount_cents is None:
+            amount_cents = int(norm_tx.amount * 100)
+        
+        # Enhanced classification using description keywords
         budget_category = self._classify_by_keywords(desc_lower, labels, is_recurring, entry_type)
         
         return NtropyOutputModel(
             transaction_id=norm_tx.transaction_id,
             original_description=norm_tx.description,
-            merchant_clean_name=None,
+            merchant_clean_name=None,  # No merchant info without Ntropy
             merchant_logo_url=None,
             merchant_website_url=None,
             labels=labels,
             is_recurring=is_recurring,
             recurrence_frequency="monthly" if is_recurring else None,
             recurrence_day=None,
-            amount_cents=int(norm_tx.amount * 100),
+            amount_cents=amount_cents,
             entry_type=entry_type,
             budget_category=budget_category,
             transaction_date=norm_tx.timestamp
@@ -1459,49 +1998,23 @@ class EnrichmentService:
     
     def _fallback_classification(
         self,
-        normalized_transactions: List[TrueLayerIngestModel]
+        normalized_transactions: List[TrueLayerIngestModel],
+        frame: Optional[TransactionFrame] = None,
+        rows: Optional[List[int]] = None
     ) -> List[NtropyOutputModel]:
         """
         Fallback when Ntropy is unavailable - use TrueLayer classifications
-        and keyword matching for basic categorization
+        and keyword matching for basic categorization.
+        rows[i] is the frame row of normalized_transactions[i] (default: the same position).
         """
-        results = []
-        
-        for norm_tx in normalized_transactions:
-            # Use TrueLayer classification as labels
-            labels = norm_tx.transaction_classification or []
-            
-            # Basic keyword matching on description
-            desc_lower = norm_tx.description.lower()
-            
-            # Detect recurring based on common patterns
-            is_recurring = any(kw in desc_lower for kw in [
-                'dd ', 'direct debit', 'standing order', 's/o',
-                'subscription', 'monthly', 'recurring'
-            ])
-            
-            entry_type = self._determine_entry_type(norm_tx)
-            
-            # Enhanced classification using description keywords
-            budget_category = self._classify_by_keywords(desc_lower, labels, is_recurring, entry_type)
-            
-            results.append(NtropyOutputModel(
-                transaction_id=norm_tx.transaction_id,
-                original_description=norm_tx.description,
-                merchant_clean_name=None,  # No merchant info without Ntropy
-                merchant_logo_url=None,
-                merchant_website_url=None,
-                labels=labels,
-                is_recurring=is_recurring,
-                recurrence_frequency="monthly" if is_recurring else None,
-                recurrence_day=None,
-                amount_cents=int(norm_tx.amount * 100),
-                entry_type=entry_type,
-                budget_category=budget_category,
-                transaction_date=norm_tx.timestamp
-            ))
-        
-        return results
+        if frame is None:
+            return [self._create_fallback_output(norm_tx) for norm_tx in normalized_transactions]
+        if rows is None:
+            rows = list(range(len(normalized_transactions)))
+        return [
+            self._create_fallback_output(norm_tx, frame.entry_type(row), frame.amount_cents[row])
+            for norm_tx, row in zip(normalized_transactions, rows)
+        ]
     
     def _classify_by_keywords(
         self,
@@ -1512,16 +2025,16 @@ class EnrichmentService:
     ) -> str:
         """Classify using keyword matching on description"""
         combined_text = description + " " + " ".join([l.lower() for l in labels])
+        keywords = get_keyword_matcher()
+        hits = keywords.scan(combined_text)
         
         # Check for debt
-        for kw in DEBT_LABELS:
-            if kw in combined_text:
-                return "debt"
+        if keywords.has_any(hits, "debt"):
+            return "debt"
         
         # Check for fixed costs
-        for kw in FIXED_COST_LABELS:
-            if kw in combined_text:
-                return "fixed"
+        if keywords.has_any(hits, "fixed"):
+            return "fixed"
         
         # Recurring outgoing = fixed
         if is_recurring and entry_type == "outgoing":
@@ -1551,7 +2064,7 @@ async def enrich_and_analyze_budget(
         raw_transactions: List of raw TrueLayer transaction dicts
         user_id: User ID for recurrence detection
         truelayer_item_id: TrueLayer item ID for unique account holder isolation
-        analysis_months: Number of months to analyze
+        analysis_months: Number of complete months averaged in the budget analysis
         account_holder_name: Optional name for Ntropy account holder
         country: Country code for account holder (default: GB)
     
@@ -1572,43 +2085,27 @@ async def enrich_and_analyze_budget(
         country=country
     )
     
-    # Compute budget breakdown
-    total_income_cents = 0
-    total_fixed_cents = 0
-    total_discretionary_cents = 0
-    detected_debts = []
+    # Budget breakdown from the monthly cube the enrichment built, averaged
+    # the same way as the streaming pipeline (complete months of the horizon)
+    budget_analysis = service.budget_cube.budget_breakdown(analysis_months)
+    budget_analysis["transactionCount"] = len(enriched)
     
-    for tx in enriched:
-        if tx.entry_type == "incoming":
-            total_income_cents += tx.amount_cents
-        elif tx.budget_category == "debt":
-            detected_debts.append({
-                "description": tx.original_description,
-                "merchant_name": tx.merchant_clean_name or tx.original_description,
-                "logo_url": tx.merchant_logo_url,
-                "amount_cents": tx.amount_cents,
-                "is_recurring": tx.is_recurring,
-                "recurrence_frequency": tx.recurrence_frequency,
-                "transaction_id": tx.transaction_id
-            })
-        elif tx.budget_category == "fixed":
-            total_fixed_cents += tx.amount_cents
-        elif tx.budget_category == "discretionary":
-            total_discretionary_cents += tx.amount_cents
-    
-    # Calculate monthly averages
-    avg_income = total_income_cents // analysis_months
-    avg_fixed = total_fixed_cents // analysis_months
-    avg_discretionary = total_discretionary_cents // analysis_months
+    detected_debts = [
+        {
+            "description": tx.original_description,
+            "merchant_name": tx.merchant_clean_name or tx.original_description,
+            "logo_url": tx.merchant_logo_url,
+            "amount_cents": tx.amount_cents,
+            "is_recurring": tx.is_recurring,
+            "recurrence_frequency": tx.recurrence_frequency,
+            "transaction_id": tx.transaction_id
+        }
+        for tx in enriched
+        if tx.entry_type != "incoming" and tx.budget_category == "debt"
+    ]
     
     return {
         "enriched_transactions": [tx.model_dump() for tx in enriched],
-        "budget_analysis": {
-            "averageMonthlyIncomeCents": avg_income,
-            "fixedCostsCents": avg_fixed,
-            "discretionaryCents": avg_discretionary,
-            "safeToSpendCents": avg_income - avg_fixed,
-            "transactionCount": len(enriched)
-        },
+        "budget_analysis": budget_analysis,
         "detected_debts": detected_debts
     }
@@ -0,0 +1,123 @@
+# enrichment_store.py - Persistent store of final enrichment results
+# Background sync re-posts overlapping 90-day windows, so most transactions
+# in a request were already enriched by an earlier one. Final results
+# (NtropyOutputModel dumps, after any agentic enrichment) are stored per
+# (account holder hash, transaction_id) together with a hash of the
+# normalized transaction, and reused only while that hash still matches.
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Where the store lives (a local SQLite file)
+STORE_PATH = os.environ.get("ENRICHMENT_STORE_PATH", ".enrichment_results.sqlite3")
+
+# Sync windows are 90 days; results older than this are never requested again
+RESULT_RETENTION_SECONDS = 400 * 24 * 3600
+
+# SQLite caps bound parameters per statement; look ids up in chunks
+_LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    account_holder_id TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    result TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (account_holder_id, transaction_id)
+);
+CREATE INDEX IF NOT EXISTS results_updated_at ON results (updated_at);
+"""
+
+
+def content_hash(normalized_tx: Dict[str, Any]) -> str:
+    """Hash of a normalized transaction; any change to what gets enriched changes it."""
+    payload = json.dumps(normalized_tx, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EnrichmentResultStore:
+    """
+    Final enrichment results keyed by (account holder, transaction id,
+    content hash). Thread-safe; reads and writes are best effort and never raise.
+    """
+
+    def __init__(self, path: Optional[str] = None, retention_seconds: float = RESULT_RETENTION_SECONDS):
+        self.path = path or STORE_PATH
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def get_many(self, account_holder_id: str, keys: Iterable[Tuple[str, str]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Stored results for (transaction_id, content_hash) pairs, by transaction id.
+        Transactions that are new, changed or past retention are left out.
+        """
+        wanted = dict(keys)
+        if not wanted:
+            return {}
+        ids = list(wanted)
+        cutoff = time.time() - self.retention_seconds
+
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            try:
+                conn = self._connection()
+                for start in range(0, len(ids), _LOOKUP_CHUNK):
+                    chunk = ids[start:start + _LOOKUP_CHUNK]
+                    rows = conn.execute(
+                        f"SELECT transaction_id, content_hash, result FROM results "
+                        f"WHERE account_holder_id = ? AND updated_at > ? "
+                        f"AND transaction_id IN ({', '.join('?' * len(chunk))})",
+                        (account_holder_id, cutoff, *chunk),
+                    ).fetchall()
+                    for transaction_id, stored_hash, result in rows:
+                        if wanted[transaction_id] == stored_hash:
+                            found[transaction_id] = json.loads(result)
+            except sqlite3.Error as e:
+                print(f"[EnrichmentStore] Could not read stored results: {e}", file=sys.stderr)
+                return {}
+        return found
+
+    def put_many(self, account_holder_id: str, entries: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """Store (transaction_id, content_hash, result) entries, replacing older versions."""
+        if not entries:
+            return
+        now = time.time()
+        rows = [
+            (account_holder_id, transaction_id, digest, json.dumps(result, default=str), now)
+            for transaction_id, digest, result in entries
+        ]
+        with self._lock:
+            try:
+                conn = self._connection()
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+                    conn.execute("DELETE FROM results WHERE updated_at <= ?", (now - self.retention_seconds,))
+            except sqlite3.Error as e:
+                print(f"[EnrichmentStore] Could not store results: {e}", file=sys.stderr)
+
+
+_shared_store: Optional[EnrichmentResultStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_result_store() -> EnrichmentResultStore:
+    """The process-wide result store shared by every enrichment run."""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = EnrichmentResultStore()
+        return _shared_store
@@ -0,0 +1,127 @@
+# keyword_matcher.py - Shared compiled keyword matcher for classification
+# Classification, confidence scoring and agentic gating all test descriptions
+# and labels against keyword lists with substring checks. Every list is
+# registered here as a named group and compiled into one regex, so a text is
+# scanned once for all keywords of all groups; callers then apply their own
+# precedence (debt before fixed, lowest penalty first, ...) to the hits.
+#
+# Groups are registered with a function returning the current keywords, so
+# reload_keywords() picks up lists edited at runtime.
+
+import re
+import threading
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+# Distinct texts whose hits are remembered (the memo is reset when full)
+SCAN_CACHE_SIZE = 50000
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    One regex alternation shaped like a trie of the keywords, so the regex
+    engine follows a single branch per character instead of trying every
+    keyword at every position.
+    """
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}  # end of a keyword
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds every keyword occurring in a text as a substring, exactly as
+    `keyword in text` would, in a single left-to-right regex scan. Matching is
+    case-sensitive: keywords are lowercase and callers lowercase the text.
+    """
+
+    def __init__(self, groups: Dict[str, Sequence[str]]):
+        # Keyword order within a group is its precedence order
+        self._ranks: Dict[str, Dict[str, int]] = {
+            name: {keyword: rank for rank, keyword in reversed(list(enumerate(keywords)))}
+            for name, keywords in groups.items()
+        }
+        vocabulary = sorted({keyword for keywords in groups.values() for keyword in keywords if keyword},
+                            key=lambda keyword: (-len(keyword), keyword))
+
+        # The trie-shaped pattern (greedy at every node) matches the longest
+        # keyword starting at a position; any other keyword starting there is
+        # a prefix of that match. Searching again from the next character
+        # finds overlapping keywords too.
+        self._prefixes: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset(other for other in vocabulary if keyword.startswith(other))
+            for keyword in vocabulary
+        }
+        self._pattern = re.compile(_trie_pattern(vocabulary)) if vocabulary else None
+        # Descriptions and labels repeat heavily; remember recent scans
+        self._recent: Dict[str, FrozenSet[str]] = {}
+
+    def scan(self, text: Optional[str]) -> FrozenSet[str]:
+        """Every keyword, of any group, that occurs in text."""
+        if not text or self._pattern is None:
+            return frozenset()
+        cached = self._recent.get(text)
+        if cached is not None:
+            return cached
+        hits: set = set()
+        search = self._pattern.search
+        match = search(text)
+        while match is not None:
+            hits |= self._prefixes[match.group()]
+            match = search(text, match.start() + 1)
+        if len(self._recent) >= SCAN_CACHE_SIZE:
+            self._recent.clear()
+        self._recent[text] = found = frozenset(hits)
+        return found
+
+    def matches(self, hits: FrozenSet[str], group: str) -> List[str]:
+        """The group's keywords among hits, in the group's precedence order."""
+        rank = self._ranks[group]
+        return sorted((keyword for keyword in hits if keyword in rank), key=rank.__getitem__)
+
+    def has_any(self, hits: FrozenSet[str], group: str) -> bool:
+        """Whether any of the group's keywords are among hits."""
+        rank = self._ranks[group]
+        return any(keyword in rank for keyword in hits)
+
+    def contains_any(self, text: Optional[str], group: str) -> bool:
+        """Shorthand for has_any(scan(text), group)."""
+        return self.has_any(self.scan(text), group)
+
+
+_sources: Dict[str, Callable[[], Iterable[str]]] = {}
+_matcher: Optional[KeywordMatcher] = None
+_lock = threading.Lock()
+
+
+def register_keywords(group: str, source: Callable[[], Iterable[str]]) -> None:
+    """Add (or replace) a keyword group; source returns its keywords in precedence order."""
+    global _matcher
+    with _lock:
+        _sources[group] = source
+        _matcher = None
+
+
+def reload_keywords() -> KeywordMatcher:
+    """Recompile the shared matcher from the current keyword lists."""
+    global _matcher
+    with _lock:
+        _matcher = KeywordMatcher({group: list(source()) for group, source in _sources.items()})
+        return _matcher
+
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """The shared matcher over every registered group (compiled on first use)."""
+    matcher = _matcher
+    return matcher if matcher is not None else reload_keywords()
@@ -4,8 +4,10 @@ import sys
 import asyncio
 import time
 import json
+import uuid
 import httpx
-from fastapi import FastAPI, HTTPException
+from datetime import datetime, timezone
+from fastapi import FastAPI, HTTPException, Query, Header, Request, Response
 from fastapi.responses import StreamingResponse
 from typing import Optional, List, Dict, Any
 
@@ -13,7 +15,10 @@ from typing import Optional, List, Dict, Any
 import schemas
 
 # Import the enrichment service
-from enrichment_service import EnrichmentService, enrich_and_analyze_budget, NtropyOutputModel
+from enrichment_service import EnrichmentService, enrich_and_analyze_budget, hash_account_holder_id, NtropyOutputModel
+from budget_cube import get_budget_cube_store
+from ntropy_client import close_ntropy_clients
+from ntropy_limiter import get_ntropy_limiter
 
 # Import the solver function AND the necessary dataclasses
 # (We need the dataclasses to pass the correct type to the solver)
@@ -21,6 +26,10 @@ try:
     # Assuming solver_engine.py is in the same directory
     from solver_engine import (
         generate_payment_plan,
+        solve_payment_plan,
+        build_columnar_plan,
+        portfolio_from_schema,
+        PlanSolveResult,
         DebtPortfolio as SolverDebtPortfolio, # Rename to avoid clash
         Account as SolverAccount,
         MinPaymentRule as SolverMinPaymentRule,
@@ -38,6 +47,18 @@ except ImportError as e:
     print("Ensure solver_engine.py is in the same directory.", file=sys.stderr)
     raise e # Re-raise the original ImportError
 
+from solver_runner import get_solver_runner, SolveCancelled, SolverOverloaded
+from solve_ledger import enable_ledger
+from batch_planner import iterate_lines, replan_batch
+from plan_jobs import (
+    PlanJob,
+    PlanJobStatus,
+    IdempotencyConflict,
+    PlanJobStoreFull,
+    get_plan_job_store,
+    request_fingerprint,
+)
+
 
 # Create the FastAPI app instance
 app = FastAPI(
@@ -46,6 +67,16 @@ app = FastAPI(
     version="0.1.0",
 )
 
+@app.on_event("startup")
+async def enable_solve_ledger():
+    """Record solves so later requests get time limits and backends from similar past solves."""
+    enable_ledger()
+
+@app.on_event("shutdown")
+async def close_ntropy_connections():
+    """Close pooled Ntropy connections when the server stops."""
+    await close_ntropy_clients()
+
 # --- Health Check Endpoint ---
 @app.get("/health")
 async def health_check():
@@ -60,52 +91,127 @@ def convert_schema_to_solver_portfolio(
     portfolio_schema: schemas.DebtPortfolio
 ) -> SolverDebtPortfolio:
     """Converts Pydantic schema input to solver's dataclass input."""
-    solver_accounts = []
-    for acc_schema in portfolio_schema.accounts:
-        # Convert the nested Pydantic MinPaymentRule to the solver's dataclass
-        solver_rule = SolverMinPaymentRule(**acc_schema.min_payment_rule.model_dump())
-        
-        # Convert buckets if present
-        # Filter bucket_data to only include valid SolverDebtBucket dataclass fields
-        # to avoid TypeError when database fields like "id" are present
-        solver_bucket_fields = {'bucket_type', 'balance_cents', 'apr_bps', 'is_promo', 'promo_expiry_date', 'label'}
-        solver_buckets = []
-        for bucket_schema in acc_schema.buckets:
-            bucket_data = bucket_schema.model_dump()
-            # Filter to only include fields that exist in the solver's DebtBucket dataclass
-            filtered_bucket_data = {k: v for k, v in bucket_data.items() if k in solver_bucket_fields}
-            solver_buckets.append(SolverDebtBucket(**filtered_bucket_data))
-        
-        # Exclude the rule and buckets from the main account data to avoid TypeError
-        acc_data = acc_schema.model_dump(exclude={'min_payment_rule', 'buckets'})
-        
-        # Create the solver's Account dataclass with buckets
-        solver_accounts.append(SolverAccount(
-            min_payment_rule=solver_rule, 
-            buckets=solver_buckets,
-            **acc_data
-        ))
-
-    # Convert the Budget schema to its dataclass
-    solver_budget = SolverBudget(**portfolio_schema.budget.model_dump())
-    
-    # Convert the UserPreferences schema to its dataclass
-    solver_prefs = SolverUserPreferences(**portfolio_schema.preferences.model_dump())
-
-    # Assemble the final SolverDebtPortfolio
-    return SolverDebtPortfolio(
-        accounts=solver_accounts,
-        budget=solver_budget,
-        preferences=solver_prefs,
-        plan_start_date=portfolio_schema.plan_start_date
+    return portfolio_from_schema(portfolio_schema)
+
+def format_plan_output(
+    solver_portfolio: SolverDebtPortfolio,
+    plan_results: List[SolverMonthlyResult],
+    format: schemas.PlanFormat
+) -> tuple[Optional[List[schemas.MonthlyResult]], Optional[schemas.ColumnarPlan]]:
+    """
+    Render solver rows as (rows, columnar); only the requested one is set.
+    Solver rows are already well-typed, so the response models are built
+    without re-validating every row.
+    """
+    if format == schemas.PlanFormat.COLUMNAR:
+        return None, schemas.ColumnarPlan.model_construct(**build_columnar_plan(solver_portfolio, plan_results))
+    return [schemas.MonthlyResult.model_construct(**result.__dict__) for result in plan_results], None
+
+def build_solve_telemetry(
+    solve_result: PlanSolveResult,
+    solver_portfolio: SolverDebtPortfolio
+) -> schemas.SolveTelemetry:
+    """Summarize a solve's status, bounds, effort and model size for the response."""
+    return schemas.SolveTelemetry(
+        solver_status=solve_result.status,
+        engine=f"fast-path:{solve_result.fast_path}" if solve_result.fast_path else solve_result.backend.value,
+        strategy=solver_portfolio.preferences.strategy.value,
+        objective_value=solve_result.objective_value,
+        best_bound=solve_result.best_bound,
+        relative_gap=solve_result.relative_gap,
+        wall_time_seconds=solve_result.wall_time_seconds,
+        user_time_seconds=solve_result.user_time_seconds,
+        num_branches=solve_result.num_branches,
+        num_conflicts=solve_result.num_conflicts,
+        num_solutions=solve_result.num_solutions,
+        time_to_first_solution_seconds=solve_result.first_solution_seconds,
+        num_variables=solve_result.num_variables,
+        num_constraints=solve_result.num_constraints,
+    )
+
+def build_plan_response(
+    solver_portfolio: SolverDebtPortfolio,
+    solve_result: PlanSolveResult,
+    format: schemas.PlanFormat,
+    alternatives: int
+) -> schemas.OptimizationPlanResponse:
+    """Turn a finished solve into the /generate-plan response."""
+    plan_results: Optional[List[SolverMonthlyResult]] = solve_result.results
+    telemetry = build_solve_telemetry(solve_result, solver_portfolio)
+
+    if solve_result.status == "LOWER_BOUND":
+        # LP relaxation only bounds the objective; there is no plan to return
+        return schemas.OptimizationPlanResponse(
+            status=solve_result.status,
+            message=f"LP relaxation lower bound on the objective: {solve_result.best_bound:,.2f}",
+            plan=None,
+            telemetry=telemetry
+        )
+    elif plan_results is not None:
+        # OPTIMAL, or FEASIBLE when the time limit or a cancel stopped the search early
+        solver_status = solve_result.status
+
+        print("Converting solver results back to Pydantic schemas...")
+        plan_output, columnar_output = format_plan_output(solver_portfolio, plan_results, format)
+        alternative_outputs = None
+        if alternatives > 0:
+            alternative_outputs = []
+            for alt in solve_result.alternatives:
+                alt_plan, alt_columnar = format_plan_output(solver_portfolio, alt.results, format)
+                alternative_outputs.append(schemas.AlternativePlan(
+                    objective_value=alt.objective_value,
+                    distance_from_best=alt.distance_from_best,
+                    total_interest_cents=sum(r.interest_charged_cents for r in alt.results),
+                    plan=alt_plan,
+                    plan_columnar=alt_columnar,
+                ))
+
+        print(f"Plan generated successfully. Status: {solver_status}")
+        return schemas.OptimizationPlanResponse(
+            status=solver_status, 
+            message="Optimization plan generated successfully.",
+            plan=plan_output,
+            plan_columnar=columnar_output,
+            approximation_error_cents=solve_result.approximation_error_cents,
+            alternatives=alternative_outputs,
+            telemetry=telemetry
+        )
+    else:
+        # INFEASIBLE, or UNKNOWN when the time limit expired before any solution
+        solver_status = solve_result.status
+        print(f"Solver failed to find a solution. Status: {solver_status}")
+        return schemas.OptimizationPlanResponse(
+            status=solver_status, 
+            message="Could not find a feasible payment plan within the given constraints and time limit.",
+            plan=None,
+            telemetry=telemetry
+        )
+
+def overloaded_http_error(error: SolverOverloaded) -> HTTPException:
+    """429/503 with a Retry-After header for a solve the runner did not admit."""
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after_seconds)},
     )
 
 # --- API Endpoint ---
 @app.post("/generate-plan", response_model=schemas.OptimizationPlanResponse)
-async def create_payment_plan(portfolio_input: schemas.DebtPortfolio):
+async def create_payment_plan(
+    request: Request,
+    portfolio_input: schemas.DebtPortfolio,
+    format: schemas.PlanFormat = Query(schemas.PlanFormat.ROWS, description="'rows' or 'columnar' plan output"),
+    alternatives: int = Query(0, ge=0, le=5, description="Number of diverse near-optimal alternative plans"),
+    solve_id: Optional[str] = Header(None, alias="X-Solve-Id", description="Client-chosen id for cancelling this solve")
+):
     """
     Receives debt portfolio details, generates an optimized payment plan,
     and returns the plan or an error status.
+    With format=columnar the plan is returned as per-lender arrays with totals,
+    which is much smaller and faster to serialize for long plans.
+    With alternatives=k, k distinct near-optimal plans are added (fewer if no more are found within tolerance).
+    The solve runs on the solver pool; it is cancelled if the client disconnects
+    or POST /generate-plan/{solve_id}/cancel is called (X-Solve-Id header).
     """
     print("Received request to /generate-plan")
     try:
@@ -113,43 +219,34 @@ async def create_payment_plan(portfolio_input: schemas.DebtPortfolio):
         print("Converting Pydantic schemas to solver dataclasses...")
         solver_portfolio = convert_schema_to_solver_portfolio(portfolio_input)
 
-        # 2. Call the solver engine
+        # 2. Call the solver engine (backend chosen from the user's preferences)
+        #    off the event loop, so other requests are served while it runs
         print("Calling solver engine...")
-        plan_results: Optional[List[SolverMonthlyResult]] = generate_payment_plan(
-            solver_portfolio
-        )
-        print("Solver finished.")
-
-
-        # 3. Process the results
-        if plan_results is not None:
-            solver_status = "OPTIMAL" 
-
-            # --- THIS IS THE FIX ---
-            # Convert solver's dataclass results back to Pydantic models
-            print("Converting solver results back to Pydantic schemas...")
-            plan_output = [
-                # Use .model_validate() and the dataclass's __dict__
-                schemas.MonthlyResult.model_validate(result.__dict__) 
-                for result in plan_results
-            ]
-            # --- END OF FIX ---
-            
-            print(f"Plan generated successfully. Status: {solver_status}")
-            return schemas.OptimizationPlanResponse(
-                status=solver_status, 
-                message="Optimization plan generated successfully.",
-                plan=plan_output
+        solve_id = solve_id or uuid.uuid4().hex
+        try:
+            solve_result: PlanSolveResult = await get_solver_runner().run(
+                solver_portfolio,
+                is_disconnected=request.is_disconnected,
+                solve_id=solve_id,
+                num_alternatives=alternatives,
             )
-        else:
-            solver_status = "INFEASIBLE" 
-            print("Solver failed to find a solution.")
+        except SolverOverloaded as e:
+            print(f"Solve not admitted: {e}")
+            raise overloaded_http_error(e)
+        except SolveCancelled:
+            print(f"Solve {solve_id} cancelled before a plan was found")
             return schemas.OptimizationPlanResponse(
-                status=solver_status, 
-                message="Could not find a feasible payment plan within the given constraints and time limit.",
+                status="CANCELLED",
+                message="The solve was cancelled before a payment plan was found.",
                 plan=None
             )
+        print(f"Solver finished. Backend: {solve_result.backend.value}")
+
+        # 3. Process the results
+        return build_plan_response(solver_portfolio, solve_result, format, alternatives)
 
+    except HTTPException:
+        raise
     except ValueError as ve:
         print(f"Input validation error: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -160,6 +257,146 @@ async def create_payment_plan(portfolio_input: schemas.DebtPortfolio):
         print(f"An unexpected error occurred: {e}", file=sys.stderr)
         raise HTTPException(status_code=500, detail="An internal server error occurred during plan generation.")
 
+@app.post("/generate-plan/{solve_id}/cancel")
+async def cancel_payment_plan(solve_id: str) -> Dict[str, Any]:
+    """
+    Cancel a queued or running /generate-plan solve by its X-Solve-Id.
+    The waiting request returns the best plan found so far, or CANCELLED.
+    """
+    if not get_solver_runner().cancel(solve_id):
+        raise HTTPException(status_code=404, detail=f"No queued or running solve with id '{solve_id}'")
+    return {"solve_id": solve_id, "cancelled": True}
+
+@app.get("/generate-plan/active")
+async def list_active_solves() -> Dict[str, Any]:
+    """Queued and running solves, oldest first."""
+    return {"solves": get_solver_runner().active_solves()}
+
+@app.post("/generate-plans/batch")
+async def create_payment_plans_batch(
+    request: Request,
+    format: schemas.PlanFormat = Query(schemas.PlanFormat.COLUMNAR, description="'rows' or 'columnar' plan output")
+):
+    """
+    Bulk re-planning (e.g. the nightly refresh). The body is NDJSON: one
+    portfolio in the /generate-plan format, or {"id": ..., "portfolio": {...}},
+    per line. Plans stream back as NDJSON records as they finish, followed by
+    a {"summary": {...}} record with throughput in plans/sec.
+    """
+    # Read the body before streaming: the streaming response listens for
+    # disconnects on the same receive channel the body arrives on
+    body = await request.body()
+
+    async def generate_records():
+        async for record in replan_batch(iterate_lines(body.decode().splitlines()), format=format):
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(generate_records(), media_type="application/x-ndjson")
+
+@app.get("/solver/metrics")
+async def get_solver_metrics() -> Dict[str, Any]:
+    """
+    Solver queue depth, utilization, queue-wait percentiles and admission
+    counters per lane, for sizing autoscaled instances.
+    """
+    return get_solver_runner().metrics()
+
+
+# --- Asynchronous Plan Jobs ---
+def build_plan_job_response(job: PlanJob) -> schemas.PlanJobResponse:
+    """Report a job's status, with its partial plan while running or its result once finished."""
+    status = job.status
+    response = schemas.PlanJobResponse(
+        job_id=job.job_id,
+        status=status.value,
+        created_at=datetime.fromtimestamp(job.created_at, tz=timezone.utc),
+        finished_at=datetime.fromtimestamp(job.finished_at, tz=timezone.utc) if job.finished_at else None,
+        error=job.error,
+    )
+    if status == PlanJobStatus.QUEUED and job.ticket is not None:
+        response.estimated_queue_seconds = get_solver_runner().estimate_queue_seconds(job.ticket.lane, job.job_id)
+    if status in (PlanJobStatus.QUEUED, PlanJobStatus.RUNNING):
+        progress = job.progress
+        unit_cents = progress.unit_cents
+        response.progress = schemas.PlanJobProgress(
+            num_solutions=progress.num_solutions,
+            elapsed_seconds=progress.elapsed_seconds,
+            objective_value=progress.objective_value * unit_cents if progress.objective_value is not None else None,
+            best_bound=progress.best_bound * unit_cents if progress.best_bound is not None else None,
+        )
+        partial = job.partial_plan()
+        if partial is not None:
+            response.partial_plan = [schemas.MonthlyResult.model_construct(**r.__dict__) for r in partial]
+    elif status == PlanJobStatus.SUCCEEDED:
+        response.result = build_plan_response(
+            job.portfolio, job.result, job.options["format"], job.options["alternatives"]
+        )
+    return response
+
+@app.post("/plan-jobs", response_model=schemas.PlanJobResponse, status_code=202)
+async def create_plan_job(
+    portfolio_input: schemas.DebtPortfolio,
+    response: Response,
+    format: schemas.PlanFormat = Query(schemas.PlanFormat.ROWS, description="'rows' or 'columnar' plan output"),
+    alternatives: int = Query(0, ge=0, le=5, description="Number of diverse near-optimal alternative plans"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description="Retries with the same key attach to the same job")
+):
+    """
+    Starts a /generate-plan solve in the background and returns its job id at once.
+    Poll GET /plan-jobs/{job_id} for progress, the best plan so far and the result.
+    A retry with the same Idempotency-Key returns the existing job (200) instead of starting a new solve.
+    """
+    print("Received request to /plan-jobs")
+    try:
+        solver_portfolio = convert_schema_to_solver_portfolio(portfolio_input)
+    except ValueError as ve:
+        print(f"Input validation error: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    fingerprint = request_fingerprint(portfolio_input.model_dump_json(), format.value, str(alternatives))
+    try:
+        job, created = get_plan_job_store().submit(
+            solver_portfolio,
+            fingerprint,
+            idempotency_key=idempotency_key,
+            options={"format": format, "alternatives": alternatives},
+            num_alternatives=alternatives,
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except PlanJobStoreFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except SolverOverloaded as e:
+        print(f"Plan job not admitted: {e}")
+        raise overloaded_http_error(e)
+
+    if not created:
+        response.status_code = 200
+    return build_plan_job_response(job)
+
+@app.get("/plan-jobs/{job_id}", response_model=schemas.PlanJobResponse)
+async def get_plan_job(
+    job_id: str,
+    wait_seconds: float = Query(0, ge=0, le=30, description="Wait up to this long for the job to finish before answering")
+):
+    """Status of a plan job; with wait_seconds, long-polls until the job finishes or the wait ends."""
+    job = get_plan_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Plan job '{job_id}' not found or expired")
+
+    deadline = time.monotonic() + wait_seconds
+    while job.finished_at is None and time.monotonic() < deadline:
+        await asyncio.sleep(0.25)
+    return build_plan_job_response(job)
+
+@app.post("/plan-jobs/{job_id}/cancel", response_model=schemas.PlanJobResponse)
+async def cancel_plan_job(job_id: str):
+    """Cancel a queued or running plan job; the best plan found so far is kept as its result."""
+    job = get_plan_job_store().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Plan job '{job_id}' not found or expired")
+    return build_plan_job_response(job)
+
 
 # --- Transaction Enrichment Endpoint ---
 class EnrichmentRequest(schemas.BaseModel):
@@ -180,6 +417,14 @@ class EnrichmentResponse(schemas.BaseModel):
     message: Optional[str] = None
 
 
+@app.get("/ntropy/metrics")
+async def get_ntropy_metrics() -> Dict[str, Any]:
+    """
+    Ntropy rate limiter state: concurrency and credit utilization, queued
+    calls, queue-wait percentiles and 429s, shared by every enrichment request.
+    """
+    return get_ntropy_limiter().metrics()
+
 @app.post("/enrich-transactions", response_model=EnrichmentResponse)
 async def enrich_transactions(request: EnrichmentRequest):
     """
@@ -218,6 +463,31 @@ async def enrich_transactions(request: EnrichmentRequest):
         raise HTTPException(status_code=500, detail=f"Enrichment failed: {str(e)}")
 
 
+@app.get("/budget-analysis")
+async def get_budget_analysis(
+    user_id: str = Query(..., description="User whose bank connection was enriched"),
+    truelayer_item_id: str = Query(..., description="TrueLayer item ID of the bank connection"),
+    horizon_months: int = Query(3, ge=1, le=120, description="Complete months averaged"),
+    as_of: Optional[str] = Query(None, description="Reference date (YYYY-MM-DD); its month is treated as partial"),
+    rolling_window_months: int = Query(3, ge=1, le=24),
+    merchant_limit: int = Query(10, ge=0, le=100)
+) -> Dict[str, Any]:
+    """
+    Budget analysis of the last enrichment of a bank connection, for any
+    horizon or reference date: breakdown, monthly totals, rolling averages,
+    trend and top merchants, served from the stored monthly cube without
+    re-enriching.
+    """
+    cube = get_budget_cube_store().get(hash_account_holder_id(user_id, truelayer_item_id))
+    if cube is None:
+        raise HTTPException(status_code=404, detail="No enrichment found for this bank connection; enrich its transactions first")
+    try:
+        reference = datetime.strptime(as_of, "%Y-%m-%d").date() if as_of else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid as_of date '{as_of}', expected YYYY-MM-DD")
+    return cube.analysis(horizon_months, reference, rolling_window_months, merchant_limit)
+
+
 # --- Streaming Enrichment Endpoint ---
 class StreamingEnrichmentRequest(schemas.BaseModel):
     """Request for streaming transaction enrichment"""
@@ -252,7 +522,8 @@ async def enrich_transactions_streaming(request: StreamingEnrichmentRequest):
                 truelayer_item_id=request.truelayer_item_id,
                 account_holder_name=request.account_holder_name,
                 country=request.country,
-                nylas_grant_id=request.nylas_grant_id
+                nylas_grant_id=request.nylas_grant_id,
+                analysis_horizon_months=request.analysis_months
             ):
                 yield f"data: {json.dumps(event)}\n\n"
         except Exception as e:
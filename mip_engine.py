@@ -0,0 +1,319 @@
+# mip_engine.py - MIP formulation of the repayment model
+# Solves the same constraints as solver_engine's CP-SAT model with pywraplp:
+# - SCIP for the exact mixed-integer model
+# - GLOP for the LP relaxation (an instant lower bound on the objective)
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ortools.linear_solver import pywraplp
+
+from solver_engine import (
+    DebtPortfolio,
+    OptimizationStrategy,
+    PaymentShape,
+    PlanArrays,
+    PlanSolveResult,
+    PortfolioTimeline,
+    SolverBackend,
+    PLAN_HORIZON_MONTHS,
+    SOLVER_TIME_LIMIT_SECONDS,
+    build_portfolio_timeline,
+    calculate_model_domains,
+    validate_strategy_requirements,
+    collect_monthly_results,
+    print_plan_summary,
+    print_no_solution,
+    start_search_watchdog,
+)
+
+
+# pywraplp result codes mapped onto the CP-SAT status names used everywhere else
+_STATUS_NAMES = {
+    pywraplp.Solver.OPTIMAL: "OPTIMAL",
+    pywraplp.Solver.FEASIBLE: "FEASIBLE",
+    pywraplp.Solver.INFEASIBLE: "INFEASIBLE",
+    pywraplp.Solver.UNBOUNDED: "MODEL_INVALID",
+    pywraplp.Solver.ABNORMAL: "UNKNOWN",
+    pywraplp.Solver.MODEL_INVALID: "MODEL_INVALID",
+    pywraplp.Solver.NOT_SOLVED: "UNKNOWN",
+}
+
+
+def solve_with_mip(
+    portfolio: DebtPortfolio,
+    relax: bool = False,
+    round_up_divisions: bool = False,
+    time_limit_seconds: float = SOLVER_TIME_LIMIT_SECONDS,
+    cancel_event: Optional[threading.Event] = None,
+    timeline: Optional[PortfolioTimeline] = None
+) -> PlanSolveResult:
+    """
+    Builds and solves the repayment model as a MIP.
+
+    The CP-SAT model's non-linear constraints are linearized:
+    - floor divisions (interest, min-pay percentage) become two-sided bounds
+    - payment >= min(max(fixed, percentage), owed) uses one binary per account-month
+    - the linear payment shape uses an 'active' binary with big-M gating
+
+    With relax=True every variable is continuous and GLOP returns the LP
+    relaxation's optimum, which is a lower bound on the MIP objective.
+    With round_up_divisions=True the floor divisions become ceilings
+    (used by scaled-precision solves).
+    Setting cancel_event interrupts the solve as soon as possible.
+    Budgets, APRs and promo ends come from the timeline (built here if not given).
+    """
+    build_start = time.perf_counter()
+    backend = SolverBackend.LP_RELAXATION if relax else SolverBackend.MIP
+    solver = pywraplp.Solver.CreateSolver("GLOP" if relax else "SCIP")
+    if solver is None:
+        raise NotImplementedError(f"Solver backend '{backend.value}' is not available in this OR-Tools build.")
+
+    print(f"MIP model canvas created ({backend.value}).")
+
+    max_months: int = PLAN_HORIZON_MONTHS
+    domains = calculate_model_domains(portfolio, round_up_divisions)
+    big_m = domains.max_total_owed
+
+    def new_int(lb: int, ub: int, name: str):
+        return solver.NumVar(lb, ub, name) if relax else solver.IntVar(lb, ub, name)
+
+    def new_bool(name: str):
+        return solver.NumVar(0, 1, name) if relax else solver.BoolVar(name)
+
+    def add_division(quotient, numerator, divisor: int):
+        """quotient == floor(numerator / divisor), or the ceiling when rounding up."""
+        if round_up_divisions:
+            solver.Add(divisor * quotient >= numerator)
+            solver.Add(divisor * quotient - numerator <= divisor - 1)
+        else:
+            solver.Add(divisor * quotient <= numerator)
+            solver.Add(numerator - divisor * quotient <= divisor - 1)
+
+    payments: Dict[Tuple[str, int], pywraplp.Variable] = {}
+    balances: Dict[Tuple[str, int], pywraplp.Variable] = {}
+    interest_charged: Dict[Tuple[str, int], pywraplp.Variable] = {}
+
+    for account in portfolio.accounts:
+        for month in range(max_months):
+            key = (account.lender_name, month)
+            payments[key] = new_int(0, domains.max_possible_balance, f'payment_{key}')
+            balances[key] = new_int(0, domains.max_possible_balance, f'balance_{key}')
+            interest_charged[key] = new_int(0, domains.max_interest, f'interest_{key}')
+
+    if timeline is None:
+        timeline = build_portfolio_timeline(portfolio, max_months)
+    promo_end_month_map = timeline.promo_end_months
+    validate_strategy_requirements(portfolio, promo_end_month_map)
+
+    # 1. Budget constraint
+    if portfolio.preferences.strategy != OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS:
+        monthly_budgets = timeline.monthly_budgets
+        for month in range(max_months):
+            solver.Add(
+                solver.Sum([payments[(acc.lender_name, month)] for acc in portfolio.accounts])
+                <= monthly_budgets[month]
+            )
+
+    # 2. Balance update, interest and minimum payments
+    # Per-segment balances of accounts whose buckets have different APR schedules
+    segment_balances: Dict[Tuple[str, int, int], pywraplp.Variable] = {}
+    for account in portfolio.accounts:
+        rule = account.min_payment_rule
+        segments = timeline.segments[account.lender_name]
+
+        for month in range(max_months):
+            key = (account.lender_name, month)
+            # Month 0 starts from a constant; later months chain off the previous balance.
+            previous_balance = account.current_balance_cents if month == 0 else balances[(account.lender_name, month - 1)]
+            interest = interest_charged[key]
+
+            # 2.a. Interest: interest == floor(previous_balance * apr / 120000) per
+            # balance segment (APR 0 during a segment's promo); segments whose
+            # remaining schedules match are pooled into one
+            active_segments = timeline.active_segments(account.lender_name, month)
+            if len(active_segments) == 1:
+                segment_previous = {active_segments[0]: previous_balance}
+                segment_interest = {active_segments[0]: interest}
+            else:
+                segment_previous = {
+                    s: segments[s].balance_cents if month == 0 else solver.Sum([
+                        segment_balances[(account.lender_name, t, month - 1)]
+                        for t in timeline.pooled_from(account.lender_name, month, s)
+                    ])
+                    for s in active_segments
+                }
+                segment_interest = {
+                    s: new_int(0, domains.max_interest, f'interest_{key}_{s}') for s in active_segments
+                }
+                solver.Add(interest == solver.Sum(list(segment_interest.values())))
+            for s in active_segments:
+                apr_bps_for_month = segments[s].apr_bps[month]
+                if apr_bps_for_month == 0:
+                    solver.Add(segment_interest[s] == 0)
+                else:
+                    add_division(segment_interest[s], segment_previous[s] * apr_bps_for_month, 120000)
+
+            total_owed = previous_balance + interest
+
+            # 2.b. Minimum payment: payment >= min(max(fixed, percentage), total_owed)
+            # pays_in_full == 1 relaxes the max(fixed, percentage) bound and instead
+            # requires the whole amount owed to be paid.
+            pays_in_full = new_bool(f'pays_in_full_{key}')
+            if rule.fixed_cents > 0:
+                solver.Add(payments[key] >= rule.fixed_cents - big_m * pays_in_full)
+            if rule.percentage_bps > 0:
+                percentage_component = new_int(0, domains.max_percentage_comp, f'min_pay_perc_{key}')
+                base_for_percentage = previous_balance + interest if rule.includes_interest else previous_balance
+                add_division(percentage_component, base_for_percentage * rule.percentage_bps, 10000)
+                solver.Add(payments[key] >= percentage_component - big_m * pays_in_full)
+            solver.Add(payments[key] >= total_owed - big_m * (1 - pays_in_full))
+
+            # 2.c. No overpayment, then the balance update
+            solver.Add(payments[key] <= total_owed)
+            solver.Add(balances[key] == total_owed - payments[key])
+
+            # 2.d. Payment allocation across segments (highest APR first):
+            # segment_payment == min(segment_owed, remaining payment), with
+            # clears_segment == 1 when the segment is paid off in full.
+            if len(active_segments) > 1:
+                remaining_payment = payments[key]
+                order = timeline.payment_order(account.lender_name, month)
+                for position, s in enumerate(order):
+                    segment_owed = segment_previous[s] + segment_interest[s]
+                    segment_payment = new_int(0, domains.max_possible_balance, f'payment_{key}_{s}')
+                    if position == len(order) - 1:
+                        solver.Add(segment_payment == remaining_payment)
+                    else:
+                        clears_segment = new_bool(f'clears_segment_{key}_{s}')
+                        solver.Add(segment_payment <= segment_owed)
+                        solver.Add(segment_payment <= remaining_payment)
+                        solver.Add(segment_payment >= segment_owed - big_m * (1 - clears_segment))
+                        solver.Add(segment_payment >= remaining_payment - big_m * clears_segment)
+                    segment_balance = new_int(0, domains.max_possible_balance, f'balance_{key}_{s}')
+                    solver.Add(segment_balance == segment_owed - segment_payment)
+                    segment_balances[(account.lender_name, s, month)] = segment_balance
+                    remaining_payment = remaining_payment - segment_payment
+
+    # 3. Payoff constraint
+    for account in portfolio.accounts:
+        solver.Add(balances[(account.lender_name, max_months - 1)] <= 0)
+
+    # 4. Strategy-specific constraints
+    if portfolio.preferences.strategy == OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS:
+        for account in portfolio.accounts:
+            promo_end_idx = promo_end_month_map[account.lender_name]
+            solver.Add(balances[(account.lender_name, promo_end_idx)] <= 0)
+
+    # 5. Linear payment shape: payment[m] == payment[m+1] while active in month m+1
+    if portfolio.preferences.payment_shape == PaymentShape.LINEAR_PER_ACCOUNT or \
+       portfolio.preferences.strategy == OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS:
+        for account in portfolio.accounts:
+            for month in range(max_months - 1):
+                key = (account.lender_name, month)
+                next_key = (account.lender_name, month + 1)
+                # is_active(m+1) <=> balance at the end of month m > 0
+                is_active_next = new_bool(f'is_active_{next_key}')
+                solver.Add(balances[key] <= domains.max_possible_balance * is_active_next)
+                solver.Add(balances[key] >= is_active_next)
+                solver.Add(payments[key] - payments[next_key] <= big_m * (1 - is_active_next))
+                solver.Add(payments[next_key] - payments[key] <= big_m * (1 - is_active_next))
+
+    # 6. Objective (identical weights to the CP-SAT model)
+    strategy = portfolio.preferences.strategy
+    total_interest_cost = solver.Sum(list(interest_charged.values()))
+
+    if strategy == OptimizationStrategy.MINIMIZE_TOTAL_INTEREST:
+        solver.Minimize(100 * total_interest_cost + solver.Sum(list(balances.values())))
+    elif strategy == OptimizationStrategy.TARGET_MAX_BUDGET:
+        solver.Minimize(10 * solver.Sum(list(balances.values())) + total_interest_cost)
+    elif strategy == OptimizationStrategy.PAY_OFF_IN_PROMO:
+        promo_penalties: List[pywraplp.Variable] = [
+            balances[(acc.lender_name, promo_end_month_map[acc.lender_name])]
+            for acc in portfolio.accounts
+            if promo_end_month_map[acc.lender_name] > -1
+        ]
+        solver.Minimize(total_interest_cost + solver.Sum(promo_penalties))
+    elif strategy == OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS:
+        max_promo_end_idx = max(promo_end_month_map.values())
+        max_total_monthly_payment = new_int(0, domains.max_possible_cents, 'max_total_monthly_payment')
+        for month in range(max_promo_end_idx + 1):
+            solver.Add(
+                solver.Sum([payments[(acc.lender_name, month)] for acc in portfolio.accounts])
+                <= max_total_monthly_payment
+            )
+        solver.Minimize(max_total_monthly_payment)
+    elif strategy == OptimizationStrategy.MINIMIZE_MONTHLY_SPEND:
+        solver.Minimize(solver.Sum(list(payments.values())))
+    else:
+        raise NotImplementedError(f"Strategy '{strategy.value}' is not yet implemented in the solver.")
+
+    print(f"MIP model built: {solver.NumVariables()} variables, {solver.NumConstraints()} constraints.")
+    print(f"\n--- Solving the Model ({backend.value}) ---")
+
+    build_seconds = time.perf_counter() - build_start
+    solver.SetTimeLimit(int(time_limit_seconds * 1000))
+    watchdog_done, stop_reason = None, [None]
+    if cancel_event is not None:
+        watchdog_done, stop_reason = start_search_watchdog(solver.InterruptSolve, cancel_event)
+    status = solver.Solve()
+    if watchdog_done is not None:
+        watchdog_done.set()
+    status_name = _STATUS_NAMES.get(status, "UNKNOWN")
+    has_solution = status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+    # pywraplp reports neither conflicts nor solution times; branches are B&B nodes
+    telemetry = dict(
+        wall_time_seconds=solver.WallTime() / 1000.0,
+        build_seconds=build_seconds,
+        num_branches=None if relax else solver.nodes(),
+        num_solutions=1 if has_solution else 0,
+        num_variables=solver.NumVariables(),
+        num_constraints=solver.NumConstraints(),
+        cancelled=stop_reason[0] == "cancelled",
+    )
+
+    if not has_solution:
+        print_no_solution(status_name)
+        return PlanSolveResult(status=status_name, backend=backend, **telemetry)
+
+    objective_value = solver.Objective().Value()
+
+    if relax:
+        # Fractional LP values are not a valid plan; only the bound is meaningful.
+        print(f"\n✅ LP relaxation lower bound: {objective_value:,.2f}")
+        return PlanSolveResult(
+            status="LOWER_BOUND",
+            backend=backend,
+            objective_value=None,
+            best_bound=objective_value,
+            **telemetry,
+        )
+
+    print(f"\n✅ Solution Found! Status: {status_name}")
+
+    def values_of(variables: Dict[Tuple[str, int], pywraplp.Variable]) -> List[List[int]]:
+        return [
+            [int(round(variables[(acc.lender_name, month)].solution_value())) for month in range(max_months)]
+            for acc in portfolio.accounts
+        ]
+
+    plan_arrays = PlanArrays(
+        payments=values_of(payments),
+        interest=values_of(interest_charged),
+        balances=values_of(balances),
+    )
+    results_list = collect_monthly_results(portfolio, plan_arrays)
+    print_plan_summary(portfolio, results_list)
+
+    best_bound = solver.Objective().BestBound()
+    return PlanSolveResult(
+        status=status_name,
+        backend=backend,
+        results=results_list,
+        objective_value=objective_value,
+        best_bound=best_bound,
+        # Only the final incumbent is visible through pywraplp
+        gap_curve=[(telemetry["wall_time_seconds"], objective_value, best_bound)],
+        **telemetry,
+    )
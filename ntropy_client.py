@@ -0,0 +1,158 @@
+# ntropy_client.py - Async-native Ntropy API client
+# The Ntropy SDK is blocking, so the enrichment service used to wrap it in a
+# 10-thread pool shared by every request: threads sat pinned on I/O and
+# requests competed for them in no particular order. This client talks to
+# the Ntropy v3 API directly over one pooled httpx.AsyncClient per event loop
+# (keep-alive, HTTP/2 when the h2 package is installed, per-request timeouts).
+# Every call goes through the process-wide Ntropy rate limiter.
+
+import asyncio
+import importlib.util
+import os
+import random
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from ntropy_limiter import CREDITS_PER_CALL, NtropyRateLimiter, get_ntropy_limiter
+
+NTROPY_API_URL = os.environ.get("NTROPY_API_URL", "https://api.ntropy.com")
+
+# HTTP/2 needs the optional h2 package; fall back to pooled HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+NTROPY_MAX_CONNECTIONS = 20
+NTROPY_KEEPALIVE_SECONDS = 30.0
+
+# Default per-request timeouts; any call can override the total
+NTROPY_CONNECT_TIMEOUT_SECONDS = 5.0
+NTROPY_REQUEST_TIMEOUT_SECONDS = 30.0
+
+# Rate-limited (429) calls are retried after the server's Retry-After, with
+# exponential backoff (plus jitter) when it asks for less
+NTROPY_MAX_RETRIES = 5
+NTROPY_RETRY_BACKOFF_SECONDS = 0.5
+
+
+class NtropyAPIError(Exception):
+    """An Ntropy API call returned an error status."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Ntropy API error {status_code}: {message}")
+        self.status_code = status_code
+
+
+class NtropyAsyncClient:
+    """
+    Minimal async client for the Ntropy v3 endpoints the enrichment service
+    uses. Responses are returned as plain dicts, in the same shape as the
+    SDK models' model_dump().
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = NTROPY_API_URL,
+        limiter: Optional[NtropyRateLimiter] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"X-API-Key": api_key, "Content-Type": "application/json"},
+            http2=HTTP2_AVAILABLE and transport is None,
+            limits=httpx.Limits(
+                max_connections=NTROPY_MAX_CONNECTIONS,
+                max_keepalive_connections=NTROPY_MAX_CONNECTIONS,
+                keepalive_expiry=NTROPY_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(NTROPY_REQUEST_TIMEOUT_SECONDS, connect=NTROPY_CONNECT_TIMEOUT_SECONDS),
+            transport=transport,
+        )
+        self._limiter = limiter or get_ntropy_limiter()
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        json: Optional[Any] = None,
+        timeout: Optional[float] = None,
+        credits: float = CREDITS_PER_CALL
+    ) -> Any:
+        for attempt in range(NTROPY_MAX_RETRIES + 1):
+            async with self._limiter.slot(credits):
+                response = await self._client.request(
+                    method, url, json=json,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+            if response.status_code == 429 and attempt < NTROPY_MAX_RETRIES:
+                try:
+                    retry_after = max(float(response.headers.get("retry-after", "1")), 0.0)
+                except ValueError:
+                    retry_after = 1.0
+                # Hold every caller in the process, then back off without a slot
+                self._limiter.penalize(retry_after)
+                backoff = NTROPY_RETRY_BACKOFF_SECONDS * 2 ** attempt
+                await asyncio.sleep(max(retry_after, backoff * random.uniform(0.5, 1.0)))
+                continue
+            if response.is_error:
+                raise NtropyAPIError(response.status_code, response.text[:200])
+            return response.json()
+        raise NtropyAPIError(429, "rate limited")  # unreachable: the last attempt returns or raises
+
+    async def create_account_holder(
+        self,
+        account_holder_id: str,
+        name: Optional[str] = None,
+        holder_type: str = "consumer"
+    ) -> bool:
+        """Create an account holder; returns False if it already existed."""
+        try:
+            await self._request("POST", "/v3/account_holders", json={
+                "id": account_holder_id, "type": holder_type, "name": name,
+            })
+        except NtropyAPIError as e:
+            if e.status_code == 409:
+                return False
+            raise
+        return True
+
+    async def enrich_transaction(self, transaction: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Enrich one transaction (a TransactionInput payload)."""
+        return await self._request("POST", "/v3/transactions", json=transaction, timeout=timeout)
+
+    async def create_batch(self, transactions: List[Dict[str, Any]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Submit transactions for batch enrichment; returns the batch (id, status, progress, total)."""
+        return await self._request("POST", "/v3/batches", json={
+            "operation": "POST /v3/transactions", "priority": "default", "data": transactions,
+        }, timeout=timeout, credits=CREDITS_PER_CALL * max(len(transactions), 1))
+
+    async def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/v3/batches/{batch_id}")
+
+    async def batch_results(self, batch_id: str, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Enriched transactions of a completed batch."""
+        return (await self._request("GET", f"/v3/batches/{batch_id}/results", timeout=timeout))["results"]
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+# One client (and connection pool) per event loop and API key: pooled
+# connections and the semaphore cannot be shared across loops
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, NtropyAsyncClient]]" = weakref.WeakKeyDictionary()
+
+
+def get_ntropy_client(api_key: str) -> NtropyAsyncClient:
+    """The shared client for the running event loop."""
+    loop_clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if api_key not in loop_clients:
+        loop_clients[api_key] = NtropyAsyncClient(api_key)
+    return loop_clients[api_key]
+
+
+async def close_ntropy_clients() -> None:
+    """Close the running loop's clients (e.g. on application shutdown)."""
+    loop_clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in loop_clients.values():
+        await client.aclose()
@@ -0,0 +1,84 @@
+# ntropy_fakes.py - In-memory stand-in for the Ntropy SDK, shared by the tests
+# Batches finish after two polls and single calls answer at once, so enrichment
+# runs end to end without an API key or network access.
+
+import contextlib
+import io
+from types import SimpleNamespace
+
+from enrichment_cache import EnrichmentCache
+from enrichment_service import EnrichmentService
+from enrichment_store import EnrichmentResultStore
+
+class Enriched:
+    """One enriched transaction, as the SDK returns it: the counterparty is the title-cased description"""
+
+    def __init__(self, transaction_id, description, periodicity=None):
+        self.id = transaction_id
+        self.description = description
+        self.periodicity = periodicity
+
+    def model_dump(self):
+        return {
+            "id": self.id,
+            "entities": {"counterparty": {"name": self.description.title(), "logo": None, "website": None}},
+            "categories": {"general": "groceries"},
+            "recurrence": "recurring" if self.periodicity else "one off",
+            "recurrence_group": {"periodicity": self.periodicity} if self.periodicity else None,
+        }
+
+
+class FakeSDK:
+    """Batches finish after two polls; one batch errors and one result goes missing."""
+
+    def __init__(self, failing_batch=None, missing_id=None):
+        self.batches = self
+        self.transactions = SimpleNamespace(create=self._create_single)
+        self.account_holders = SimpleNamespace(create=lambda **kwargs: None)
+        self.submitted, self.single_calls, self.polls = {}, [], {}
+        self.failing_batch, self.missing_id = failing_batch, missing_id
+
+    def create(self, operation, data):
+        assert operation == "POST /v3/transactions"
+        batch_id = f"batch-{len(self.submitted)}"
+        self.submitted[batch_id] = data
+        self.polls[batch_id] = 0
+        return SimpleNamespace(id=batch_id)
+
+    def get(self, id):
+        self.polls[id] += 1
+        status = "processing" if self.polls[id] < 2 else ("error" if id == self.failing_batch else "completed")
+        return SimpleNamespace(
+            total=len(self.submitted[id]), progress=len(self.submitted[id]) // 2,
+            is_completed=lambda: status == "completed", is_error=lambda: status == "error",
+        )
+
+    def results(self, id):
+        return SimpleNamespace(results=[
+            Enriched(tx["id"], tx["description"]) for tx in self.submitted[id] if tx["id"] != self.missing_id
+        ])
+
+    def _create_single(self, **kwargs):
+        self.single_calls.append(kwargs["id"])
+        return Enriched(kwargs["id"], kwargs["description"])
+
+
+def raw_transactions(count):
+    """A history of distinct debits, tx-0 .. tx-{count - 1}, in the shape the API receives"""
+    return [
+        {"transaction_id": f"tx-{i}", "description": f"shop {i}", "amount": -(10 + i),
+         "transaction_type": "DEBIT", "timestamp": f"2025-01-{1 + i % 28:02d}T10:00:00Z"}
+        for i in range(count)
+    ]
+
+
+def fake_service(sdk, cache=None, result_store=None):
+    """An EnrichmentService on the given fake SDK, with in-memory cache and result store by default"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = EnrichmentService(
+            api_key="",
+            cache=cache or EnrichmentCache(path=":memory:"),
+            result_store=result_store or EnrichmentResultStore(path=":memory:"),
+        )
+    service.sdk = sdk
+    return service
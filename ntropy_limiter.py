@@ -0,0 +1,226 @@
+# ntropy_limiter.py - Process-wide rate limiter for Ntropy API calls
+# Ntropy allows 10 concurrent operations and refills 500 credits per second.
+# Every Ntropy call in the process (async client or SDK threads, any event
+# loop) takes a concurrency slot and its credits from one token bucket here,
+# so simultaneous onboardings share the limits instead of each assuming it
+# has them all and tripping 429s. Waiting calls are queued per request key
+# (the account holder) and granted round-robin across keys, so one large
+# history cannot starve a small one queued behind it.
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional, Tuple
+
+# Ntropy rate limits: max 10 concurrent enrichment operations, 500 credits/sec refill
+# Source: https://docs.ntropy.com/api/rate-limits
+NTROPY_MAX_CONCURRENCY = 10
+NTROPY_CREDITS_PER_SECOND = 500.0
+# Credits that can be spent at once after an idle period
+NTROPY_BURST_CREDITS = 500.0
+
+# Credits charged per call; batch submissions are charged per transaction
+CREDITS_PER_CALL = 1.0
+
+# A waiting call re-checks the bucket at least this often
+_MAX_WAIT_SLICE_SECONDS = 0.25
+
+# Recent queue waits kept for the wait-time percentiles
+WAIT_SAMPLE_SIZE = 200
+# Window over which credit utilization is measured
+UTILIZATION_WINDOW_SECONDS = 10.0
+
+DEFAULT_REQUEST_KEY = "default"
+
+_request_key: ContextVar[str] = ContextVar("ntropy_request_key", default=DEFAULT_REQUEST_KEY)
+
+
+@contextmanager
+def ntropy_request_scope(key: str) -> Iterator[None]:
+    """Queue Ntropy calls made in this context (and tasks it starts) under key."""
+    token = _request_key.set(key)
+    try:
+        yield
+    finally:
+        _request_key.reset(token)
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "credits", "enqueued_at", "granted")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, credits: float):
+        self.loop = loop
+        self.future: asyncio.Future = loop.create_future()
+        self.credits = credits
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class NtropyRateLimiter:
+    """
+    Token bucket for credits plus a cap on in-flight calls. Thread-safe and
+    usable from any event loop; waiters are woken on their own loop.
+    """
+
+    def __init__(
+        self,
+        credits_per_second: float = NTROPY_CREDITS_PER_SECOND,
+        burst_credits: float = NTROPY_BURST_CREDITS,
+        max_concurrency: int = NTROPY_MAX_CONCURRENCY
+    ):
+        self.credits_per_second = credits_per_second
+        self.burst_credits = burst_credits
+        self.max_concurrency = max_concurrency
+
+        self._lock = threading.Lock()
+        self._credits = burst_credits
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+
+        self.granted = 0
+        self.credits_spent = 0.0
+        self.rate_limited = 0
+        self._waits: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self._recent_spend: Deque[Tuple[float, float]] = deque()
+
+    def _refill_locked(self, now: float) -> None:
+        self._credits = min(self.burst_credits, self._credits + (now - self._refilled_at) * self.credits_per_second)
+        self._refilled_at = now
+
+    def _dispatch_locked(self) -> Optional[float]:
+        """
+        Grant queued calls, taking keys in round-robin order. Returns how long
+        until the next queued call could be granted on credits, or None if it
+        is waiting for a slot (or nothing is queued).
+        """
+        now = time.monotonic()
+        self._refill_locked(now)
+        while self._queues and self._in_flight < self.max_concurrency:
+            if now < self._paused_until:
+                return self._paused_until - now
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            # A call costing more than the bucket holds goes once it is full
+            # and leaves the bucket in debt
+            needed = min(waiter.credits, self.burst_credits)
+            if self._credits < needed:
+                return (needed - self._credits) / self.credits_per_second
+
+            queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self._credits -= waiter.credits
+            self._in_flight += 1
+            waiter.granted = True
+
+            self.granted += 1
+            self.credits_spent += waiter.credits
+            self._waits.append(now - waiter.enqueued_at)
+            self._recent_spend.append((now, waiter.credits))
+            waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+        return None
+
+    def _release_locked(self) -> None:
+        self._in_flight -= 1
+        self._dispatch_locked()
+
+    async def acquire(self, credits: float = CREDITS_PER_CALL, key: Optional[str] = None) -> None:
+        """Wait for a slot and the credits; queued under key (default: the current request scope)."""
+        waiter = _Waiter(asyncio.get_running_loop(), credits)
+        key = key if key is not None else _request_key.get()
+        with self._lock:
+            self._queues.setdefault(key, deque()).append(waiter)
+            delay = self._dispatch_locked()
+
+        try:
+            while not waiter.future.done():
+                timeout = min(delay, _MAX_WAIT_SLICE_SECONDS) if delay is not None else _MAX_WAIT_SLICE_SECONDS
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), timeout=timeout)
+                except asyncio.TimeoutError:
+                    with self._lock:
+                        delay = self._dispatch_locked()
+        except BaseException:
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked()
+                else:
+                    queue = self._queues.get(key)
+                    if queue is not None:
+                        queue.remove(waiter)
+                        if not queue:
+                            del self._queues[key]
+            raise
+
+    def release(self) -> None:
+        """Free the slot taken by acquire()."""
+        with self._lock:
+            self._release_locked()
+
+    @asynccontextmanager
+    async def slot(self, credits: float = CREDITS_PER_CALL, key: Optional[str] = None) -> AsyncIterator[None]:
+        await self.acquire(credits, key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def penalize(self, retry_after: float) -> None:
+        """Ntropy answered 429: hold every queued call for retry_after and empty the bucket."""
+        with self._lock:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self._credits = min(self._credits, 0.0)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Slot and credit utilization, queue depth, queue-wait percentiles and 429 count."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill_locked(now)
+            while self._recent_spend and self._recent_spend[0][0] < now - UTILIZATION_WINDOW_SECONDS:
+                self._recent_spend.popleft()
+            recent_credits = sum(credits for _, credits in self._recent_spend)
+            waits = sorted(self._waits)
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "concurrency_utilization": round(self._in_flight / self.max_concurrency, 3),
+                "credits_per_second": self.credits_per_second,
+                "credits_available": round(self._credits, 1),
+                "credit_utilization": round(
+                    recent_credits / (self.credits_per_second * UTILIZATION_WINDOW_SECONDS), 3
+                ),
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "queued_requests": len(self._queues),
+                "paused_seconds": round(max(0.0, self._paused_until - now), 3),
+                "queue_wait_p50_seconds": round(waits[len(waits) // 2], 3) if waits else None,
+                "queue_wait_p95_seconds": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else None,
+                "granted": self.granted,
+                "credits_spent": round(self.credits_spent, 1),
+                "rate_limited": self.rate_limited,
+            }
+
+
+_shared_limiter: Optional[NtropyRateLimiter] = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_ntropy_limiter() -> NtropyRateLimiter:
+    """The process-wide limiter every Ntropy call goes through."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = NtropyRateLimiter()
+        return _shared_limiter
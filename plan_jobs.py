@@ -0,0 +1,220 @@
+"""
+Plan Jobs
+
+Asynchronous payment-plan solves: a job is created and returned at once,
+and its status, the best plan found so far and the final result are polled.
+
+Key features:
+- Jobs run on the shared solver runner, so they can be cancelled like any solve
+- Idempotency keys: a retried submission attaches to the existing job
+  instead of starting a second solve
+- Bounded retention: finished jobs expire after a TTL, and the oldest
+  finished jobs are evicted once the store is full
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from schemas import PlanJobStatus
+from solver_engine import (
+    DebtPortfolio,
+    MonthlyResult,
+    PlanSolveResult,
+    PortfolioTimeline,
+    SolveProgress,
+    build_portfolio_timeline,
+    collect_monthly_results,
+)
+from solver_runner import SolveState, SolveTicket, SolverOverloaded, get_solver_runner
+
+# How long finished jobs (and their idempotency keys) are kept
+PLAN_JOB_TTL_SECONDS = float(os.environ.get("PLAN_JOB_TTL_SECONDS", "3600"))
+
+# Most jobs kept at once, finished or not
+MAX_RETAINED_JOBS = int(os.environ.get("MAX_RETAINED_PLAN_JOBS", "500"))
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused with a different request."""
+
+
+class PlanJobStoreFull(Exception):
+    """Every retained job is still unfinished, so no new job can be accepted."""
+
+
+@dataclass
+class PlanJob:
+    """A submitted solve and everything needed to report on it."""
+    job_id: str
+    portfolio: DebtPortfolio
+    request_fingerprint: str
+    idempotency_key: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    progress: SolveProgress = field(default_factory=SolveProgress)
+    ticket: Optional[SolveTicket] = None
+    result: Optional[PlanSolveResult] = None
+    error: Optional[str] = None
+    # Request options echoed back when the result is rendered
+    options: Dict[str, object] = field(default_factory=dict)
+    # Built on the first coarse-precision partial plan and reused by later polls
+    timeline: Optional[PortfolioTimeline] = None
+
+    @property
+    def status(self) -> PlanJobStatus:
+        if self.error is not None:
+            return PlanJobStatus.FAILED
+        if self.finished_at is not None:
+            if self.result is None or (self.result.cancelled and not self.result.results):
+                return PlanJobStatus.CANCELLED
+            return PlanJobStatus.SUCCEEDED
+        if self.ticket is not None and self.ticket.state != SolveState.QUEUED:
+            return PlanJobStatus.RUNNING
+        return PlanJobStatus.QUEUED
+
+    def partial_plan(self) -> Optional[List[MonthlyResult]]:
+        """The best plan found so far by a running CP-SAT solve, in exact cents."""
+        incumbent = self.progress.incumbent
+        if incumbent is None:
+            return None
+        unit_cents = self.progress.unit_cents
+        if unit_cents == 1:
+            return collect_monthly_results(self.portfolio, incumbent)
+        # Coarse-precision incumbents are replayed in cents, as for the final plan
+        from plan_simulator import simulate_plan
+        planned_payments = {
+            (acc.lender_name, month): payment * unit_cents
+            for acc, row in zip(self.portfolio.accounts, incumbent.payments)
+            for month, payment in enumerate(row)
+        }
+        if self.timeline is None:
+            self.timeline = build_portfolio_timeline(self.portfolio)
+        return simulate_plan(self.portfolio, planned_payments, timeline=self.timeline)
+
+
+def request_fingerprint(*parts: str) -> str:
+    """Stable hash of a request, to detect idempotency keys reused for another request."""
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class PlanJobStore:
+    """In-memory plan jobs with idempotency keys, TTL expiry and bounded retention."""
+
+    def __init__(self, ttl_seconds: float = PLAN_JOB_TTL_SECONDS, max_jobs: int = MAX_RETAINED_JOBS):
+        self._ttl_seconds = ttl_seconds
+        self._max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, PlanJob]" = OrderedDict()  # oldest first
+        self._job_ids_by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        portfolio: DebtPortfolio,
+        fingerprint: str,
+        idempotency_key: Optional[str] = None,
+        options: Optional[Dict[str, object]] = None,
+        **solve_kwargs
+    ) -> Tuple[PlanJob, bool]:
+        """
+        Start a job, or return the existing job for this idempotency key.
+        Raises SolverOverloaded when the solver runner does not admit the solve.
+        solve_kwargs are passed to solve_payment_plan.
+        Returns (job, created).
+        """
+        with self._lock:
+            self._evict_locked(make_room=True)
+
+            if idempotency_key is not None and idempotency_key in self._job_ids_by_key:
+                job = self._jobs[self._job_ids_by_key[idempotency_key]]
+                if job.request_fingerprint != fingerprint:
+                    raise IdempotencyConflict(
+                        f"Idempotency key '{idempotency_key}' was already used for a different request."
+                    )
+                print(f"[PlanJobs] Idempotency key matched job {job.job_id}; not starting a new solve")
+                return job, False
+
+            if len(self._jobs) >= self._max_jobs:
+                raise PlanJobStoreFull(f"{len(self._jobs)} plan jobs are still in progress.")
+
+            job = PlanJob(
+                job_id=uuid.uuid4().hex,
+                portfolio=portfolio,
+                request_fingerprint=fingerprint,
+                idempotency_key=idempotency_key,
+                options=options or {},
+            )
+            self._jobs[job.job_id] = job
+            if idempotency_key is not None:
+                self._job_ids_by_key[idempotency_key] = job.job_id
+
+        try:
+            job.ticket = get_solver_runner().submit(
+                portfolio, solve_id=job.job_id, progress=job.progress, **solve_kwargs
+            )
+        except SolverOverloaded:
+            # Not admitted: forget the job so a retry with the same key can start it
+            with self._lock:
+                del self._jobs[job.job_id]
+                if idempotency_key is not None:
+                    self._job_ids_by_key.pop(idempotency_key, None)
+            raise
+        job.ticket.future.add_done_callback(lambda future: self._finish(job, future))
+        print(f"[PlanJobs] Started job {job.job_id}")
+        return job, True
+
+    def _finish(self, job: PlanJob, future) -> None:
+        if not future.cancelled():
+            try:
+                job.result = future.result()
+            except Exception as e:
+                print(f"[PlanJobs] Job {job.job_id} failed: {e}")
+                job.error = str(e)
+        job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[PlanJob]:
+        with self._lock:
+            self._evict_locked()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[PlanJob]:
+        """Cancel a job's solve; finished jobs are returned unchanged."""
+        job = self.get(job_id)
+        if job is not None and job.finished_at is None:
+            get_solver_runner().cancel(job_id)
+        return job
+
+    def _evict_locked(self, make_room: bool = False) -> None:
+        """
+        Drop expired finished jobs. With make_room, also drop the oldest
+        finished jobs until there is space for one more job.
+        """
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished_at is not None]
+        expired = [job for job in finished if now - job.finished_at > self._ttl_seconds]
+        overflow = len(self._jobs) - len(expired) - (self._max_jobs - 1) if make_room else 0
+        if overflow > 0:
+            expired_ids = {job.job_id for job in expired}
+            expired += [job for job in finished if job.job_id not in expired_ids][:overflow]
+
+        for job in expired:
+            del self._jobs[job.job_id]
+            if job.idempotency_key is not None:
+                self._job_ids_by_key.pop(job.idempotency_key, None)
+
+
+# Global store instance
+_plan_job_store: Optional[PlanJobStore] = None
+
+
+def get_plan_job_store() -> PlanJobStore:
+    """Get or create the global plan job store"""
+    global _plan_job_store
+    if _plan_job_store is None:
+        _plan_job_store = PlanJobStore()
+    return _plan_job_store
@@ -0,0 +1,181 @@
+# plan_pool.py - Diverse near-optimal plans around a CP-SAT solve
+# Every improving solution the search finds is snapshotted; at the end a
+# greedy pass keeps the best plans whose payment vectors differ enough.
+# Improving solutions mostly trace the incumbent's own path, so when they
+# yield fewer distinct plans than requested the model is re-solved with its
+# objective held within tolerance of the best and a constraint that the new
+# plan differs enough from every plan already picked, once per missing plan.
+# Fewer plans than requested come back only when no such plan exists or
+# none is found within ALTERNATIVE_TIME_LIMIT_SECONDS.
+
+import math
+import threading
+from typing import List, Optional, Tuple
+
+from ortools.sat.python import cp_model
+
+from solver_engine import (
+    PlanArrays,
+    SolutionTimer,
+    SolveProgress,
+    plan_arrays_from_solution,
+)
+
+# Default share of the best objective an alternative may exceed it by
+DEFAULT_OBJECTIVE_TOLERANCE = 0.05
+
+# Default minimum payment_distance between any two returned plans
+DEFAULT_MIN_DIVERSITY = 0.10
+
+# Time limit of each diversity re-solve (capped by the main solve's limit)
+ALTERNATIVE_TIME_LIMIT_SECONDS = 10.0
+
+# Fixed-point scale of the diversity constraint's threshold
+_DIVERSITY_SCALE = 1000
+
+
+def payment_distance(a: PlanArrays, b: PlanArrays) -> float:
+    """
+    Normalized L1 distance between two plans' payment vectors, in [0, 1].
+    0 means identical payments; 1 means no payment in common at all.
+    """
+    diff = 0
+    total = 0
+    for row_a, row_b in zip(a.payments, b.payments):
+        for pay_a, pay_b in zip(row_a, row_b):
+            diff += abs(pay_a - pay_b)
+            total += pay_a + pay_b
+    return diff / total if total else 0.0
+
+
+class PlanPoolCollector(SolutionTimer):
+    """
+    Snapshots every solution found during the search, keeping only those
+    within `objective_tolerance` of the best objective seen so far.
+    """
+
+    def __init__(
+        self,
+        plan_indices: List[List[List[int]]],
+        objective_tolerance: float = DEFAULT_OBJECTIVE_TOLERANCE,
+        progress: Optional[SolveProgress] = None,
+    ):
+        super().__init__(progress)
+        self._objective_tolerance = objective_tolerance
+        # Variable indices per account (portfolio order) and month, from plan_variable_indices
+        self._indices = plan_indices
+        self.pool: List[Tuple[float, PlanArrays]] = []
+
+    def _within_tolerance(self, objective: float, best: float) -> bool:
+        return objective <= best + abs(best) * self._objective_tolerance
+
+    def OnSolutionCallback(self) -> None:
+        super().OnSolutionCallback()
+        objective = self.ObjectiveValue()
+        snapshot = plan_arrays_from_solution(list(self.Response().solution), self._indices)
+        self.pool.append((objective, snapshot))
+        if self._progress is not None:
+            self._progress.incumbent = snapshot
+
+        # Drop solutions that fell out of tolerance of the new best
+        best = min(obj for obj, _ in self.pool)
+        self.pool = [(obj, plan) for obj, plan in self.pool if self._within_tolerance(obj, best)]
+
+
+def select_diverse_plans(
+    pool: List[Tuple[float, PlanArrays]],
+    k: int,
+    min_diversity: float = DEFAULT_MIN_DIVERSITY,
+) -> List[Tuple[float, float, PlanArrays]]:
+    """
+    Greedily pick up to k plans, best objective first, skipping any plan
+    closer than `min_diversity` to one already picked.
+    Returns (objective, distance from the best plan, arrays) tuples; the first is the best plan.
+    """
+    chosen: List[Tuple[float, float, PlanArrays]] = []
+    for objective, plan in sorted(pool, key=lambda item: item[0]):
+        if len(chosen) >= k:
+            break
+        if all(payment_distance(plan, other) >= min_diversity for _, _, other in chosen):
+            distance_from_best = payment_distance(plan, chosen[0][2]) if chosen else 0.0
+            chosen.append((objective, distance_from_best, plan))
+    return chosen
+
+
+def _payment_distance_at_least(
+    model: cp_model.CpModel,
+    payment_indices: List[List[int]],
+    other: PlanArrays,
+    min_diversity: float,
+) -> None:
+    """Constrain the model's payments to be at least min_diversity from other's (see payment_distance)."""
+    proto = model.Proto()
+    differences = []
+    payments = []
+    for row, other_row in zip(payment_indices, other.payments):
+        for index, other_payment in zip(row, other_row):
+            payment = model.GetIntVarFromProtoIndex(index)
+            # The proto's repeated fields don't support negative indexing
+            domain = list(proto.variables[index].domain)
+            difference = model.NewIntVar(0, max(domain[-1], other_payment) + abs(domain[0]), "")
+            model.AddAbsEquality(difference, payment - other_payment)
+            differences.append(difference)
+            payments.append(payment)
+    other_total = sum(sum(row) for row in other.payments)
+    threshold = round(min_diversity * _DIVERSITY_SCALE)
+    model.Add(_DIVERSITY_SCALE * sum(differences) >= threshold * (sum(payments) + other_total))
+
+
+def solve_diverse_alternatives(
+    model: cp_model.CpModel,
+    plan_indices: List[List[List[int]]],
+    chosen: List[Tuple[float, float, PlanArrays]],
+    k: int,
+    best_solution: Optional[List[int]] = None,
+    time_limit_seconds: float = ALTERNATIVE_TIME_LIMIT_SECONDS,
+    objective_tolerance: float = DEFAULT_OBJECTIVE_TOLERANCE,
+    min_diversity: float = DEFAULT_MIN_DIVERSITY,
+    cancel_event: Optional[threading.Event] = None,
+) -> List[Tuple[float, float, PlanArrays]]:
+    """
+    Extend chosen (select_diverse_plans output, best plan first) to k plans.
+    Each new plan solves a copy of the (minimization) model with its
+    objective bounded to within objective_tolerance of the best plan's and
+    its payments at least min_diversity from every plan picked so far; the
+    first such plan is taken, searched for from best_solution (the best
+    plan's solution vector) as a hint. Returns fewer than k plans when no
+    such plan exists, none is found within time_limit_seconds, or
+    cancel_event is set.
+    """
+    if not chosen or len(chosen) >= k:
+        return chosen
+    chosen = list(chosen)
+    constrained = model.Clone()
+    objective = constrained.Proto().objective
+    terms = list(zip(objective.vars, objective.coeffs))
+    offset = objective.offset
+    expression = sum(coefficient * constrained.GetIntVarFromProtoIndex(index) for index, coefficient in terms)
+    best = chosen[0][0]
+    constrained.Add(expression <= math.floor(best + abs(best) * objective_tolerance - offset))
+    # Any plan within the bound will do, and the first is found much sooner without the objective
+    constrained.ClearObjective()
+    for index, value in enumerate(best_solution or []):
+        constrained.AddHint(constrained.GetIntVarFromProtoIndex(index), value)
+    for _, _, plan in chosen:
+        _payment_distance_at_least(constrained, plan_indices[0], plan, min_diversity)
+
+    while len(chosen) < k:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = time_limit_seconds
+        status = solver.Solve(constrained)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            print(f"No further alternative plan ({solver.StatusName(status)}).")
+            break
+        solution = list(solver.ResponseProto().solution)
+        plan = plan_arrays_from_solution(solution, plan_indices)
+        objective_value = offset + sum(coefficient * solution[index] for index, coefficient in terms)
+        chosen.append((objective_value, payment_distance(plan, chosen[0][2]), plan))
+        _payment_distance_at_least(constrained, plan_indices[0], plan, min_diversity)
+    return chosen
@@ -0,0 +1,249 @@
+# plan_robustness.py - Monte Carlo projection of plan robustness
+# Replays an optimized plan over thousands of random scenario paths at once
+# (budget shocks, missed payments, deferred interest at promo expiry) with
+# NumPy arrays of shape (paths, accounts), and summarizes how payoff month
+# and total interest are distributed.
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from solver_engine import (
+    DebtPortfolio,
+    MonthlyResult,
+    PLAN_HORIZON_MONTHS,
+    PortfolioTimeline,
+    build_portfolio_timeline,
+)
+
+# Percentiles reported for each distribution
+REPORTED_PERCENTILES = (10, 50, 90)
+
+
+@dataclass
+class ScenarioModel:
+    """
+    Random behaviour applied to every scenario path, month by month.
+    - Budget: each month has budget_shock_probability of an income dip that
+      removes budget_shock_fraction of the budget; budget_volatility adds
+      normal noise (as a share of the budget) on top.
+    - Missed payments: each account's payment is skipped entirely with
+      missed_payment_probability (interest keeps accruing).
+    - Promo expiry: a promo balance still outstanding when its promo ends
+      is charged deferred interest for the promo months with
+      deferred_interest_probability (as some BNPL and store cards do).
+    When the budget falls short of the plan, minimum payments are covered
+    first and the rest of each planned payment is cut proportionally. The
+    shortfall is carried as arrears and paid on top of later planned
+    payments, as budget allows.
+    """
+    num_paths: int = 5000
+    budget_shock_probability: float = 0.05
+    budget_shock_fraction: float = 0.3
+    budget_volatility: float = 0.05
+    missed_payment_probability: float = 0.01
+    deferred_interest_probability: float = 0.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class RobustnessReport:
+    """
+    Distributions over scenario paths. payoff_months holds the month (1-based)
+    each path cleared all debt, or horizon + 1 where it never did.
+    """
+    num_paths: int
+    horizon_months: int
+    planned_payoff_month: int
+    planned_interest_cents: int
+    payoff_months: np.ndarray = field(repr=False)
+    total_interest_cents: np.ndarray = field(repr=False)
+
+    @property
+    def payoff_probability(self) -> float:
+        """Share of paths that clear all debt within the horizon."""
+        return float(np.mean(self.payoff_months <= self.horizon_months))
+
+    @property
+    def on_time_probability(self) -> float:
+        """Share of paths that clear all debt no later than the plan does."""
+        return float(np.mean(self.payoff_months <= self.planned_payoff_month))
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "num_paths": self.num_paths,
+            "planned_payoff_month": self.planned_payoff_month,
+            "planned_interest_cents": self.planned_interest_cents,
+            "payoff_probability": round(self.payoff_probability, 4),
+            "on_time_probability": round(self.on_time_probability, 4),
+            "payoff_month_percentiles": {
+                f"p{p}": int(v) for p, v in zip(REPORTED_PERCENTILES, np.percentile(self.payoff_months, REPORTED_PERCENTILES))
+            },
+            "total_interest_cents_percentiles": {
+                f"p{p}": int(v) for p, v in zip(REPORTED_PERCENTILES, np.percentile(self.total_interest_cents, REPORTED_PERCENTILES))
+            },
+            "mean_total_interest_cents": int(np.mean(self.total_interest_cents)),
+        }
+
+
+def planned_payment_matrix(portfolio: DebtPortfolio, plan: List[MonthlyResult], max_months: int) -> np.ndarray:
+    """Planned payments as a (months, accounts) array in cents."""
+    account_index = {acc.lender_name: idx for idx, acc in enumerate(portfolio.accounts)}
+    payments = np.zeros((max_months, len(portfolio.accounts)), dtype=np.int64)
+    for row in plan:
+        if row.month <= max_months:
+            payments[row.month - 1, account_index[row.lender_name]] = row.payment_cents
+    return payments
+
+
+def simulate_plan_robustness(
+    portfolio: DebtPortfolio,
+    plan: List[MonthlyResult],
+    scenario: Optional[ScenarioModel] = None,
+    max_months: int = PLAN_HORIZON_MONTHS,
+    timeline: Optional[PortfolioTimeline] = None
+) -> RobustnessReport:
+    """
+    Replay the plan over scenario.num_paths random paths at once.
+    Interest and minimum payments follow simulate_plan's integer-cent rules,
+    on the same timeline schedules (built here if not given).
+    """
+    scenario = scenario or ScenarioModel()
+    rng = np.random.default_rng(scenario.seed)
+    num_paths, num_accounts = scenario.num_paths, len(portfolio.accounts)
+
+    # Per-month, per-account and per-segment constants, shared by every path.
+    # Segments are laid out account by account, so account totals are
+    # reduceat sums over segment_starts.
+    if timeline is None:
+        timeline = build_portfolio_timeline(portfolio, max_months)
+    planned = planned_payment_matrix(portfolio, plan, max_months)
+    budgets = np.array(timeline.monthly_budgets[:max_months], dtype=np.int64)
+    segments = [segment for acc in portfolio.accounts for segment in timeline.segments[acc.lender_name]]
+    segment_account = np.array(
+        [idx for idx, acc in enumerate(portfolio.accounts) for _ in timeline.segments[acc.lender_name]], dtype=np.int64
+    )
+    segment_starts = np.searchsorted(segment_account, np.arange(num_accounts))
+    # (months, segments)
+    apr_bps = np.array([segment.apr_bps[:max_months] for segment in segments], dtype=np.int64).reshape(
+        len(segments), max_months
+    ).T
+    # Month a segment's promo ends (its APR first turns positive after 0% months), or -1
+    promo_months = np.argmax(apr_bps > 0, axis=0) if max_months else np.zeros(len(segments), dtype=np.int64)
+    promo_months = np.where(apr_bps.any(axis=0) & (promo_months > 0), promo_months, -1)
+    # Accounts whose payments are split across segments, with per-month allocation orders
+    split_accounts = [
+        (idx, segment_starts[idx], acc.lender_name) for idx, acc in enumerate(portfolio.accounts)
+        if len(timeline.segments[acc.lender_name]) > 1
+    ]
+    single_segments = np.array(
+        [segment_starts[idx] for idx, acc in enumerate(portfolio.accounts) if len(timeline.segments[acc.lender_name]) == 1],
+        dtype=np.int64,
+    )
+    single_accounts = segment_account[single_segments]
+    # (pooled, segment) column pairs whose balances are combined at the start of each month
+    pooling_moves = [
+        [
+            (segment_starts[idx] + pooled, segment_starts[idx] + s)
+            for idx, acc in enumerate(portfolio.accounts)
+            for s, pooled in enumerate(timeline.pooled_into[acc.lender_name][month])
+            if pooled != s and (month == 0 or timeline.pooled_into[acc.lender_name][month - 1][s] == s)
+        ]
+        for month in range(max_months)
+    ]
+    fixed_min = np.array([acc.min_payment_rule.fixed_cents for acc in portfolio.accounts], dtype=np.int64)
+    min_pct_bps = np.array([acc.min_payment_rule.percentage_bps for acc in portfolio.accounts], dtype=np.int64)
+    min_includes_interest = np.array([acc.min_payment_rule.includes_interest for acc in portfolio.accounts])
+
+    segment_balances = np.tile(np.array([segment.balance_cents for segment in segments], dtype=np.int64), (num_paths, 1))
+    arrears = np.zeros((num_paths, num_accounts), dtype=np.int64)
+    total_interest = np.zeros(num_paths, dtype=np.int64)
+    payoff_months = np.full(num_paths, max_months + 1, dtype=np.int64)
+    payoff_months[segment_balances.sum(axis=1) <= 0] = 0
+
+    for month in range(max_months):
+        active = payoff_months > max_months
+        if not active.any():
+            break
+
+        # Deferred interest on balances left when a promo ends
+        deferred_interest = np.zeros_like(segment_balances)
+        expiring = month == promo_months
+        if scenario.deferred_interest_probability > 0 and expiring.any():
+            charged = rng.random((num_paths, num_accounts)) < scenario.deferred_interest_probability
+            deferred_interest = np.where(
+                expiring & charged[:, segment_account], segment_balances * apr_bps[month] * promo_months // 120000, 0
+            )
+
+        # Segments whose remaining schedules match are pooled from this month on
+        for pooled, segment in pooling_moves[month]:
+            segment_balances[:, pooled] += segment_balances[:, segment]
+            segment_balances[:, segment] = 0
+            deferred_interest[:, pooled] += deferred_interest[:, segment]
+            deferred_interest[:, segment] = 0
+
+        # Interest per segment (0% while a segment is in its promo)
+        segment_interest = segment_balances * apr_bps[month] // 120000 + deferred_interest
+
+        segment_owed = segment_balances + segment_interest
+        balances = np.add.reduceat(segment_balances, segment_starts, axis=1)
+        interest = np.add.reduceat(segment_interest, segment_starts, axis=1)
+        total_owed = balances + interest
+        base_for_percentage = np.where(min_includes_interest, total_owed, balances)
+        minimum = np.minimum(np.maximum(fixed_min, base_for_percentage * min_pct_bps // 10000), total_owed)
+        target = planned[month] + arrears
+        requested = np.minimum(np.maximum(target, minimum), total_owed)
+
+        # Budget available this month on each path
+        factor = 1.0 + scenario.budget_volatility * rng.standard_normal(num_paths)
+        shocked = rng.random(num_paths) < scenario.budget_shock_probability
+        factor = np.clip(np.where(shocked, factor - scenario.budget_shock_fraction, factor), 0.0, None)
+        available = np.floor(budgets[month] * factor).astype(np.int64)
+
+        # Cover minimums first, then cut the extra over minimum proportionally
+        minimum_total = minimum.sum(axis=1)
+        extra = requested - minimum
+        extra_total = extra.sum(axis=1)
+        extra_budget = np.maximum(available - minimum_total, 0)
+        extra_share = np.where(extra_total > 0, np.minimum(extra_budget / np.maximum(extra_total, 1), 1.0), 0.0)
+        minimum_share = np.where(minimum_total > available, available / np.maximum(minimum_total, 1), 1.0)
+        payments = (
+            np.floor(minimum * minimum_share[:, None]).astype(np.int64)
+            + np.floor(extra * extra_share[:, None]).astype(np.int64)
+        )
+
+        if scenario.missed_payment_probability > 0:
+            missed = rng.random((num_paths, num_accounts)) < scenario.missed_payment_probability
+            payments = np.where(missed, 0, payments)
+
+        # Paths that already paid off stay frozen
+        payments = np.where(active[:, None], payments, 0)
+
+        # Payments clear each account's highest-APR segment first
+        segment_payments = np.zeros_like(segment_owed)
+        segment_payments[:, single_segments] = payments[:, single_accounts]
+        for idx, start, name in split_accounts:
+            remaining = payments[:, idx]
+            for s in timeline.payment_order(name, month):
+                paid = np.minimum(segment_owed[:, start + s], remaining)
+                segment_payments[:, start + s] = paid
+                remaining = remaining - paid
+
+        segment_balances = np.where(active[:, None], segment_owed - segment_payments, segment_balances)
+        interest = np.where(active[:, None], interest, 0)
+        balances = np.add.reduceat(segment_balances, segment_starts, axis=1)
+        arrears = np.where(balances > 0, np.maximum(target - payments, 0), 0)
+        total_interest += interest.sum(axis=1)
+
+        cleared = active & (balances.sum(axis=1) <= 0)
+        payoff_months[cleared] = month + 1
+
+    return RobustnessReport(
+        num_paths=num_paths,
+        horizon_months=max_months,
+        planned_payoff_month=max((row.month for row in plan), default=0),
+        planned_interest_cents=sum(row.interest_charged_cents for row in plan),
+        payoff_months=payoff_months,
+        total_interest_cents=total_interest,
+    )
@@ -0,0 +1,196 @@
+# plan_simulator.py - Exact-cents simulation of repayment plans
+# Replays planned payments against the real interest and minimum payment
+# rules, and converts portfolios to and from coarser monetary units.
+
+import dataclasses
+from typing import Dict, List, Optional, Tuple
+
+from solver_engine import (
+    Account,
+    AlternativePlan,
+    DebtPortfolio,
+    MinPaymentRule,
+    MonthlyResult,
+    PlanSolveResult,
+    PortfolioTimeline,
+    PLAN_HORIZON_MONTHS,
+    build_portfolio_timeline,
+)
+
+
+def _ceil_div(value: int, unit: int) -> int:
+    return -(-value // unit)
+
+
+def scale_portfolio(portfolio: DebtPortfolio, unit_cents: int) -> DebtPortfolio:
+    """
+    Convert a portfolio into model units of `unit_cents`, rounding conservatively:
+    balances and fixed minimum payments round UP, budgets round DOWN.
+    A plan that is feasible for the scaled portfolio stays feasible in cents.
+    """
+    scaled_accounts: List[Account] = []
+    for account in portfolio.accounts:
+        scaled_buckets = [
+            dataclasses.replace(bucket, balance_cents=_ceil_div(bucket.balance_cents, unit_cents))
+            for bucket in account.buckets
+        ]
+        # Rounding buckets individually can exceed the rounded total, so the
+        # account balance follows its buckets to keep them consistent.
+        if scaled_buckets:
+            scaled_balance = sum(b.balance_cents for b in scaled_buckets)
+        else:
+            scaled_balance = _ceil_div(account.current_balance_cents, unit_cents)
+
+        scaled_accounts.append(dataclasses.replace(
+            account,
+            current_balance_cents=scaled_balance,
+            buckets=scaled_buckets,
+            min_payment_rule=MinPaymentRule(
+                fixed_cents=_ceil_div(account.min_payment_rule.fixed_cents, unit_cents),
+                percentage_bps=account.min_payment_rule.percentage_bps,
+                includes_interest=account.min_payment_rule.includes_interest,
+            ),
+        ))
+
+    budget = portfolio.budget
+    scaled_budget = dataclasses.replace(
+        budget,
+        monthly_budget_cents=budget.monthly_budget_cents // unit_cents,
+        future_changes=[(dt, amount // unit_cents) for dt, amount in budget.future_changes],
+        lump_sum_payments=[(dt, amount // unit_cents) for dt, amount in budget.lump_sum_payments],
+    )
+
+    return dataclasses.replace(portfolio, accounts=scaled_accounts, budget=scaled_budget)
+
+
+def simulate_plan(
+    portfolio: DebtPortfolio,
+    planned_payments: Dict[Tuple[str, int], int],
+    max_months: int = PLAN_HORIZON_MONTHS,
+    timeline: Optional[PortfolioTimeline] = None
+) -> List[MonthlyResult]:
+    """
+    Replay planned payments (keyed by (lender_name, 0-indexed month), in cents)
+    month by month with exact integer-cent interest and minimum payments.
+
+    Each payment is clamped into [minimum payment, amount owed], so overpayments
+    on an already-cleared account drop to zero and under-minimum payments are raised.
+    Interest accrues per balance segment and each payment clears the
+    highest-APR segment first, as in the solver models.
+    Rows are produced with the same activity filter as the solver's results.
+    Pass the portfolio's timeline to reuse the schedules the solver used.
+    """
+    if timeline is None:
+        timeline = build_portfolio_timeline(portfolio, max_months)
+    segment_balances: Dict[str, List[int]] = {
+        name: [segment.balance_cents for segment in segments] for name, segments in timeline.segments.items()
+    }
+    results_list: List[MonthlyResult] = []
+
+    for month in range(max_months):
+        if sum(sum(owed) for owed in segment_balances.values()) <= 0:
+            break
+
+        for account in portfolio.accounts:
+            name = account.lender_name
+            segments = timeline.segments[name]
+            previous_balance = sum(segment_balances[name])
+            rule = account.min_payment_rule
+
+            # Segments whose remaining schedules match are pooled from this month on
+            pooled_balances = [0] * len(segments)
+            for balance, pooled in zip(segment_balances[name], timeline.pooled_into[name][month]):
+                pooled_balances[pooled] += balance
+            segment_owed = [
+                balance + balance * segment.apr_bps[month] // 120000
+                for balance, segment in zip(pooled_balances, segments)
+            ]
+            total_owed = sum(segment_owed)
+            interest = total_owed - previous_balance
+
+            base_for_percentage = total_owed if rule.includes_interest else previous_balance
+            raw_minimum = max(rule.fixed_cents, base_for_percentage * rule.percentage_bps // 10000)
+            minimum_payment = min(raw_minimum, total_owed)
+
+            payment = min(max(planned_payments.get((name, month), 0), minimum_payment), total_owed)
+            ending_balance = total_owed - payment
+            remaining_payment = payment
+            for s in timeline.payment_order(name, month):
+                segment_payment = min(segment_owed[s], remaining_payment)
+                segment_owed[s] -= segment_payment
+                remaining_payment -= segment_payment
+            segment_balances[name] = segment_owed
+
+            if payment > 0 or ending_balance > 0 or interest > 0 or (month > 0 and previous_balance > 0):
+                results_list.append(MonthlyResult(
+                    month=month + 1,
+                    lender_name=name,
+                    payment_cents=payment,
+                    interest_charged_cents=interest,
+                    ending_balance_cents=ending_balance,
+                ))
+
+    return results_list
+
+
+def correct_scaled_plan(
+    portfolio: DebtPortfolio,
+    scaled_result: PlanSolveResult,
+    unit_cents: int,
+    timeline: Optional[PortfolioTimeline] = None
+) -> PlanSolveResult:
+    """
+    Turn a plan solved in coarse units into an exact-cents plan.
+
+    Planned payments are scaled back to cents and replayed by simulate_plan.
+    Because the scaled model over-estimates interest and balances, the replay
+    only ever lowers payments (never breaking budgets or the payoff deadline).
+    The approximation error is the model's total interest minus the exact total.
+    timeline is the (unscaled) portfolio's timeline, built here if not given.
+    """
+    objective_value = scaled_result.objective_value * unit_cents if scaled_result.objective_value is not None else None
+    best_bound = scaled_result.best_bound * unit_cents if scaled_result.best_bound is not None else None
+
+    if scaled_result.results is None:
+        return dataclasses.replace(
+            scaled_result,
+            objective_value=objective_value,
+            best_bound=best_bound,
+            precision_unit_cents=unit_cents,
+        )
+
+    if timeline is None:
+        timeline = build_portfolio_timeline(portfolio)
+
+    def to_exact(scaled_rows: List[MonthlyResult]) -> List[MonthlyResult]:
+        planned_payments = {
+            (r.lender_name, r.month - 1): r.payment_cents * unit_cents
+            for r in scaled_rows
+        }
+        return simulate_plan(portfolio, planned_payments, timeline=timeline)
+
+    exact_results = to_exact(scaled_result.results)
+
+    model_interest_cents = sum(r.interest_charged_cents for r in scaled_result.results) * unit_cents
+    exact_interest_cents = sum(r.interest_charged_cents for r in exact_results)
+    approximation_error_cents = model_interest_cents - exact_interest_cents
+    print(f"Exact-cents correction: model interest ${model_interest_cents / 100:,.2f}, "
+          f"exact interest ${exact_interest_cents / 100:,.2f} "
+          f"(approximation error ${approximation_error_cents / 100:,.2f})")
+
+    return dataclasses.replace(
+        scaled_result,
+        results=exact_results,
+        objective_value=objective_value,
+        best_bound=best_bound,
+        precision_unit_cents=unit_cents,
+        approximation_error_cents=approximation_error_cents,
+        alternatives=[
+            AlternativePlan(
+                objective_value=alt.objective_value * unit_cents,
+                distance_from_best=alt.distance_from_best,
+                results=to_exact(alt.results),
+            )
+            for alt in scaled_result.alternatives
+        ],
+    )
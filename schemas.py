@@ -1,7 +1,7 @@
 # schemas.py
 
 import sys
-from datetime import date
+from datetime import date, datetime
 from enum import Enum
 from typing import List, Optional, Tuple
 
@@ -36,6 +36,29 @@ class PaymentShape(str, Enum):
     LINEAR_PER_ACCOUNT = "Linear (Same Amount Per Account)"
     OPTIMIZED_MONTH_TO_MONTH = "Optimized (Variable Amounts)"
 
+class SolverBackend(str, Enum):
+    AUTO = "Auto"
+    CP_SAT = "CP-SAT"
+    MIP = "MIP (SCIP)"
+    LP_RELAXATION = "LP Relaxation (GLOP)"
+
+class PlanFormat(str, Enum):
+    ROWS = "rows"
+    COLUMNAR = "columnar"
+
+class MonetaryPrecision(str, Enum):
+    EXACT = "Exact (1p)"
+    TEN_PENCE = "10p"
+    WHOLE_POUNDS = "£1"
+
+class PlanJobStatus(str, Enum):
+    """Lifecycle of a plan job (also used by the plan job store)"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
 # --- Pydantic Models ---
 
 class MinPaymentRule(BaseModel):
@@ -147,6 +170,10 @@ class UserPreferences(BaseModel):
     """Pydantic model capturing user's optimization choices."""
     strategy: OptimizationStrategy
     payment_shape: PaymentShape
+    # Which solver optimizes the plan. LP_RELAXATION only returns a lower bound.
+    solver_backend: SolverBackend = SolverBackend.AUTO
+    # Coarser units solve faster on large balances; the plan is corrected back to exact cents.
+    precision: MonetaryPrecision = MonetaryPrecision.EXACT
 
 # schemas.py (continued)
 
@@ -165,6 +192,49 @@ class MonthlyResult(BaseModel):
     interest_charged_cents: int = Field(..., ge=0)
     ending_balance_cents: int # Can be negative if overpaid
 
+class ColumnarPlan(BaseModel):
+    """
+    Column-oriented plan: one row per lender, one column per month (month 1 first).
+    Inactive months hold zeros. Totals are precomputed per account and per plan year.
+    """
+    lenders: List[str]
+    months: int
+    payments: List[List[int]]
+    balances: List[List[int]]
+    interest: List[List[int]]
+    total_paid_by_account: List[int]
+    total_interest_by_account: List[int]
+    total_paid_by_year: List[int]
+    total_interest_by_year: List[int]
+
+class AlternativePlan(BaseModel):
+    """A near-optimal alternative plan, in the same format as the primary plan."""
+    objective_value: float
+    distance_from_best: float # Normalized L1 distance of payments (0 = identical, 1 = disjoint)
+    total_interest_cents: int
+    plan: Optional[List[MonthlyResult]] = None
+    plan_columnar: Optional[ColumnarPlan] = None
+
+class SolveTelemetry(BaseModel):
+    """
+    Solver performance data for one /generate-plan request, used to track
+    latency per strategy. Values a backend does not report are None.
+    """
+    solver_status: str # The solver's own status, e.g. "OPTIMAL", "FEASIBLE", "UNKNOWN"
+    engine: str # Backend that solved the model, or "fast-path:<reason>" if none was needed
+    strategy: str
+    objective_value: Optional[float] = None
+    best_bound: Optional[float] = None
+    relative_gap: Optional[float] = None # |objective - bound| / max(1, |objective|)
+    wall_time_seconds: float = 0.0
+    user_time_seconds: Optional[float] = None
+    num_branches: Optional[int] = None
+    num_conflicts: Optional[int] = None
+    num_solutions: int = 0
+    time_to_first_solution_seconds: Optional[float] = None
+    num_variables: int = 0
+    num_constraints: int = 0
+
 # --- API Response Model ---
 
 class OptimizationPlanResponse(BaseModel):
@@ -173,8 +243,39 @@ class OptimizationPlanResponse(BaseModel):
     Initially, the 'plan' will contain the raw MonthlyResult list.
     Later, we'll adapt this or add a field for the structured dashboard data.
     """
-    status: str # e.g., "OPTIMAL", "FEASIBLE", "INFEASIBLE", "ERROR"
+    status: str # e.g., "OPTIMAL", "FEASIBLE", "INFEASIBLE", "LOWER_BOUND", "CANCELLED", "ERROR"
     message: Optional[str] = None
     plan: Optional[List[MonthlyResult]] = None # The raw plan from the solver
+    plan_columnar: Optional[ColumnarPlan] = None # Set instead of 'plan' when format=columnar
+    # Model interest minus exact-cents interest when solved at a coarser precision
+    approximation_error_cents: Optional[int] = None
+    # Diverse near-optimal plans, when requested with ?alternatives=k
+    alternatives: Optional[List[AlternativePlan]] = None
+    telemetry: Optional[SolveTelemetry] = None
     # Future: Add summary fields (total_interest, payoff_month)
     # Future: Add structured dashboard_data field
+
+# --- Plan Job Models ---
+
+class PlanJobProgress(BaseModel):
+    """Search progress of a running job (CP-SAT reports every solution; MIP only at the end)."""
+    num_solutions: int = 0
+    elapsed_seconds: float = 0.0
+    objective_value: Optional[float] = None
+    best_bound: Optional[float] = None
+
+class PlanJobResponse(BaseModel):
+    """
+    State of an asynchronous /plan-jobs solve.
+    While running, partial_plan holds the best plan found so far;
+    once finished, result holds the same response /generate-plan returns.
+    """
+    job_id: str
+    status: PlanJobStatus
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    estimated_queue_seconds: Optional[float] = None # Set while the job waits for a solver worker
+    progress: Optional[PlanJobProgress] = None
+    partial_plan: Optional[List[MonthlyResult]] = None
+    result: Optional[OptimizationPlanResponse] = None
+    error: Optional[str] = None
@@ -18,7 +18,11 @@ import { registerTrueLayerRoutes } from "./routes/truelayer";
 import { registerCurrentFinancesRoutes } from "./routes/current-finances";
 import { registerProjectionsRoutes } from "./routes/projections";
 
-// Helper function to retry fetch requests with exponential backoff
+// Longest Retry-After we are willing to wait before retrying an overloaded backend
+const MAX_RETRY_AFTER_MS = 30000;
+
+// Helper function to retry fetch requests with exponential backoff.
+// 429/503 responses with a Retry-After header are retried after that delay.
 async function fetchWithRetry(
   url: string,
   options: RequestInit,
@@ -30,6 +34,13 @@ async function fetchWithRetry(
   for (let attempt = 0; attempt < maxRetries; attempt++) {
     try {
       const response = await fetch(url, options);
+      const retryAfterSeconds = Number(response.headers.get("Retry-After"));
+      if ((response.status === 429 || response.status === 503) && retryAfterSeconds > 0
+          && retryAfterSeconds * 1000 <= MAX_RETRY_AFTER_MS && attempt < maxRetries - 1) {
+        console.log(`[Retry] Backend overloaded (${response.status}), retrying in ${retryAfterSeconds}s...`);
+        await new Promise(resolve => setTimeout(resolve, retryAfterSeconds * 1000));
+        continue;
+      }
       return response; // Success - return response (even if not ok, let caller handle)
     } catch (error: any) {
       lastError = error;
@@ -47,6 +58,36 @@ async function fetchWithRetry(
   throw lastError || new Error("Max retries exceeded");
 }
 
+// Submit a plan job to the Python backend and long-poll it until it finishes.
+// Every retry of the submission reuses one Idempotency-Key, so a re-post after
+// a timeout attaches to the job already solving instead of starting another solve.
+// Resolves to a Response carrying the same body /generate-plan returns.
+async function runPlanJob(baseUrl: string, portfolioInput: unknown): Promise<Response> {
+  const submitResponse = await fetchWithRetry(`${baseUrl}/plan-jobs`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", "Idempotency-Key": randomUUID() },
+    body: JSON.stringify(portfolioInput),
+  }, 3, 500);
+  if (!submitResponse.ok) {
+    return submitResponse;
+  }
+
+  let job = await submitResponse.json();
+  while (job.status === "queued" || job.status === "running") {
+    const pollResponse = await fetchWithRetry(`${baseUrl}/plan-jobs/${job.job_id}?wait_seconds=10`, { method: "GET" }, 3, 500);
+    if (!pollResponse.ok) {
+      return pollResponse;
+    }
+    job = await pollResponse.json();
+  }
+
+  if (job.status === "failed") {
+    return new Response(JSON.stringify({ detail: job.error }), { status: 400, headers: { "Content-Type": "application/json" } });
+  }
+  const result = job.result ?? { status: "CANCELLED", message: "The solve was cancelled before a payment plan was found." };
+  return new Response(JSON.stringify(result), { status: 200, headers: { "Content-Type": "application/json" } });
+}
+
 // Enum mapping functions to translate frontend values to Python backend values
 // These functions accept both snake_case (frontend) and human-readable (database) formats
 function mapAccountTypeToPython(frontendValue: string): string {
@@ -718,18 +759,15 @@ export async function registerRoutes(app: Express): Promise<Server> {
 
       // Call Python FastAPI backend with retry logic
       const pythonBackendUrl = process.env.PYTHON_BACKEND_URL || "http://127.0.0.1:8000";
-      console.log(`[Plan Generation] Calling Python backend at ${pythonBackendUrl}/generate-plan`);
+      console.log(`[Plan Generation] Submitting plan job to Python backend at ${pythonBackendUrl}/plan-jobs`);
       
       let pythonResponse;
       try {
-        pythonResponse = await fetchWithRetry(`${pythonBackendUrl}/generate-plan`, {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify(portfolioInput),
-        }, 3, 500); // 3 retries with 500ms initial delay (exponential backoff)
+        // 3 retries per call with 500ms initial delay (exponential backoff)
+        pythonResponse = await runPlanJob(pythonBackendUrl, portfolioInput);
       } catch (fetchError: any) {
         console.error("[Plan Generation] Failed to reach Python backend after retries:", {
-          url: `${pythonBackendUrl}/generate-plan`,
+          url: `${pythonBackendUrl}/plan-jobs`,
           error: fetchError.message,
           errorType: fetchError.code || fetchError.name,
           stack: fetchError.stack
@@ -764,7 +802,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         }
         console.error("Python backend request failed:", {
           status: pythonResponse.status,
-          url: `${pythonBackendUrl}/generate-plan`,
+          url: `${pythonBackendUrl}/plan-jobs`,
           error: errorMessage
         });
         return res.status(400).send({ 
@@ -801,7 +839,8 @@ export async function registerRoutes(app: Express): Promise<Server> {
       let status = pythonResult.status;
       let errorMessage = pythonResult.error_message || null;
 
-      if (pythonResult.status === "OPTIMAL" && pythonResult.plan) {
+      // FEASIBLE plans are valid but were not proven optimal before the time limit
+      if ((pythonResult.status === "OPTIMAL" || pythonResult.status === "FEASIBLE") && pythonResult.plan) {
         planData = pythonResult.plan.map((result: any) => ({
           month: result.month,
           lenderName: result.lender_name,
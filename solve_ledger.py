@@ -0,0 +1,315 @@
+# solve_ledger.py - SQLite ledger of solver runs and per-request time budgets
+# Every CP-SAT/MIP solve is recorded with the portfolio features that drive
+# solver effort and its outcome (status, timings, gap curve). Similar past
+# solves then predict a time limit and a stall-based early-stop rule for
+# new requests, instead of a flat SOLVER_TIME_LIMIT_SECONDS for everything.
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from statistics import quantiles
+from typing import Any, Dict, List, Optional, Tuple
+
+from solver_engine import (
+    DebtPortfolio,
+    PlanSolveResult,
+    SolverBackend,
+    PLAN_HORIZON_MONTHS,
+    SOLVER_TIME_LIMIT_SECONDS,
+)
+
+# The ledger is off unless the server turns it on (enable_ledger) or
+# SOLVER_LEDGER_PATH names a file, so library calls and tests record nothing
+# and their time budgets never depend on earlier runs
+LEDGER_PATH: Optional[str] = os.environ.get("SOLVER_LEDGER_PATH") or None
+if LEDGER_PATH is not None and LEDGER_PATH != ":memory:":
+    LEDGER_PATH = os.path.abspath(LEDGER_PATH)
+
+# Where the server keeps the ledger when no path is configured
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".solver_ledger.sqlite3")
+
+# Keep the ledger small; only recent solves are relevant
+MAX_LEDGER_ROWS = 5000
+
+# Similar solves needed before history overrides the flat default
+MIN_SAMPLES_FOR_PREDICTION = 5
+
+# Most recent similar solves consulted per lookup
+MAX_SIMILAR_SOLVES = 200
+# Lookups are answered from memory for this long (solves recorded by this
+# process refresh them at once; other processes' solves show up after this)
+SIMILAR_SOLVES_CACHE_SECONDS = 30.0
+
+# Predicted time limits stay within these bounds; hard cases may exceed the default
+MIN_TIME_LIMIT_SECONDS = 5.0
+MAX_TIME_LIMIT_SECONDS = 120.0
+
+# Safety margins on the historical 90th percentiles
+TIME_LIMIT_HEADROOM = 1.5
+STALL_HEADROOM = 2.0
+MIN_STALL_SECONDS = 2.0
+
+# Share of similar solves that timed out above which a case counts as hard
+HARD_CASE_TIMEOUT_SHARE = 0.5
+
+# Solves that ended with an answer (a proven plan, or proof there is none),
+# and solves that ran out of time without one (like benchmarks/compare.py)
+_PROVEN_STATUSES = ("OPTIMAL", "INFEASIBLE")
+_TIMED_OUT_STATUSES = ("FEASIBLE", "UNKNOWN")
+
+_ledger_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS solves (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    strategy TEXT NOT NULL,
+    payment_shape TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    num_accounts INTEGER NOT NULL,
+    num_buckets INTEGER NOT NULL,
+    num_promos INTEGER NOT NULL,
+    max_balance_cents INTEGER NOT NULL,
+    horizon_months INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    wall_time_seconds REAL NOT NULL,
+    first_solution_seconds REAL,
+    last_improvement_seconds REAL,
+    max_improvement_interval_seconds REAL,
+    objective_value REAL,
+    best_bound REAL,
+    relative_gap REAL,
+    time_limit_seconds REAL,
+    stall_seconds REAL,
+    stopped_early INTEGER NOT NULL DEFAULT 0,
+    gap_curve TEXT
+)
+"""
+
+# similar_solves filters on these and reads newest first
+_INDEX = """
+CREATE INDEX IF NOT EXISTS solves_by_features
+ON solves (strategy, payment_shape, horizon_months, id)
+"""
+
+# The columns callers of similar_solves read
+_SUMMARY_COLUMNS = (
+    "backend, num_accounts, num_promos, status, wall_time_seconds, "
+    "max_improvement_interval_seconds, stopped_early"
+)
+
+# num_accounts bounds of each size band (inclusive)
+_SIZE_BANDS = {"small": (0, 2), "medium": (3, 6), "large": (7, None)}
+
+_similar_cache: Dict[tuple, Tuple[float, List[sqlite3.Row]]] = {}
+
+
+@dataclass
+class SolveBudget:
+    """
+    Time allowance for one solve.
+    stall_seconds (CP-SAT only): stop once no better plan was found for this
+    long after the first solution. None disables the early stop.
+    """
+    time_limit_seconds: float
+    stall_seconds: Optional[float] = None
+    basis: str = "default"  # "default", or "history (n=...)" when predicted
+
+
+def portfolio_features(portfolio: DebtPortfolio) -> Dict[str, Any]:
+    """Summarize the portfolio features that drive solver performance."""
+    return {
+        "strategy": portfolio.preferences.strategy.value,
+        "payment_shape": portfolio.preferences.payment_shape.value,
+        "num_accounts": len(portfolio.accounts),
+        "num_buckets": sum(len(acc.buckets) for acc in portfolio.accounts),
+        "num_promos": sum(
+            1 for acc in portfolio.accounts
+            if acc.promo_end_date or acc.promo_duration_months or acc.has_promo_buckets()
+        ),
+        "max_balance_cents": max((acc.current_balance_cents for acc in portfolio.accounts), default=0),
+        "horizon_months": PLAN_HORIZON_MONTHS,
+    }
+
+
+def size_band(num_accounts: int) -> str:
+    """Group portfolios of similar size so history compares like with like."""
+    if num_accounts <= 2:
+        return "small"
+    if num_accounts <= 6:
+        return "medium"
+    return "large"
+
+
+def enable_ledger(path: Optional[str] = None) -> str:
+    """Record solves (and predict from them) in path, the configured path or DEFAULT_LEDGER_PATH."""
+    global LEDGER_PATH
+    path = path or LEDGER_PATH or DEFAULT_LEDGER_PATH
+    LEDGER_PATH = path if path == ":memory:" else os.path.abspath(path)
+    print(f"[SolveLedger] Recording solves in {LEDGER_PATH}")
+    return LEDGER_PATH
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(LEDGER_PATH, timeout=5.0)
+    conn.row_factory = sqlite3.Row
+    conn.execute(_SCHEMA)
+    conn.execute(_INDEX)
+    return conn
+
+
+def _improvement_times(gap_curve: List[List[float]]) -> List[float]:
+    """Wall times at which the objective strictly improved."""
+    times: List[float] = []
+    best = None
+    for seconds, objective, _bound in gap_curve:
+        if best is None or objective < best:
+            best = objective
+            times.append(seconds)
+    return times
+
+
+def record_solve(portfolio: DebtPortfolio, result: PlanSolveResult, budget: SolveBudget) -> None:
+    """Append a solve's features and outcome to the ledger (best effort)."""
+    if LEDGER_PATH is None:
+        return
+    # Cancelled solves say nothing about how long the model needs
+    if result.backend not in (SolverBackend.CP_SAT, SolverBackend.MIP) or result.fast_path or result.cancelled:
+        return
+
+    features = portfolio_features(portfolio)
+    improvements = _improvement_times(result.gap_curve)
+    intervals = [later - earlier for earlier, later in zip(improvements, improvements[1:])]
+
+    row = {
+        **features,
+        "created_at": time.time(),
+        "backend": result.backend.value,
+        "status": result.status,
+        "wall_time_seconds": result.wall_time_seconds,
+        "first_solution_seconds": result.first_solution_seconds,
+        "last_improvement_seconds": improvements[-1] if improvements else None,
+        "max_improvement_interval_seconds": max(intervals) if intervals else None,
+        "objective_value": result.objective_value,
+        "best_bound": result.best_bound,
+        "relative_gap": result.relative_gap,
+        "time_limit_seconds": budget.time_limit_seconds,
+        "stall_seconds": budget.stall_seconds,
+        "stopped_early": int(result.stopped_early),
+        "gap_curve": json.dumps(result.gap_curve),
+    }
+    columns = ", ".join(row)
+    placeholders = ", ".join(f":{name}" for name in row)
+
+    with _ledger_lock:
+        try:
+            _similar_cache.clear()
+            with _connect() as conn:
+                conn.execute(f"INSERT INTO solves ({columns}) VALUES ({placeholders})", row)
+                conn.execute(
+                    "DELETE FROM solves WHERE id <= (SELECT MAX(id) FROM solves) - ?",
+                    (MAX_LEDGER_ROWS,),
+                )
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"[SolveLedger] Could not record solve: {e}", file=sys.stderr)
+
+
+def similar_solves(
+    features: Dict[str, Any],
+    backend: Optional[SolverBackend] = None,
+    limit: int = MAX_SIMILAR_SOLVES
+) -> List[sqlite3.Row]:
+    """
+    Summaries (_SUMMARY_COLUMNS) of the most recent past solves with the same
+    strategy, shape, promo presence and size band, newest first.
+    """
+    if LEDGER_PATH is None:
+        return []
+
+    band = size_band(features["num_accounts"])
+    has_promos = features["num_promos"] > 0
+    key = (LEDGER_PATH, features["strategy"], features["payment_shape"], features["horizon_months"],
+           band, has_promos, backend, limit)
+    now = time.monotonic()
+    cached = _similar_cache.get(key)
+    if cached is not None and now - cached[0] < SIMILAR_SOLVES_CACHE_SECONDS:
+        return list(cached[1])
+
+    low, high = _SIZE_BANDS[band]
+    query = (
+        f"SELECT {_SUMMARY_COLUMNS} FROM solves"
+        " WHERE strategy = ? AND payment_shape = ? AND horizon_months = ? AND num_accounts >= ?"
+    )
+    params: List[Any] = [features["strategy"], features["payment_shape"], features["horizon_months"], low]
+    if high is not None:
+        query += " AND num_accounts <= ?"
+        params.append(high)
+    query += " AND num_promos > 0" if has_promos else " AND num_promos = 0"
+    if backend is not None:
+        query += " AND backend = ?"
+        params.append(backend.value)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+
+    try:
+        with _ledger_lock:
+            conn = _connect()
+            try:
+                rows = conn.execute(query, params).fetchall()
+            finally:
+                conn.close()
+            if len(_similar_cache) >= 1000:
+                _similar_cache.clear()
+            _similar_cache[key] = (now, rows)
+    except sqlite3.Error as e:
+        print(f"[SolveLedger] Could not read ledger: {e}", file=sys.stderr)
+        return []
+    return list(rows)
+
+
+def _p90(values: List[float]) -> float:
+    return quantiles(values, n=10, method="inclusive")[-1] if len(values) > 1 else values[0]
+
+
+def predict_solve_budget(portfolio: DebtPortfolio, backend: SolverBackend) -> SolveBudget:
+    """
+    Predict a time limit and stall rule from similar past solves.
+
+    - Time limit: 90th percentile of the time similar solves needed to prove
+      optimality or infeasibility, with headroom. Cases that mostly time out
+      (FEASIBLE or UNKNOWN) get the maximum.
+    - Stall rule: 90th percentile of the longest wait between improving
+      solutions, with headroom; waiting longer rarely finds a better plan.
+    Falls back to the flat default when there is not enough history.
+    """
+    default = SolveBudget(time_limit_seconds=SOLVER_TIME_LIMIT_SECONDS)
+    history = [row for row in similar_solves(portfolio_features(portfolio), backend) if not row["stopped_early"]]
+    if len(history) < MIN_SAMPLES_FOR_PREDICTION:
+        return default
+
+    proven = [row for row in history if row["status"] in _PROVEN_STATUSES]
+    optimal = [row for row in proven if row["status"] == "OPTIMAL"]
+    timed_out_share = sum(row["status"] in _TIMED_OUT_STATUSES for row in history) / len(history)
+    basis = f"history (n={len(history)})"
+
+    if timed_out_share >= HARD_CASE_TIMEOUT_SHARE:
+        time_limit = MAX_TIME_LIMIT_SECONDS
+    elif proven:
+        time_limit = _p90([row["wall_time_seconds"] for row in proven]) * TIME_LIMIT_HEADROOM
+        time_limit = min(max(time_limit, MIN_TIME_LIMIT_SECONDS), MAX_TIME_LIMIT_SECONDS)
+    else:
+        # Only invalid or cancelled solves: nothing to learn a time from
+        time_limit = SOLVER_TIME_LIMIT_SECONDS
+
+    stall_seconds = None
+    intervals = [row["max_improvement_interval_seconds"] for row in optimal
+                 if row["max_improvement_interval_seconds"] is not None]
+    if backend == SolverBackend.CP_SAT and len(intervals) >= MIN_SAMPLES_FOR_PREDICTION:
+        stall_seconds = max(_p90(intervals) * STALL_HEADROOM, MIN_STALL_SECONDS)
+
+    return SolveBudget(time_limit_seconds=time_limit, stall_seconds=stall_seconds, basis=basis)
@@ -1,8 +1,13 @@
 import sys
+import argparse
+import bisect
+import json
+import threading
+import time
 from dataclasses import dataclass, field
 from datetime import date
 from enum import Enum
-from typing import List, Optional, Dict, Tuple
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Dict, Tuple
 
 # Ensure we are using Python 3.10+
 assert sys.version_info >= (3, 10), "Python 3.10 or higher is required."
@@ -12,6 +17,9 @@ from ortools.sat.python import cp_model
 # Import the relativedelta object for date calculations
 from dateutil.relativedelta import relativedelta
 
+if TYPE_CHECKING:
+    from solver_profiler import SolveProfile
+
 # --- Enums for User Choices based on the product document ---
 
 class AccountType(str, Enum):
@@ -50,6 +58,43 @@ class PaymentShape(str, Enum):
     LINEAR_PER_ACCOUNT = "Linear (Same Amount Per Account)"
     OPTIMIZED_MONTH_TO_MONTH = "Optimized (Variable Amounts)"
 
+class SolverBackend(str, Enum):
+    """
+    Defines which solver is used to optimize the repayment model.
+    AUTO picks CP-SAT or MIP from portfolio features and benchmark history.
+    LP_RELAXATION returns an instant lower bound on the objective, not a plan.
+    """
+    AUTO = "Auto"
+    CP_SAT = "CP-SAT"
+    MIP = "MIP (SCIP)"
+    LP_RELAXATION = "LP Relaxation (GLOP)"
+
+class MonetaryPrecision(str, Enum):
+    """
+    Defines the monetary unit the model is solved in.
+    Coarser units shrink integer domains (and solve times) on large balances;
+    the plan is then corrected by an exact-cents simulation pass.
+    """
+    EXACT = "Exact (1p)"
+    TEN_PENCE = "10p"
+    WHOLE_POUNDS = "£1"
+
+
+# --- Solver Configuration ---
+
+# The planning horizon in months (10 years)
+PLAN_HORIZON_MONTHS = 120
+
+# Wall-clock limit for a single solve
+SOLVER_TIME_LIMIT_SECONDS = 60.0
+
+# Size of one model unit in cents for each precision mode
+PRECISION_UNIT_CENTS: Dict[MonetaryPrecision, int] = {
+    MonetaryPrecision.EXACT: 1,
+    MonetaryPrecision.TEN_PENCE: 10,
+    MonetaryPrecision.WHOLE_POUNDS: 100,
+}
+
 
 # --- Core Data Structures ---
 
@@ -141,7 +186,8 @@ class Account:
     def get_effective_apr_bps(self, current_date: Optional[date] = None) -> int:
         """
         Get the weighted average APR across all buckets, or standard APR if no buckets.
-        This is used for account-level optimization when buckets exist.
+        This is a summary of the starting balances only: the engines model each
+        bucket's balance separately (see PortfolioTimeline.segments).
         
         For promo buckets:
         - If current_date is before promo_expiry_date, that bucket contributes 0 APR
@@ -208,6 +254,8 @@ class UserPreferences:
     """
     strategy: OptimizationStrategy
     payment_shape: PaymentShape
+    solver_backend: SolverBackend = SolverBackend.AUTO
+    precision: MonetaryPrecision = MonetaryPrecision.EXACT
 
 
 @dataclass
@@ -235,46 +283,122 @@ class MonthlyResult:
     ending_balance_cents: int
 
 
-# --- Solver Function ---
+@dataclass
+class PlanArrays:
+    """
+    Solved values extracted in bulk: one row per account (portfolio order),
+    one column per month of the planning horizon.
+    """
+    payments: List[List[int]]
+    interest: List[List[int]]
+    balances: List[List[int]]
 
-def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResult]]:
+
+@dataclass
+class AlternativePlan:
     """
-    Creates, solves, and returns a debt repayment optimization plan.
-    Args:
-        portfolio: A DebtPortfolio object containing all accounts, budget,
-                   and user preferences.
-    Returns:
-        A list of MonthlyResult objects representing the plan, or None if no
-        solution is found.
+    A near-optimal plan: passed through by the primary plan's search, or
+    re-solved within tolerance of its objective and apart from the plans
+    picked before it.
+    distance_from_best is the normalized L1 distance of its payment vector
+    from the primary plan's (0 = identical, 1 = nothing in common).
     """
-    # 1. Create the main model object.
-    model = cp_model.CpModel()
-    print("Model canvas created. Ready to define variables.")
+    objective_value: float
+    distance_from_best: float
+    results: List[MonthlyResult]
 
-    # 2. Define the time horizon for the plan.
-    max_months: int = 120 # 10 years
-    
-    # 3. Create dictionaries to hold our decision variables.
-    payments: Dict[Tuple[str, int], cp_model.IntVar] = {}
-    balances: Dict[Tuple[str, int], cp_model.IntVar] = {}
-    interest_charged: Dict[Tuple[str, int], cp_model.IntVar] = {}
-    is_active: Dict[Tuple[str, int], cp_model.IntVar] = {} # Boolean: is there a balance?
 
+@dataclass
+class PlanSolveResult:
+    """
+    The outcome of a single solve, independent of the backend that produced it.
+    For LP_RELAXATION solves, results is None and best_bound holds the lower bound.
+    """
+    status: str  # e.g., "OPTIMAL", "FEASIBLE", "INFEASIBLE", "LOWER_BOUND", "MODEL_INVALID", "CANCELLED"
+    backend: SolverBackend
+    results: Optional[List[MonthlyResult]] = None
+    objective_value: Optional[float] = None
+    best_bound: Optional[float] = None
+    wall_time_seconds: float = 0.0
+    # Scaled-precision solves only: model unit size, and how far the model's
+    # total interest was from the exact-cents simulation (model - exact)
+    precision_unit_cents: int = 1
+    approximation_error_cents: Optional[int] = None
+    # Diverse near-optimal alternatives (CP-SAT only, when requested)
+    alternatives: List[AlternativePlan] = field(default_factory=list)
+    # Telemetry; None where the backend does not report a value
+    fast_path: Optional[str] = None  # Set when no model was solved, e.g. "zero-balance"
+    build_seconds: Optional[float] = None  # Model construction time, before the solve starts
+    user_time_seconds: Optional[float] = None
+    num_branches: Optional[int] = None
+    num_conflicts: Optional[int] = None
+    num_solutions: int = 0
+    first_solution_seconds: Optional[float] = None
+    num_variables: int = 0
+    num_constraints: int = 0
+    # (seconds, objective, best bound) at each solution found
+    gap_curve: List[Tuple[float, float, float]] = field(default_factory=list)
+    stopped_early: bool = False  # True when a stall rule ended the search before the time limit
+    cancelled: bool = False  # True when the caller cancelled the solve (the plan, if any, is the incumbent)
+
+    @property
+    def relative_gap(self) -> Optional[float]:
+        """|objective - bound| / max(1, |objective|); 0 means proven optimal."""
+        if self.objective_value is None or self.best_bound is None:
+            return None
+        return abs(self.objective_value - self.best_bound) / max(1.0, abs(self.objective_value))
+
+
+@dataclass
+class SolveProgress:
+    """
+    Live view of a running solve, for callers polling from another thread.
+    CP-SAT updates it at every solution; MIP solves don't update it (pywraplp
+    exposes no incumbent callback), so AUTO solves given one run on CP-SAT.
+    Values are in the units the model was solved in (see unit_cents).
+    """
+    num_solutions: int = 0
+    elapsed_seconds: float = 0.0
+    objective_value: Optional[float] = None
+    best_bound: Optional[float] = None
+    incumbent: Optional[PlanArrays] = None  # Best plan found so far
+    unit_cents: int = 1
+
+
+@dataclass
+class ModelDomains:
+    """
+    Pre-calculated variable domains shared by every backend's model.
+    Tighter domains improve model stability and keep big-M constants small.
+    """
+    max_possible_cents: int
+    max_possible_balance: int
+    max_interest: int
+    max_min_pay_base: int
+    max_percentage_comp: int
+    max_raw_min_pay: int
+    max_total_owed: int
+    max_numerator: int
+
+
+# --- Shared Model Helpers ---
+
+def calculate_model_domains(portfolio: DebtPortfolio, round_up_divisions: bool = False) -> ModelDomains:
+    """
+    Pre-calculate TIGHTER domains for the repayment model variables.
+    round_up_divisions widens the numerator domains for ceiling divisions.
+    """
     max_possible_cents = sum(acc.current_balance_cents for acc in portfolio.accounts)
-    if max_possible_cents == 0:
-        print("All accounts have a zero balance. Nothing to plan.")
-        return []
-    
+
     # Add a buffer for interest calculations. This domain is larger than the
     # original sum to safely accommodate accrued interest over time.
     max_possible_balance = int(max_possible_cents * 3) 
     
     print(f"Base domain max cents: {max_possible_balance}")
     
-    # --- 4. Pre-calculate TIGHTER domains to improve model stability ---
-    
     # Find the highest possible APR and Min Pay BPS in the portfolio
-    max_apr_bps = max((acc.apr_standard_bps for acc in portfolio.accounts), default=0)
+    # Bucket APRs (e.g. cash advances) can exceed the standard APR
+    max_apr_bps = max((max(acc.apr_standard_bps, acc.get_highest_apr_bps()) for acc in portfolio.accounts), default=0)
     max_min_pay_bps = max((acc.min_payment_rule.percentage_bps for acc in portfolio.accounts), default=0)
     max_min_pay_fixed = max((acc.min_payment_rule.fixed_cents for acc in portfolio.accounts), default=0)
 
@@ -306,27 +430,33 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
     # This is the largest value our numerators will *ever* need to hold
     interest_numerator_domain_max = max_possible_balance * (max_apr_bps or 1)
     min_pay_numerator_domain_max = domain_max_min_pay_base * (max_min_pay_bps or 1)
+    if round_up_divisions:
+        # Ceiling divisions add (divisor - 1) to the numerator
+        interest_numerator_domain_max += 120000 - 1
+        min_pay_numerator_domain_max += 10000 - 1
     
     # Find the absolute largest numerator domain we'll need
     max_numerator_domain = max(interest_numerator_domain_max, min_pay_numerator_domain_max)
     print(f"TIGHTENED Domain: Max numerator = {max_numerator_domain}")
-    
-    # 4. Create variables for each account for each month in the time horizon.
-    for account in portfolio.accounts:
-        for month in range(max_months):
-            key = (account.lender_name, month)
-            payments[key] = model.NewIntVar(0, max_possible_balance, f'payment_{key}')
-            balances[key] = model.NewIntVar(0, max_possible_balance, f'balance_{key}')
-            interest_charged[key] = model.NewIntVar(0, domain_max_interest, f'interest_{key}')
-            is_active[key] = model.NewBoolVar(f'is_active_{key}')
-         
-   
-    total_vars = len(payments) + len(balances) + len(interest_charged) + len(is_active)
-    print(f"Created {total_vars} variables across {max_months} months.")
-    
-    # --- Pre-calculate promo end month index for all accounts ---
-    # For accounts with buckets, the "promo end" is when the LAST promo bucket expires
-    # This is used for strategies like PAY_OFF_IN_PROMO
+
+    return ModelDomains(
+        max_possible_cents=max_possible_cents,
+        max_possible_balance=max_possible_balance,
+        max_interest=domain_max_interest,
+        max_min_pay_base=domain_max_min_pay_base,
+        max_percentage_comp=domain_max_percentage_comp,
+        max_raw_min_pay=domain_max_raw_min_pay,
+        max_total_owed=domain_max_total_owed,
+        max_numerator=max_numerator_domain,
+    )
+
+
+def calculate_promo_end_month_map(portfolio: DebtPortfolio) -> Dict[str, int]:
+    """
+    Pre-calculate the promo end month index (0-indexed) for all accounts.
+    For accounts with buckets, the "promo end" is when the LAST promo bucket expires.
+    Accounts without a promo map to -1.
+    """
     print("...calculating promotional period end dates...")
     promo_end_month_map: Dict[str, int] = {}
     for account in portfolio.accounts:
@@ -356,6 +486,660 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
             promo_month_index = account.promo_duration_months - 1
             
         promo_end_month_map[account.lender_name] = promo_month_index
+    return promo_end_month_map
+
+
+def calculate_monthly_budgets(portfolio: DebtPortfolio, max_months: int) -> List[int]:
+    """
+    Resolve the budget available in each month of the horizon, applying
+    future budget changes and adding one-time lump sums.
+    """
+    return build_portfolio_timeline(portfolio, max_months).monthly_budgets
+
+
+@dataclass
+class BalanceSegment:
+    """
+    Part of an account's balance that is modelled on its own: the buckets
+    sharing one APR schedule (e.g. two purchase balances at the same rate),
+    or the whole balance of an account without buckets.
+    apr_bps is the APR charged in each month, 0 during a promo.
+    """
+    label: str
+    balance_cents: int
+    apr_bps: List[int]
+
+
+@dataclass
+class PortfolioTimeline:
+    """
+    Month-by-month schedules of a portfolio over the planning horizon,
+    resolved once per solve and shared by every engine and the simulators:
+    - month_dates: the date each month starts (plan_start_date + month)
+    - monthly_budgets: the budget per month, with future changes and lump sums applied
+    - segments: per account (by lender_name), its balance segments with their APR schedules
+    - pooled_into: per account and month, the segment each segment is modelled
+      as from that month on (see segment_pooling)
+    - promo_end_months: per account, the last promo month index (-1 = none)
+    """
+    max_months: int
+    month_dates: List[date]
+    monthly_budgets: List[int]
+    segments: Dict[str, List[BalanceSegment]]
+    pooled_into: Dict[str, List[List[int]]]
+    promo_end_months: Dict[str, int]
+
+    def active_segments(self, lender_name: str, month: int) -> List[int]:
+        """Indices of the segments modelled separately in a month."""
+        return [s for s, pooled in enumerate(self.pooled_into[lender_name][month]) if pooled == s]
+
+    def pooled_from(self, lender_name: str, month: int, segment: int) -> List[int]:
+        """The previous month's active segments whose balances carry into `segment`."""
+        pooled_into = self.pooled_into[lender_name][month]
+        return [s for s in self.active_segments(lender_name, month - 1) if pooled_into[s] == segment]
+
+    def payment_order(self, lender_name: str, month: int) -> List[int]:
+        """
+        Active segment indices in the order a payment clears them in a month:
+        highest APR first, as UK lenders must allocate payments.
+        """
+        segments = self.segments[lender_name]
+        return sorted(self.active_segments(lender_name, month), key=lambda s: -segments[s].apr_bps[month])
+
+
+def account_segments(account: Account, month_dates: List[date], promo_end_idx: int) -> List[BalanceSegment]:
+    """
+    Split an account's balance into segments with identical APR schedules.
+    A promo bucket is charged nothing up to its expiry date and the account's
+    standard APR afterwards (UK balance transfers revert to the standard rate);
+    other buckets keep their stated APR. Buckets whose schedules match are
+    merged into one segment, so the model only grows with distinct schedules.
+    Accounts without buckets are one segment, interest-free up to promo_end_idx.
+    """
+    num_months = len(month_dates)
+    merged: Dict[Tuple[int, ...], BalanceSegment] = {}
+    for bucket in account.buckets:
+        if bucket.balance_cents == 0:
+            continue
+        if bucket.is_promo:
+            # First month whose date is past the promo expiry (0 if there is no expiry)
+            first_expired = (
+                bisect.bisect_right(month_dates, bucket.promo_expiry_date) if bucket.promo_expiry_date else 0
+            )
+            schedule = [0] * first_expired + [account.apr_standard_bps] * (num_months - first_expired)
+        else:
+            schedule = [bucket.apr_bps] * num_months
+        label = bucket.label or bucket.bucket_type.value
+        segment = merged.get(tuple(schedule))
+        if segment is None:
+            merged[tuple(schedule)] = BalanceSegment(label=label, balance_cents=bucket.balance_cents, apr_bps=schedule)
+        else:
+            segment.label = f"{segment.label} + {label}"
+            segment.balance_cents += bucket.balance_cents
+
+    segments = list(merged.values())
+    if not segments:
+        schedule = [0 if month <= promo_end_idx else account.apr_standard_bps for month in range(num_months)]
+        return [BalanceSegment(label=account.lender_name, balance_cents=account.current_balance_cents, apr_bps=schedule)]
+
+    # Bucket totals may be a cent off the account balance; the largest segment absorbs it
+    largest = max(segments, key=lambda s: s.balance_cents)
+    largest.balance_cents = max(largest.balance_cents + account.current_balance_cents
+                                - sum(s.balance_cents for s in segments), 0)
+    return segments
+
+
+def segment_pooling(segments: List[BalanceSegment], num_months: int) -> List[List[int]]:
+    """
+    For each month, the segment each segment is pooled into. Segments whose
+    APR schedules agree for the rest of the horizon (e.g. an expired balance
+    transfer and purchases at the standard rate) are modelled as one from
+    that month on, under the lowest index among them.
+    """
+    pooled_into: List[List[int]] = [[] for _ in range(num_months)]
+    later: List[Optional[int]] = [None] * len(segments)  # pooling from the next month on
+    for month in reversed(range(num_months)):
+        first_with_tail: Dict[Tuple[int, Optional[int]], int] = {}
+        for s, segment in enumerate(segments):
+            pooled_into[month].append(first_with_tail.setdefault((segment.apr_bps[month], later[s]), s))
+        later = pooled_into[month]
+    return pooled_into
+
+
+def build_portfolio_timeline(portfolio: DebtPortfolio, max_months: int = PLAN_HORIZON_MONTHS) -> PortfolioTimeline:
+    """
+    Resolve the portfolio's month dates, budgets, balance segments and promo
+    end months once. Future budget changes are sorted once and swept alongside
+    the months, instead of being re-sorted and re-scanned every month.
+    """
+    start = portfolio.plan_start_date
+    month_dates = [start + relativedelta(months=month) for month in range(max_months)]
+
+    lump_sums = [0] * max_months
+    for payment_date, amount_cents in portfolio.budget.lump_sum_payments:
+        month_diff = (payment_date.year - start.year) * 12 + (payment_date.month - start.month)
+        if 0 <= month_diff < max_months:
+            lump_sums[month_diff] += amount_cents
+
+    changes = sorted(portfolio.budget.future_changes)
+    monthly_budgets: List[int] = []
+    recurring_budget = portfolio.budget.monthly_budget_cents
+    next_change = 0
+    for month, month_date in enumerate(month_dates):
+        while next_change < len(changes) and changes[next_change][0] <= month_date:
+            recurring_budget = changes[next_change][1]
+            next_change += 1
+        monthly_budgets.append(recurring_budget + lump_sums[month])
+
+    promo_end_months = calculate_promo_end_month_map(portfolio)
+    segments = {
+        acc.lender_name: account_segments(acc, month_dates, promo_end_months[acc.lender_name])
+        for acc in portfolio.accounts
+    }
+    return PortfolioTimeline(
+        max_months=max_months,
+        month_dates=month_dates,
+        monthly_budgets=monthly_budgets,
+        segments=segments,
+        pooled_into={name: segment_pooling(account_segs, max_months) for name, account_segs in segments.items()},
+        promo_end_months=promo_end_months,
+    )
+
+
+def validate_strategy_requirements(portfolio: DebtPortfolio, promo_end_month_map: Dict[str, int]) -> None:
+    """Raise ValueError if the portfolio cannot be planned with the chosen strategy."""
+    if portfolio.preferences.strategy != OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS:
+        return
+
+    non_promo_accounts = [name for name, idx in promo_end_month_map.items() if idx == -1]
+
+    # Validation: This strategy is only valid if ALL accounts have promos.
+    if non_promo_accounts:
+        raise ValueError(
+            f"The '{OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS.value}' strategy is only valid "
+            f"when ALL accounts have a promotional period. The following accounts do not: {non_promo_accounts}"
+        )
+    
+    if not promo_end_month_map:
+        raise ValueError(
+            f"The '{OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS.value}' strategy requires "
+            f"at least one account with a promotional period."
+        )
+
+
+def plan_variable_indices(
+    portfolio: DebtPortfolio,
+    max_months: int,
+    payments: Dict[Tuple[str, int], cp_model.IntVar],
+    interest_charged: Dict[Tuple[str, int], cp_model.IntVar],
+    balances: Dict[Tuple[str, int], cp_model.IntVar]
+) -> List[List[List[int]]]:
+    """Solution-vector indices of the payment, interest and balance variables, per account and month."""
+    return [
+        [[variables[(acc.lender_name, month)].Index() for month in range(max_months)]
+         for acc in portfolio.accounts]
+        for variables in (payments, interest_charged, balances)
+    ]
+
+
+def plan_arrays_from_solution(solution: List[int], indices: List[List[List[int]]]) -> PlanArrays:
+    """Read a plan out of a CP-SAT solution vector using plan_variable_indices."""
+    payment_idx, interest_idx, balance_idx = indices
+    return PlanArrays(
+        payments=[[solution[i] for i in row] for row in payment_idx],
+        interest=[[solution[i] for i in row] for row in interest_idx],
+        balances=[[solution[i] for i in row] for row in balance_idx],
+    )
+
+
+def collect_monthly_results(portfolio: DebtPortfolio, plan_arrays: PlanArrays) -> List[MonthlyResult]:
+    """
+    Build the MonthlyResult list from bulk-extracted solution arrays.
+    Previous balances are read from the same arrays, so no solver calls are made here.
+    """
+    results_list: List[MonthlyResult] = []
+    max_months = len(plan_arrays.balances[0]) if plan_arrays.balances else 0
+    starting_balances = [acc.current_balance_cents for acc in portfolio.accounts]
+
+    for month in range(max_months):
+        previous_balances = starting_balances if month == 0 else [row[month - 1] for row in plan_arrays.balances]
+
+        # Optimization: if all balances are zero, we can stop.
+        if sum(previous_balances) <= 0:
+            print(f"All balances at zero or below. Stopping at month {month + 1}.")
+            break
+
+        for idx, account in enumerate(portfolio.accounts):
+            prev_balance = previous_balances[idx]
+            payment = plan_arrays.payments[idx][month]
+            interest = plan_arrays.interest[idx][month]
+            ending_balance = plan_arrays.balances[idx][month]
+
+            # DEBUG: Check for minimum payment violations
+            if prev_balance > 0 and payment == 0:
+                print(f"⚠️  WARNING: {account.lender_name} month {month+1} has prev_balance=${prev_balance/100:.2f} but payment=$0.00!")
+
+            # Only append if there's activity. This cleans up the final log.
+            is_active_last_month = (month > 0 and prev_balance > 0)
+            if payment > 0 or ending_balance > 0 or interest > 0 or is_active_last_month:
+                results_list.append(MonthlyResult(
+                    month=month + 1,
+                    lender_name=account.lender_name,
+                    payment_cents=payment,
+                    interest_charged_cents=interest,
+                    ending_balance_cents=ending_balance,
+                ))
+
+    return results_list
+
+
+def build_columnar_plan(portfolio: DebtPortfolio, results_list: List[MonthlyResult]) -> Dict[str, object]:
+    """
+    Pivot a plan into columns: one row per lender (portfolio order), one column per month.
+    Months in which an account is inactive hold zeros. Totals per account and per
+    plan year are precomputed so clients never need to walk the full grid.
+    """
+    lenders = [acc.lender_name for acc in portfolio.accounts]
+    lender_index = {name: idx for idx, name in enumerate(lenders)}
+    num_months = max((r.month for r in results_list), default=0)
+    num_years = (num_months + 11) // 12
+
+    payments = [[0] * num_months for _ in lenders]
+    balances = [[0] * num_months for _ in lenders]
+    interest = [[0] * num_months for _ in lenders]
+    paid_by_year = [0] * num_years
+    interest_by_year = [0] * num_years
+
+    for r in results_list:
+        idx = lender_index[r.lender_name]
+        col = r.month - 1
+        payments[idx][col] = r.payment_cents
+        balances[idx][col] = r.ending_balance_cents
+        interest[idx][col] = r.interest_charged_cents
+        paid_by_year[col // 12] += r.payment_cents
+        interest_by_year[col // 12] += r.interest_charged_cents
+
+    return {
+        "lenders": lenders,
+        "months": num_months,
+        "payments": payments,
+        "balances": balances,
+        "interest": interest,
+        "total_paid_by_account": [sum(row) for row in payments],
+        "total_interest_by_account": [sum(row) for row in interest],
+        "total_paid_by_year": paid_by_year,
+        "total_interest_by_year": interest_by_year,
+    }
+
+
+def print_plan_summary(portfolio: DebtPortfolio, results_list: List[MonthlyResult]) -> None:
+    """Print interest totals and the month-by-month plan."""
+    print("\n--- Plan Summary ---")
+    
+    # i. Total interest for the entire plan..
+    total_interest = sum(r.interest_charged_cents for r in results_list)
+    print(f"Minimized Total Interest Paid: ${total_interest / 100.0:,.2f}")
+    
+    # ii. Total interest per account.
+    print("\nInterest Breakdown by Account:")
+    interest_by_account: Dict[str, int] = {acc.lender_name: 0 for acc in portfolio.accounts}
+    for res in results_list:
+        interest_by_account[res.lender_name] += res.interest_charged_cents
+    for name, total_cents in interest_by_account.items():
+         print(f"  - {name}: ${total_cents / 100.0:,.2f}")
+         
+    # iii. Total interest per year.
+    print("\nInterest Breakdown by Year:")
+    interest_by_year: Dict[int, int] = {}
+    for res in results_list:
+        year = (res.month - 1) // 12 + 1
+        interest_by_year[year] = interest_by_year.get(year, 0) + res.interest_charged_cents
+    for year, total_cents in sorted(interest_by_year.items()):
+        print(f"  - Year {year}: ${total_cents / 100.0:,.2f}")
+    
+    # e. Print the detailed month-by-month plan.
+    print("\n--- Optimized Payment Plan Details ---")
+    last_month_printed = -1
+    
+    payoff_month = 0
+    if results_list:
+        # The payoff month is the highest month number in the results list,
+        # because the loop breaks when all balances hit zero.
+        payoff_month = max(r.month for r in results_list)
+
+    for res in results_list:
+        # Only print rows where a payment was made
+        if res.payment_cents > 0:
+            if res.month != last_month_printed:
+                print(f'\n--- Month {res.month} ---')
+                last_month_printed = res.month
+            
+            payment_str = f"${res.payment_cents / 100.0:,.2f}"
+            interest_str = f"${res.interest_charged_cents / 100.0:,.2f}"
+            balance_str = f"${res.ending_balance_cents / 100.0:,.2f}"
+    
+            print(f"  - {res.lender_name}: Pay {payment_str} "
+                  f"(Interest: {interest_str}, New Balance: {balance_str})")
+
+    print(f"\n🎉 All accounts paid off in {payoff_month} months!")
+
+
+def print_no_solution(status_name: str) -> None:
+    """Explain why no plan was produced."""
+    print(f"\n❌ Solution Not Found. Status: {status_name}")
+    if status_name == "INFEASIBLE":
+        print("Model is INFEASIBLE. This often means the monthly budget is less than the")
+        print("sum of the minimum payments, or the payoff constraint could not be met.")
+    elif status_name == "MODEL_INVALID":
+        print("Model is INVALID. This is a critical error in the solver's constraint logic.")
+        print("The most recent change (e.g., complex minimum payments) likely introduced")
+        print("a contradictory or malformed rule (e.g., type ambiguity, circular dependency).")
+        print("Please review the `model.Validate()` output above.")
+    else:
+        print(f"The solver stopped for an unknown reason: {status_name}")
+
+
+# --- Input Conversion ---
+
+def portfolio_from_schema(portfolio_schema: Any) -> DebtPortfolio:
+    """
+    Converts an API schemas.DebtPortfolio (Pydantic) into the solver's dataclasses.
+    Shared by the API and the command-line tools.
+    """
+    solver_accounts = []
+    for acc_schema in portfolio_schema.accounts:
+        # Convert the nested Pydantic MinPaymentRule to the solver's dataclass
+        solver_rule = MinPaymentRule(**acc_schema.min_payment_rule.model_dump())
+
+        # Convert buckets if present
+        # Filter bucket_data to only include valid DebtBucket dataclass fields
+        # to avoid TypeError when database fields like "id" are present
+        solver_bucket_fields = {'bucket_type', 'balance_cents', 'apr_bps', 'is_promo', 'promo_expiry_date', 'label'}
+        solver_buckets = []
+        for bucket_schema in acc_schema.buckets:
+            bucket_data = bucket_schema.model_dump()
+            filtered_bucket_data = {k: v for k, v in bucket_data.items() if k in solver_bucket_fields}
+            solver_buckets.append(DebtBucket(**filtered_bucket_data))
+
+        # Exclude the rule and buckets from the main account data to avoid TypeError
+        acc_data = acc_schema.model_dump(exclude={'min_payment_rule', 'buckets'})
+        solver_accounts.append(Account(
+            min_payment_rule=solver_rule,
+            buckets=solver_buckets,
+            **acc_data
+        ))
+
+    return DebtPortfolio(
+        accounts=solver_accounts,
+        budget=Budget(**portfolio_schema.budget.model_dump()),
+        preferences=UserPreferences(**portfolio_schema.preferences.model_dump()),
+        plan_start_date=portfolio_schema.plan_start_date
+    )
+
+
+def load_portfolio_json(path: str) -> DebtPortfolio:
+    """Load a portfolio saved in the /generate-plan request format."""
+    import schemas
+    with open(path, "r") as f:
+        return portfolio_from_schema(schemas.DebtPortfolio.model_validate(json.load(f)))
+
+
+# --- Solver Function ---
+
+def generate_payment_plan(
+    portfolio: DebtPortfolio,
+    backend: SolverBackend = SolverBackend.CP_SAT
+) -> Optional[List[MonthlyResult]]:
+    """
+    Creates, solves, and returns a debt repayment optimization plan.
+    Args:
+        portfolio: A DebtPortfolio object containing all accounts, budget,
+                   and user preferences.
+        backend: The solver backend to use (defaults to CP-SAT).
+    Returns:
+        A list of MonthlyResult objects representing the plan, or None if no
+        solution is found.
+    """
+    return solve_payment_plan(portfolio, backend).results
+
+
+def solve_payment_plan(
+    portfolio: DebtPortfolio,
+    backend: Optional[SolverBackend] = None,
+    num_alternatives: int = 0,
+    profile: Optional["SolveProfile"] = None,
+    time_limit_seconds: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    progress: Optional[SolveProgress] = None
+) -> PlanSolveResult:
+    """
+    Solves the repayment model with the requested backend.
+    If backend is None, the portfolio's preferred solver_backend is used.
+    AUTO resolves to a concrete backend via backend_selector.select_backend,
+    or to CP-SAT when alternatives are requested or progress is given (only
+    its search collects alternatives and publishes incumbents as it goes).
+    num_alternatives > 0 also returns that many diverse near-optimal plans:
+    fewer come back only when no more plans within tolerance of the best
+    objective differ enough from those already picked, a re-solve for one
+    times out, or the solve is cancelled (see plan_pool).
+    A SolveProfile collects timings and model statistics from CP-SAT solves.
+    The time limit (and CP-SAT stall rule) is predicted from similar past
+    solves in the solve ledger unless time_limit_seconds is given.
+    Setting cancel_event (e.g. on client disconnect) stops the search early.
+    A SolveProgress is kept up to date with the best plan found so far.
+    Returns a PlanSolveResult carrying the plan (if any), status and bounds.
+    """
+    if backend is None:
+        backend = portfolio.preferences.solver_backend
+
+    if sum(acc.current_balance_cents for acc in portfolio.accounts) == 0:
+        print("All accounts have a zero balance. Nothing to plan.")
+        return PlanSolveResult(
+            status="OPTIMAL", backend=backend, results=[], objective_value=0, best_bound=0, fast_path="zero-balance"
+        )
+
+    if cancel_event is not None and cancel_event.is_set():
+        print("Solve cancelled before it started.")
+        return PlanSolveResult(status="CANCELLED", backend=backend, cancelled=True)
+
+    from backend_selector import select_backend
+    from solve_ledger import SolveBudget, predict_solve_budget, record_solve
+
+    if backend == SolverBackend.AUTO:
+        needs_search = num_alternatives > 0 or progress is not None
+        backend = SolverBackend.CP_SAT if needs_search else select_backend(portfolio)
+        print(f"Auto-selected solver backend: {backend.value}")
+    if num_alternatives > 0 and backend != SolverBackend.CP_SAT:
+        print(f"Alternative plans are only collected by CP-SAT; {backend.value} returns a single plan.")
+    if progress is not None and backend != SolverBackend.CP_SAT:
+        print(f"Only CP-SAT publishes plans as it finds them; {backend.value} reports its final plan only.")
+
+    if time_limit_seconds is not None:
+        budget = SolveBudget(time_limit_seconds=time_limit_seconds, basis="explicit")
+    elif backend == SolverBackend.LP_RELAXATION:
+        budget = SolveBudget(time_limit_seconds=SOLVER_TIME_LIMIT_SECONDS)
+    else:
+        budget = predict_solve_budget(portfolio, backend)
+    stall_note = f", stop after {budget.stall_seconds:.1f}s without improvement" if budget.stall_seconds else ""
+    print(f"Time budget: {budget.time_limit_seconds:.1f}s{stall_note} ({budget.basis})")
+
+    # Coarser precision: solve a conservatively scaled copy of the portfolio
+    unit_cents = PRECISION_UNIT_CENTS[MonetaryPrecision(portfolio.preferences.precision)]
+    model_portfolio = portfolio
+    if unit_cents > 1:
+        from plan_simulator import scale_portfolio
+        model_portfolio = scale_portfolio(portfolio, unit_cents)
+        print(f"Solving in units of {unit_cents} cents ({portfolio.preferences.precision.value})")
+    if progress is not None:
+        progress.unit_cents = unit_cents
+
+    # Budgets, APRs and promo ends are resolved once for the model and the replay
+    timeline = build_portfolio_timeline(portfolio)
+    model_timeline = build_portfolio_timeline(model_portfolio) if unit_cents > 1 else timeline
+
+    if backend == SolverBackend.CP_SAT:
+        result = _solve_with_cp_sat(
+            model_portfolio,
+            round_up_divisions=unit_cents > 1,
+            num_alternatives=num_alternatives,
+            profile=profile,
+            time_limit_seconds=budget.time_limit_seconds,
+            stall_seconds=budget.stall_seconds,
+            cancel_event=cancel_event,
+            progress=progress,
+            timeline=model_timeline
+        )
+    else:
+        from mip_engine import solve_with_mip
+        result = solve_with_mip(
+            model_portfolio,
+            relax=(backend == SolverBackend.LP_RELAXATION),
+            round_up_divisions=unit_cents > 1,
+            time_limit_seconds=budget.time_limit_seconds,
+            cancel_event=cancel_event,
+            timeline=model_timeline
+        )
+
+    if unit_cents > 1:
+        from plan_simulator import correct_scaled_plan
+        result = correct_scaled_plan(portfolio, result, unit_cents, timeline)
+
+    record_solve(portfolio, result, budget)
+    return result
+
+
+class SolutionTimer(cp_model.CpSolverSolutionCallback):
+    """
+    Counts solutions, records the wall time at which the first was found,
+    and the gap curve: (seconds, objective, best bound) at every solution.
+    With a SolveProgress (and the plan's plan_variable_indices), each
+    solution is also published there as the incumbent plan.
+    """
+
+    def __init__(
+        self,
+        progress: Optional[SolveProgress] = None,
+        plan_indices: Optional[List[List[List[int]]]] = None
+    ):
+        super().__init__()
+        self._progress = progress
+        self._plan_indices = plan_indices
+        self.num_solutions = 0
+        self.first_solution_seconds: Optional[float] = None
+        self.gap_curve: List[Tuple[float, float, float]] = []
+        # time.monotonic() of the latest solution, read by the stall watchdog
+        self.last_solution_monotonic: Optional[float] = None
+
+    def OnSolutionCallback(self) -> None:
+        seconds = self.WallTime()
+        if self.first_solution_seconds is None:
+            self.first_solution_seconds = seconds
+        self.num_solutions += 1
+        self.gap_curve.append((seconds, self.ObjectiveValue(), self.BestObjectiveBound()))
+        self.last_solution_monotonic = time.monotonic()
+
+        if self._progress is not None:
+            if self._plan_indices is not None:
+                self._progress.incumbent = plan_arrays_from_solution(list(self.Response().solution), self._plan_indices)
+            self._progress.num_solutions = self.num_solutions
+            self._progress.elapsed_seconds = seconds
+            self._progress.objective_value = self.ObjectiveValue()
+            self._progress.best_bound = self.BestObjectiveBound()
+
+
+def start_search_watchdog(
+    stop_search: Callable[[], object],
+    cancel_event: Optional[threading.Event] = None,
+    timer: Optional[SolutionTimer] = None,
+    stall_seconds: Optional[float] = None
+) -> Tuple[threading.Event, List[Optional[str]]]:
+    """
+    Poll in the background and call stop_search (e.g. CpSolver.StopSearch)
+    when cancel_event is set or, once a plan exists, when no better one was
+    found for stall_seconds. Stops are repeated until the search ends, so a
+    cancel that races with the start of the search is not lost.
+    Returns (done event to set after the solve, [stop reason: None, "cancelled" or "stalled"]).
+    """
+    done = threading.Event()
+    stop_reason: List[Optional[str]] = [None]
+
+    def watch() -> None:
+        while not done.wait(0.25):
+            if cancel_event is not None and cancel_event.is_set():
+                if stop_reason[0] is None:
+                    print("Solve cancelled. Stopping the search.")
+                stop_reason[0] = "cancelled"
+            elif stall_seconds is not None and timer is not None and stop_reason[0] is None:
+                last = timer.last_solution_monotonic
+                if last is not None and time.monotonic() - last >= stall_seconds:
+                    print(f"No better plan for {stall_seconds:.1f}s. Stopping the search early.")
+                    stop_reason[0] = "stalled"
+            if stop_reason[0] is not None:
+                stop_search()
+
+    threading.Thread(target=watch, name="solver-search-watchdog", daemon=True).start()
+    return done, stop_reason
+
+
+def _solve_with_cp_sat(
+    portfolio: DebtPortfolio,
+    round_up_divisions: bool = False,
+    num_alternatives: int = 0,
+    profile: Optional["SolveProfile"] = None,
+    time_limit_seconds: float = SOLVER_TIME_LIMIT_SECONDS,
+    stall_seconds: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    progress: Optional[SolveProgress] = None,
+    timeline: Optional[PortfolioTimeline] = None
+) -> PlanSolveResult:
+    """
+    Builds and solves the repayment model with CP-SAT.
+    round_up_divisions rounds interest and min-pay percentages UP instead of
+    down, which keeps a scaled-precision model conservative.
+    If a profile is given, build time, model statistics and the search log are recorded in it.
+    With stall_seconds, the search stops once no better plan was found for that long.
+    Setting cancel_event stops the search as soon as possible.
+    A SolveProgress receives every solution's plan as the search runs.
+    The portfolio's timeline is built here unless the caller already has one.
+    """
+    build_start = time.perf_counter()
+
+    # 1. Create the main model object.
+    model = cp_model.CpModel()
+    print("Model canvas created. Ready to define variables.")
+
+    # 2. Define the time horizon for the plan.
+    max_months: int = PLAN_HORIZON_MONTHS
+    
+    # 3. Create dictionaries to hold our decision variables.
+    payments: Dict[Tuple[str, int], cp_model.IntVar] = {}
+    balances: Dict[Tuple[str, int], cp_model.IntVar] = {}
+    interest_charged: Dict[Tuple[str, int], cp_model.IntVar] = {}
+    is_active: Dict[Tuple[str, int], cp_model.IntVar] = {} # Boolean: is there a balance?
+
+    # --- 4. Pre-calculate TIGHTER domains to improve model stability ---
+    domains = calculate_model_domains(portfolio, round_up_divisions)
+    max_possible_cents = domains.max_possible_cents
+    max_possible_balance = domains.max_possible_balance
+    
+    # 4. Create variables for each account for each month in the time horizon.
+    for account in portfolio.accounts:
+        for month in range(max_months):
+            key = (account.lender_name, month)
+            payments[key] = model.NewIntVar(0, max_possible_balance, f'payment_{key}')
+            balances[key] = model.NewIntVar(0, max_possible_balance, f'balance_{key}')
+            interest_charged[key] = model.NewIntVar(0, domains.max_interest, f'interest_{key}')
+            is_active[key] = model.NewBoolVar(f'is_active_{key}')
+   
+    total_vars = len(payments) + len(balances) + len(interest_charged) + len(is_active)
+    print(f"Created {total_vars} variables across {max_months} months.")
+    
+    # --- Pre-calculate promo end month index for all accounts ---
+    # This is used for strategies like PAY_OFF_IN_PROMO
+    if timeline is None:
+        timeline = build_portfolio_timeline(portfolio, max_months)
+    promo_end_month_map = timeline.promo_end_months
+    validate_strategy_requirements(portfolio, promo_end_month_map)
     
     print("\n--- Adding Constraints ---")
 
@@ -366,28 +1150,17 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
     print("1. Adding dynamic monthly budget constraints...")
     
     if portfolio.preferences.strategy != OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS:
-        lump_sum_map: Dict[int, int] = {}
-        for payment_date, amount_cents in portfolio.budget.lump_sum_payments:
-            month_diff = (payment_date.year - portfolio.plan_start_date.year) * 12 + \
-                         (payment_date.month - portfolio.plan_start_date.month)
-            if month_diff >= 0:
-                lump_sum_map[month_diff] = lump_sum_map.get(month_diff, 0) + amount_cents
-    
+        monthly_budgets = timeline.monthly_budgets
         for month in range(max_months):
-            current_month_date = portfolio.plan_start_date + relativedelta(months=month)
-            budget_for_this_month = portfolio.budget.monthly_budget_cents
-            for change_date, new_amount_cents in sorted(portfolio.budget.future_changes):
-                if change_date <= current_month_date:
-                    budget_for_this_month = new_amount_cents
-            budget_for_this_month += lump_sum_map.get(month, 0)
-            
             monthly_payments = [payments[(acc.lender_name, month)] for acc in portfolio.accounts]
-            model.Add(sum(monthly_payments) <= budget_for_this_month)
+            model.Add(sum(monthly_payments) <= monthly_budgets[month])
     else:
         print("   - SKIPPING budget constraint for 'Minimize Spend to Clear Promos' strategy.")
 
     # 5.2. Balance Update, Minimum Payments, and Interest Logic
     print("2. Adding core balance update, interest, and minimum payment logic...")
+    # Per-segment balances of accounts whose buckets have different APR schedules
+    segment_balances: Dict[Tuple[str, int, int], cp_model.IntVar] = {}
     for account in portfolio.accounts:
         for month in range(max_months):
             key = (account.lender_name, month)
@@ -409,29 +1182,51 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
             model.Add(previous_balance_var > 0).OnlyEnforceIf(is_active[key])
             model.Add(previous_balance_var == 0).OnlyEnforceIf(is_active[key].Not())
             
-            # 5.2.b. Interest Calculation (with Promotional APR logic)
-            promo_end_idx = promo_end_month_map[account.lender_name]
-
-            if month <= promo_end_idx:
-                # --- PROMO PERIOD: Interest is 0 ---
-                model.Add(interest_charged[key] == 0)
-            
+            # 5.2.b. Interest Calculation, per balance segment
+            # Each segment's APR schedule is 0 during its promo, so bucket
+            # accounts keep accruing on purchases while a transfer is at 0%.
+            # Segments whose remaining schedules match are pooled into one.
+            segments = timeline.segments[account.lender_name]
+            active_segments = timeline.active_segments(account.lender_name, month)
+            if len(active_segments) == 1:
+                segment_previous = {active_segments[0]: previous_balance_var}
             else:
+                segment_previous = {
+                    s: segments[s].balance_cents if month == 0 else sum(
+                        segment_balances[(account.lender_name, t, month - 1)]
+                        for t in timeline.pooled_from(account.lender_name, month, s)
+                    )
+                    for s in active_segments
+                }
+            segment_interest = {}
+            for s in active_segments:
+                apr_bps_for_month = segments[s].apr_bps[month]
+                if apr_bps_for_month == 0:
+                    # --- PROMO PERIOD: Interest is 0 ---
+                    segment_interest[s] = 0
+                    continue
+
                 # --- STANDARD PERIOD: Calculate interest ---
-                # Use effective APR which accounts for bucket-level rates if present
-                # This is the weighted average APR across all buckets, or standard APR if no buckets
-                # Pass current month date to properly handle per-bucket promo expiry
-                current_month_date = portfolio.plan_start_date + relativedelta(months=month)
-                apr_bps_for_month = account.get_effective_apr_bps(current_month_date) if account.buckets else account.apr_standard_bps
-            
+                # A single segment charges straight into the account's interest variable
+                interest_var = (
+                    interest_charged[key] if len(active_segments) == 1
+                    else model.NewIntVar(0, domains.max_interest, f'interest_{key}_{s}')
+                )
                 # Use the pre-calculated, absolute max domain for numerators
-                numerator_var = model.NewIntVar(0, max_numerator_domain, f'num_{key}')
+                numerator_var = model.NewIntVar(0, domains.max_numerator, f'num_{key}_{s}')
                 
-                # (IntVar == IntVar * constant)
-                model.Add(numerator_var == previous_balance_var * apr_bps_for_month)
+                # (IntVar == IntVar * constant), offset by (divisor - 1) to round up
+                interest_rounding = 120000 - 1 if round_up_divisions else 0
+                model.Add(numerator_var == segment_previous[s] * apr_bps_for_month + interest_rounding)
                 
                 # This division runs unconditionally.
-                model.AddDivisionEquality(interest_charged[key], numerator_var, 120000)
+                model.AddDivisionEquality(interest_var, numerator_var, 120000)
+                segment_interest[s] = interest_var
+
+            if len(active_segments) > 1:
+                model.Add(interest_charged[key] == sum(segment_interest.values()))
+            elif segments[active_segments[0]].apr_bps[month] == 0:
+                model.Add(interest_charged[key] == 0)
 
             # This constraint handles the case where the account is inactive.
             # It is now OUTSIDE the if/else block, as it applies to both cases.
@@ -441,27 +1236,24 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
             
             # 1. Define the 'max' components
             fixed_component = account.min_payment_rule.fixed_cents
-            percentage_component_var = model.NewIntVar(0, domain_max_percentage_comp, f'min_pay_perc_var_{key}')
+            percentage_component_var = model.NewIntVar(0, domains.max_percentage_comp, f'min_pay_perc_var_{key}')
             
             # 2. Define the base for the percentage calculation
-     
-            base_for_percentage = model.NewIntVar(0, domain_max_min_pay_base, f'base_for_perc_{key}') 
+            base_for_percentage = model.NewIntVar(0, domains.max_min_pay_base, f'base_for_perc_{key}') 
             
             # This constraint is now clean: (IntVar == IntVar + IntVar) or (IntVar == IntVar)
             if account.min_payment_rule.includes_interest:
                 model.Add(base_for_percentage == previous_balance_var + interest_charged[key])
- 
             else:
                 model.Add(base_for_percentage == previous_balance_var)
 
             # 3. Calculate the percentage component: (base * bps / 10000)
             if account.min_payment_rule.percentage_bps > 0:
-              
-                perc_numerator_var = model.NewIntVar(0, max_numerator_domain, f'perc_num_{key}')
+                perc_numerator_var = model.NewIntVar(0, domains.max_numerator, f'perc_num_{key}')
                 
                 # This constraint is also clean: (IntVar == IntVar * constant)
-                model.Add(perc_numerator_var == base_for_percentage * account.min_payment_rule.percentage_bps)
-                
+                percentage_rounding = 10000 - 1 if round_up_divisions else 0
+                model.Add(perc_numerator_var == base_for_percentage * account.min_payment_rule.percentage_bps + percentage_rounding)
                 
                 # This division does not need enforcement; it runs unconditionally.
                 model.AddDivisionEquality(
@@ -470,24 +1262,22 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
                     10000
                 )
             else:
-            
                 model.Add(percentage_component_var == 0)
             
             # 4. Calculate the 'raw' minimum: max(fixed, percentage)
-            raw_minimum_payment_var = model.NewIntVar(0, domain_max_raw_min_pay, f'raw_min_pay_{key}')
+            raw_minimum_payment_var = model.NewIntVar(0, domains.max_raw_min_pay, f'raw_min_pay_{key}')
             model.AddMaxEquality(
                 raw_minimum_payment_var,
                 [fixed_component, percentage_component_var]
-  
             )
 
             # 5. Calculate the total amount owed
-            total_owed_var = model.NewIntVar(0, domain_max_total_owed, f'total_owed_{key}')
+            total_owed_var = model.NewIntVar(0, domains.max_total_owed, f'total_owed_{key}')
             model.Add(total_owed_var == previous_balance_var + interest_charged[key])
 
             # 6. The *actual* minimum payment is the LESSER of the raw 
             # minimum or the total owed.
-            final_minimum_payment_var = model.NewIntVar(0, domain_max_total_owed, f'final_min_pay_{key}')
+            final_minimum_payment_var = model.NewIntVar(0, domains.max_total_owed, f'final_min_pay_{key}')
             model.AddMinEquality(
                 final_minimum_payment_var,
                 [raw_minimum_payment_var, total_owed_var]
@@ -518,6 +1308,24 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
             # This constraint is also clean: (IntVar == IntVar + IntVar - IntVar)
             model.Add(balances[key] == previous_balance_var + interest_charged[key] - payments[key])
 
+            # 5.2.e. Payment allocation across segments (highest APR first)
+            # Each segment takes min(its amount owed, what is left of the payment).
+            if len(active_segments) > 1:
+                remaining_payment = payments[key]
+                order = timeline.payment_order(account.lender_name, month)
+                for position, s in enumerate(order):
+                    segment_owed = segment_previous[s] + segment_interest[s]
+                    segment_payment = model.NewIntVar(0, max_possible_balance, f'payment_{key}_{s}')
+                    if position == len(order) - 1:
+                        model.Add(segment_payment == remaining_payment)
+                    else:
+                        model.AddMinEquality(segment_payment, [segment_owed, remaining_payment])
+                    segment_balances[(account.lender_name, s, month)] = model.NewIntVar(
+                        0, max_possible_balance, f'balance_{key}_{s}'
+                    )
+                    model.Add(segment_balances[(account.lender_name, s, month)] == segment_owed - segment_payment)
+                    remaining_payment = remaining_payment - segment_payment
+
     # 5.3. Payoff Constraint
     print("3. Adding final payoff constraint...")
     for account in portfolio.accounts:
@@ -528,33 +1336,12 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
     if portfolio.preferences.strategy == OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS:
         print("4. Adding 'Minimize Spend to Clear Promos' hard constraints...")
         
-        non_promo_accounts: List[str] = []
-        has_promo_accounts = False
         for account in portfolio.accounts:
+            # Every account has a promo here (see validate_strategy_requirements).
             promo_end_idx = promo_end_month_map[account.lender_name]
-            
-            if promo_end_idx > -1:
-                # This is a promo account. Add the hard constraint.
-                has_promo_accounts = True
-                promo_end_key = (account.lender_name, promo_end_idx)
-                print(f"   - Constraint added: {account.lender_name} balance <= 0 by month {promo_end_idx + 1}")
-                model.Add(balances[promo_end_key] <= 0)
-            else:
-                # This account has no promo period.
-                non_promo_accounts.append(account.lender_name)
-        
-        # Validation: This strategy is only valid if ALL accounts have promos.
-        if non_promo_accounts:
-            raise ValueError(
-                f"The '{OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS.value}' strategy is only valid "
-                f"when ALL accounts have a promotional period. The following accounts do not: {non_promo_accounts}"
-            )
-        
-        if not has_promo_accounts:
-            raise ValueError(
-                f"The '{OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS.value}' strategy requires "
-                f"at least one account with a promotional period."
-            )
+            promo_end_key = (account.lender_name, promo_end_idx)
+            print(f"   - Constraint added: {account.lender_name} balance <= 0 by month {promo_end_idx + 1}")
+            model.Add(balances[promo_end_key] <= 0)
 
     # 5.5. Payment Shape Constraints
     # We check for the user's choice OR our new strategy, which forces this shape.
@@ -653,13 +1440,7 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
         print(f"Objective set to: {strategy.value} (Minimize Peak Monthly Payment)")
         
         # 1. Determine the maximum relevant month index (longest promo period)
-        max_promo_end_idx = -1
-        if promo_end_month_map:
-            max_promo_end_idx = max(promo_end_month_map.values())
-        
-        if max_promo_end_idx == -1:
-             # Should have been caught by validation in 5.4, but handle defensively
-             raise ValueError("MINIMIZE_SPEND_TO_CLEAR_PROMOS requires at least one promo account.")
+        max_promo_end_idx = max(promo_end_month_map.values())
             
         # 2. Create the objective variable (the peak monthly payment)
         # Domain: 0 to the total initial balance (absolute max possible payment in one month)
@@ -697,138 +1478,111 @@ def generate_payment_plan(portfolio: DebtPortfolio) -> Optional[List[MonthlyResu
         validation_error = model.Validate()
         if validation_error:
             print(f"!!! Model Validation Error: {validation_error}", file=sys.stderr)
-            # You could optionally print the full model proto for deep debugging:
-            # 
-            print(model.Proto(), file=sys.stderr)
+            # For deep debugging, export the model instead of dumping the whole proto:
+            # python -m solver_engine profile portfolio.json --export-model model.pbtxt
+            print("!!! Profile this portfolio with --export-model to inspect the model offline.", file=sys.stderr)
     except Exception as e:
         print(f"!!! An exception occurred during model.Validate(): {e}", file=sys.stderr)
         
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 60.0
-    status = solver.Solve(model)
+    solver.parameters.max_time_in_seconds = time_limit_seconds
+
+    # Time the first solution; optionally keep every near-optimal solution
+    # the search passes through
+    plan_indices = plan_variable_indices(portfolio, max_months, payments, interest_charged, balances)
+    if num_alternatives > 0:
+        from plan_pool import PlanPoolCollector
+        collector = PlanPoolCollector(plan_indices, progress=progress)
+    else:
+        collector = SolutionTimer(progress, plan_indices if progress is not None else None)
+
+    build_seconds = time.perf_counter() - build_start
+    if profile is not None:
+        profile.build_seconds = build_seconds
+        profile.attach(model, solver)
+
+    watchdog_done, stop_reason = None, [None]
+    if stall_seconds is not None or cancel_event is not None:
+        watchdog_done, stop_reason = start_search_watchdog(solver.StopSearch, cancel_event, collector, stall_seconds)
+
+    status = solver.Solve(model, collector)
+
+    if watchdog_done is not None:
+        watchdog_done.set()
+    if profile is not None:
+        profile.finish(solver)
+
+    model_proto = model.Proto()
+    telemetry = dict(
+        wall_time_seconds=solver.WallTime(),
+        build_seconds=build_seconds,
+        user_time_seconds=solver.UserTime(),
+        num_branches=solver.NumBranches(),
+        num_conflicts=solver.NumConflicts(),
+        num_solutions=collector.num_solutions,
+        first_solution_seconds=collector.first_solution_seconds,
+        num_variables=len(model_proto.variables),
+        num_constraints=len(model_proto.constraints),
+        gap_curve=collector.gap_curve,
+        stopped_early=stop_reason[0] == "stalled",
+        cancelled=stop_reason[0] == "cancelled",
+    )
     
     if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
         print(f"\n✅ Solution Found! Status: {solver.StatusName(status)}")
         
-        # a. Create an empty list for results.
-        results_list: List[MonthlyResult] = []
-       
- 
-        # b/c. Populate the results list from the solver's solution.
-        for month in range(max_months):
-            # Optimization: if all balances are zero, we can stop.
-            total_balance_at_month_start = 0
-            for account in portfolio.accounts:
-                if month == 0:
-  
-                  total_balance_at_month_start += account.current_balance_cents
-                else:
-                     total_balance_at_month_start += solver.Value(balances[(account.lender_name, month - 1)])
-            
-            if total_balance_at_month_start <= 0:
-           
-                print(f"All balances at zero or below. Stopping at month {month + 1}.")
-                break
+        # Read every value in one pass from the response's solution vector
+        # instead of calling solver.Value() per variable.
+        best_solution = list(solver.ResponseProto().solution)
+        plan_arrays = plan_arrays_from_solution(best_solution, plan_indices)
+        results_list = collect_monthly_results(portfolio, plan_arrays)
+        print_plan_summary(portfolio, results_list)
 
-            for account in portfolio.accounts:
-                key = (account.lender_name, month)
-                
-                # DEBUG: Check for minimum payment violations
-                prev_bal_key = (account.lender_name, month - 1) if month > 0 else None
-                prev_balance = solver.Value(balances[prev_bal_key]) if prev_bal_key else account.current_balance_cents
-                payment = int(solver.Value(payments[key]))
-                
-                if prev_balance > 0 and payment == 0:
-                    print(f"⚠️  WARNING: {account.lender_name} month {month+1} has prev_balance=${prev_balance/100:.2f} but payment=$0.00!")
-                
-                result = MonthlyResult(
-                    month=month + 1,
-     
-                    lender_name=account.lender_name,
-                    payment_cents=payment,
-                    interest_charged_cents=int(solver.Value(interest_charged[key])),
-                    ending_balance_cents=int(solver.Value(balances[key])),
+        alternatives: List[AlternativePlan] = []
+        if num_alternatives > 0:
+            from plan_pool import ALTERNATIVE_TIME_LIMIT_SECONDS, select_diverse_plans, solve_diverse_alternatives
+            # The first pick is the primary plan itself; re-solve for any the search didn't pass through
+            diverse = select_diverse_plans(collector.pool, num_alternatives + 1)
+            from_search = len(diverse) - 1
+            if len(diverse) <= num_alternatives and stop_reason[0] != "cancelled":
+                diverse = solve_diverse_alternatives(
+                    model, plan_indices, diverse, num_alternatives + 1, best_solution,
+                    time_limit_seconds=min(ALTERNATIVE_TIME_LIMIT_SECONDS, time_limit_seconds),
+                    cancel_event=cancel_event,
                 )
-         
-       
-                # Only append if there's activity. This cleans up the final log.
-                is_active_last_month = (month > 0 and solver.Value(balances[(account.lender_name, month - 1)]) > 0)
-                if result.payment_cents > 0 or result.ending_balance_cents > 0 or result.interest_charged_cents > 0 or is_active_last_month:
-          
-                    results_list.append(result)
-        
-        # d. Process the results_list to print summaries.
-        print("\n--- Plan Summary ---")
-        
-        # i. Total interest for the entire plan..
-        total_interest = sum(r.interest_charged_cents for r in results_list)
-        print(f"Minimized Total Interest Paid: ${total_interest / 100.0:,.2f}")
-        
-        # ii. Total interest per account.
-        print("\nInterest Breakdown by Account:")
-        interest_by_account: Dict[str, int] = {acc.lender_name: 0 for acc in portfolio.accounts}
-        for res in results_list:
-            interest_by_account[res.lender_name] += res.interest_charged_cents
-        for name, total_cents in interest_by_account.items():
-             print(f"  - {name}: ${total_cents / 100.0:,.2f}")
-             
-       
-        # iii. Total interest per year.
-        print("\nInterest Breakdown by Year:")
-        interest_by_year: Dict[int, int] = {}
-        for res in results_list:
-            year = (res.month - 1) // 12 + 1
-            interest_by_year[year] = interest_by_year.get(year, 0) + res.interest_charged_cents
-        for year, total_cents in sorted(interest_by_year.items()):
-            print(f"  - Year {year}: ${total_cents / 100.0:,.2f}")
-        
-        # e. Print the detailed month-by-month plan.
-        print("\n--- Optimized Payment Plan Details ---")
-        last_month_printed = -1
-        
-        payoff_month = 0
-        if results_list:
-            # The payoff month is the highest month number in the results list,
-            # because the loop breaks when all balances hit zero.
-            payoff_month = max(r.month for r in results_list)
-
-        for res in results_list:
-            # Only print rows where a payment was made
-            if res.payment_cents > 0:
-                if res.month != last_month_printed:
-                    print(f'\n--- Month {res.month} ---')
-      
-                    last_month_printed = res.month
-                
-                payment_str = f"${res.payment_cents / 100.0:,.2f}"
-                interest_str = f"${res.interest_charged_cents / 100.0:,.2f}"
-                balance_str = f"${res.ending_balance_cents / 100.0:,.2f}"
-        
-                print(f"  - {res.lender_name}: Pay {payment_str} "
-                      f"(Interest: {interest_str}, New Balance: {balance_str})")
-
-        print(f"\n🎉 All accounts paid off in {payoff_month} months!")
+            diverse = diverse[1:]
+            alternatives = [
+                AlternativePlan(
+                    objective_value=objective,
+                    distance_from_best=distance,
+                    results=collect_monthly_results(portfolio, arrays),
+                )
+                for objective, distance, arrays in diverse
+            ]
+            print(f"Collected {len(alternatives)} alternative plan(s): {from_search} from {len(collector.pool)} "
+                  f"near-optimal solutions of the search, {len(alternatives) - from_search} re-solved.")
 
-        return results_list
+        return PlanSolveResult(
+            status=solver.StatusName(status),
+            backend=SolverBackend.CP_SAT,
+            results=results_list,
+            objective_value=solver.ObjectiveValue(),
+            best_bound=solver.BestObjectiveBound(),
+            alternatives=alternatives,
+            **telemetry,
+        )
 
     else:
         # Handle cases where no- solution is found.
-        print(f"\n❌ Solution Not Found. Status: {solver.StatusName(status)}")
-        if status == cp_model.INFEASIBLE:
-            print("Model is INFEASIBLE. This often means the monthly budget is less than the")
-            print("sum of the minimum payments, or the payoff constraint could not be met.")
-        elif status == cp_model.MODEL_INVALID:
-            print("Model is INVALID. This is a critical error in the solver's constraint logic.")
- 
-            print("The most recent change (e.g., complex minimum payments) likely introduced")
-            print("a contradictory or malformed rule (e.g., type ambiguity, circular dependency).")
-            print("Please review the `model.Validate()` output above.")
-        else:
-            print(f"The solver stopped for an unknown reason: {solver.StatusName(status)}")
-        return None
+        print_no_solution(solver.StatusName(status))
+        return PlanSolveResult(
+            status=solver.StatusName(status),
+            backend=SolverBackend.CP_SAT,
+            **telemetry,
+        )
 
 # --- VALIDATION TEST: MINIMIZE SPEND TO CLEAR PROMOS ---
-if __name__ == "__main__":
+def run_validation_demo() -> None:
     print("--- Creating Test for 'Minimize Spend to Clear Promos' Strategy ---")
     
     # 1. Define the user's accounts. MUST all be promo accounts.
@@ -877,3 +1631,83 @@ if __name__ == "__main__":
     # 5. Call the solver to generate and print the plan!
     print("...Starting solver to validate 'Minimize Spend to Clear Promos' logic...")
     generate_payment_plan(test_portfolio)
+
+
+# --- Command Line ---
+
+def run_profile(args: argparse.Namespace) -> None:
+    """Solve a saved portfolio with CP-SAT and print a profiling report."""
+    from solver_profiler import SolveProfile, print_profile_report
+
+    portfolio = load_portfolio_json(args.portfolio)
+    profile = SolveProfile(export_model_path=args.export_model)
+    result = solve_payment_plan(
+        portfolio, SolverBackend.CP_SAT, profile=profile, time_limit_seconds=args.time_limit
+    )
+    print_profile_report(profile, result.status, show_log=not args.no_log)
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    """Re-plan every portfolio in an NDJSON file, writing NDJSON plan records."""
+    import asyncio
+    import contextlib
+    import schemas
+    from batch_planner import iterate_lines, replan_batch
+    from solver_runner import SolverRunner
+
+    runner = SolverRunner(max_concurrent_solves=args.workers) if args.workers else None
+    output = open(args.output, "w") if args.output else sys.stdout
+
+    async def run() -> None:
+        with open(args.portfolios, "r") as lines:
+            async for record in replan_batch(
+                iterate_lines(lines), format=schemas.PlanFormat(args.format), runner=runner
+            ):
+                output.write(json.dumps(record) + "\n")
+                if "summary" in record:
+                    print(f"Batch summary: {json.dumps(record['summary'])}", file=sys.stderr)
+
+    # Solver progress output goes to stderr so stdout carries only NDJSON
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            asyncio.run(run())
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m solver_engine", description="Resolve payment plan solver tools.")
+    subcommands = parser.add_subparsers(dest="command")
+
+    profile_parser = subcommands.add_parser("profile", help="Profile a CP-SAT solve of a portfolio JSON file.")
+    profile_parser.add_argument("portfolio", help="Portfolio JSON in the /generate-plan request format.")
+    profile_parser.add_argument("--export-model", metavar="PATH",
+                                help="Write the CP-SAT model proto to PATH (.pbtxt for text) for offline replay.")
+    profile_parser.add_argument("--time-limit", type=float, metavar="SECONDS",
+                                help="Override the solver time limit (default: predicted from the solve ledger).")
+    profile_parser.add_argument("--no-log", action="store_true", help="Omit the search log highlights.")
+
+    batch_parser = subcommands.add_parser("batch", help="Re-plan an NDJSON file of portfolios, streaming NDJSON results.")
+    batch_parser.add_argument("portfolios", help="NDJSON: one portfolio (or {\"id\", \"portfolio\"}) per line.")
+    batch_parser.add_argument("-o", "--output", metavar="PATH", help="Write results here instead of stdout.")
+    batch_parser.add_argument("--format", choices=["rows", "columnar"], default="columnar", help="Plan output format.")
+    batch_parser.add_argument("--workers", type=int, metavar="N",
+                              help="Concurrent solves (default: SOLVER_MAX_CONCURRENT_SOLVES).")
+
+    subcommands.add_parser("demo", help="Run the built-in 'Minimize Spend to Clear Promos' validation portfolio.")
+
+    args = parser.parse_args(argv)
+    if args.command == "profile":
+        run_profile(args)
+    elif args.command == "batch":
+        run_batch(args)
+    else:
+        run_validation_demo()
+
+
+if __name__ == "__main__":
+    # Run through the importable module so helper modules (mip_engine,
+    # plan_simulator, ...) share its classes and settings with this entry point.
+    import solver_engine
+    solver_engine.main()
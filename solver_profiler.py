@@ -0,0 +1,153 @@
+# solver_profiler.py - Diagnostics for slow CP-SAT solves
+# Collects model build time, presolve/search timings parsed from the CP-SAT
+# search log, and variable/constraint counts by type, then prints a report.
+# Entry point: python -m solver_engine profile portfolio.json
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from ortools.sat.python import cp_model
+
+# Constraint kinds in the CP-SAT proto, in the order they are checked
+_CONSTRAINT_KINDS = (
+    "linear", "int_div", "int_prod", "int_mod", "lin_max",
+    "bool_or", "bool_and", "bool_xor", "at_most_one", "exactly_one",
+    "element", "table", "automaton", "all_diff", "inverse", "circuit", "routes",
+    "interval", "no_overlap", "no_overlap_2d", "cumulative", "reservoir",
+)
+
+_PRESOLVE_START = re.compile(r"^Starting presolve at ([0-9.]+)s")
+_SEARCH_START = re.compile(r"^Starting search at ([0-9.]+)s")
+_SOLUTION_LINE = re.compile(r"^#(\d+|Done|Model)\s")
+
+
+@dataclass
+class SolveProfile:
+    """
+    Diagnostics filled in by a profiled CP-SAT solve (see _solve_with_cp_sat).
+    If export_model_path is set, the built model is written there for offline
+    replay (text format for .txt/.pbtxt paths, binary otherwise).
+    """
+    export_model_path: Optional[str] = None
+    build_seconds: float = 0.0
+    presolve_seconds: Optional[float] = None
+    search_seconds: Optional[float] = None
+    total_seconds: float = 0.0
+    variable_counts: Dict[str, int] = field(default_factory=dict)
+    constraint_counts: Dict[str, int] = field(default_factory=dict)
+    log_lines: List[str] = field(default_factory=list)
+
+    def attach(self, model: cp_model.CpModel, solver: cp_model.CpSolver) -> None:
+        """Record model statistics and route the search log into this profile."""
+        self.variable_counts, self.constraint_counts = count_model_elements(model)
+        if self.export_model_path:
+            if not model.ExportToFile(self.export_model_path):
+                print(f"[SolverProfiler] Could not export model to {self.export_model_path}")
+
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        # A single log message can span several lines (e.g. the response summary)
+        solver.log_callback = lambda message: self.log_lines.extend(message.splitlines())
+
+    def finish(self, solver: cp_model.CpSolver) -> None:
+        """Derive phase timings from the captured search log."""
+        self.total_seconds = solver.WallTime()
+        presolve_start = search_start = None
+        for line in self.log_lines:
+            if presolve_start is None and (match := _PRESOLVE_START.match(line)):
+                presolve_start = float(match.group(1))
+            elif search_start is None and (match := _SEARCH_START.match(line)):
+                search_start = float(match.group(1))
+        if search_start is not None:
+            self.presolve_seconds = search_start - (presolve_start or 0.0)
+            self.search_seconds = max(self.total_seconds - search_start, 0.0)
+
+    def log_highlights(self, max_solutions: int = 5) -> List[str]:
+        """
+        The useful parts of a long search log: the presolved model size, the
+        first and last few solution lines, and the final response summary.
+        """
+        highlights: List[str] = []
+        solution_lines: List[str] = []
+        section = None
+        for line in self.log_lines:
+            if line.startswith("Presolved optimization model"):
+                section = "presolved"
+                highlights.append(line)
+            elif line.startswith("CpSolverResponse summary"):
+                section = "summary"
+                highlights.append(line)
+            elif section == "presolved" and line.startswith(("#Variables", "#k", "  -")):
+                highlights.append(line)
+            elif section == "summary" and line.split(":")[0] in (
+                    "status", "objective", "best_bound", "conflicts", "branches", "walltime", "gap_integral"):
+                highlights.append(f"  {line}")
+            elif _SOLUTION_LINE.match(line):
+                section = None
+                solution_lines.append(line)
+
+        if solution_lines:
+            shown = solution_lines if len(solution_lines) <= 2 * max_solutions else (
+                solution_lines[:max_solutions] + ["..."] + solution_lines[-max_solutions:])
+            highlights.append(f"Solutions and bounds ({len(solution_lines)} log lines):")
+            highlights.extend(f"  {line}" for line in shown)
+        return highlights
+
+
+def count_model_elements(model: cp_model.CpModel) -> tuple[Dict[str, int], Dict[str, int]]:
+    """Count variables (boolean/integer/constant) and constraints by type from the model proto."""
+    proto = model.Proto()
+
+    variable_counts: Counter = Counter()
+    for variable in proto.variables:
+        domain = list(variable.domain)
+        if domain[0] == domain[-1]:
+            variable_counts["constant"] += 1
+        elif domain[0] == 0 and domain[-1] == 1:
+            variable_counts["boolean"] += 1
+        else:
+            variable_counts["integer"] += 1
+
+    constraint_counts: Counter = Counter()
+    for constraint in proto.constraints:
+        if hasattr(constraint, "WhichOneof"):
+            kind = constraint.WhichOneof("constraint") or "other"
+        else:
+            kind = next((k for k in _CONSTRAINT_KINDS if getattr(constraint, f"has_{k}")()), "other")
+        if len(constraint.enforcement_literal) > 0:
+            kind += " (enforced)"
+        constraint_counts[kind] += 1
+
+    return dict(variable_counts), dict(constraint_counts)
+
+
+def print_profile_report(profile: SolveProfile, status: str, show_log: bool = True) -> None:
+    """Print the phase timings, model statistics and search-log highlights."""
+    def fmt(seconds: Optional[float]) -> str:
+        return "n/a" if seconds is None else f"{seconds:8.3f}s"
+
+    print("\n=== Solver Profile ===")
+    print(f"Status: {status}")
+    print("\nPhase timings:")
+    print(f"  model build : {fmt(profile.build_seconds)}")
+    print(f"  presolve    : {fmt(profile.presolve_seconds)}")
+    print(f"  search      : {fmt(profile.search_seconds)}")
+    print(f"  solver total: {fmt(profile.total_seconds)}")
+
+    print(f"\nVariables ({sum(profile.variable_counts.values())}):")
+    for kind, count in sorted(profile.variable_counts.items(), key=lambda item: -item[1]):
+        print(f"  {kind:<24} {count:>8}")
+
+    print(f"\nConstraints ({sum(profile.constraint_counts.values())}):")
+    for kind, count in sorted(profile.constraint_counts.items(), key=lambda item: -item[1]):
+        print(f"  {kind:<24} {count:>8}")
+
+    if profile.export_model_path:
+        print(f"\nModel exported to {profile.export_model_path}")
+
+    if show_log:
+        print("\nSearch log highlights:")
+        for line in profile.log_highlights():
+            print(f"  {line}")
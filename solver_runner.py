@@ -0,0 +1,370 @@
+"""
+Solver Runner
+
+Runs plan solves off the event loop on bounded worker pools, with admission
+control, and keeps a registry of queued and running solves so they can be
+cancelled.
+
+Key features:
+- Solves run in worker threads; the API awaits them without blocking
+- Admission control: each lane has a bounded queue and a fixed number of
+  workers; requests that would overflow the queue or wait too long are
+  rejected at once with a Retry-After estimate instead of missing their deadline
+- Fast lane: solves expected to finish quickly get their own workers, so
+  they never wait behind long searches
+- Cancellation: queued solves are dropped from the pool, running solves get
+  StopSearch()/InterruptSolve() via their cancel event, freeing the worker
+  for the next queued request right away
+- Client disconnects are detected by polling and cancel the solve
+- Queue depth and wait-time metrics for capacity planning
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
+from statistics import median
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from solver_engine import (
+    DebtPortfolio,
+    PlanSolveResult,
+    SolverBackend,
+    solve_payment_plan,
+)
+
+# CP-SAT already uses every core per solve, so only a few solves run at once
+SOLVER_MAX_CONCURRENT_SOLVES = int(os.environ.get("SOLVER_MAX_CONCURRENT_SOLVES", "2"))
+
+# Workers reserved for fast-path solves
+FAST_LANE_WORKERS = int(os.environ.get("SOLVER_FAST_LANE_WORKERS", "1"))
+
+# Solves allowed to wait per lane; beyond this requests are rejected (503)
+MAX_QUEUED_SOLVES = int(os.environ.get("SOLVER_MAX_QUEUED_SOLVES", "16"))
+
+# Requests whose estimated queue wait exceeds this are rejected (429)
+MAX_QUEUE_WAIT_SECONDS = float(os.environ.get("SOLVER_MAX_QUEUE_WAIT_SECONDS", "60"))
+
+# A portfolio goes to the fast lane when its recent similar solves all took at most this long
+FAST_LANE_MAX_SECONDS = 2.0
+FAST_LANE_SAMPLE = 20
+
+# Solve duration assumed by the queue-time estimate until real solves are measured
+DEFAULT_SOLVE_SECONDS = 10.0
+
+# Weight of the latest solve in the moving average of solve durations
+SOLVE_SECONDS_SMOOTHING = 0.2
+
+# Recent queue waits kept for the wait-time percentiles
+WAIT_SAMPLE_SIZE = 200
+
+# How often a waiting request checks whether its client went away
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+class SolveState(str, Enum):
+    """Lifecycle of a solve in the runner"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    CANCELLING = "cancelling"
+    DONE = "done"
+    CANCELLED = "cancelled"
+
+
+class SolveLane(str, Enum):
+    """Worker pool a solve is admitted to"""
+    STANDARD = "standard"
+    FAST = "fast"
+
+
+class SolveCancelled(Exception):
+    """Raised to the waiter when a solve was cancelled before producing a result."""
+
+
+class SolverOverloaded(Exception):
+    """
+    Raised when a solve is not admitted. status_code is 503 when the lane's
+    queue is full and 429 when the estimated queue wait is too long;
+    retry_after_seconds is when capacity is expected to free up.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after_seconds: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after_seconds = retry_after_seconds
+
+
+@dataclass
+class SolveTicket:
+    """A solve submitted to the runner."""
+    solve_id: str
+    lane: SolveLane = SolveLane.STANDARD
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    state: SolveState = SolveState.QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    future: Optional[Future] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "solve_id": self.solve_id,
+            "lane": self.lane.value,
+            "state": self.state.value,
+            "queued_seconds": round((self.started_at or now) - self.submitted_at, 3),
+            "running_seconds": round(now - self.started_at, 3) if self.started_at else 0.0,
+        }
+
+
+@dataclass
+class LaneStats:
+    """Capacity and recent timings of one lane."""
+    workers: int
+    solve_seconds: float = DEFAULT_SOLVE_SECONDS  # Moving average of solve durations
+    queue_waits: Deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLE_SIZE))
+    admitted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    cancelled: int = 0
+
+
+def is_fast_path(portfolio: DebtPortfolio, backend: Optional[SolverBackend] = None) -> bool:
+    """
+    Whether a solve is expected to finish within FAST_LANE_MAX_SECONDS:
+    nothing to solve, an LP bound only, or recent similar solves were all quick.
+    """
+    if sum(acc.current_balance_cents for acc in portfolio.accounts) == 0:
+        return True
+    if (backend or portfolio.preferences.solver_backend) == SolverBackend.LP_RELAXATION:
+        return True
+
+    from solve_ledger import portfolio_features, similar_solves
+    recent = [row["wall_time_seconds"] for row in similar_solves(portfolio_features(portfolio))][:FAST_LANE_SAMPLE]
+    return len(recent) == FAST_LANE_SAMPLE and max(recent) <= FAST_LANE_MAX_SECONDS
+
+
+class SolverRunner:
+    """Bounded pools of solver workers with admission control and a registry of cancellable solves."""
+
+    def __init__(
+        self,
+        max_concurrent_solves: int = SOLVER_MAX_CONCURRENT_SOLVES,
+        fast_lane_workers: int = FAST_LANE_WORKERS,
+        max_queued_solves: int = MAX_QUEUED_SOLVES,
+        max_queue_wait_seconds: float = MAX_QUEUE_WAIT_SECONDS
+    ):
+        self._executors = {
+            SolveLane.STANDARD: ThreadPoolExecutor(max_workers=max_concurrent_solves, thread_name_prefix="solver"),
+            SolveLane.FAST: ThreadPoolExecutor(max_workers=fast_lane_workers, thread_name_prefix="solver-fast"),
+        }
+        self._stats = {
+            SolveLane.STANDARD: LaneStats(workers=max_concurrent_solves),
+            SolveLane.FAST: LaneStats(workers=fast_lane_workers, solve_seconds=FAST_LANE_MAX_SECONDS),
+        }
+        self._max_queued_solves = max_queued_solves
+        self._max_queue_wait_seconds = max_queue_wait_seconds
+        self._tickets: Dict[str, SolveTicket] = {}
+        self._lock = threading.Lock()
+
+    def _lane_counts_locked(self, lane: SolveLane) -> Tuple[int, int]:
+        """(queued, running) solves in a lane."""
+        queued = running = 0
+        for ticket in self._tickets.values():
+            if ticket.lane == lane:
+                if ticket.state == SolveState.QUEUED:
+                    queued += 1
+                else:
+                    running += 1
+        return queued, running
+
+    def _estimate_wait_locked(self, lane: SolveLane, queued_ahead: Optional[int] = None) -> float:
+        """Expected queue wait behind queued_ahead solves (default: all queued, i.e. a new submission)."""
+        stats = self._stats[lane]
+        queued, running = self._lane_counts_locked(lane)
+        if queued_ahead is None:
+            queued_ahead = queued
+        if running + queued_ahead < stats.workers:
+            return 0.0
+        # Solves ahead of this one are served `workers` at a time
+        rounds = math.ceil((queued_ahead + 1) / stats.workers)
+        return rounds * stats.solve_seconds
+
+    def estimate_queue_seconds(self, lane: SolveLane = SolveLane.STANDARD, solve_id: Optional[str] = None) -> float:
+        """Expected queue wait for a new solve in the lane, or for a queued solve by id."""
+        with self._lock:
+            ticket = self._tickets.get(solve_id) if solve_id is not None else None
+            if ticket is None:
+                return self._estimate_wait_locked(lane)
+            if ticket.state != SolveState.QUEUED:
+                return 0.0
+            queued_ahead = sum(
+                1 for other in self._tickets.values()
+                if other.lane == ticket.lane and other.state == SolveState.QUEUED
+                and other.submitted_at < ticket.submitted_at
+            )
+            return self._estimate_wait_locked(ticket.lane, queued_ahead)
+
+    def submit(
+        self,
+        portfolio: DebtPortfolio,
+        solve_id: Optional[str] = None,
+        lane: Optional[SolveLane] = None,
+        **solve_kwargs
+    ) -> SolveTicket:
+        """
+        Queue a solve, or raise SolverOverloaded if the lane has no room.
+        The lane defaults to FAST for fast-path portfolios. solve_kwargs are passed to solve_payment_plan.
+        """
+        if lane is None:
+            lane = SolveLane.FAST if is_fast_path(portfolio, solve_kwargs.get("backend")) else SolveLane.STANDARD
+        ticket = SolveTicket(solve_id=solve_id or uuid.uuid4().hex, lane=lane)
+        stats = self._stats[lane]
+
+        with self._lock:
+            if ticket.solve_id in self._tickets:
+                raise ValueError(f"A solve with id '{ticket.solve_id}' is already in progress.")
+            queued, _running = self._lane_counts_locked(lane)
+            estimated_wait = self._estimate_wait_locked(lane)
+            if queued >= self._max_queued_solves:
+                stats.rejected += 1
+                raise SolverOverloaded(
+                    f"The {lane.value} solver queue is full ({queued} waiting).",
+                    status_code=503,
+                    retry_after_seconds=max(1, math.ceil(stats.solve_seconds)),
+                )
+            if estimated_wait > self._max_queue_wait_seconds:
+                stats.rejected += 1
+                raise SolverOverloaded(
+                    f"Estimated queue wait of {estimated_wait:.0f}s exceeds {self._max_queue_wait_seconds:.0f}s.",
+                    status_code=429,
+                    retry_after_seconds=max(1, math.ceil(estimated_wait - self._max_queue_wait_seconds)),
+                )
+            stats.admitted += 1
+            self._tickets[ticket.solve_id] = ticket
+
+        def run() -> PlanSolveResult:
+            ticket.started_at = time.time()
+            ticket.state = SolveState.RUNNING
+            return solve_payment_plan(portfolio, cancel_event=ticket.cancel_event, **solve_kwargs)
+
+        ticket.future = self._executors[lane].submit(run)
+        ticket.future.add_done_callback(lambda _: self._finish(ticket))
+        return ticket
+
+    def _finish(self, ticket: SolveTicket) -> None:
+        ticket.state = SolveState.CANCELLED if ticket.cancel_event.is_set() else SolveState.DONE
+        stats = self._stats[ticket.lane]
+        with self._lock:
+            self._tickets.pop(ticket.solve_id, None)
+            if ticket.started_at is not None:
+                stats.queue_waits.append(ticket.started_at - ticket.submitted_at)
+            if ticket.state == SolveState.CANCELLED:
+                stats.cancelled += 1
+            elif ticket.started_at is not None:
+                # Only full solves say how long the next one will take
+                stats.completed += 1
+                duration = time.time() - ticket.started_at
+                stats.solve_seconds += SOLVE_SECONDS_SMOOTHING * (duration - stats.solve_seconds)
+
+    def cancel(self, solve_id: str) -> bool:
+        """
+        Cancel a queued or running solve. Queued solves never start; running
+        solves stop searching at the next watchdog poll. Returns False if unknown.
+        """
+        with self._lock:
+            ticket = self._tickets.get(solve_id)
+        if ticket is None:
+            return False
+
+        ticket.cancel_event.set()
+        if ticket.future is not None and ticket.future.cancel():
+            print(f"[SolverRunner] Dropped queued solve {solve_id}")
+        else:
+            ticket.state = SolveState.CANCELLING
+            print(f"[SolverRunner] Stopping running solve {solve_id}")
+        return True
+
+    async def run(
+        self,
+        portfolio: DebtPortfolio,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        solve_id: Optional[str] = None,
+        **solve_kwargs
+    ) -> PlanSolveResult:
+        """
+        Submit a solve and wait for it without blocking the event loop.
+        Raises SolverOverloaded if it is not admitted. If is_disconnected()
+        turns true while waiting (client gone), the solve is cancelled and
+        SolveCancelled is raised.
+        """
+        ticket = self.submit(portfolio, solve_id=solve_id, **solve_kwargs)
+        waiter = asyncio.wrap_future(ticket.future)
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({waiter}, timeout=DISCONNECT_POLL_SECONDS)
+                if done:
+                    break
+                if is_disconnected is not None and await is_disconnected():
+                    print(f"[SolverRunner] Client disconnected; cancelling solve {ticket.solve_id}")
+                    self.cancel(ticket.solve_id)
+                    is_disconnected = None  # keep waiting for the worker to wind down
+        except asyncio.CancelledError:
+            # The request task itself was cancelled (e.g. server shutdown)
+            self.cancel(ticket.solve_id)
+            raise
+
+        if waiter.cancelled():
+            raise SolveCancelled(ticket.solve_id)
+        result = waiter.result()
+        if result.cancelled and not result.results:
+            raise SolveCancelled(ticket.solve_id)
+        return result
+
+    def active_solves(self) -> List[Dict[str, Any]]:
+        """Queued and running solves, oldest first."""
+        with self._lock:
+            tickets = sorted(self._tickets.values(), key=lambda t: t.submitted_at)
+        return [ticket.to_dict() for ticket in tickets]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-lane queue depth, capacity, wait times and admission counters."""
+        lanes: Dict[str, Any] = {}
+        with self._lock:
+            for lane, stats in self._stats.items():
+                queued, running = self._lane_counts_locked(lane)
+                waits = sorted(stats.queue_waits)
+                lanes[lane.value] = {
+                    "workers": stats.workers,
+                    "running": running,
+                    "queued": queued,
+                    "max_queued": self._max_queued_solves,
+                    "utilization": round(running / stats.workers, 3) if stats.workers else 0.0,
+                    "estimated_queue_seconds": round(self._estimate_wait_locked(lane), 3),
+                    "average_solve_seconds": round(stats.solve_seconds, 3),
+                    "queue_wait_p50_seconds": round(median(waits), 3) if waits else None,
+                    "queue_wait_p95_seconds": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else None,
+                    "admitted": stats.admitted,
+                    "rejected": stats.rejected,
+                    "completed": stats.completed,
+                    "cancelled": stats.cancelled,
+                }
+        return {"lanes": lanes, "max_queue_wait_seconds": self._max_queue_wait_seconds}
+
+
+# Global runner instance
+_solver_runner: Optional[SolverRunner] = None
+
+
+def get_solver_runner() -> SolverRunner:
+    """Get or create the global solver runner"""
+    global _solver_runner
+    if _solver_runner is None:
+        _solver_runner = SolverRunner()
+    return _solver_runner
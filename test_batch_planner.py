@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test batch re-planning: NDJSON portfolios are solved across the solver
+runner, duplicates are solved once, bad lines become error records, and the
+batch ends with a throughput summary.
+"""
+
+import asyncio
+import json
+
+from batch_planner import iterate_lines, replan_batch
+from solver_runner import SolverRunner
+
+def test_batch_streams_records_and_summary(portfolio_json):
+    print("\n" + "="*80)
+    print("TEST: Batch Re-Planning From NDJSON")
+    print("="*80)
+
+    zero_balance = json.loads(json.dumps(portfolio_json))
+    zero_balance["accounts"][0]["current_balance_cents"] = 0
+    lines = [
+        json.dumps({"id": "alice", "portfolio": portfolio_json}),
+        json.dumps({"id": "bob", "portfolio": portfolio_json}),  # same portfolio as alice
+        json.dumps(zero_balance),
+        "{not json",
+    ]
+
+    async def collect():
+        return [record async for record in replan_batch(iterate_lines(lines), runner=SolverRunner())]
+
+    records = asyncio.run(collect())
+    summary = records[-1]["summary"]
+    by_id = {record["id"]: record for record in records[:-1]}
+    print(f"\nSummary: {summary}")
+
+    assert set(by_id) == {"alice", "bob", "3", "4"}
+    assert by_id["alice"]["plan_columnar"] == by_id["bob"]["plan_columnar"]
+    assert by_id["alice"]["status"] in ("OPTIMAL", "FEASIBLE")
+    assert by_id["3"]["engine"] == "fast-path:zero-balance"
+    assert by_id["4"]["status"] == "ERROR" and by_id["4"]["error"]
+    assert summary["plans"] == 4 and summary["solves"] == 2 and summary["cache_hits"] == 1
+    assert summary["errors"] == 1 and summary["plans_per_second"] > 0
+
+    print("\n✅ Batch streamed one record per line and a throughput summary")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    from conftest import PORTFOLIO_JSON
+    test_batch_streams_records_and_summary(PORTFOLIO_JSON)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test the solver benchmark suite: the generator rebuilds identical, valid
+portfolios from a seed, the runner records a solve in a fresh process, and
+the comparison flags a slower or worse candidate run.
+"""
+
+import copy
+
+from benchmarks import Tolerances, compare_results, generate_portfolio, generate_suite, run_benchmarks
+from solver_engine import (
+    OptimizationStrategy,
+    PaymentShape,
+    SolverBackend,
+    calculate_promo_end_month_map,
+    validate_strategy_requirements,
+)
+
+def test_generator_is_seeded_and_valid():
+    print("\n" + "="*80)
+    print("TEST: Benchmark Portfolio Generator")
+    print("="*80)
+
+    cases = generate_suite(seed=3, sizes=(1, 30))
+    assert len(cases) == 2 * len(OptimizationStrategy) * len(PaymentShape)
+    assert len({case.case_id for case in cases}) == len(cases)
+
+    for case in cases:
+        portfolio = case.portfolio
+        assert len(portfolio.accounts) == case.num_accounts
+        assert portfolio.preferences.strategy == case.strategy
+        validate_strategy_requirements(portfolio, calculate_promo_end_month_map(portfolio))
+        assert portfolio == generate_portfolio(3, case.num_accounts, case.strategy, case.payment_shape)
+
+    large = [case.portfolio for case in cases if case.num_accounts == 30]
+    assert any(acc.buckets for p in large for acc in p.accounts)
+    assert any(acc.promo_duration_months or acc.promo_end_date for p in large for acc in p.accounts)
+    assert generate_suite(seed=4, sizes=(30,))[0].portfolio != large[0]
+
+    print("\n✅ Same seed, same portfolios; every strategy's requirements hold")
+    print("\n" + "="*80)
+
+def test_runner_and_compare():
+    print("\n" + "="*80)
+    print("TEST: Benchmark Runner and Regression Check")
+    print("="*80)
+
+    cases = generate_suite(seed=0, sizes=(1,), strategies=[OptimizationStrategy.MINIMIZE_SPEND_TO_CLEAR_PROMOS],
+                           shapes=[PaymentShape.LINEAR_PER_ACCOUNT])
+    [result] = run_benchmarks(cases, backends=[SolverBackend.MIP], time_limit_seconds=5.0)
+    print(f"   {result}")
+    assert result.status == "OPTIMAL" and result.error is None
+    assert result.build_seconds > 0 and result.solve_seconds >= 0
+    assert result.peak_rss_mb > 0 and result.num_variables > 0
+
+    baseline = {"metadata": {}, "results": [vars(result)]}
+    assert compare_results(baseline, copy.deepcopy(baseline)) == ([], [])
+
+    slower = copy.deepcopy(baseline)
+    slower["results"][0].update(status="FEASIBLE", solve_seconds=result.solve_seconds * 2 + 1.0, relative_gap=0.05)
+    regressions, _ = compare_results(baseline, slower)
+    assert {r.metric for r in regressions} == {"status", "solve_seconds", "relative_gap"}
+
+    # Within tolerance is not a regression
+    noisy = copy.deepcopy(baseline)
+    noisy["results"][0]["solve_seconds"] = result.solve_seconds + 0.1
+    assert compare_results(baseline, noisy, Tolerances(min_seconds=0.25))[0] == []
+
+    print("\n✅ Runner records a solve; comparison flags the regressed metrics")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_generator_is_seeded_and_valid()
+    test_runner_and_compare()
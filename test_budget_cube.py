@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test the monthly budget cube: breakdowns for any horizon and reference date,
+rolling averages and trends match direct scans of the classified
+transactions, merchants are rolled up, and both enrichment pipelines leave a
+cube per account holder that serves other horizons without re-enriching.
+"""
+
+import asyncio
+import contextlib
+import io
+import random
+from datetime import date, datetime, timedelta
+
+from budget_cube import BudgetCube, get_budget_cube_store, month_index
+from enrichment_service import EnrichmentService, NtropyOutputModel, hash_account_holder_id
+from enrichment_store import EnrichmentResultStore
+from transaction_frame import INCOMING, category_code
+
+def _raw_history(seed, size, days=500):
+    rng = random.Random(seed)
+    descriptions = ["TESCO STORES", "NETFLIX.COM", "DD BRITISH GAS", "KLARNA PAYMENT", "SALARY ACME LTD",
+                    "TRANSFER TO SAVINGS", "COUNCIL TAX", "Pret A Manger", "AMEX PAYMENT"]
+    transactions = []
+    for i in range(size):
+        timestamp = (date.today() - timedelta(days=rng.randrange(days))).isoformat()
+        if rng.random() < 0.01:
+            timestamp = "pending"
+        transactions.append({
+            "transaction_id": f"tx-{i}",
+            "description": rng.choice(descriptions),
+            "amount": rng.choice((-1, 1)) * round(rng.uniform(1, 900), 2),
+            "transaction_type": rng.choice(["DEBIT", "CREDIT", "DIRECT_DEBIT", None]),
+            "timestamp": timestamp,
+        })
+    return transactions
+
+def _month_totals(enriched):
+    """Cents per (month, measure), scanning the results directly"""
+    totals = {}
+    for tx in enriched:
+        try:
+            month = month_index(datetime.strptime(tx.transaction_date, "%Y-%m-%d").date())
+        except ValueError:
+            continue
+        cell = totals.setdefault(month, dict.fromkeys(("income", "fixed", "discretionary", "debt"), 0))
+        if tx.entry_type == "incoming":
+            cell["income"] += tx.amount_cents
+        elif tx.budget_category in cell:
+            cell[tx.budget_category] += tx.amount_cents
+    return totals
+
+def _enrich(service, raw_transactions):
+    async def run():
+        return [event async for event in service.enrich_transactions_streaming(
+            raw_transactions, "user-1", "item-1", enable_agentic_enrichment=False, analysis_horizon_months=6
+        )][-1]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(run())
+
+def test_cube_queries_match_scans():
+    print("\n" + "="*80)
+    print("TEST: Budget Cube Queries")
+    print("="*80)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = EnrichmentService(api_key="", result_store=EnrichmentResultStore(path=":memory:"))
+    complete = _enrich(service, _raw_history(1, 3000))
+    enriched = [NtropyOutputModel(**tx) for tx in complete["result"]["enriched_transactions"]]
+    cube = service.budget_cube
+    totals = _month_totals(enriched)
+    zero = dict.fromkeys(("income", "fixed", "discretionary", "debt"), 0)
+
+    # The streamed breakdown used the requested horizon
+    assert complete["result"]["budget_analysis"] == cube.budget_breakdown(6)
+    assert complete["result"]["budget_analysis"]["analysisMonths"] == 6
+
+    for as_of in (date.today(), date.today() - timedelta(days=95), date(2020, 1, 15)):
+        end = month_index(as_of)
+        for horizon in (1, 3, 12, 24):
+            months = [totals.get(month, zero) for month in range(end - horizon, end)]
+            expected = {measure: sum(m[measure] for m in months) // horizon for measure in zero}
+            breakdown = cube.budget_breakdown(horizon, as_of)
+            assert breakdown["averageMonthlyIncomeCents"] == expected["income"]
+            assert breakdown["fixedCostsCents"] == expected["fixed"]
+            assert breakdown["discretionaryCents"] == expected["discretionary"]
+            assert breakdown["debtPaymentsCents"] == expected["debt"]
+            assert breakdown["safeToSpendCents"] == max(0, expected["income"] - expected["fixed"] - expected["debt"])
+
+        # Rolling averages: trailing window means, one per complete month
+        rolling = cube.rolling_averages(window_months=3, horizon_months=6, as_of=as_of)
+        assert len(rolling) == 6
+        for offset, point in enumerate(rolling):
+            month = end - 6 + offset
+            window = [totals.get(m, zero) for m in range(month - 2, month + 1)]
+            assert point["fixedCents"] == sum(m["fixed"] for m in window) // 3
+
+    # A steady rise is reported as its per-month change
+    rising = BudgetCube()
+    rising.first_month, rising.month_count = month_index(date(2025, 1, 1)), 6
+    rising.cents = type(rising.cents)("q", [0]) * rising._cell(rising.first_month + 6, 0, 0)
+    for offset in range(6):
+        rising.cents[rising._cell(rising.first_month + offset, INCOMING, category_code("income"))] = 100000 + 5000 * offset
+    assert rising.trend(6, as_of=date(2025, 7, 1))["incomeCentsPerMonth"] == 5000
+
+    merchants = cube.top_merchants(limit=3)
+    assert len(merchants) == 3
+    assert merchants[0]["outgoingCents"] >= merchants[1]["outgoingCents"] >= merchants[2]["outgoingCents"]
+    assert sum(m["transactionCount"] for m in cube.top_merchants(limit=100)) <= cube.transaction_count
+    print(f"   {cube.transaction_count} transactions over {cube.month_count} months; top merchant {merchants[0]['merchant']}")
+
+    print("\n✅ Horizons, rolling averages and trends match direct scans")
+    print("\n" + "="*80)
+
+def test_cube_served_per_account_holder():
+    print("\n" + "="*80)
+    print("TEST: Budget Cube Store")
+    print("="*80)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = EnrichmentService(api_key="", result_store=EnrichmentResultStore(path=":memory:"))
+        results = asyncio.run(service.enrich_transactions(_raw_history(2, 800), "user-2", "item-2"))
+
+    # The non-streaming pipeline stored its cube under the account holder id
+    cube = get_budget_cube_store().get(hash_account_holder_id("user-2", "item-2"))
+    assert cube is service.budget_cube and cube.transaction_count == sum(r.transaction_date != "pending" for r in results)
+    analysis = cube.analysis(horizon_months=12, rolling_window_months=3, merchant_limit=5)
+    assert analysis["budget_analysis"]["analysisMonths"] == 12
+    assert len(analysis["monthly_totals"]) == 12 and len(analysis["rolling_averages"]) == 12
+    assert len(analysis["top_merchants"]) == 5
+    assert get_budget_cube_store().get(hash_account_holder_id("user-2", "other-item")) is None
+    print(f"   12-month analysis from the stored cube: {analysis['budget_analysis']}")
+
+    print("\n✅ Each enrichment leaves a cube that answers other horizons without re-enriching")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_cube_queries_match_scans()
+    test_cube_served_per_account_holder()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test the description-level enrichment cache: the canonicalizer maps repeat
+descriptions to one key, the LRU and SQLite tiers honour their bounds and
+TTL, and a second streaming enrichment of the same history is served from
+the cache without calling Ntropy, with the hit rate in its progress events.
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import enrichment_service
+from enrichment_cache import EnrichmentCache, canonicalize_description
+from ntropy_fakes import FakeSDK, fake_service, raw_transactions
+
+def _letters(number):
+    """A digit-free name per number, so every transaction is a distinct merchant"""
+    return "".join(chr(ord("a") + int(digit)) for digit in str(number))
+
+def test_canonical_descriptions():
+    print("\n" + "="*80)
+    print("TEST: Description Canonicalizer")
+    print("="*80)
+
+    same_merchant = [
+        ["TESCO STORES 2345", "Tesco Stores 6611 31/01", "TESCO STORES CARD 4421", "TESCO STORES #12 ON 03 FEB"],
+        ["NETFLIX.COM", "netflix.com 2025-01-31", "NETFLIX.COM REF 88812345"],
+        ["AMZN MKTP UK*2K4LL0XY5", "AMZN MKTP UK*9Q1ZZ7AB2"],
+        ["DD BRITISH GAS REF 123456789", "DD BRITISH GAS XXXX1234"],
+    ]
+    for descriptions in same_merchant:
+        canonical = {canonicalize_description(d) for d in descriptions}
+        print(f"   {descriptions[0]!r} -> {canonical}")
+        assert len(canonical) == 1
+
+    # Short brand tokens survive; nothing left means nothing to cache
+    assert canonicalize_description("O2 UK") == "o2 uk"
+    assert canonicalize_description("THREE 3 MOBILE") == "three 3 mobile"
+    assert canonicalize_description("0041872213") == ""
+    assert EnrichmentCache.key("0041872213", "outgoing", "GBP") is None
+    assert EnrichmentCache.key("Tesco Stores 0112", "outgoing", "gbp") == ("tesco stores", "outgoing", "GBP")
+
+    print("\n✅ Repeat descriptions share one cache key")
+    print("\n" + "="*80)
+
+def test_cache_tiers_and_ttl():
+    print("\n" + "="*80)
+    print("TEST: LRU and SQLite Cache Tiers")
+    print("="*80)
+
+    tesco = {"merchant_name": "Tesco", "logo_url": "logo", "website_url": "tesco.com",
+             "category": "groceries", "labels": ["groceries"]}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite3")
+        cache = EnrichmentCache(path=path, memory_size=2)
+        cache.put("TESCO STORES 2345", "outgoing", "GBP", tesco)
+        cache.put("NETFLIX.COM", "outgoing", "GBP", dict(tesco, merchant_name="Netflix"))
+        cache.put("SPOTIFY", "outgoing", "GBP", dict(tesco, merchant_name="Spotify"))
+        assert len(cache._memory) == 2  # Tesco evicted from memory, still on disk
+
+        assert cache.get("TESCO STORES 9999", "outgoing", "GBP") == tesco
+        assert cache.get("TESCO STORES 9999", "incoming", "GBP") is None  # entry type is part of the key
+        assert cache.get("TESCO STORES 9999", "outgoing", "EUR") is None
+        assert (cache.hits, cache.misses) == (1, 2)
+
+        # A fresh process sees the shared SQLite tier
+        assert EnrichmentCache(path=path).get("Tesco Stores 0112", "outgoing", "GBP") == tesco
+
+        # A whole history is written in one transaction and read back in one query
+        writer = EnrichmentCache(path=path)
+        writer.put_many([(f"MERCHANT {_letters(i)} 4417", "outgoing", "GBP", dict(tesco, merchant_name=str(i)))
+                         for i in range(1200)])
+        reader = EnrichmentCache(path=path)
+        statements = []
+        reader._connection().set_trace_callback(statements.append)
+        items = [(f"Merchant {_letters(i % 1200)} 0001", "outgoing", "GBP") for i in range(3000)]
+        found = reader.get_many(items + [("0041872213", "outgoing", "GBP"), ("NEW SHOP", "outgoing", "GBP")])
+        assert [value["merchant_name"] for value in found[:3000]] == [str(i % 1200) for i in range(3000)]
+        assert found[3000:] == [None, None]
+        assert (reader.hits, reader.misses) == (3000, 2)
+        assert sum(statement.startswith("SELECT") for statement in statements) == 3  # 1201 keys, chunks of 500
+
+        # Expired entries are ignored in both tiers
+        stale = EnrichmentCache(path=path, ttl_seconds=0.05)
+        stale.put("ASDA", "outgoing", "GBP", tesco)
+        time.sleep(0.1)
+        assert stale.get("ASDA", "outgoing", "GBP") is None
+        assert EnrichmentCache(path=path, ttl_seconds=0.05).get("ASDA", "outgoing", "GBP") is None
+
+    print("\n✅ Bounded LRU in front of SQLite; entries expire after their TTL")
+    print("\n" + "="*80)
+
+def test_streaming_serves_cache_hits():
+    print("\n" + "="*80)
+    print("TEST: Streaming Enrichment Serves Cache Hits")
+    print("="*80)
+
+    saved = enrichment_service.NTROPY_BATCH_POLL_SECONDS
+    enrichment_service.NTROPY_BATCH_POLL_SECONDS = 0.01
+    cache = EnrichmentCache(path=":memory:")
+    runs = []
+    try:
+        for _ in range(2):
+            sdk = FakeSDK()
+            service = fake_service(sdk, cache)
+
+            history = [dict(tx, description=f"shop {_letters(i)} 4417") for i, tx in enumerate(raw_transactions(60))]
+
+            async def collect():
+                return [event async for event in service.enrich_transactions_streaming(
+                    history, "user", "item", enable_agentic_enrichment=False
+                )]
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                runs.append((sdk, asyncio.run(collect())))
+    finally:
+        enrichment_service.NTROPY_BATCH_POLL_SECONDS = saved
+
+    (first_sdk, first_events), (second_sdk, second_events) = runs
+    assert len(first_sdk.submitted) == 1 and first_events[-1]["stats"]["cache_hit_rate"] == 0.0
+    # Same descriptions again: no batch, no single calls
+    assert not second_sdk.submitted and not second_sdk.single_calls
+    assert second_events[-1]["stats"]["cache_hits"] == 60
+    assert any(e.get("cache_hit_rate") == 1.0 for e in second_events if e["type"] == "progress")
+
+    first = first_events[-1]["result"]["enriched_transactions"]
+    second = second_events[-1]["result"]["enriched_transactions"]
+    assert [(r["merchant_clean_name"], r["labels"], r["budget_category"]) for r in second] == \
+        [(r["merchant_clean_name"], r["labels"], r["budget_category"]) for r in first]
+    print(f"   second run: {second_events[-1]['stats']['cache_hits']} hits, 0 API calls")
+
+    print("\n✅ Repeat histories are enriched from the cache and report their hit rate")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_canonical_descriptions()
+    test_cache_tiers_and_ttl()
+    test_streaming_serves_cache_hits()
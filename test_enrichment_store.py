@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test the enrichment result store: overlapping sync windows only send new or
+changed transactions through the pipeline, stored results come back exactly,
+and ghost pairs are still evaluated across the whole window.
+"""
+
+import asyncio
+import contextlib
+import io
+
+import enrichment_service
+from enrichment_cache import EnrichmentCache
+from enrichment_store import EnrichmentResultStore
+from ntropy_fakes import FakeSDK, fake_service, raw_transactions
+
+def _stream(service, history):
+    async def collect():
+        return [event async for event in service.enrich_transactions_streaming(
+            history, "user", "item", enable_agentic_enrichment=False
+        )]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(collect())[-1]
+
+def _sent(sdk):
+    return sorted([tx["id"] for batch in sdk.submitted.values() for tx in batch] + sdk.single_calls)
+
+def test_overlapping_windows_reuse_results():
+    print("\n" + "="*80)
+    print("TEST: Overlapping Sync Windows Reuse Stored Results")
+    print("="*80)
+
+    saved = enrichment_service.NTROPY_BATCH_POLL_SECONDS
+    enrichment_service.NTROPY_BATCH_POLL_SECONDS = 0.01
+    store = EnrichmentResultStore(path=":memory:")
+    history = raw_transactions(90)
+    try:
+        first_sdk = FakeSDK()
+        first = _stream(fake_service(first_sdk, result_store=store), history[:60])
+        assert len(_sent(first_sdk)) == 60
+
+        # Next sync: 30 new transactions, one edited, and a credit that makes
+        # the already-stored tx-50 one side of a transfer
+        window = [dict(tx) for tx in history[30:]]
+        window[10]["description"] = "shop 40 (amended)"
+        window.append({"transaction_id": "tx-transfer", "description": "TRANSFER FROM SAVINGS", "amount": 60,
+                       "transaction_type": "CREDIT", "timestamp": history[50]["timestamp"]})
+        second_sdk = FakeSDK()
+        second = _stream(fake_service(second_sdk, cache=EnrichmentCache(path=":memory:"), result_store=store), window)
+    finally:
+        enrichment_service.NTROPY_BATCH_POLL_SECONDS = saved
+
+    assert _sent(second_sdk) == sorted(["tx-40"] + [f"tx-{i}" for i in range(60, 90)])
+    assert second["stats"]["stored_reused"] == 28  # tx-30..59 except the edited tx-40 and tx-50, now a transfer
+
+    first_by_id = {r["transaction_id"]: r for r in first["result"]["enriched_transactions"]}
+    second_by_id = {r["transaction_id"]: r for r in second["result"]["enriched_transactions"]}
+    assert [r["transaction_id"] for r in second["result"]["enriched_transactions"]] == [tx["transaction_id"] for tx in window]
+    assert second_by_id["tx-31"] == first_by_id["tx-31"]
+    assert second_by_id["tx-40"]["merchant_clean_name"] == "Shop 40 (Amended)"
+    assert second_by_id["tx-50"]["transaction_type"] == "transfer"
+    assert second_by_id["tx-50"]["linked_transaction_id"] == "tx-transfer"
+    print(f"   second window: {len(_sent(second_sdk))} sent to Ntropy, {second['stats']['stored_reused']} reused")
+
+    print("\n✅ Only new or changed transactions are enriched; ghost pairs span the whole window")
+    print("\n" + "="*80)
+
+def test_store_keys():
+    print("\n" + "="*80)
+    print("TEST: Result Store Keys")
+    print("="*80)
+
+    store = EnrichmentResultStore(path=":memory:")
+    store.put_many("holder-a", [("tx-1", "hash-1", {"transaction_id": "tx-1", "labels": ["groceries"]})])
+    assert store.get_many("holder-a", [("tx-1", "hash-1")]) == {"tx-1": {"transaction_id": "tx-1", "labels": ["groceries"]}}
+    assert store.get_many("holder-a", [("tx-1", "hash-2")]) == {}  # content changed
+    assert store.get_many("holder-b", [("tx-1", "hash-1")]) == {}  # another account holder
+
+    # Non-streaming enrichment reuses the same store
+    first_sdk, second_sdk = FakeSDK(), FakeSDK()
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = asyncio.run(fake_service(first_sdk, result_store=store).enrich_transactions(raw_transactions(8), "user", "item"))
+        again = asyncio.run(fake_service(second_sdk, result_store=store).enrich_transactions(raw_transactions(8), "user", "item"))
+    assert len(first_sdk.single_calls) == 8 and not second_sdk.single_calls
+    assert again == first
+
+    print("\n✅ Results are keyed by account holder, transaction id and content hash")
+    print("\n" + "="*80)
+
+def test_duplicate_ids_are_not_reused():
+    print("\n" + "="*80)
+    print("TEST: Duplicate Transaction Ids Skip The Result Store")
+    print("="*80)
+
+    # Id-less transactions get a description hash as their id, so two
+    # charges at the same merchant share one
+    history = [
+        {"description": "TESCO STORES", "amount": -12.5, "transaction_type": "DEBIT", "timestamp": "2025-01-03T10:00:00Z"},
+        {"description": "TESCO STORES", "amount": -80.0, "transaction_type": "DEBIT", "timestamp": "2025-01-20T10:00:00Z"},
+        {"transaction_id": "tx-1", "description": "NETFLIX.COM", "amount": -9.99, "transaction_type": "DEBIT",
+         "timestamp": "2025-01-21T10:00:00Z"},
+    ]
+    expected = [(1250, "2025-01-03"), (8000, "2025-01-20"), (999, "2025-01-21")]
+    store = EnrichmentResultStore(path=":memory:")
+
+    runs = [_stream(fake_service(FakeSDK(), result_store=store), history) for _ in range(2)]
+    for run in runs:
+        assert [(r["amount_cents"], r["transaction_date"]) for r in run["result"]["enriched_transactions"]] == expected
+    assert runs[1]["stats"]["stored_reused"] == 1  # only tx-1
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(fake_service(FakeSDK(), result_store=store).enrich_transactions(history, "user", "item"))
+    assert [(r.amount_cents, r.transaction_date) for r in results] == expected
+    print(f"   second sync: {runs[1]['stats']['stored_reused']} reused, amounts {[r.amount_cents for r in results]}")
+
+    print("\n✅ Transactions sharing an id are enriched afresh instead of taking each other's results")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_overlapping_windows_reuse_results()
+    test_store_keys()
+    test_duplicate_ids_are_not_reused()
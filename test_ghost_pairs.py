@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Test Layer 0 ghost pair detection: the date-windowed detector must pair
+exactly the same transactions as the original full scan of each amount
+group, including duplicate ids, unparseable dates and competing candidates,
+and must handle a 50k-transaction history quickly.
+"""
+
+import contextlib
+import io
+import random
+import time
+from datetime import date, timedelta
+
+from enrichment_service import EnrichmentService, TrueLayerIngestModel
+
+def _reference_detect_ghost_pairs(service, normalized_transactions):
+    """The original full-scan detector, kept to check the windowed one against."""
+    from datetime import datetime
+
+    ghost_pairs = {}
+    processed_ids = set()
+
+    # Keywords for returned/bounced payments
+    # Note: "returned dd" matches "RETURNED DD" (the most common format)
+    BOUNCE_KEYWORDS = [
+        'returned dd',          # Most common format from banks
+        'direct debit returned',
+        'dd returned',
+        'unpaid direct debit',
+        'returned payment',
+        'payment returned',
+        'reversal',
+        'refund returned',
+        'chargeback',
+        'bounced',
+        'dishonoured',
+        'insufficient funds',
+        'reversed dd',
+    ]
+
+    # Group transactions by amount for faster matching
+    amount_groups = {}
+    for tx in normalized_transactions:
+        amount_cents = int(tx.amount * 100)
+        if amount_cents not in amount_groups:
+            amount_groups[amount_cents] = []
+        amount_groups[amount_cents].append(tx)
+
+    # PHASE 1: Detect bounced/returned direct debits FIRST
+    # These have special handling because the description changes
+    for tx in normalized_transactions:
+        if tx.transaction_id in processed_ids:
+            continue
+
+        tx_entry_type = service._determine_entry_type(tx)
+
+        # Only process incoming transactions for bounce detection
+        if tx_entry_type != "incoming":
+            continue
+
+        # Check if description matches bounce keywords
+        desc_lower = (tx.description or "").lower()
+        is_bounce = any(kw in desc_lower for kw in BOUNCE_KEYWORDS)
+
+        if not is_bounce:
+            continue
+
+        # Found a potential bounce credit - look for matching outgoing payment
+        amount_cents = int(tx.amount * 100)
+        candidates = amount_groups.get(amount_cents, [])
+
+        try:
+            tx_date = datetime.strptime(tx.timestamp, "%Y-%m-%d")
+        except ValueError:
+            continue
+
+        for candidate in candidates:
+            if candidate.transaction_id == tx.transaction_id:
+                continue
+            if candidate.transaction_id in processed_ids:
+                continue
+
+            candidate_entry_type = service._determine_entry_type(candidate)
+
+            # Must be outgoing (the original payment that bounced)
+            if candidate_entry_type != "outgoing":
+                continue
+
+            try:
+                candidate_date = datetime.strptime(candidate.timestamp, "%Y-%m-%d")
+            except ValueError:
+                continue
+
+            # Bounced payments can take up to 7 days to appear
+            # The returned credit usually comes AFTER the original debit
+            days_diff = (tx_date - candidate_date).days
+            if days_diff < 0 or days_diff > 7:
+                continue
+
+            # Found a bounce pair!
+            ghost_pairs[tx.transaction_id] = {
+                "linked_id": candidate.transaction_id,
+                "amount_cents": amount_cents,
+                "days_apart": abs(days_diff),
+                "entry_type": tx_entry_type,
+                "linked_entry_type": candidate_entry_type,
+                "pair_type": "bounced_payment"
+            }
+            ghost_pairs[candidate.transaction_id] = {
+                "linked_id": tx.transaction_id,
+                "amount_cents": amount_cents,
+                "days_apart": abs(days_diff),
+                "entry_type": candidate_entry_type,
+                "linked_entry_type": tx_entry_type,
+                "pair_type": "bounced_payment"
+            }
+
+            processed_ids.add(tx.transaction_id)
+            processed_ids.add(candidate.transaction_id)
+
+            break
+
+    # PHASE 2: Standard ghost pair detection (internal transfers)
+    for tx in normalized_transactions:
+        if tx.transaction_id in processed_ids:
+            continue
+
+        amount_cents = int(tx.amount * 100)
+        candidates = amount_groups.get(amount_cents, [])
+
+        tx_entry_type = service._determine_entry_type(tx)
+
+        try:
+            tx_date = datetime.strptime(tx.timestamp, "%Y-%m-%d")
+        except ValueError:
+            continue
+
+        for candidate in candidates:
+            if candidate.transaction_id == tx.transaction_id:
+                continue
+            if candidate.transaction_id in processed_ids:
+                continue
+
+            candidate_entry_type = service._determine_entry_type(candidate)
+
+            # Check opposite entry types
+            if tx_entry_type == candidate_entry_type:
+                continue
+
+            try:
+                candidate_date = datetime.strptime(candidate.timestamp, "%Y-%m-%d")
+            except ValueError:
+                continue
+
+            # Check within 2 days
+            days_diff = abs((tx_date - candidate_date).days)
+            if days_diff > 2:
+                continue
+
+            # Found a ghost pair!
+            ghost_pairs[tx.transaction_id] = {
+                "linked_id": candidate.transaction_id,
+                "amount_cents": amount_cents,
+                "days_apart": days_diff,
+                "entry_type": tx_entry_type,
+                "linked_entry_type": candidate_entry_type,
+                "pair_type": "transfer"
+            }
+            ghost_pairs[candidate.transaction_id] = {
+                "linked_id": tx.transaction_id,
+                "amount_cents": amount_cents,
+                "days_apart": days_diff,
+                "entry_type": candidate_entry_type,
+                "linked_entry_type": tx_entry_type,
+                "pair_type": "transfer"
+            }
+
+            processed_ids.add(tx.transaction_id)
+            processed_ids.add(candidate.transaction_id)
+
+            break
+
+    return ghost_pairs
+
+def _history(seed, size, days=730):
+    """Random history with common amounts, transfers, bounces and a few bad rows."""
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    descriptions = ["TESCO STORES", "TRANSFER TO SAVINGS", "FROM J SMITH", "DD BRITISH GAS",
+                    "RETURNED DD BRITISH GAS", "CHARGEBACK AMAZON", "Reversal - card payment"]
+    types = ["DEBIT", "CREDIT", "DIRECT_DEBIT", "STANDING_ORDER", "", None]
+    transactions = []
+    for i in range(size):
+        timestamp = (start + timedelta(days=rng.randrange(days))).isoformat()
+        if rng.random() < 0.01:
+            timestamp = rng.choice(["", "2024-13-01", "pending"])
+        transactions.append(TrueLayerIngestModel(
+            transaction_id=f"tx-{rng.randrange(size * 2) if rng.random() < 0.02 else i}",
+            description=rng.choice(descriptions),
+            amount=rng.choice((10.0, 50.0, 25.99, 100.0, round(rng.uniform(1, 500), 2))),
+            original_amount_sign=rng.choice((1, -1)),
+            transaction_type=rng.choice(types),
+            timestamp=timestamp,
+        ))
+    return transactions
+
+def test_ghost_pairs_match_full_scan():
+    print("\n" + "="*80)
+    print("TEST: Windowed Ghost Pair Detection Matches Full Scan")
+    print("="*80)
+
+    service = EnrichmentService(api_key="")
+    for seed, size, days in ((1, 300, 30), (2, 2000, 90), (3, 3000, 730)):
+        transactions = _history(seed, size, days)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = _reference_detect_ghost_pairs(service, transactions)
+            pairs = service._detect_ghost_pairs(transactions)
+        assert list(pairs.items()) == list(expected.items())
+        kinds = {info["pair_type"] for info in pairs.values()}
+        print(f"   {size} transactions over {days} days: {len(pairs) // 2} pairs {sorted(kinds)}")
+        assert kinds == {"transfer", "bounced_payment"}
+
+    print("\n✅ Same pairs, in the same order, as the full scan")
+    print("\n" + "="*80)
+
+def test_ghost_pairs_large_history():
+    print("\n" + "="*80)
+    print("TEST: Ghost Pair Detection on 50k Transactions")
+    print("="*80)
+
+    service = EnrichmentService(api_key="")
+    transactions = _history(4, 50000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        pairs = service._detect_ghost_pairs(transactions)
+        elapsed = time.perf_counter() - start
+    print(f"   {len(pairs) // 2} pairs in {elapsed * 1000:.0f}ms")
+    assert pairs and elapsed < 2.0
+
+    print("\n✅ 50k transactions paired without a quadratic scan")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_ghost_pairs_match_full_scan()
+    test_ghost_pairs_large_history()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test the shared compiled keyword matcher: it finds exactly the keywords a
+substring check would (overlapping and nested ones included), the
+classification and confidence functions built on it keep their precedence,
+and edited keyword lists take effect after a reload.
+"""
+
+import contextlib
+import io
+import random
+
+import enrichment_service
+from enrichment_service import (
+    AMBIGUITY_PENALTIES,
+    BOUNCE_KEYWORDS,
+    DEBT_LABELS,
+    EnrichmentService,
+    FIXED_COST_LABELS,
+    PAYMENT_PROCESSOR_PENALTIES,
+    RECURRING_KEYWORDS,
+)
+from keyword_matcher import KeywordMatcher, get_keyword_matcher, reload_keywords
+
+def _reference_category(text, is_recurring, entry_type):
+    """classify_transaction / _classify_by_keywords as linear keyword scans"""
+    if any(kw in text for kw in DEBT_LABELS):
+        return "debt"
+    if any(kw in text for kw in FIXED_COST_LABELS):
+        return "fixed"
+    if is_recurring and entry_type == "outgoing":
+        return "fixed"
+    return "discretionary" if entry_type == "outgoing" else "income"
+
+def _reference_penalty(merchant_name, labels, description):
+    """The penalty search of _calculate_ntropy_confidence as linear keyword scans"""
+    lowest, reason = 1.0, None
+    for text, penalties, kind in (
+        [((merchant_name or "").lower(), AMBIGUITY_PENALTIES, "ambiguous merchant")]
+        + [(label.lower(), AMBIGUITY_PENALTIES, "ambiguous label") for label in labels]
+        + [((description or "").lower(), PAYMENT_PROCESSOR_PENALTIES, "payment processor in description")]
+    ):
+        for keyword, penalty in penalties.items():
+            if keyword in text and penalty < lowest:
+                lowest, reason = penalty, f"{kind}: {keyword}"
+    return lowest, reason
+
+def test_scan_matches_substring_checks():
+    print("\n" + "="*80)
+    print("TEST: Keyword Scan vs Substring Checks")
+    print("="*80)
+
+    rng = random.Random(48)
+    # Nested and overlapping keywords: prefixes, suffixes and shared middles
+    groups = {"a": ["card", "credit card", "credit", "edit", "it c"], "b": ["dd ", "dd returned", "returned dd", "d r"]}
+    vocabulary = {kw for keywords in groups.values() for kw in keywords}
+    matcher = KeywordMatcher(groups)
+    fragments = sorted(vocabulary) + ["x", " ", "re", "cred", "turned"]
+    for _ in range(3000):
+        text = "".join(rng.choice(fragments) for _ in range(rng.randint(0, 8)))
+        hits = matcher.scan(text)
+        assert hits == {kw for kw in vocabulary if kw in text}, text
+        assert matcher.matches(hits, "a") == [kw for kw in groups["a"] if kw in text]
+
+    shared = get_keyword_matcher()
+    words = sorted({w for kw in DEBT_LABELS + FIXED_COST_LABELS + BOUNCE_KEYWORDS + RECURRING_KEYWORDS for w in kw.split()})
+    all_keywords = set(DEBT_LABELS + FIXED_COST_LABELS + BOUNCE_KEYWORDS + RECURRING_KEYWORDS)
+    for _ in range(3000):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 6)))
+        assert {kw for kw in shared.scan(text) if kw in all_keywords} == {kw for kw in all_keywords if kw in text}
+    print("   6000 random texts: hits identical to substring checks")
+
+    print("\n✅ One scan finds exactly the keywords substring checks would")
+    print("\n" + "="*80)
+
+def test_classification_precedence_and_reload():
+    print("\n" + "="*80)
+    print("TEST: Classification Precedence And Reload")
+    print("="*80)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = EnrichmentService(api_key="")
+    rng = random.Random(7)
+    vocabulary = DEBT_LABELS + FIXED_COST_LABELS + list(AMBIGUITY_PENALTIES) + ["groceries", "Transport", "PAYPAL *UBER"]
+    for _ in range(2000):
+        labels = rng.sample(vocabulary, rng.randint(0, 3))
+        is_recurring = rng.random() < 0.3
+        entry_type = rng.choice(["outgoing", "incoming"])
+        expected = _reference_category(" ".join(l.lower() for l in labels), is_recurring, entry_type)
+        assert service.classify_transaction(labels, is_recurring, entry_type) == expected, labels
+
+        description = " ".join(rng.sample(vocabulary + list(PAYMENT_PROCESSOR_PENALTIES), 2)).lower()
+        expected = _reference_category(description + " " + " ".join(l.lower() for l in labels), is_recurring, entry_type)
+        assert service._classify_by_keywords(description, labels, is_recurring, entry_type) == expected
+
+        merchant = rng.choice([None, "Amazon", "Tesco Express", "Unknown Services", "Pret"])
+        confidence, reason = service._calculate_ntropy_confidence(merchant, labels, original_description=description)
+        penalty, expected_reason = _reference_penalty(merchant, labels, description)
+        base = 0.7 + 0.1 * bool(merchant and len(merchant) >= 3) \
+            + 0.1 * any(l.lower() not in enrichment_service.GENERIC_LABELS for l in labels)
+        assert reason == expected_reason and abs(confidence - base * penalty) < 1e-9
+
+    # Lists edited at runtime apply after a reload
+    assert service.classify_transaction(["tabby instalment"], False, "outgoing") == "discretionary"
+    DEBT_LABELS.append("tabby")
+    try:
+        reload_keywords()
+        assert service.classify_transaction(["tabby instalment"], False, "outgoing") == "debt"
+    finally:
+        DEBT_LABELS.remove("tabby")
+        reload_keywords()
+    assert service.classify_transaction(["tabby instalment"], False, "outgoing") == "discretionary"
+    assert enrichment_service.get_keyword_matcher() is get_keyword_matcher()
+    print("   2000 random label sets: categories and penalty reasons unchanged")
+
+    print("\n✅ Classification keeps its precedence and picks up reloaded keyword lists")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_scan_matches_substring_checks()
+    test_classification_precedence_and_reload()
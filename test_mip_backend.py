@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test the MIP backend against the same constraints as the CP-SAT model,
+and check that the LP relaxation bounds the MIP objective from below.
+"""
+
+from datetime import date
+from solver_engine import (
+    solve_payment_plan,
+    build_columnar_plan,
+    DebtPortfolio,
+    Account,
+    MinPaymentRule,
+    Budget,
+    UserPreferences,
+    AccountType,
+    OptimizationStrategy,
+    PaymentShape,
+    SolverBackend,
+)
+
+def test_mip_plan_and_lp_bound():
+    """
+    Two accounts, one with a 6-month promo, minimizing total interest.
+    Every month must pay at least the minimum, interest must match the
+    floor(balance * APR / 12) rule, and the LP bound must not exceed the MIP objective.
+    """
+    print("\n" + "="*80)
+    print("TEST: MIP Backend Plan + LP Relaxation Lower Bound")
+    print("="*80)
+
+    accounts = [
+        Account(
+            lender_name="Promo Card",
+            account_type=AccountType.CREDIT_CARD,
+            current_balance_cents=300000,  # $3,000
+            apr_standard_bps=2499,
+            payment_due_day=15,
+            min_payment_rule=MinPaymentRule(fixed_cents=2500, percentage_bps=200),
+            promo_duration_months=6,
+        ),
+        Account(
+            lender_name="Loan",
+            account_type=AccountType.LOAN,
+            current_balance_cents=150000,  # $1,500
+            apr_standard_bps=1999,
+            payment_due_day=1,
+            min_payment_rule=MinPaymentRule(fixed_cents=5000, percentage_bps=300, includes_interest=True),
+        ),
+    ]
+
+    def build_portfolio():
+        return DebtPortfolio(
+            accounts=accounts,
+            budget=Budget(monthly_budget_cents=40000),  # $400/month
+            preferences=UserPreferences(
+                strategy=OptimizationStrategy.MINIMIZE_TOTAL_INTEREST,
+                payment_shape=PaymentShape.OPTIMIZED_MONTH_TO_MONTH,
+            ),
+            plan_start_date=date(2026, 1, 1),
+        )
+
+    mip = solve_payment_plan(build_portfolio(), SolverBackend.MIP)
+    lp = solve_payment_plan(build_portfolio(), SolverBackend.LP_RELAXATION)
+
+    print(f"\nMIP status: {mip.status}, objective: {mip.objective_value}")
+    print(f"LP status: {lp.status}, lower bound: {lp.best_bound}")
+
+    assert mip.status in ("OPTIMAL", "FEASIBLE")
+    assert lp.status == "LOWER_BOUND"
+    assert lp.best_bound <= mip.objective_value + 1e-6
+    assert mip.num_variables > 0 and mip.num_constraints > 0
+    assert mip.relative_gap is not None and mip.relative_gap <= 1e-4
+
+    for account in accounts:
+        rows = sorted((r for r in mip.results if r.lender_name == account.lender_name), key=lambda r: r.month)
+        previous_balance = account.current_balance_cents
+        for row in rows:
+            apr_bps = 0 if account.promo_duration_months and row.month <= account.promo_duration_months else account.apr_standard_bps
+            interest = previous_balance * apr_bps // 120000
+            owed = previous_balance + interest
+            rule = account.min_payment_rule
+            base = owed if rule.includes_interest else previous_balance
+            minimum = min(max(rule.fixed_cents, base * rule.percentage_bps // 10000), owed)
+
+            assert row.interest_charged_cents == interest, f"{account.lender_name} month {row.month}: interest mismatch"
+            assert minimum <= row.payment_cents <= owed, f"{account.lender_name} month {row.month}: payment out of range"
+            assert row.ending_balance_cents == owed - row.payment_cents
+            previous_balance = row.ending_balance_cents
+
+        assert previous_balance == 0, f"{account.lender_name} was not paid off"
+
+    # The columnar view must carry the same numbers as the row plan
+    columnar = build_columnar_plan(build_portfolio(), mip.results)
+    assert columnar["months"] == max(r.month for r in mip.results)
+    for r in mip.results:
+        idx = columnar["lenders"].index(r.lender_name)
+        assert columnar["payments"][idx][r.month - 1] == r.payment_cents
+        assert columnar["balances"][idx][r.month - 1] == r.ending_balance_cents
+        assert columnar["interest"][idx][r.month - 1] == r.interest_charged_cents
+    assert sum(columnar["total_interest_by_year"]) == sum(r.interest_charged_cents for r in mip.results)
+    assert sum(columnar["total_paid_by_account"]) == sum(r.payment_cents for r in mip.results)
+
+    print("\n✅ MIP plan satisfies all constraints")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_mip_plan_and_lp_bound()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test Ntropy batch enrichment against an in-memory stand-in for the SDK:
+histories go out as a few large batches that are polled to completion,
+only stragglers (a failed batch, a missing result) fall back to
+per-transaction calls (run over a sliding window), and every result is
+parsed like a single call's.
+"""
+
+import asyncio
+import contextlib
+import io
+import threading
+import time
+
+import enrichment_service
+from enrichment_cache import EnrichmentCache, detect_recurrence
+from ntropy_fakes import Enriched, FakeSDK, fake_service, raw_transactions
+
+def test_batches_with_straggler_fallback():
+    print("\n" + "="*80)
+    print("TEST: Ntropy Batch Enrichment")
+    print("="*80)
+
+    saved = (enrichment_service.NTROPY_BATCH_SIZE, enrichment_service.NTROPY_BATCH_POLL_SECONDS)
+    enrichment_service.NTROPY_BATCH_SIZE, enrichment_service.NTROPY_BATCH_POLL_SECONDS = 40, 0.01
+    try:
+        sdk = FakeSDK(failing_batch="batch-2", missing_id="tx-5")
+        service = fake_service(sdk)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(service.enrich_transactions(raw_transactions(100), "user", "item"))
+
+        assert [r.transaction_id for r in results] == [f"tx-{i}" for i in range(100)]
+        assert len(sdk.submitted) == 3
+        # Only the failed batch (tx-80..99) and the missing result go one by one
+        assert sorted(sdk.single_calls) == sorted(["tx-5"] + [f"tx-{i}" for i in range(80, 100)])
+        assert all(r.merchant_clean_name == f"Shop {i}" and r.labels == ["groceries"] for i, r in enumerate(results))
+        print(f"   100 transactions: {len(sdk.submitted)} batches, {len(sdk.single_calls)} individual calls")
+
+        # Small histories skip batching
+        sdk = FakeSDK()
+        service = fake_service(sdk)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(service.enrich_transactions(raw_transactions(5), "user", "item"))
+        assert not sdk.submitted and len(sdk.single_calls) == 5 and len(results) == 5
+    finally:
+        enrichment_service.NTROPY_BATCH_SIZE, enrichment_service.NTROPY_BATCH_POLL_SECONDS = saved
+
+    print("\n✅ Batched results parse like single calls; only stragglers are enriched one by one")
+    print("\n" + "="*80)
+
+def test_streaming_reports_batch_progress():
+    print("\n" + "="*80)
+    print("TEST: Streaming Enrichment Over Batches")
+    print("="*80)
+
+    saved = enrichment_service.NTROPY_BATCH_POLL_SECONDS
+    enrichment_service.NTROPY_BATCH_POLL_SECONDS = 0.01
+    try:
+        sdk = FakeSDK()
+        service = fake_service(sdk)
+
+        async def collect():
+            return [event async for event in service.enrich_transactions_streaming(
+                raw_transactions(60), "user", "item", enable_agentic_enrichment=False
+            )]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            events = asyncio.run(collect())
+    finally:
+        enrichment_service.NTROPY_BATCH_POLL_SECONDS = saved
+
+    assert len(sdk.submitted) == 1 and not sdk.single_calls
+    assert any(e.get("ntropy_batch_total") == 60 for e in events)
+    complete = events[-1]
+    assert complete["type"] == "complete"
+    assert [r["transaction_id"] for r in complete["result"]["enriched_transactions"]] == [f"tx-{i}" for i in range(60)]
+    print(f"   {len(events)} events, 1 batch, no individual calls")
+
+    print("\n✅ Streaming enrichment reports batch progress and classifies every transaction")
+    print("\n" + "="*80)
+
+class _SlowSDK(FakeSDK):
+    """Single calls take 0.02s, except 'shop 0' which takes 0.3s."""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.in_flight = self.peak = 0
+        self.started, self.finished = {}, {}
+
+    def _create_single(self, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            self.started[kwargs["id"]] = time.monotonic()
+        time.sleep(0.3 if kwargs["description"] == "shop 0" else 0.02)
+        with self.lock:
+            self.in_flight -= 1
+            self.finished[kwargs["id"]] = time.monotonic()
+        return super()._create_single(**kwargs)
+
+def test_sliding_window():
+    print("\n" + "="*80)
+    print("TEST: Sliding-Window Enrichment")
+    print("="*80)
+
+    sdk = _SlowSDK()
+    service = fake_service(sdk)
+    tx_data_list = [
+        {"id": f"tx-{i}", "description": f"shop {i}", "amount": 10.0, "entry_type": "outgoing",
+         "currency": "GBP", "date": "2025-01-01", "account_holder_id": "holder", "country": "GB"}
+        for i in range(25)
+    ]
+    delivered = []
+
+    async def run():
+        return await service._enrich_concurrent(
+            tx_data_list, asyncio.get_running_loop(), on_result=lambda index, result: delivered.append(index)
+        )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(run())
+
+    assert [r["id"] for r in results] == [tx["id"] for tx in tx_data_list]
+    assert sdk.peak <= enrichment_service.NTROPY_WINDOW_SIZE
+    # Calls beyond the first window start while the slow one is still running
+    assert all(sdk.started[f"tx-{i}"] < sdk.finished["tx-0"] for i in range(10, 25))
+    assert delivered[-1] == 0 and sorted(delivered) == list(range(25))
+    print(f"   25 calls, peak {sdk.peak} in flight, slow call delivered last")
+
+    print("\n✅ A slow call holds one slot while the rest of the window keeps moving")
+    print("\n" + "="*80)
+
+class _RecurringSDK(FakeSDK):
+    """Ntropy's recurrence for one merchant charged monthly; everything else is one off"""
+
+    def _create_single(self, **kwargs):
+        self.single_calls.append(kwargs["id"])
+        periodicity = "monthly" if kwargs["description"].startswith("CINEMA CLUB") else None
+        return Enriched(kwargs["id"], kwargs["description"], periodicity)
+
+def test_cache_hits_keep_recurrence():
+    print("\n" + "="*80)
+    print("TEST: Recurrence of Cache Hits")
+    print("="*80)
+
+    # A monthly membership with no fixed-cost keyword, next to one-off shops
+    history = [
+        {"transaction_id": f"tx-{month}", "description": f"CINEMA CLUB 00{month}", "amount": -12.99,
+         "transaction_type": "DEBIT", "timestamp": f"2025-{month:02d}-{14 + month % 3:02d}T10:00:00Z"}
+        for month in range(1, 7)
+    ] + [
+        {"transaction_id": f"shop-{i}", "description": f"CORNER SHOP {i}", "amount": -4.5,
+         "transaction_type": "DEBIT", "timestamp": f"2025-0{i}-03T10:00:00Z"}
+        for i in (2, 5)
+    ]
+    cache = EnrichmentCache(path=":memory:")
+
+    def classify(prefix, streaming=False):
+        sdk = _RecurringSDK()
+        service = fake_service(sdk, cache)
+        raw = [dict(tx, transaction_id=prefix + tx["transaction_id"]) for tx in history]
+
+        async def stream():
+            events = [event async for event in service.enrich_transactions_streaming(
+                raw, "user", "item", enable_agentic_enrichment=False
+            )]
+            return [enrichment_service.NtropyOutputModel(**tx) for tx in events[-1]["result"]["enriched_transactions"]]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(stream() if streaming else service.enrich_transactions(raw, "user", "item"))
+        return sdk, [(r.budget_category, r.is_recurring, r.recurrence_frequency) for r in results]
+
+    miss_sdk, misses = classify("first-")
+    hit_sdk, hits = classify("second-")
+    _, streamed_hits = classify("third-", streaming=True)
+
+    assert len(miss_sdk.single_calls) == 8 and not hit_sdk.single_calls and not hit_sdk.submitted
+    assert misses[:6] == [("fixed", True, "monthly")] * 6
+    assert misses[6:] == [("discretionary", False, None)] * 2
+    assert hits == misses and streamed_hits == misses
+    print(f"   miss: {misses[0]}, hit: {hits[0]}")
+
+    # Local cadence detection: one skipped charge is tolerated, irregular shopping is not
+    assert detect_recurrence([1, 8, 15, 22, 29]) == "weekly"
+    assert detect_recurrence([1, 31, 92, 122, 153]) == "monthly"
+    assert detect_recurrence([1, 2, 9, 30, 33, 70]) is None
+    assert detect_recurrence([1, 31]) is None
+
+    print("\n✅ A recurring merchant classifies the same whether its enrichment was cached or not")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_batches_with_straggler_fallback()
+    test_streaming_reports_batch_progress()
+    test_sliding_window()
+    test_cache_hits_keep_recurrence()
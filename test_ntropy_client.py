@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test the async Ntropy client against a mocked API: rate-limited calls are
+retried, existing account holders are not an error, and the enrichment
+service runs its batch and per-transaction paths on it, creating each
+account holder only once.
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+
+import httpx
+
+import enrichment_service
+import ntropy_client
+from enrichment_cache import EnrichmentCache
+from enrichment_service import EnrichmentService
+from enrichment_store import EnrichmentResultStore
+from ntropy_client import NtropyAsyncClient
+
+class _FakeAPI:
+    """Ntropy v3 endpoints in memory; the first call of each kind is rate limited once."""
+
+    def __init__(self, rate_limit=False):
+        self.requests = []
+        self.holders = set()
+        self.batches = {}
+        self.rate_limit = rate_limit
+
+    @staticmethod
+    def _enriched(tx):
+        return {
+            "id": tx["id"],
+            "entities": {"counterparty": {"name": tx["description"].title(), "logo": None, "website": None}},
+            "categories": {"general": "groceries"},
+        }
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.method, request.url.path))
+        assert request.headers["X-API-Key"] == "test-key"
+        if self.rate_limit:
+            self.rate_limit = False
+            return httpx.Response(429, headers={"retry-after": "0"}, json={"detail": "rate limited"})
+
+        path = request.url.path
+        body = json.loads(request.content) if request.content else None
+        if path == "/v3/account_holders":
+            if body["id"] in self.holders:
+                return httpx.Response(409, json={"detail": "already exists"})
+            self.holders.add(body["id"])
+            return httpx.Response(200, json=body)
+        if path == "/v3/transactions":
+            return httpx.Response(200, json=self._enriched(body))
+        if path == "/v3/batches":
+            batch_id = f"batch-{len(self.batches)}"
+            self.batches[batch_id] = body["data"]
+            return httpx.Response(200, json={"id": batch_id, "status": "processing", "progress": 0, "total": len(body["data"])})
+        batch_id = path.split("/")[3]
+        if path.endswith("/results"):
+            return httpx.Response(200, json={"id": batch_id, "results": [self._enriched(tx) for tx in self.batches[batch_id]]})
+        total = len(self.batches[batch_id])
+        return httpx.Response(200, json={"id": batch_id, "status": "completed", "progress": total, "total": total})
+
+def _raw_transactions(count):
+    return [
+        {"transaction_id": f"tx-{i}", "description": f"shop {i}", "amount": -(10 + i),
+         "transaction_type": "DEBIT", "timestamp": f"2025-01-{1 + i % 28:02d}T10:00:00Z"}
+        for i in range(count)
+    ]
+
+def test_client_retries_and_conflicts():
+    print("\n" + "="*80)
+    print("TEST: Async Ntropy Client")
+    print("="*80)
+
+    api = _FakeAPI(rate_limit=True)
+
+    async def run():
+        client = NtropyAsyncClient("test-key", transport=httpx.MockTransport(api.handler))
+        try:
+            created = await client.create_account_holder("holder-1", name="Test")
+            again = await client.create_account_holder("holder-1", name="Test")
+            enriched = await client.enrich_transaction({"id": "tx-1", "description": "tesco"}, timeout=5.0)
+        finally:
+            await client.aclose()
+        return created, again, enriched
+
+    created, again, enriched = asyncio.run(run())
+    assert created is True and again is False
+    assert enriched["entities"]["counterparty"]["name"] == "Tesco"
+    # The 429 was retried once
+    assert api.requests.count(("POST", "/v3/account_holders")) == 3
+    print(f"   {len(api.requests)} requests, 429 retried, 409 treated as existing")
+
+    print("\n✅ Rate-limited calls are retried and existing account holders are not an error")
+    print("\n" + "="*80)
+
+def test_service_on_async_client():
+    print("\n" + "="*80)
+    print("TEST: Enrichment Service On The Async Client")
+    print("="*80)
+
+    api = _FakeAPI()
+    saved = enrichment_service.NTROPY_BATCH_POLL_SECONDS
+    enrichment_service.NTROPY_BATCH_POLL_SECONDS = 0.01
+    enrichment_service._known_account_holders.clear()
+
+    async def run():
+        # Route the shared client for this loop through the fake API
+        client = NtropyAsyncClient("test-key", transport=httpx.MockTransport(api.handler))
+        ntropy_client._clients[asyncio.get_running_loop()] = {"test-key": client}
+        try:
+            results = []
+            for count in (60, 5):
+                service = EnrichmentService(
+                    api_key="test-key",
+                    cache=EnrichmentCache(path=":memory:"),
+                    result_store=EnrichmentResultStore(path=":memory:"),
+                )
+                results.append(await service.enrich_transactions(_raw_transactions(count), "user", "item"))
+            return results
+        finally:
+            await ntropy_client.close_ntropy_clients()
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            batched, single = asyncio.run(run())
+    finally:
+        enrichment_service.NTROPY_BATCH_POLL_SECONDS = saved
+
+    assert [r.merchant_clean_name for r in batched] == [f"Shop {i}" for i in range(60)]
+    assert [r.merchant_clean_name for r in single] == [f"Shop {i}" for i in range(5)]
+    assert len(api.batches) == 1
+    assert api.requests.count(("POST", "/v3/transactions")) == 5
+    # The second request reused the account holder created by the first
+    assert api.requests.count(("POST", "/v3/account_holders")) == 1
+    print(f"   {len(api.requests)} requests: 1 account holder, 1 batch, 5 single calls")
+
+    print("\n✅ Batch and per-transaction enrichment run on the async client; holders are created once")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_client_retries_and_conflicts()
+    test_service_on_async_client()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test the process-wide Ntropy rate limiter: in-flight calls never exceed the
+concurrency cap, credits refill at the configured rate, queued requests are
+served round-robin, calls from another thread's event loop share the same
+limits, and a 429 holds every caller and shows up in the metrics.
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+
+from ntropy_client import NtropyAsyncClient
+from ntropy_limiter import NtropyRateLimiter, ntropy_request_scope
+
+def test_concurrency_and_credits():
+    print("\n" + "="*80)
+    print("TEST: Concurrency Cap And Credit Refill")
+    print("="*80)
+
+    limiter = NtropyRateLimiter(credits_per_second=1000.0, burst_credits=1000.0, max_concurrency=3)
+    peak = {"in_flight": 0, "max": 0}
+
+    async def call():
+        async with limiter.slot():
+            peak["in_flight"] += 1
+            peak["max"] = max(peak["max"], peak["in_flight"])
+            await asyncio.sleep(0.01)
+            peak["in_flight"] -= 1
+
+    async def run_calls():
+        await asyncio.gather(*[call() for _ in range(30)])
+
+    # Calls from a second event loop in another thread share the same slots
+    other = threading.Thread(target=lambda: asyncio.run(run_calls()))
+    other.start()
+    asyncio.run(run_calls())
+    other.join()
+    assert peak["max"] <= 3
+    assert limiter.metrics()["granted"] == 60 and limiter.metrics()["in_flight"] == 0
+
+    # 100 credits/s with a 10-credit burst: 30 one-credit calls need ~0.2s
+    limiter = NtropyRateLimiter(credits_per_second=100.0, burst_credits=10.0, max_concurrency=10)
+
+    async def spend():
+        for _ in range(30):
+            async with limiter.slot(1.0):
+                pass
+
+    start = time.monotonic()
+    asyncio.run(spend())
+    elapsed = time.monotonic() - start
+    assert 0.15 <= elapsed < 1.0, elapsed
+    print(f"   peak in flight {peak['max']}/3; 30 credits over a 10-credit burst took {elapsed:.2f}s")
+
+    print("\n✅ In-flight calls stay under the cap and credits refill at the configured rate")
+    print("\n" + "="*80)
+
+def test_fair_queueing_and_rate_limits():
+    print("\n" + "="*80)
+    print("TEST: Fair Queueing And 429 Handling")
+    print("="*80)
+
+    limiter = NtropyRateLimiter(max_concurrency=1)
+    order = []
+
+    async def call(key, label):
+        with ntropy_request_scope(key):
+            async with limiter.slot():
+                order.append(label)
+                await asyncio.sleep(0.005)
+
+    async def run():
+        large = [asyncio.ensure_future(call("large", f"L{i}")) for i in range(6)]
+        await asyncio.sleep(0)
+        small = [asyncio.ensure_future(call("small", f"S{i}")) for i in range(2)]
+        await asyncio.gather(*large, *small)
+
+    asyncio.run(run())
+    # The small request is served between the large one's calls, not after all of them
+    assert order == ["L0", "L1", "S0", "L2", "S1", "L3", "L4", "L5"], order
+
+    # A 429 pauses the limiter and is retried
+    responses = iter([
+        httpx.Response(429, headers={"retry-after": "0.2"}),
+        httpx.Response(200, json={"id": "tx-1"}),
+    ])
+    limiter = NtropyRateLimiter()
+
+    async def enrich():
+        client = NtropyAsyncClient("key", limiter=limiter, transport=httpx.MockTransport(lambda request: next(responses)))
+        try:
+            start = time.monotonic()
+            result = await client.enrich_transaction({"id": "tx-1"})
+            return result, time.monotonic() - start
+        finally:
+            await client.aclose()
+
+    result, elapsed = asyncio.run(enrich())
+    metrics = limiter.metrics()
+    assert result == {"id": "tx-1"} and elapsed >= 0.2
+    assert metrics["rate_limited"] == 1 and metrics["granted"] == 2
+    assert set(metrics) >= {"concurrency_utilization", "credit_utilization", "queue_wait_p95_seconds"}
+    print(f"   order {order}; 429 retried after {elapsed:.2f}s")
+
+    print("\n✅ Requests share the limiter round-robin and 429s hold every caller before retrying")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_concurrency_and_credits()
+    test_fair_queueing_and_rate_limits()
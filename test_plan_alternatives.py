@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test diverse alternative plans: the greedy selection must respect the objective
+order and the diversity threshold, and a real CP-SAT solve must return the
+requested number of alternatives, each a valid plan within tolerance of the
+primary plan and apart from every other plan returned.
+"""
+
+from datetime import date
+from solver_engine import (
+    solve_payment_plan,
+    DebtPortfolio,
+    Account,
+    MinPaymentRule,
+    Budget,
+    UserPreferences,
+    AccountType,
+    OptimizationStrategy,
+    PaymentShape,
+    SolverBackend,
+    PlanArrays,
+)
+from plan_pool import payment_distance, select_diverse_plans, DEFAULT_MIN_DIVERSITY, DEFAULT_OBJECTIVE_TOLERANCE
+
+def _plan(payments):
+    zeros = [[0] * len(row) for row in payments]
+    return PlanArrays(payments=payments, interest=zeros, balances=zeros)
+
+def _plan_from_results(results, accounts, months):
+    """Payments per account over the first `months` months, read back from a plan's MonthlyResults"""
+    payments = [[0] * months for _ in accounts]
+    names = [account.lender_name for account in accounts]
+    for r in results:
+        payments[names.index(r.lender_name)][r.month - 1] = r.payment_cents
+    return _plan(payments)
+
+def test_select_diverse_plans():
+    """Near-duplicates of the best plan are skipped in favour of a distinct one."""
+    print("\n" + "="*80)
+    print("TEST: Diverse Plan Selection")
+    print("="*80)
+
+    best = _plan([[100, 100], [100, 100]])
+    near_duplicate = _plan([[101, 99], [100, 100]])
+    front_loaded = _plan([[200, 0], [100, 100]])
+
+    assert payment_distance(best, best) == 0.0
+    assert payment_distance(best, front_loaded) == 0.25
+
+    chosen = select_diverse_plans([(12.0, front_loaded), (10.0, best), (11.0, near_duplicate)], k=3, min_diversity=0.1)
+
+    assert [objective for objective, _, _ in chosen] == [10.0, 12.0]
+    assert chosen[0][1] == 0.0
+    assert chosen[1][1] == 0.25
+
+    print("\n✅ Selection keeps the best plan and skips near-duplicates")
+    print("\n" + "="*80)
+
+def test_alternatives_from_cp_sat():
+    """The requested alternatives come back as distinct complete plans near the best objective."""
+    print("\n" + "="*80)
+    print("TEST: Alternative Plans From CP-SAT")
+    print("="*80)
+
+    accounts = [
+        Account(
+            lender_name="Promo Card",
+            account_type=AccountType.CREDIT_CARD,
+            current_balance_cents=300000,  # $3,000
+            apr_standard_bps=2499,
+            payment_due_day=15,
+            min_payment_rule=MinPaymentRule(fixed_cents=2500, percentage_bps=200),
+            promo_duration_months=6,
+        ),
+        Account(
+            lender_name="Loan",
+            account_type=AccountType.LOAN,
+            current_balance_cents=150000,  # $1,500
+            apr_standard_bps=1999,
+            payment_due_day=1,
+            min_payment_rule=MinPaymentRule(fixed_cents=5000, percentage_bps=300, includes_interest=True),
+        ),
+    ]
+    portfolio = DebtPortfolio(
+        accounts=accounts,
+        budget=Budget(monthly_budget_cents=60000),  # $600/month
+        preferences=UserPreferences(
+            strategy=OptimizationStrategy.TARGET_MAX_BUDGET,
+            payment_shape=PaymentShape.OPTIMIZED_MONTH_TO_MONTH,
+        ),
+        plan_start_date=date(2026, 1, 1),
+    )
+
+    result = solve_payment_plan(portfolio, SolverBackend.CP_SAT, num_alternatives=2)
+
+    print(f"\nStatus: {result.status}, alternatives: {len(result.alternatives)}")
+    assert result.status in ("OPTIMAL", "FEASIBLE")
+    assert len(result.alternatives) == 2
+    assert 0 <= result.first_solution_seconds <= result.wall_time_seconds
+
+    for alt in result.alternatives:
+        print(f"  objective {alt.objective_value}, distance {alt.distance_from_best:.3f}")
+        assert result.objective_value <= alt.objective_value
+        assert alt.objective_value <= result.objective_value * (1 + DEFAULT_OBJECTIVE_TOLERANCE)
+        assert alt.distance_from_best >= DEFAULT_MIN_DIVERSITY
+        for account in accounts:
+            rows = [r for r in alt.results if r.lender_name == account.lender_name]
+            assert sum(r.payment_cents for r in rows) >= account.current_balance_cents
+            assert max(rows, key=lambda r: r.month).ending_balance_cents == 0, f"{account.lender_name} was not paid off"
+
+    months = max(r.month for alt in result.alternatives for r in alt.results)
+    first, second = [_plan_from_results(alt.results, accounts, months) for alt in result.alternatives]
+    assert payment_distance(first, second) >= DEFAULT_MIN_DIVERSITY
+
+    print("\n✅ Alternatives are complete plans within tolerance")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_select_diverse_plans()
+    test_alternatives_from_cp_sat()
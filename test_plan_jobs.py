@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Test asynchronous plan jobs: idempotency keys attach retries to the same job,
+a running job exposes its best plan so far (AUTO keeps jobs on CP-SAT, whose
+search publishes it), and finished jobs are evicted by TTL and by the
+retention bound.
+"""
+
+import time
+from datetime import date
+
+from backend_selector import select_backend
+from plan_jobs import PlanJobStore, PlanJobStatus, IdempotencyConflict, PlanJobStoreFull
+from solver_engine import (
+    DebtPortfolio,
+    Account,
+    MinPaymentRule,
+    Budget,
+    UserPreferences,
+    AccountType,
+    OptimizationStrategy,
+    PaymentShape,
+    SolverBackend,
+)
+
+def _portfolio():
+    return DebtPortfolio(
+        accounts=[
+            Account(
+                lender_name="Promo Card",
+                account_type=AccountType.CREDIT_CARD,
+                current_balance_cents=300000,  # $3,000
+                apr_standard_bps=2499,
+                payment_due_day=15,
+                min_payment_rule=MinPaymentRule(fixed_cents=2500, percentage_bps=200),
+                promo_duration_months=6,
+            ),
+            Account(
+                lender_name="Loan",
+                account_type=AccountType.LOAN,
+                current_balance_cents=150000,  # $1,500
+                apr_standard_bps=1999,
+                payment_due_day=1,
+                min_payment_rule=MinPaymentRule(fixed_cents=5000, percentage_bps=300, includes_interest=True),
+            ),
+        ],
+        budget=Budget(monthly_budget_cents=40000),  # $400/month
+        preferences=UserPreferences(
+            strategy=OptimizationStrategy.MINIMIZE_TOTAL_INTEREST,
+            payment_shape=PaymentShape.OPTIMIZED_MONTH_TO_MONTH,
+        ),
+        plan_start_date=date(2026, 1, 1),
+    )
+
+def _wait_for(condition, timeout=30.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Timed out waiting for the job"
+        time.sleep(0.1)
+
+def test_idempotent_job_with_partial_plan():
+    print("\n" + "="*80)
+    print("TEST: Idempotent Plan Job With Partial Plan")
+    print("="*80)
+
+    # Without history a synchronous solve of this portfolio would go to MIP,
+    # which publishes no incumbents; the job's AUTO solve stays on CP-SAT
+    assert select_backend(_portfolio()) == SolverBackend.MIP
+    store = PlanJobStore()
+    job, created = store.submit(_portfolio(), "request-a", idempotency_key="key-1")
+    retry, retry_created = store.submit(_portfolio(), "request-a", idempotency_key="key-1")
+    assert created and not retry_created
+    assert retry is job, "A retry must attach to the existing job"
+
+    try:
+        store.submit(_portfolio(), "request-b", idempotency_key="key-1")
+        assert False, "Reusing a key for another request must be rejected"
+    except IdempotencyConflict:
+        pass
+
+    # The first incumbent is visible while the search continues
+    _wait_for(lambda: job.progress.incumbent is not None or job.finished_at is not None)
+    assert job.progress.incumbent is not None
+    if job.finished_at is None:
+        assert job.status == PlanJobStatus.RUNNING
+        partial = job.partial_plan()
+        print(f"\nPartial plan after {job.progress.elapsed_seconds:.1f}s: {len(partial)} rows, "
+              f"objective {job.progress.objective_value}")
+        assert partial and partial[0].month == 1
+
+    store.cancel(job.job_id)
+    _wait_for(lambda: job.finished_at is not None)
+    print(f"Final status: {job.status.value}, solver status: {job.result.status}")
+    assert job.status == PlanJobStatus.SUCCEEDED and job.result.results
+    assert job.result.backend == SolverBackend.CP_SAT
+
+    print("\n✅ Retries attach to the same job, which reports its best plan so far")
+    print("\n" + "="*80)
+
+def test_finished_jobs_are_evicted():
+    print("\n" + "="*80)
+    print("TEST: Plan Job Retention")
+    print("="*80)
+
+    zero_balance = _portfolio()
+    for account in zero_balance.accounts:
+        account.current_balance_cents = 0
+
+    store = PlanJobStore(ttl_seconds=0.5, max_jobs=2)
+    first, _ = store.submit(zero_balance, "a", idempotency_key="key-a")
+    second, _ = store.submit(zero_balance, "b")
+    _wait_for(lambda: first.finished_at is not None and second.finished_at is not None)
+
+    # Full store: the oldest finished job makes room for the new one
+    third, _ = store.submit(zero_balance, "c")
+    assert store.get(first.job_id) is None
+    assert store.get(second.job_id) is second
+
+    # TTL expiry also frees the idempotency key
+    _wait_for(lambda: third.finished_at is not None)
+    time.sleep(0.6)
+    assert store.get(second.job_id) is None and store.get(third.job_id) is None
+    again, created = store.submit(zero_balance, "a", idempotency_key="key-a")
+    assert created and again.job_id != first.job_id
+
+    # Unfinished jobs are never evicted
+    busy = PlanJobStore(max_jobs=1)
+    running, _ = busy.submit(_portfolio(), "busy", backend=SolverBackend.CP_SAT)
+    try:
+        busy.submit(zero_balance, "more")
+        assert False, "A store full of unfinished jobs must refuse new ones"
+    except PlanJobStoreFull:
+        pass
+    busy.cancel(running.job_id)
+    _wait_for(lambda: running.finished_at is not None)
+
+    print("\n✅ Finished jobs expire by TTL and by the retention bound")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_idempotent_job_with_partial_plan()
+    test_finished_jobs_are_evicted()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test the portfolio timeline: budgets, bucket segments and promo ends are
+resolved once and match the month-by-month rules, bucket balances accrue and
+are paid down highest APR first, and the CP-SAT model, the MIP model, the
+exact simulator and the Monte Carlo simulator all plan against the same
+schedules.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+from plan_robustness import ScenarioModel, simulate_plan_robustness
+from plan_simulator import simulate_plan
+from solver_engine import (
+    Account,
+    AccountType,
+    BucketType,
+    Budget,
+    DebtBucket,
+    DebtPortfolio,
+    MinPaymentRule,
+    OptimizationStrategy,
+    PaymentShape,
+    SolverBackend,
+    UserPreferences,
+    build_portfolio_timeline,
+    calculate_promo_end_month_map,
+    solve_payment_plan,
+)
+
+def _portfolio():
+    return DebtPortfolio(
+        accounts=[
+            Account(
+                lender_name="Bucket Card",
+                account_type=AccountType.CREDIT_CARD,
+                current_balance_cents=240000,
+                apr_standard_bps=2490,
+                payment_due_day=10,
+                min_payment_rule=MinPaymentRule(fixed_cents=2500, percentage_bps=100, includes_interest=True),
+                buckets=[
+                    DebtBucket(BucketType.BALANCE_TRANSFER, 120000, 0, is_promo=True,
+                               promo_expiry_date=date(2026, 5, 20)),
+                    DebtBucket(BucketType.PURCHASES, 50000, 2490),
+                    DebtBucket(BucketType.PURCHASES, 30000, 2490, label="Old purchases"),
+                    DebtBucket(BucketType.CASH_ADVANCE, 40000, 3990),
+                ],
+            ),
+            Account(
+                lender_name="Loan",
+                account_type=AccountType.LOAN,
+                current_balance_cents=90000,
+                apr_standard_bps=1290,
+                payment_due_day=1,
+                min_payment_rule=MinPaymentRule(fixed_cents=4000, percentage_bps=0),
+                promo_end_date=date(2026, 3, 1),
+            ),
+        ],
+        budget=Budget(
+            monthly_budget_cents=30000,
+            # Deliberately unsorted: later changes win once their date has passed
+            future_changes=[(date(2026, 9, 1), 45000), (date(2026, 4, 15), 25000)],
+            lump_sum_payments=[(date(2026, 7, 3), 50000), (date(2026, 7, 28), 10000), (date(2025, 12, 1), 99999)],
+        ),
+        preferences=UserPreferences(
+            strategy=OptimizationStrategy.MINIMIZE_TOTAL_INTEREST,
+            payment_shape=PaymentShape.OPTIMIZED_MONTH_TO_MONTH,
+        ),
+        plan_start_date=date(2026, 1, 1),
+    )
+
+def test_timeline_matches_monthly_rules():
+    print("\n" + "="*80)
+    print("TEST: Portfolio Timeline Schedules")
+    print("="*80)
+
+    portfolio = _portfolio()
+    timeline = build_portfolio_timeline(portfolio, 24)
+
+    assert timeline.month_dates == [date(2026, 1, 1) + relativedelta(months=m) for m in range(24)]
+    assert timeline.promo_end_months == calculate_promo_end_month_map(portfolio)
+
+    # Both purchase buckets share a schedule and are modelled as one segment
+    card = timeline.segments["Bucket Card"]
+    assert [(s.label, s.balance_cents) for s in card] == [
+        ("Balance Transfer", 120000), ("Purchases + Old purchases", 80000), ("Cash Advance", 40000)
+    ]
+    # The transfer reverts to the standard APR after its promo expires in May
+    assert card[0].apr_bps == [0] * 5 + [2490] * 19
+    assert card[2].apr_bps == [3990] * 24
+    assert timeline.payment_order("Bucket Card", 0) == [2, 1, 0]
+    # Once expired, the transfer matches purchases for good and is pooled with them
+    assert timeline.active_segments("Bucket Card", 4) == [0, 1, 2]
+    assert timeline.active_segments("Bucket Card", 5) == [0, 2]
+    assert timeline.pooled_from("Bucket Card", 5, 0) == [0, 1]
+    [loan] = timeline.segments["Loan"]
+    assert loan.balance_cents == 90000 and loan.apr_bps == [0] * 3 + [1290] * 21
+
+    expected_budgets = [30000] * 4 + [25000] * 4 + [45000] * 16
+    expected_budgets[6] += 60000  # both July lump sums; the pre-start one is ignored
+    assert timeline.monthly_budgets == expected_budgets
+
+    # Purchases and cash accrue during the transfer's promo; a payment clears
+    # the cash advance before reducing purchases
+    rows = simulate_plan(portfolio, {("Bucket Card", 0): 50000}, max_months=24, timeline=timeline)
+    card_interest = [r.interest_charged_cents for r in rows if r.lender_name == "Bucket Card"]
+    assert card_interest[0] == 40000 * 3990 // 120000 + 80000 * 2490 // 120000
+    assert card_interest[1] == (80000 + 80000 * 2490 // 120000 - 8670) * 2490 // 120000
+
+    print("\n✅ Timeline schedules match the month-by-month rules")
+    print("\n" + "="*80)
+
+def test_engines_share_timeline_schedules():
+    print("\n" + "="*80)
+    print("TEST: Engines Plan Against the Same Timeline")
+    print("="*80)
+
+    portfolio = _portfolio()
+    timeline = build_portfolio_timeline(portfolio)
+
+    for backend in (SolverBackend.MIP, SolverBackend.CP_SAT):
+        result = solve_payment_plan(portfolio, backend, time_limit_seconds=10.0)
+        assert result.results, f"{backend.value} found no plan"
+
+        # Every engine's interest must replay exactly under the simulator's schedules
+        planned = {(r.lender_name, r.month - 1): r.payment_cents for r in result.results}
+        assert simulate_plan(portfolio, planned, timeline=timeline) == result.results
+
+        paid = defaultdict(int)
+        for r in result.results:
+            paid[r.month - 1] += r.payment_cents
+        assert all(paid[month] <= timeline.monthly_budgets[month] for month in paid)
+
+        calm = ScenarioModel(num_paths=4, budget_shock_probability=0.0, budget_volatility=0.0,
+                             missed_payment_probability=0.0)
+        report = simulate_plan_robustness(portfolio, result.results, calm, timeline=timeline)
+        assert (report.total_interest_cents == report.planned_interest_cents).all()
+        print(f"   {backend.value}: plan replays exactly ({result.status})")
+
+    print("\n✅ CP-SAT, MIP and both simulators agree on the schedules")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_timeline_matches_monthly_rules()
+    test_engines_share_timeline_schedules()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test coarse monetary precision: a plan solved in whole pounds must be
+corrected back into an exact-cents plan that satisfies every constraint.
+"""
+
+from datetime import date
+from solver_engine import (
+    solve_payment_plan,
+    DebtPortfolio,
+    Account,
+    MinPaymentRule,
+    Budget,
+    UserPreferences,
+    AccountType,
+    OptimizationStrategy,
+    PaymentShape,
+    SolverBackend,
+    MonetaryPrecision,
+)
+
+def test_whole_pound_precision_plan_is_exact():
+    """
+    Large odd-penny balances solved at £1 precision with the MIP backend.
+    The corrected plan must match the exact interest and minimum payment rules,
+    stay within budget, pay everything off, and report its approximation error.
+    """
+    print("\n" + "="*80)
+    print("TEST: Whole-Pound Precision Solve Corrected To Exact Cents")
+    print("="*80)
+
+    accounts = [
+        Account(
+            lender_name="Big Card",
+            account_type=AccountType.CREDIT_CARD,
+            current_balance_cents=1234567,  # $12,345.67
+            apr_standard_bps=2299,
+            payment_due_day=10,
+            min_payment_rule=MinPaymentRule(fixed_cents=2599, percentage_bps=100, includes_interest=True),
+        ),
+        Account(
+            lender_name="Car Loan",
+            account_type=AccountType.LOAN,
+            current_balance_cents=876543,  # $8,765.43
+            apr_standard_bps=899,
+            payment_due_day=1,
+            min_payment_rule=MinPaymentRule(fixed_cents=15050),
+        ),
+    ]
+    monthly_budget_cents = 120050  # $1,200.50
+
+    portfolio = DebtPortfolio(
+        accounts=accounts,
+        budget=Budget(monthly_budget_cents=monthly_budget_cents),
+        preferences=UserPreferences(
+            strategy=OptimizationStrategy.MINIMIZE_TOTAL_INTEREST,
+            payment_shape=PaymentShape.OPTIMIZED_MONTH_TO_MONTH,
+            precision=MonetaryPrecision.WHOLE_POUNDS,
+        ),
+        plan_start_date=date(2026, 1, 1),
+    )
+
+    result = solve_payment_plan(portfolio, SolverBackend.MIP)
+
+    print(f"\nStatus: {result.status}, unit: {result.precision_unit_cents}p, "
+          f"approximation error: {result.approximation_error_cents}")
+
+    assert result.status in ("OPTIMAL", "FEASIBLE")
+    assert result.precision_unit_cents == 100
+    assert result.approximation_error_cents is not None
+    assert result.approximation_error_cents >= 0, "Scaled model must over-estimate interest"
+
+    for account in accounts:
+        rows = sorted((r for r in result.results if r.lender_name == account.lender_name), key=lambda r: r.month)
+        previous_balance = account.current_balance_cents
+        for row in rows:
+            interest = previous_balance * account.apr_standard_bps // 120000
+            owed = previous_balance + interest
+            rule = account.min_payment_rule
+            base = owed if rule.includes_interest else previous_balance
+            minimum = min(max(rule.fixed_cents, base * rule.percentage_bps // 10000), owed)
+
+            assert row.interest_charged_cents == interest, f"{account.lender_name} month {row.month}: interest mismatch"
+            assert minimum <= row.payment_cents <= owed, f"{account.lender_name} month {row.month}: payment out of range"
+            assert row.ending_balance_cents == owed - row.payment_cents
+            previous_balance = row.ending_balance_cents
+
+        assert previous_balance == 0, f"{account.lender_name} was not paid off"
+
+    for month in {r.month for r in result.results}:
+        spent = sum(r.payment_cents for r in result.results if r.month == month)
+        assert spent <= monthly_budget_cents, f"Month {month} exceeds the budget"
+
+    print("\n✅ Corrected plan is exact to the penny")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_whole_pound_precision_plan_is_exact()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test the solve ledger: recorded solves must drive the predicted time limit
+and stall rule, hard cases must get the maximum time, and a CP-SAT search
+with a stall rule must stop early while still returning a plan.
+"""
+
+import os
+import tempfile
+from datetime import date
+
+import solve_ledger
+from solve_ledger import SolveBudget, predict_solve_budget, record_solve, similar_solves, portfolio_features
+from solver_engine import (
+    solve_payment_plan,
+    DebtPortfolio,
+    Account,
+    MinPaymentRule,
+    Budget,
+    UserPreferences,
+    AccountType,
+    OptimizationStrategy,
+    PaymentShape,
+    SolverBackend,
+    PlanSolveResult,
+)
+
+def _portfolio():
+    return DebtPortfolio(
+        accounts=[
+            Account(
+                lender_name="Promo Card",
+                account_type=AccountType.CREDIT_CARD,
+                current_balance_cents=300000,  # $3,000
+                apr_standard_bps=2499,
+                payment_due_day=15,
+                min_payment_rule=MinPaymentRule(fixed_cents=2500, percentage_bps=200),
+                promo_duration_months=6,
+            ),
+            Account(
+                lender_name="Loan",
+                account_type=AccountType.LOAN,
+                current_balance_cents=150000,  # $1,500
+                apr_standard_bps=1999,
+                payment_due_day=1,
+                min_payment_rule=MinPaymentRule(fixed_cents=5000, percentage_bps=300, includes_interest=True),
+            ),
+        ],
+        budget=Budget(monthly_budget_cents=40000),  # $400/month
+        preferences=UserPreferences(
+            strategy=OptimizationStrategy.MINIMIZE_TOTAL_INTEREST,
+            payment_shape=PaymentShape.OPTIMIZED_MONTH_TO_MONTH,
+        ),
+        plan_start_date=date(2026, 1, 1),
+    )
+
+def _recorded(status, wall_time, improvements):
+    return PlanSolveResult(
+        status=status,
+        backend=SolverBackend.CP_SAT,
+        results=[],
+        objective_value=100.0,
+        best_bound=100.0 if status == "OPTIMAL" else 90.0,
+        wall_time_seconds=wall_time,
+        gap_curve=[(t, 200.0 - i, 50.0) for i, t in enumerate(improvements)],
+    )
+
+def test_ledger_predicts_budget():
+    print("\n" + "="*80)
+    print("TEST: Solve Ledger Time Budget Prediction")
+    print("="*80)
+
+    original_path = solve_ledger.LEDGER_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        solve_ledger.LEDGER_PATH = os.path.join(tmp, "ledger.sqlite3")
+        try:
+            portfolio = _portfolio()
+            default = predict_solve_budget(portfolio, SolverBackend.CP_SAT)
+            assert default.basis == "default" and default.stall_seconds is None
+
+            budget = SolveBudget(time_limit_seconds=60.0)
+            for i in range(6):
+                record_solve(portfolio, _recorded("OPTIMAL", 10.0 + i, [1.0, 2.0, 3.0 + i * 0.1]), budget)
+
+            assert len(similar_solves(portfolio_features(portfolio), SolverBackend.CP_SAT)) == 6
+            assert len(similar_solves(portfolio_features(portfolio), limit=4)) == 4
+
+            # Lookups use the feature index and read summaries, not the gap curves
+            conn = solve_ledger._connect()
+            plan = " ".join(row[3] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM solves WHERE strategy = ? AND payment_shape = ?"
+                " AND horizon_months = ? ORDER BY id DESC", ("a", "b", 1)))
+            conn.close()
+            assert "solves_by_features" in plan, plan
+            assert "gap_curve" not in similar_solves(portfolio_features(portfolio))[0].keys()
+            predicted = predict_solve_budget(portfolio, SolverBackend.CP_SAT)
+            print(f"\nPredicted: {predicted}")
+            assert predicted.basis.startswith("history")
+            assert solve_ledger.MIN_TIME_LIMIT_SECONDS <= predicted.time_limit_seconds <= 15.0 * solve_ledger.TIME_LIMIT_HEADROOM
+            assert predicted.stall_seconds is not None
+            assert solve_ledger.MIN_STALL_SECONDS <= predicted.stall_seconds <= 1.5 * solve_ledger.STALL_HEADROOM
+
+            # Mostly timed-out history marks the case as hard
+            for _ in range(10):
+                record_solve(portfolio, _recorded("FEASIBLE", 60.0, [5.0, 30.0]), budget)
+            hard = predict_solve_budget(portfolio, SolverBackend.CP_SAT)
+            print(f"Hard case: {hard}")
+            assert hard.time_limit_seconds == solve_ledger.MAX_TIME_LIMIT_SECONDS
+        finally:
+            solve_ledger.LEDGER_PATH = original_path
+
+    print("\n✅ Ledger history drives time limits and stall rules")
+    print("\n" + "="*80)
+
+def test_infeasible_solves_are_not_timeouts():
+    print("\n" + "="*80)
+    print("TEST: Infeasible Solves In The Ledger")
+    print("="*80)
+
+    # Most similar budgets were proven infeasible quickly; the feasible ones took 10-13s
+    portfolio = _portfolio()
+    budget = SolveBudget(time_limit_seconds=60.0)
+    for i in range(4):
+        record_solve(portfolio, _recorded("OPTIMAL", 10.0 + i, [1.0, 2.0]), budget)
+    for _ in range(6):
+        record_solve(portfolio, _recorded("INFEASIBLE", 0.5, []), budget)
+
+    predicted = predict_solve_budget(portfolio, SolverBackend.CP_SAT)
+    print(f"\nPredicted: {predicted}")
+    assert predicted.basis == "history (n=10)"
+    assert solve_ledger.MIN_TIME_LIMIT_SECONDS <= predicted.time_limit_seconds <= 13.0 * solve_ledger.TIME_LIMIT_HEADROOM
+    assert predicted.time_limit_seconds < solve_ledger.MAX_TIME_LIMIT_SECONDS
+
+    # Time-outs (UNKNOWN as well as FEASIBLE) still mark the case as hard
+    for _ in range(10):
+        record_solve(portfolio, _recorded("UNKNOWN", 60.0, []), budget)
+    assert predict_solve_budget(portfolio, SolverBackend.CP_SAT).time_limit_seconds == solve_ledger.MAX_TIME_LIMIT_SECONDS
+
+    print("\n✅ Proven infeasibility counts as an answer, not a time-out")
+    print("\n" + "="*80)
+
+def test_stall_rule_stops_search_with_a_plan():
+    print("\n" + "="*80)
+    print("TEST: Stall Rule Stops CP-SAT Early")
+    print("="*80)
+
+    from solver_engine import _solve_with_cp_sat
+    result = _solve_with_cp_sat(_portfolio(), time_limit_seconds=60.0, stall_seconds=4.0)
+
+    print(f"\nStatus: {result.status}, stopped early: {result.stopped_early}, wall: {result.wall_time_seconds:.1f}s")
+    assert result.results, "A plan must be returned"
+    assert len(result.gap_curve) == result.num_solutions
+    if result.stopped_early:
+        assert result.status == "FEASIBLE"
+        assert result.wall_time_seconds < 60.0
+
+    print("\n✅ Stall rule returns the incumbent plan")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_ledger_predicts_budget()
+    test_infeasible_solves_are_not_timeouts()
+    test_stall_rule_stops_search_with_a_plan()
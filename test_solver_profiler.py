@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test the solver profiling CLI: a portfolio JSON in the /generate-plan format
+is loaded, solved with CP-SAT, and the profile reports timings, model
+statistics and an exported model.
+"""
+
+import json
+import os
+import tempfile
+
+from solver_engine import main, load_portfolio_json, solve_payment_plan, SolverBackend
+from solver_profiler import SolveProfile
+
+def test_profile_reports_timings_and_model_stats(portfolio_json):
+    print("\n" + "="*80)
+    print("TEST: Solver Profile From Portfolio JSON")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        portfolio_path = os.path.join(tmp, "portfolio.json")
+        model_path = os.path.join(tmp, "model.pbtxt")
+        with open(portfolio_path, "w") as f:
+            json.dump(portfolio_json, f)
+
+        portfolio = load_portfolio_json(portfolio_path)
+        assert portfolio.accounts[0].current_balance_cents == 150000
+
+        profile = SolveProfile(export_model_path=model_path)
+        result = solve_payment_plan(portfolio, SolverBackend.CP_SAT, profile=profile)
+
+        print(f"\nStatus: {result.status}, build {profile.build_seconds:.3f}s, "
+              f"presolve {profile.presolve_seconds}, search {profile.search_seconds}")
+        assert result.status == "OPTIMAL"
+        assert profile.build_seconds > 0
+        assert profile.presolve_seconds is not None and profile.search_seconds is not None
+        assert profile.variable_counts.get("integer", 0) > 0
+        assert profile.constraint_counts.get("int_div", 0) > 0
+        assert any("status: OPTIMAL" in line for line in profile.log_highlights())
+        assert os.path.getsize(model_path) > 0
+
+        # The CLI entry point runs end to end on the same file
+        main(["profile", portfolio_path, "--no-log"])
+
+    print("\n✅ Profile captured timings, model statistics and the exported model")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    from conftest import PORTFOLIO_JSON
+    test_profile_reports_timings_and_model_stats(PORTFOLIO_JSON)
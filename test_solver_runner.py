@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test the solver runner: a running CP-SAT solve must stop promptly when
+cancelled, a queued solve must never start, and admission control must
+reject overflow with a Retry-After while fast-path solves skip the queue.
+"""
+
+import asyncio
+import time
+from datetime import date
+
+from solver_runner import SolverRunner, SolveCancelled, SolveLane, SolverOverloaded
+from solver_engine import (
+    DebtPortfolio,
+    Account,
+    MinPaymentRule,
+    Budget,
+    UserPreferences,
+    AccountType,
+    OptimizationStrategy,
+    PaymentShape,
+    SolverBackend,
+)
+
+def _portfolio():
+    return DebtPortfolio(
+        accounts=[
+            Account(
+                lender_name="Promo Card",
+                account_type=AccountType.CREDIT_CARD,
+                current_balance_cents=300000,  # $3,000
+                apr_standard_bps=2499,
+                payment_due_day=15,
+                min_payment_rule=MinPaymentRule(fixed_cents=2500, percentage_bps=200),
+                promo_duration_months=6,
+            ),
+            Account(
+                lender_name="Loan",
+                account_type=AccountType.LOAN,
+                current_balance_cents=150000,  # $1,500
+                apr_standard_bps=1999,
+                payment_due_day=1,
+                min_payment_rule=MinPaymentRule(fixed_cents=5000, percentage_bps=300, includes_interest=True),
+            ),
+        ],
+        budget=Budget(monthly_budget_cents=40000),  # $400/month
+        preferences=UserPreferences(
+            strategy=OptimizationStrategy.MINIMIZE_TOTAL_INTEREST,
+            payment_shape=PaymentShape.OPTIMIZED_MONTH_TO_MONTH,
+        ),
+        plan_start_date=date(2026, 1, 1),
+    )
+
+def test_cancel_running_solve_stops_search():
+    print("\n" + "="*80)
+    print("TEST: Cancelling A Running Solve")
+    print("="*80)
+
+    runner = SolverRunner(max_concurrent_solves=1)
+    ticket = runner.submit(_portfolio(), solve_id="running", backend=SolverBackend.CP_SAT)
+    time.sleep(1.5)
+    assert runner.active_solves()[0]["state"] == "running"
+
+    cancelled_at = time.time()
+    assert runner.cancel("running")
+    result = ticket.future.result(timeout=10)
+    stop_seconds = time.time() - cancelled_at
+
+    print(f"\nStatus: {result.status}, cancelled: {result.cancelled}, stopped {stop_seconds:.2f}s after cancel")
+    assert result.cancelled
+    assert stop_seconds < 2.0
+    assert runner.active_solves() == []
+    assert not runner.cancel("running"), "Finished solves are no longer cancellable"
+
+    print("\n✅ Running solve stopped at the next watchdog poll")
+    print("\n" + "="*80)
+
+def test_cancel_queued_solve_and_disconnect():
+    print("\n" + "="*80)
+    print("TEST: Cancelling Queued Solves And Client Disconnects")
+    print("="*80)
+
+    runner = SolverRunner(max_concurrent_solves=1)
+
+    async def scenario():
+        disconnected = False
+
+        async def is_disconnected():
+            return disconnected
+
+        first = asyncio.ensure_future(runner.run(_portfolio(), is_disconnected=is_disconnected, solve_id="first",
+                                                  backend=SolverBackend.CP_SAT))
+        await asyncio.sleep(0.2)
+        queued = runner.submit(_portfolio(), solve_id="queued", backend=SolverBackend.CP_SAT)
+        assert [s["state"] for s in runner.active_solves()] == ["running", "queued"]
+
+        # A queued solve is dropped without ever reaching the solver
+        assert runner.cancel("queued")
+        assert queued.future.cancelled()
+
+        # The client going away stops the running solve
+        await asyncio.sleep(1.0)
+        disconnected = True
+        started = time.time()
+        try:
+            result = await first
+            assert result.cancelled
+        except SolveCancelled:
+            pass
+        return time.time() - started
+
+    wait_seconds = asyncio.run(scenario())
+    print(f"\nDisconnected solve released its worker after {wait_seconds:.2f}s")
+    assert wait_seconds < 3.0
+    assert runner.active_solves() == []
+
+    print("\n✅ Queued solves are dropped and disconnects cancel the search")
+    print("\n" + "="*80)
+
+def test_admission_control_and_fast_lane():
+    print("\n" + "="*80)
+    print("TEST: Admission Control And Fast Lane")
+    print("="*80)
+
+    runner = SolverRunner(max_concurrent_solves=1, max_queued_solves=1, max_queue_wait_seconds=60)
+    running = runner.submit(_portfolio(), solve_id="running", backend=SolverBackend.CP_SAT)
+    queued = runner.submit(_portfolio(), solve_id="queued", backend=SolverBackend.CP_SAT)
+    assert queued.lane == SolveLane.STANDARD
+    assert runner.estimate_queue_seconds(solve_id="queued") > 0
+
+    # Queue full: rejected at once with a retry hint
+    try:
+        runner.submit(_portfolio(), solve_id="overflow", backend=SolverBackend.CP_SAT)
+        assert False, "A full queue must reject new solves"
+    except SolverOverloaded as e:
+        print(f"\nRejected: {e} (status {e.status_code}, retry after {e.retry_after_seconds}s)")
+        assert e.status_code == 503 and e.retry_after_seconds >= 1
+
+    # Fast-path solves have their own lane and finish while the standard lane is busy
+    zero_balance = _portfolio()
+    for account in zero_balance.accounts:
+        account.current_balance_cents = 0
+    fast = runner.submit(zero_balance, solve_id="fast")
+    assert fast.lane == SolveLane.FAST
+    assert fast.future.result(timeout=5).fast_path == "zero-balance"
+    assert not running.future.done()
+
+    metrics = runner.metrics()["lanes"]
+    print(f"Metrics: {metrics}")
+    assert metrics["standard"]["running"] == 1 and metrics["standard"]["queued"] == 1
+    assert metrics["standard"]["rejected"] == 1 and metrics["fast"]["completed"] == 1
+
+    runner.cancel("queued")
+    runner.cancel("running")
+    running.future.result(timeout=10)
+
+    # An estimated wait beyond the limit is rejected with 429
+    impatient = SolverRunner(max_concurrent_solves=1, max_queue_wait_seconds=1)
+    busy = impatient.submit(_portfolio(), solve_id="busy", backend=SolverBackend.CP_SAT)
+    try:
+        impatient.submit(_portfolio(), solve_id="late", backend=SolverBackend.CP_SAT)
+        assert False, "A solve that would wait too long must be rejected"
+    except SolverOverloaded as e:
+        assert e.status_code == 429
+    impatient.cancel("busy")
+    busy.future.result(timeout=10)
+
+    print("\n✅ Overflow is rejected fast and fast-path solves skip the queue")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_cancel_running_solve_stops_search()
+    test_cancel_queued_solve_and_disconnect()
+    test_admission_control_and_fast_lane()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test the columnar transaction frame: its columns hold exactly what the
+pipeline used to derive per model (entry type, truncated cents, ordinal day,
+interned descriptions), and the budget breakdown computed from the frame is
+the same as the original per-model computation over the streamed results.
+"""
+
+import asyncio
+import contextlib
+import io
+import random
+from datetime import date, datetime, timedelta
+
+from budget_cube import BudgetCube
+from enrichment_service import EnrichmentService, NtropyOutputModel
+from enrichment_store import EnrichmentResultStore
+from transaction_frame import BUDGET_CATEGORIES, ENTRY_TYPES, NO_DAY, UNCLASSIFIED
+
+def _reference_budget_breakdown(enriched, analysis_horizon_months=3):
+    """The original per-model budget breakdown, kept to check the columnar one against."""
+    today = datetime.now()
+    first_of_current_month = datetime(today.year, today.month, 1)
+    start_year, start_month = today.year, today.month - analysis_horizon_months
+    while start_month <= 0:
+        start_month += 12
+        start_year -= 1
+    analysis_start = datetime(start_year, start_month, 1)
+
+    totals = {"income": 0, "fixed": 0, "discretionary": 0, "debt": 0}
+    for tx in enriched:
+        if not tx.transaction_date:
+            continue
+        try:
+            tx_date = datetime.strptime(tx.transaction_date, "%Y-%m-%d")
+        except ValueError:
+            continue
+        if tx_date < analysis_start or tx_date >= first_of_current_month:
+            continue
+        if tx.entry_type == "incoming":
+            totals["income"] += tx.amount_cents
+        elif tx.budget_category in totals:
+            totals[tx.budget_category] += tx.amount_cents
+
+    complete_months = 0
+    year, month = start_year, start_month
+    while datetime(year, month, 1) < first_of_current_month:
+        complete_months += 1
+        month += 1
+        if month > 12:
+            month, year = 1, year + 1
+    months = max(1, min(complete_months, analysis_horizon_months))
+    monthly = {key: value // months for key, value in totals.items()}
+    return {
+        "averageMonthlyIncomeCents": monthly["income"],
+        "fixedCostsCents": monthly["fixed"],
+        "discretionaryCents": monthly["discretionary"],
+        "debtPaymentsCents": monthly["debt"],
+        "safeToSpendCents": max(0, monthly["income"] - monthly["fixed"] - monthly["debt"]),
+        "analysisMonths": months,
+    }
+
+def _raw_history(seed, size):
+    rng = random.Random(seed)
+    descriptions = ["TESCO STORES", "NETFLIX.COM", "DD BRITISH GAS", "KLARNA PAYMENT", "SALARY ACME LTD",
+                    "TRANSFER TO SAVINGS", "RETURNED DD BRITISH GAS", "COUNCIL TAX", "Pret A Manger"]
+    transactions = []
+    for i in range(size):
+        timestamp = (date.today() - timedelta(days=rng.randrange(200))).isoformat() + "T09:30:00Z"
+        if rng.random() < 0.02:
+            timestamp = rng.choice(["", "2024-13-01", "pending"])
+        transactions.append({
+            "transaction_id": f"tx-{i}",
+            "description": rng.choice(descriptions),
+            # Amounts whose float cents truncate (e.g. 0.29 * 100 = 28.999...)
+            "amount": rng.choice((-1, 1)) * rng.choice((0.29, 10.0, 25.99, 1.15, round(rng.uniform(1, 900), 2))),
+            "transaction_type": rng.choice(["DEBIT", "CREDIT", "DIRECT_DEBIT", "", None]),
+            "transaction_classification": rng.choice([[], ["Bills", "Utilities"], ["Shopping"]]),
+            "timestamp": timestamp,
+        })
+    return transactions
+
+def test_frame_columns():
+    print("\n" + "="*80)
+    print("TEST: Transaction Frame Columns")
+    print("="*80)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = EnrichmentService(api_key="", result_store=EnrichmentResultStore(path=":memory:"))
+    normalized = [service.normalize_truelayer_transaction(tx) for tx in _raw_history(1, 3000)]
+    frame = service._build_frame(normalized)
+
+    assert len(frame) == len(normalized)
+    for index, tx in enumerate(normalized):
+        assert frame.transaction_ids[index] == tx.transaction_id
+        assert frame.entry_type(index) == service._determine_entry_type(tx)
+        assert frame.amount_cents[index] == int(tx.amount * 100)
+        assert frame.descriptions[frame.description_ids[index]] == tx.description
+        try:
+            expected_day = datetime.strptime(tx.timestamp, "%Y-%m-%d").toordinal()
+        except ValueError:
+            expected_day = NO_DAY
+        assert frame.days[index] == expected_day
+    assert len(frame.descriptions) == len({tx.description for tx in normalized})
+    assert set(frame.categories) == {UNCLASSIFIED}
+
+    # Categories recorded from results, None rows left unclassified
+    results = [NtropyOutputModel(transaction_id="a", original_description="", amount_cents=1, entry_type="outgoing",
+                                 budget_category=category, transaction_date="") for category in ("debt", "mystery")]
+    frame.set_categories(results + [None])
+    assert list(frame.categories[:3]) == [BUDGET_CATEGORIES.index("debt"), BUDGET_CATEGORIES.index("other"), UNCLASSIFIED]
+    assert ENTRY_TYPES == ("outgoing", "incoming")
+    print(f"   {len(frame)} rows, {len(frame.descriptions)} distinct descriptions")
+
+    print("\n✅ Frame columns match the per-model values")
+    print("\n" + "="*80)
+
+def test_budget_breakdown_from_frame():
+    print("\n" + "="*80)
+    print("TEST: Columnar Budget Breakdown")
+    print("="*80)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = EnrichmentService(api_key="", result_store=EnrichmentResultStore(path=":memory:"))
+
+    async def run(raw_transactions):
+        events = [event async for event in service.enrich_transactions_streaming(
+            raw_transactions, "user", "item", enable_agentic_enrichment=False
+        )]
+        return events[-1]
+
+    for seed, size in ((2, 500), (3, 4000)):
+        raw_transactions = _raw_history(seed, size)
+        with contextlib.redirect_stdout(io.StringIO()):
+            complete = asyncio.run(run(raw_transactions))
+        enriched = [NtropyOutputModel(**tx) for tx in complete["result"]["enriched_transactions"]]
+        budget = complete["result"]["budget_analysis"]
+        assert budget == _reference_budget_breakdown(enriched)
+        assert budget["averageMonthlyIncomeCents"] > 0 and budget["fixedCostsCents"] > 0
+
+        # Other horizons over the same classified frame
+        frame = service._build_frame([service.normalize_truelayer_transaction(tx) for tx in raw_transactions])
+        frame.set_categories(enriched)
+        for horizon in (1, 6, 12):
+            assert BudgetCube.from_frame(frame).budget_breakdown(horizon) == _reference_budget_breakdown(enriched, horizon)
+        print(f"   {size} transactions: {budget}")
+
+    print("\n✅ Budget breakdown from the frame equals the per-model computation")
+    print("\n" + "="*80)
+
+if __name__ == "__main__":
+    test_frame_columns()
+    test_budget_breakdown_from_frame()
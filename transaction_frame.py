@@ -0,0 +1,103 @@
+# transaction_frame.py - Columnar view of a normalized transaction history
+# The enrichment pipeline needs the same few derived values for every
+# transaction in several places: Layer 0 matches on day, entry type and amount
+# in cents, classification writes one budget category per transaction, and the
+# budget analysis sums cents by month, entry type and category. The frame
+# computes each of them once, at normalization, into compact typed columns
+# (one array per field, one row per transaction in input order) so large
+# histories don't re-derive them per stage or hold them as per-row objects.
+# Descriptions are interned: each distinct text is stored once and rows refer
+# to it by id, so per-description work (keyword scans) runs once per text.
+
+from array import array
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+# Entry type codes
+OUTGOING = 0
+INCOMING = 1
+ENTRY_TYPES = ("outgoing", "incoming")
+
+# Budget category codes; any other category string is recorded as "other",
+# and UNCLASSIFIED rows have no result (yet)
+UNCLASSIFIED = -1
+BUDGET_CATEGORIES = ("debt", "fixed", "discretionary", "income", "transfer", "other")
+_CATEGORY_CODES = {name: code for code, name in enumerate(BUDGET_CATEGORIES)}
+_OTHER = _CATEGORY_CODES["other"]
+
+# Ordinal day of a row whose date is missing or unparseable (real ordinals start at 1)
+NO_DAY = 0
+
+
+def category_code(budget_category: str) -> int:
+    """Code of a budget category ("other" for categories outside BUDGET_CATEGORIES)."""
+    return _CATEGORY_CODES.get(budget_category, _OTHER)
+
+
+class TransactionFrame:
+    """
+    Struct-of-arrays columns for a normalized transaction history. Row i is
+    the i-th transaction passed to from_transactions.
+    """
+
+    __slots__ = ("transaction_ids", "descriptions", "description_ids", "amount_cents",
+                 "days", "entry_types", "categories")
+
+    def __init__(self):
+        self.transaction_ids: List[str] = []
+        # Distinct descriptions; description_ids[i] indexes into it
+        self.descriptions: List[str] = []
+        self.description_ids = array("l")
+        # Truncated like every other amount in the pipeline: int(amount * 100)
+        self.amount_cents = array("q")
+        self.days = array("l")
+        self.entry_types = array("b")
+        self.categories = array("b")
+
+    @classmethod
+    def from_transactions(cls, transactions: Sequence, entry_type_of: Callable[[object], str]) -> "TransactionFrame":
+        """
+        Build the columns from normalized transactions (objects with
+        transaction_id, description, amount and a YYYY-MM-DD timestamp);
+        entry_type_of resolves each one's entry type.
+        """
+        frame = cls()
+        description_index: Dict[str, int] = {}
+        day_by_timestamp: Dict[str, int] = {}
+        for tx in transactions:
+            description = tx.description or ""
+            description_id = description_index.get(description)
+            if description_id is None:
+                description_id = description_index[description] = len(frame.descriptions)
+                frame.descriptions.append(description)
+            # Histories repeat dates, so parse each date once
+            day = day_by_timestamp.get(tx.timestamp)
+            if day is None:
+                try:
+                    day = datetime.strptime(tx.timestamp, "%Y-%m-%d").toordinal()
+                except (TypeError, ValueError):
+                    day = NO_DAY
+                day_by_timestamp[tx.timestamp] = day
+
+            frame.transaction_ids.append(tx.transaction_id)
+            frame.description_ids.append(description_id)
+            frame.amount_cents.append(int(tx.amount * 100))
+            frame.days.append(day)
+            frame.entry_types.append(INCOMING if entry_type_of(tx) == "incoming" else OUTGOING)
+        frame.categories = array("b", [UNCLASSIFIED]) * len(frame.transaction_ids)
+        return frame
+
+    def __len__(self) -> int:
+        return len(self.transaction_ids)
+
+    def entry_type(self, index: int) -> str:
+        return ENTRY_TYPES[self.entry_types[index]]
+
+    def set_categories(self, results: Iterable[Optional[object]]) -> None:
+        """Record the budget_category of each row's result (None leaves a row unclassified)."""
+        for index, result in enumerate(results):
+            self.categories[index] = UNCLASSIFIED if result is None else category_code(result.budget_category)
+
+    def description_flags(self, predicate: Callable[[str], bool]) -> List[bool]:
+        """predicate evaluated once per distinct description, by description id."""
+        return [predicate(description) for description in self.descriptions]